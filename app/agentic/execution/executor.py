@@ -1,7 +1,9 @@
 # app/agentic/execution/executor.py
 
-from typing import Dict, Any
+import inspect
+from typing import Callable, Dict, Any
 from app.agentic.tools.registry import ToolRegistry
+from app.db.unit_of_work import UnitOfWork
 from app.agentic.schemas.tool_result import ToolResult
 from app.agentic.schemas.error_type import ErrorType
 
@@ -9,8 +11,10 @@ class ToolExecutionError(Exception):
     pass
 
 class PythonExecutor:
-    def __init__(self, registry: ToolRegistry):
+    def __init__(self, registry: ToolRegistry, uow_factory: Callable[[], UnitOfWork] = UnitOfWork):
         self.registry = registry
+        # tool 声明了 db 参数但调用方没有传时，每次调用打开一个工作单元
+        self.uow_factory = uow_factory
 
     def execute(self, *, tool_name: str, args: Dict[str, Any], allowlist: set[str]) -> ToolResult:
         '''
@@ -18,7 +22,9 @@ class PythonExecutor:
         steps:
         1) check allowlist
         2) lookup tool spec
-        3) execute tool function with args 
+        3) execute tool function with args (tools taking `db` get a per-call UnitOfWork session
+           when the caller does not pass one: committed when result.ok, rolled back otherwise;
+           tools only flush, a caller passing its own `db` owns commit/rollback/close)
         4) return result in a standard format, raise System error when result is not ToolResult
         param:
         tool_name: str - The name of the tool to execute.
@@ -51,8 +57,17 @@ class PythonExecutor:
             )
 
         # 3️ execute
+        uow = None
+        if "db" not in args and "db" in inspect.signature(spec.func).parameters:
+            uow = self.uow_factory()
+            args = {**args, "db": uow.session}
         try:
             result = spec.func(**args)
+            if uow is not None:
+                if isinstance(result, ToolResult) and result.ok:
+                    uow.commit()
+                else:
+                    uow.rollback()
             #如果返回不是ToolResult，说明tool实现有问题，属于系统错误
             if not isinstance(result, ToolResult):
                 return ToolResult(
@@ -68,6 +83,8 @@ class PythonExecutor:
             return result
 
         except Exception as e:
+            if uow is not None:
+                uow.rollback()
             # 理论上不应该进入这里（tool 内部已分类）
             return ToolResult(
                 tool_name=tool_name,
@@ -77,4 +94,7 @@ class PythonExecutor:
                 explanation="Unhandled exception in executor. Escalate.",
                 side_effect=False,
                 irreversible=False
-            )
\ No newline at end of file
+            )
+        finally:
+            if uow is not None:
+                uow.close()
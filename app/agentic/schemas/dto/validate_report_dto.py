@@ -1,6 +1,6 @@
-from app.services.validation_service import ValidationReport, ItemValidationResult
+from app.services.validation_service import ValidationReport, ItemValidationResult, PagedValidationReport
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, List, Optional
 
 
 class ValidationIssueDTO(BaseModel):
@@ -12,6 +12,16 @@ class ValidationIssueDTO(BaseModel):
 
     explanation: str
 
+    @classmethod
+    def from_result(cls, item: ItemValidationResult) -> "ValidationIssueDTO":
+        return cls(
+            item_id=item.item_id,
+            status=item.status,
+            error_codes=item.error_codes,
+            messages=item.messages,
+            explanation="; ".join(item.messages)
+        )
+
 class ValidationSummaryDTO(BaseModel):
     total_items: int
     ok_count: int
@@ -27,13 +37,17 @@ class ValidationReportDTO(BaseModel):
     validation_status: str
     summary: ValidationSummaryDTO
 
+    # 只包含一页明细；游标不为 None 时用 list_validation_issues_tool 继续读取
     blocked_items: List[ValidationIssueDTO]
     warning_items: List[ValidationIssueDTO]
+    blocked_next_cursor: Optional[int] = None
+    warning_next_cursor: Optional[int] = None
+    # error_code -> 命中的 item 数，可配合 list_validation_issues_tool(error_code=...) 筛选
+    error_code_counts: Dict[str, int] = {}
 
-    @classmethod
-    def from_domain_model(cls, report: ValidationReport) -> "ValidationReportDTO":
-
-        summary = ValidationSummaryDTO(
+    @staticmethod
+    def _summary(report) -> ValidationSummaryDTO:
+        return ValidationSummaryDTO(
             total_items=report.total_items,
             ok_count=report.ok_count,
             warning_count=report.warning_count,
@@ -42,20 +56,29 @@ class ValidationReportDTO(BaseModel):
             is_ready_for_summary=(report.blocked_count == 0 and report.warning_count == 0)
         )
 
-        def convert_item(item: ItemValidationResult) -> ValidationIssueDTO:
-            return ValidationIssueDTO(
-                item_id=item.item_id,
-                status=item.status,
-                error_codes=item.error_codes,
-                messages=item.messages,
-                explanation="; ".join(item.messages)
-            )
+    @classmethod
+    def from_paged_report(cls, report: PagedValidationReport) -> "ValidationReportDTO":
+        summary = report.summary
+        return cls(
+            id=summary.id,
+            file_type=summary.file_type,
+            validation_status=summary.validation_status,
+            summary=cls._summary(summary),
+            blocked_items=[ValidationIssueDTO.from_result(i) for i in report.blocked_page.items],
+            warning_items=[ValidationIssueDTO.from_result(i) for i in report.warning_page.items],
+            blocked_next_cursor=report.blocked_page.next_cursor,
+            warning_next_cursor=report.warning_page.next_cursor,
+            error_code_counts=dict(report.error_code_counts),
+        )
+
+    @classmethod
+    def from_domain_model(cls, report: ValidationReport) -> "ValidationReportDTO":
 
         return cls(
             id=report.id,
             file_type=report.file_type,
             validation_status=report.validation_status,
-            summary=summary,
-            blocked_items=[convert_item(i) for i in report.blocked_items],
-            warning_items=[convert_item(i) for i in report.warning_items]
+            summary=cls._summary(report),
+            blocked_items=[ValidationIssueDTO.from_result(i) for i in report.blocked_items],
+            warning_items=[ValidationIssueDTO.from_result(i) for i in report.warning_items]
         )
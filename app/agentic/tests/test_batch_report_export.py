@@ -0,0 +1,76 @@
+#app/agentic/tests/test_batch_report_export.py
+import io
+import json
+import zipfile
+from decimal import Decimal
+from uuid import uuid4
+
+from sqlalchemy.orm import sessionmaker
+
+import app.db.auto_init  # noqa: F401  注册所有模型
+from app.db.enums import CostSummaryStatus
+from app.models.cost_summary import CostSummary
+from app.models.project import Project
+from app.services import batch_report_export
+from app.services.batch_report_export import MANIFEST_NAME, export_reports_zip, select_export_targets
+
+
+def _session(engine):
+    return sessionmaker(bind=engine, autoflush=False)()
+
+
+def _project(db, name, *summaries):
+    project = Project(id=str(uuid4()), raw_name=name, normalized_name=name, business_code=f"B-{name}",
+                      contract_code="C", spec_tags=[])
+    db.add(project)
+    for version, status in summaries:
+        db.add(CostSummary(
+            id=str(uuid4()), project_id=project.id, calculation_version=version, status=status,
+            material_file_id="f", part_file_id="f", labor_file_id="f", logistics_file_id="f",
+            material_cost=Decimal(1), part_cost=Decimal(1), labor_cost=Decimal(1), logistics_cost=Decimal(1),
+            total_cost=Decimal(version),
+        ))
+    db.flush()
+    return project
+
+
+def test_targets_are_latest_active_summary_per_project(db_engine):
+    db = _session(db_engine)
+    a = _project(db, "甲", (1, CostSummaryStatus.REPLACED), (2, CostSummaryStatus.ACTIVE))
+    _project(db, "乙")  # 没有成本报告，不导出
+    c = _project(db, "丙/2024", (1, CostSummaryStatus.ACTIVE))
+
+    targets = select_export_targets(db)
+    assert [(t.project_id, t.calculation_version) for t in targets] == [(c.id, 1), (a.id, 2)]
+    assert targets[0].filename == "丙_2024_成本报告_v1.xlsx"
+    assert [t.project_id for t in select_export_targets(db, search="B-甲")] == [a.id]
+    assert select_export_targets(db, project_ids=[]) == []
+
+
+def test_zip_contains_reports_and_manifest_with_failures(db_engine, tmp_path, monkeypatch):
+    db = _session(db_engine)
+    ok = _project(db, "甲", (1, CostSummaryStatus.ACTIVE))
+    bad = _project(db, "乙", (3, CostSummaryStatus.ACTIVE))
+    targets = select_export_targets(db)
+    by_project = {t.project_id: t for t in targets}
+
+    report = tmp_path / "report.xlsx"
+    report.write_bytes(b"xlsx")
+
+    def fake_render(cost_summary_id, operator_id):
+        if cost_summary_id == by_project[bad.id].cost_summary_id:
+            raise ValueError("FileRecord not found: f")
+        return str(report)
+
+    monkeypatch.setattr(batch_report_export, "_render_in_worker", fake_render)
+    seen = []
+    output = io.BytesIO()
+    results = export_reports_zip(targets, output, workers=1, progress=lambda s: seen.append((s.done, s.failed)))
+
+    assert seen == [(1, 1), (2, 1)]  # 按 targets 顺序：乙 在 甲 之前
+    assert {r.project_id: r.ok for r in results} == {ok.id: True, bad.id: False}
+    archive = zipfile.ZipFile(output)
+    assert sorted(archive.namelist()) == sorted([MANIFEST_NAME, by_project[ok.id].filename])
+    manifest = json.loads(archive.read(MANIFEST_NAME))
+    assert manifest["failed"] == 1
+    assert {r["project_id"]: r["error"] for r in manifest["reports"]}[bad.id] == "FileRecord not found: f"
@@ -0,0 +1,132 @@
+#app/agentic/tests/test_cost_rollup.py
+from datetime import datetime
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import delete, update
+from sqlalchemy.orm import sessionmaker
+
+import app.db.auto_init  # noqa: F401  注册所有模型
+from app.db.enums import CostItemStatus, CostSummaryStatus, FileType, LogisticsType, ParseStatus, ValidationStatus
+from app.models.cost_rollup import ProjectCostRollup
+from app.models.cost_summary import CostSummary
+from app.models.file_record import FileRecord
+from app.models.labor_item import LaborItem
+from app.models.logistics_item import LogisticsItem
+from app.models.material_item import MaterialItem
+from app.models.part_item import PartItem
+from app.models.project import Project
+from app.services.audit_log_service import AuditLogService
+from app.services.cost_calculation_service import CostCalculationService
+from app.services.cost_rollup_service import CostRollupService, rollup_month
+
+
+def _session(engine):
+    return sessionmaker(bind=engine, autoflush=False)()
+
+
+def _file(db, project_id, file_type, version, subtotal):
+    file_record = FileRecord(
+        id=str(uuid4()), project_id=project_id, file_type=file_type, uploader_id="u1", version=version,
+        parse_status=ParseStatus.parsed, validation_status=ValidationStatus.ok, locked=False,
+    )
+    common = dict(id=str(uuid4()), project_id=project_id, source_file_id=file_record.id,
+                  subtotal=Decimal(subtotal), status=CostItemStatus.ok)
+    item = {
+        FileType.material_cost: lambda: MaterialItem(raw_name="钢板", normalized_name="钢板", **common),
+        FileType.part_cost: lambda: PartItem(raw_name="螺栓", normalized_name="螺栓", **common),
+        FileType.labor_cost: lambda: LaborItem(raw_group="班组", normalized_group="班组", **common),
+        FileType.logistics_cost: lambda: LogisticsItem(type=LogisticsType.TRANSPORT, **common),
+    }[file_type]()
+    db.add_all([file_record, item])
+    db.flush()
+    return file_record.id
+
+
+def _generate(db, project_id, version, material, part="10", labor="5", logistics="1"):
+    service = CostCalculationService(db, AuditLogService(db))
+    return service.generate_cost_summary(
+        project_id=project_id, operator_id="u1",
+        material_file_id=_file(db, project_id, FileType.material_cost, version, material),
+        part_file_id=_file(db, project_id, FileType.part_cost, version, part),
+        labor_file_id=_file(db, project_id, FileType.labor_cost, version, labor),
+        logistics_file_id=_file(db, project_id, FileType.logistics_cost, version, logistics),
+    )
+
+
+def _seed(db):
+    db.add_all([
+        Project(id="a", raw_name="项目A", spec_tags=["钢结构", "出口"]),
+        Project(id="b", raw_name="项目B", spec_tags=["钢结构"]),
+        Project(id="c", raw_name="项目C", spec_tags=None),
+    ])
+    db.flush()
+    _generate(db, "a", 1, "100")
+    _generate(db, "a", 2, "200")   # 替代 a 的第一版
+    _generate(db, "b", 1, "300")
+    _generate(db, "c", 1, "400")
+
+
+def test_rollup_is_maintained_with_summaries_and_answers_tag_queries(db_engine):
+    db = _session(db_engine)
+    _seed(db)
+    service = CostRollupService(db)
+    assert service.check_consistency() == []
+
+    result = service.query(group_by=("tag",))
+    rows = {row.key["tag"]: row.values for row in result.rows}
+    assert list(rows) == ["出口", "钢结构", None]
+    assert rows["钢结构"].summary_count == 2
+    assert rows["钢结构"].costs["material"] == Decimal("500")
+    assert rows["出口"].costs["total"] == Decimal("216")
+    # 多标签项目计入每个标签，合计中每个 CostSummary 只计一次
+    assert (result.total.summary_count, result.total.costs["total"]) == (3, Decimal("948"))
+
+    by_project = service.query(group_by=("project",), tags=["出口"])
+    assert [row.key["project"] for row in by_project.rows] == ["a"]
+    assert by_project.as_dict()["rows"][0]["project_name"] == "项目A"
+
+    by_status = service.query(group_by=("status",), statuses=None)
+    counts = {row.key["status"]: row.values.summary_count for row in by_status.rows}
+    assert counts == {CostSummaryStatus.ACTIVE: 3, CostSummaryStatus.REPLACED: 1}
+
+    # 改标签：已有核价结果随标签移动
+    service.retag_project("b", ["钢结构"], ["出口"])
+    db.get(Project, "b").spec_tags = ["出口"]
+    db.flush()
+    rows = {row.key["tag"]: row.values for row in service.query(group_by=("tag",)).rows}
+    assert (rows["出口"].summary_count, rows["钢结构"].summary_count) == (2, 1)
+    assert service.check_consistency() == []
+    # 多个标签：项目只计一次
+    both = service.query(group_by=("month",), tags=["出口", "钢结构"])
+    assert both.total.summary_count == 2 and both.rows[0].values.summary_count == 2
+
+
+def test_month_filters_and_drift_repair(db_engine):
+    db = _session(db_engine)
+    _seed(db)
+    service = CostRollupService(db)
+    db.execute(update(CostSummary).where(CostSummary.project_id == "c").values(calculated_at=datetime(2025, 12, 3)))
+    db.execute(delete(ProjectCostRollup).where(ProjectCostRollup.project_id == "b"))
+
+    now = rollup_month(datetime.now())
+    drifts = service.check_consistency(repair=True)
+    assert {(d.table, d.key[0], d.key[1]) for d in drifts} == {
+        ("project_cost_rollups", "b", now), ("project_cost_rollups", "c", "2025-12"), ("project_cost_rollups", "c", now),
+        ("cost_rollups", "", "2025-12"), ("cost_rollups", "", now), ("cost_rollups", "*", "2025-12"), ("cost_rollups", "*", now),
+    }
+    assert service.check_consistency() == []
+
+    by_month = service.query(group_by=("month",))
+    assert [(row.key["month"], row.values.summary_count) for row in by_month.rows] == [("2025-12", 1), (now, 2)]
+    by_month = service.query(group_by=("month", "project"))
+    assert [tuple(row.key.values()) for row in by_month.rows][0] == ("2025-12", "c")
+    recent = service.query(group_by=("project",), month_from="2026-01")
+    assert [row.key["project"] for row in recent.rows] == ["a", "b"]
+    assert service.query(month_to="2025-12").total.costs["total"] == Decimal("416")
+
+    with pytest.raises(ValueError):
+        service.query(month_from="2025-13")
+    with pytest.raises(ValueError):
+        service.query(group_by=("customer",))
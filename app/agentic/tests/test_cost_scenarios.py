@@ -0,0 +1,114 @@
+#app/agentic/tests/test_cost_scenarios.py
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import app.db.auto_init  # noqa: F401  注册所有模型
+from app.db.enums import CostItemStatus, FileType, LogisticsType, ParseStatus, ValidationStatus
+from app.models.audit_log import AuditLog
+from app.models.cost_summary import CostSummary
+from app.models.file_cost_aggregate import FileCostAggregate
+from app.models.file_record import FileRecord
+from app.models.labor_item import LaborItem
+from app.models.logistics_item import LogisticsItem
+from app.models.material_item import MaterialItem
+from app.models.part_item import PartItem
+from app.services.audit_log_service import AuditLogService
+from app.services.cost_calculation_service import CostCalculationService
+from app.services.file_aggregate_service import FileAggregateService
+from app.services.money import to_units
+
+
+def _session(engine):
+    return sessionmaker(bind=engine, autoflush=False)()
+
+
+def _file(db, file_type, version, subtotal, validation_status=ValidationStatus.ok):
+    file_record = FileRecord(
+        id=str(uuid4()), project_id="p1", file_type=file_type, uploader_id="u1", version=version,
+        parse_status=ParseStatus.parsed, validation_status=validation_status, locked=False,
+    )
+    common = dict(id=str(uuid4()), project_id="p1", source_file_id=file_record.id,
+                  subtotal=Decimal(subtotal), status=CostItemStatus.ok)
+    item = {
+        FileType.material_cost: lambda: MaterialItem(raw_name="钢板", normalized_name="钢板", **common),
+        FileType.part_cost: lambda: PartItem(raw_name="螺栓", normalized_name="螺栓", **common),
+        FileType.labor_cost: lambda: LaborItem(raw_group="班组", normalized_group="班组", **common),
+        FileType.logistics_cost: lambda: LogisticsItem(type=LogisticsType.TRANSPORT, **common),
+    }[file_type]()
+    db.add_all([file_record, item])
+    db.flush()
+    return file_record.id
+
+
+def test_scenarios_cover_every_combination_without_side_effects(db_engine):
+    db = _session(db_engine)
+    material_v1 = _file(db, FileType.material_cost, 1, "100")
+    material_v2 = _file(db, FileType.material_cost, 2, "80", ValidationStatus.warning)
+    part = _file(db, FileType.part_cost, 1, "10")
+    labor_v1 = _file(db, FileType.labor_cost, 1, "5")
+    labor_v2 = _file(db, FileType.labor_cost, 2, "7")
+    logistics = _file(db, FileType.logistics_cost, 1, "1")
+
+    service = CostCalculationService(db, AuditLogService(db))
+    comparison = service.evaluate_scenarios(project_id="p1", candidates={
+        "material": [material_v1, material_v2],
+        "part": [part],
+        "labor": [labor_v1, labor_v2],
+        "logistics": [logistics],
+    })
+
+    assert len(comparison.scenarios) == 4
+    # 可用组合在前，按总成本升序；material v2 未通过校验，排在后面
+    assert [(sc.usable, sc.total_cost) for sc in comparison.scenarios] == [
+        (True, Decimal("116")), (True, Decimal("118")), (False, Decimal("96")), (False, Decimal("98")),
+    ]
+    assert comparison.files[material_v2].reason == "FileRecord not validated"
+    assert db.query(CostSummary).count() == 0
+    assert db.query(FileRecord).filter(FileRecord.locked.is_(True)).count() == 0
+
+
+def test_scenarios_reject_file_of_wrong_category(db_engine):
+    db = _session(db_engine)
+    material = _file(db, FileType.material_cost, 1, "100")
+    part = _file(db, FileType.part_cost, 1, "10")
+    service = CostCalculationService(db, AuditLogService(db))
+
+    with pytest.raises(ValueError, match="is not a labor_cost file"):
+        service.evaluate_scenarios(project_id="p1", candidates={
+            "material": [material], "part": [part], "labor": [material], "logistics": [part],
+        })
+
+
+def test_preview_uses_latest_valid_files_and_caches_on_file_stamps(db_engine):
+    db = _session(db_engine)
+    material_v1 = _file(db, FileType.material_cost, 1, "100")
+    _file(db, FileType.material_cost, 2, "80", ValidationStatus.warning)  # 未通过校验，不参与预览
+    part = _file(db, FileType.part_cost, 1, "10")
+    labor = _file(db, FileType.labor_cost, 1, "5")
+    aggregates = FileAggregateService(db)
+    aggregates.rebuild([material_v1, part, labor])
+
+    service = CostCalculationService(db, AuditLogService(db))
+    preview = service.preview_cost("p1")
+    assert preview.file_ids == {"material": material_v1, "part": part, "labor": labor}
+    assert preview.missing == ["logistics"] and not preview.complete
+    assert preview.total_cost == Decimal("115")
+    assert service.preview_cost("p1") is preview  # 文件戳未变，命中缓存
+
+    # item 编辑改变聚合行 revision，缓存自然失效
+    aggregates.apply_delta(labor, subtotal_units=to_units("2"))
+    assert service.preview_cost("p1").costs["labor"] == Decimal("7")
+
+    # 新的可用版本替换旧文件；聚合行缺失时只计算不写回
+    logistics = _file(db, FileType.logistics_cost, 1, "1")
+    material_v3 = _file(db, FileType.material_cost, 3, "90")
+    preview = service.preview_cost("p1")
+    assert preview.complete and preview.file_ids["material"] == material_v3
+    assert preview.total_cost == Decimal("108")
+    assert db.get(FileCostAggregate, logistics) is None
+    assert db.query(CostSummary).count() == 0
+    assert db.query(AuditLog).count() == 0
+    assert db.query(FileRecord).filter(FileRecord.locked.is_(True)).count() == 0
@@ -0,0 +1,118 @@
+#app/agentic/tests/test_cost_summary_diff.py
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import app.db.auto_init  # noqa: F401  注册所有模型
+from app.db.enums import CostItemStatus, LogisticsType
+from app.models.cost_summary import CostSummary
+from app.models.labor_item import LaborItem
+from app.models.logistics_item import LogisticsItem
+from app.models.material_item import MaterialItem
+from app.models.part_item import PartItem
+from app.services.cost_summary_diff_service import CostSummaryDiffService
+
+
+def _session(engine):
+    return sessionmaker(bind=engine, autoflush=False)()
+
+
+def _material(file_id, name, spec, price, weight="1000", **kw):
+    return MaterialItem(id=str(uuid4()), project_id="p", source_file_id=file_id, raw_name=name, normalized_name=name,
+                        spec=spec, material_grade="Q235", weight_kg=Decimal(weight), unit_price=Decimal(price),
+                        subtotal=Decimal(weight) * Decimal(price) / 1000, status=CostItemStatus.ok, **kw)
+
+
+def _part(file_id, name, subtotal, bundle_key=None, is_calculable=True):
+    return PartItem(id=str(uuid4()), project_id="p", source_file_id=file_id, raw_name=name, normalized_name=name,
+                    spec="x", quantity=Decimal(1), unit_price=Decimal(subtotal), subtotal=Decimal(subtotal),
+                    bundle_key=bundle_key, is_calculable=is_calculable, status=CostItemStatus.ok)
+
+
+def _summary(db, version, files, costs):
+    summary = CostSummary(
+        id=str(uuid4()), project_id="p", calculation_version=version,
+        material_file_id=files[0], part_file_id=files[1], labor_file_id=files[2], logistics_file_id=files[3],
+        material_cost=Decimal(costs[0]), part_cost=Decimal(costs[1]), labor_cost=Decimal(0),
+        logistics_cost=Decimal(costs[2]), total_cost=sum(Decimal(c) for c in costs),
+    )
+    db.add(summary)
+    db.flush()
+    return summary
+
+
+def test_diff_hash_joins_items_and_reports_category_deltas(db_engine):
+    db = _session(db_engine)
+    db.add_all([
+        _material("m1", "钢板", "10mm", "4000"),
+        _material("m1", "钢板", "12mm", "4100"),
+        _material("m1", "角钢", "L50", "3900"),
+        _material("m1", "圆钢", "D20", "4200"),
+        _material("m1", "圆钢", "D20", "4200"),
+        # 规格写法不同、单价变化；同键两行合并后比较
+        _material("m2", "钢板", " 10MM ", "4500"),
+        _material("m2", "钢板", "12mm", "4100"),
+        _material("m2", "槽钢", "C10", "4300"),
+        _material("m2", "圆钢", "D20", "4200", weight="2000"),
+        # 配件 bundle：只有锚点行可计算，代表整个 bundle
+        _part("p1", "螺栓", "30", bundle_key=1),
+        _part("p1", "螺母", "0", bundle_key=1, is_calculable=False),
+        _part("p2", "螺栓", "30", bundle_key=7),
+        _part("p2", "垫片", "0", bundle_key=7, is_calculable=False),
+        LaborItem(id=str(uuid4()), project_id="p", source_file_id="l1", raw_group="焊接", normalized_group="焊接",
+                  work_quantity=Decimal(3), unit="吨", unit_price=Decimal(7), subtotal=Decimal(21),
+                  status=CostItemStatus.ok),
+        LaborItem(id=str(uuid4()), project_id="p", source_file_id="l2", raw_group="焊接", normalized_group="焊接",
+                  work_quantity=Decimal(3), unit="吨", unit_price=Decimal(7), subtotal=Decimal(21),
+                  status=CostItemStatus.ok),
+        LogisticsItem(id=str(uuid4()), project_id="p", source_file_id="g1", type=LogisticsType.TRANSPORT,
+                      description="运输", subtotal=Decimal("10.5"), status=CostItemStatus.ok),
+        LogisticsItem(id=str(uuid4()), project_id="p", source_file_id="g2", type=LogisticsType.TRANSPORT,
+                      description="运输", subtotal=Decimal("12.5"), status=CostItemStatus.ok),
+    ])
+    db.flush()
+    v1 = _summary(db, 1, ("m1", "p1", "l1", "g1"), ("20400", "30", "10.5"))
+    v2 = _summary(db, 2, ("m2", "p2", "l2", "g2"), ("21300", "30", "12.5"))
+
+    service = CostSummaryDiffService(db)
+    base, target = service.resolve("p", v2.id)
+    assert (base.id, target.id) == (v1.id, v2.id)
+    diff = service.diff(base, target)
+
+    changes = {(c.category, c.change, c.labels[:2]): c for c in diff.changes}
+    assert sorted(changes) == [
+        ("logistics", "changed", (LogisticsType.TRANSPORT, "运输")),
+        ("material", "added", ("槽钢", "C10")),
+        ("material", "changed", ("圆钢", "D20")),
+        ("material", "changed", ("钢板", " 10MM ")),
+        ("material", "removed", ("角钢", "L50")),
+    ]
+    steel = changes[("material", "changed", ("钢板", " 10MM "))]
+    assert steel.fields == ["unit_price", "subtotal"]
+    assert (steel.before.unit_price, steel.after.unit_price) == (Decimal("4000"), Decimal("4500"))
+    assert steel.subtotal_delta == Decimal("500")
+    assert changes[("material", "changed", ("圆钢", "D20"))].fields == ["count"]
+
+    by_category = {c.category: c for c in diff.categories}
+    material = by_category["material"]
+    assert (material.added, material.removed, material.changed, material.unchanged) == (1, 1, 2, 1)
+    assert material.delta == Decimal("900")
+    assert (by_category["part"].changed, by_category["part"].unchanged) == (0, 1)
+    assert (by_category["labor"].changed, by_category["labor"].unchanged) == (0, 1)
+    assert diff.total_delta == Decimal("902")
+
+    data = diff.as_dict(limit=2)
+    assert data["change_count"] == 5 and len(data["changes"]) == 2
+    assert data["categories"][0]["delta"] == "900"
+
+
+def test_resolve_rejects_other_projects_and_first_version(db_engine):
+    db = _session(db_engine)
+    v1 = _summary(db, 1, ("m", "p", "l", "g"), ("1", "1", "1"))
+    service = CostSummaryDiffService(db)
+    with pytest.raises(ValueError):
+        service.resolve("p", v1.id)
+    with pytest.raises(ValueError):
+        service.resolve("other", v1.id)
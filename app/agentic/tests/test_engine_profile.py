@@ -0,0 +1,95 @@
+#app/agentic/tests/test_engine_profile.py
+import threading
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+import app.db.auto_init  # noqa: F401  注册所有模型
+from app.db.engine_profiles import engine_options, get_profile
+from app.db.session import build_engine
+from app.models.project import Project
+
+
+def test_tuned_profile_sets_pragmas_and_pool(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'tuned.db'}", "tuned")
+    with engine.connect() as conn:
+        pragma = lambda name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1          # NORMAL
+        assert pragma("busy_timeout") == 15_000
+        assert pragma("cache_size") == -64 * 1024
+    assert engine.pool.size() == 8
+
+    basic = build_engine(f"sqlite:///{tmp_path / 'basic.db'}", "basic")
+    with basic.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "delete"
+    # 内存库不套用 WAL / 连接池
+    build_engine("sqlite://", "tuned").connect().close()
+
+    # PostgreSQL：同样大小的连接池，不带 SQLite 专有的 connect_args
+    options = engine_options("postgresql+psycopg2://cost@localhost/cost", get_profile("tuned"))
+    assert options == dict(pool_size=8, max_overflow=16, pool_timeout=30, pool_pre_ping=True, pool_recycle=1800)
+    assert engine_options("postgresql+psycopg2://cost@localhost/cost", get_profile("basic")) == {}
+
+    with pytest.raises(ValueError):
+        get_profile("fastest")
+
+
+def test_concurrent_reads_and_writes_do_not_hit_database_is_locked(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'stress.db'}", "tuned")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    writers, commits, errors = 6, 40, []
+    done = threading.Event()
+
+    def write(n):
+        try:
+            for i in range(commits):
+                db = Session()
+                try:
+                    db.add(Project(id=str(uuid4()), raw_name=f"p{n}-{i}"))
+                    db.flush()
+                    # 写事务中再读一次，持有写锁的时间更长
+                    db.scalar(select(func.count()).select_from(Project))
+                    db.commit()
+                finally:
+                    db.close()
+        except Exception as e:  # noqa: BLE001  在主线程断言
+            errors.append(e)
+
+    def read():
+        try:
+            while not done.is_set():
+                db = Session()
+                try:
+                    db.execute(select(Project.id, Project.raw_name).limit(50)).all()
+                    db.scalar(select(func.count()).select_from(Project))
+                finally:
+                    db.close()
+        except Exception as e:  # noqa: BLE001
+            errors.append(e)
+
+    def long_read():
+        # 像报告导出一样长时间持有读事务：WAL 下不阻塞其它连接提交
+        with engine.connect() as conn:
+            conn.exec_driver_sql("BEGIN")
+            conn.scalar(select(func.count()).select_from(Project))
+            done.wait(timeout=60)
+            conn.exec_driver_sql("ROLLBACK")
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(writers)]
+    readers = [threading.Thread(target=read) for _ in range(4)] + [threading.Thread(target=long_read)]
+    for t in readers + threads:
+        t.start()
+    for t in threads:
+        t.join()
+    done.set()
+    for t in readers:
+        t.join()
+
+    assert errors == []
+    with Session() as db:
+        assert db.scalar(select(func.count()).select_from(Project)) == writers * commits
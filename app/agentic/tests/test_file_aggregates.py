@@ -0,0 +1,202 @@
+#app/agentic/tests/test_file_aggregates.py
+from decimal import Decimal
+from uuid import uuid4
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+import app.db.auto_init  # noqa: F401  注册所有模型
+from app.db.enums import CostItemStatus, FileType, ParseStatus, ValidationStatus
+from app.db.migrations import run_migrations
+from app.models.file_cost_aggregate import FileCostAggregate
+from app.models.file_record import FileRecord
+from app.models.part_item import PartItem
+from app.services.audit_log_service import AuditLogService
+from app.services.file_aggregate_service import FileAggregateService
+from app.services.file_record_service import FileRecordService
+from app.services.item_edit_service import ItemEditService
+from app.services.money import from_units, to_units
+from app.services.validation_service import ValidationService
+
+
+def _session(engine):
+    return sessionmaker(bind=engine, autoflush=False)()
+
+
+def _seed(db):
+    file_record = FileRecord(
+        id=str(uuid4()), project_id="p1", file_type=FileType.part_cost, uploader_id="u1", version=1,
+        parse_status=ParseStatus.parsed, validation_status=ValidationStatus.pending, locked=False,
+    )
+    db.add(file_record)
+
+    def part(row_no, subtotal, status=CostItemStatus.ok, bundle_key=None):
+        return PartItem(
+            id=str(uuid4()), project_id="p1", source_file_id=file_record.id, row_no=row_no, raw_name="螺栓",
+            normalized_name="螺栓", quantity=Decimal(1), unit="件", unit_price=Decimal(subtotal),
+            subtotal=Decimal(subtotal), status=status, bundle_key=bundle_key,
+        )
+
+    # 两行 bundle：第二行是非锚点（小计 0），校验后 is_calculable=False
+    items = [part(0, "10.5"), part(1, "20", status=CostItemStatus.warning), part(2, "7", bundle_key=1),
+             part(3, "0", bundle_key=1)]
+    db.add_all(items)
+    db.flush()
+    return file_record, items
+
+
+def test_validation_and_edits_keep_aggregate_in_step(db_engine):
+    db = _session(db_engine)
+    file_record, items = _seed(db)
+    audit = AuditLogService(db)
+    validation = ValidationService(db, audit)
+    aggregates = FileAggregateService(db)
+
+    validation.validate_file(file_record)
+    assert aggregates.check_consistency() == []
+    values = aggregates.get_many([file_record.id])[file_record.id]
+    assert values.item_count == 4 and values.calculable_count == 3
+    assert values.calculable_subtotal == Decimal("37.50000")
+
+    editor = ItemEditService(db, audit, validation)
+    editor.edit_item(item_type="part", item_id=items[0].id, updates={"subtotal": Decimal("12.5")},
+                     operator_id="u1", auto_validate=False)
+    assert aggregates.get_subtotal(file_record.id) == Decimal("39.50000")
+    assert aggregates.check_consistency() == []
+
+
+def test_consistency_check_reports_and_repairs_drift(db_engine):
+    db = _session(db_engine)
+    file_record, _ = _seed(db)
+    aggregates = FileAggregateService(db)
+    aggregates.rebuild([file_record.id])
+
+    aggregates.apply_delta(file_record.id, subtotal_units=500000, status_from=CostItemStatus.ok,
+                           status_to=CostItemStatus.blocked)
+    drifts = aggregates.check_consistency(repair=True)
+    assert [d.file_id for d in drifts] == [file_record.id]
+    assert set(drifts[0].fields) == {"calculable_subtotal_units", "ok_count", "blocked_count"}
+    assert aggregates.check_consistency() == []
+
+
+def test_subtotals_sum_exactly_in_integer_units(db_engine):
+    db = _session(db_engine)
+    file_record, _ = _seed(db)
+    # 大金额在 SQLite 中以 REAL 存储，浮点 SUM 会在第 5 位小数上产生误差
+    amounts = [Decimal("123456789.12345") + Decimal(7 * i).scaleb(-5) for i in range(2000)]
+    db.add_all(
+        PartItem(id=str(uuid4()), project_id="p1", source_file_id=file_record.id, raw_name="钢板",
+                 normalized_name="钢板", quantity=Decimal(1), unit="件", unit_price=a, subtotal=a)
+        for a in amounts
+    )
+    values = FileAggregateService(db).recompute([file_record.id])[file_record.id]
+    expected = sum(amounts) + Decimal("37.5")  # 加上 _seed 的可计算行（bundle 校验前全部可计算）
+    assert values.calculable_subtotal == expected
+    assert values.calculable_subtotal_units == to_units(expected)
+    assert from_units(to_units("-0.000005")) == Decimal("-0.00001")
+
+
+def test_writes_bump_revision(db_engine):
+    db = _session(db_engine)
+    file_id = _seed(db)[0].id
+    service = FileAggregateService(db)
+    service.rebuild([file_id])
+    db.flush()
+    start = db.get(FileCostAggregate, file_id).revision
+
+    service.apply_delta(file_id, subtotal_units=100)
+    service.apply_delta(file_id)  # 没有变化，不 +1
+    service.rebuild([file_id])
+    db.expire_all()
+    assert db.get(FileCostAggregate, file_id).revision == start + 2
+
+
+def _plan(db, run):
+    '''执行 run，返回它发出的最后一条语句的 EXPLAIN QUERY PLAN'''
+    statements = []
+    engine = db.get_bind()
+
+    def on_execute(*args):
+        statements.append(args[2:4])
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        run()
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+    statement, params = statements[-1]
+    return " | ".join(row[-1] for row in db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + statement, params))
+
+
+def test_migration_replaces_source_file_index_with_composite_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'v3.db'}")
+    Base.metadata.create_all(engine)
+    tables = ("material_items", "part_items", "labor_items", "logistics_items")
+    # 0004 之后的结构：只有单列 source_file_id 索引
+    with engine.begin() as conn:
+        for table in tables:
+            conn.execute(text(f"DROP INDEX ix_{table}_file_row"))
+            conn.execute(text(f"DROP INDEX ix_{table}_file_status"))
+            conn.execute(text(f"CREATE INDEX ix_{table}_source_file ON {table} (source_file_id)"))
+        conn.execute(text("DROP INDEX ix_file_records_latest"))
+        conn.execute(text("CREATE TABLE schema_migrations (id VARCHAR(100) PRIMARY KEY, applied_at DATETIME NOT NULL)"))
+        for done in ("0003_cost_rollup_backfill", "0004_cost_item_indexes", "0005_cost_item_row_no",
+                     "0006_price_history_backfill"):
+            conn.execute(text("INSERT INTO schema_migrations VALUES (:id, CURRENT_TIMESTAMP)"), {"id": done})
+
+    assert run_migrations(engine) == ["0007_cost_item_indexes"]
+    for table in tables:
+        names = {i["name"] for i in inspect(engine).get_indexes(table)}
+        assert names == {f"ix_{table}_file_row", f"ix_{table}_file_status"}
+    assert "ix_file_records_latest" in {i["name"] for i in inspect(engine).get_indexes("file_records")}
+    assert run_migrations(engine) == []
+
+
+def test_file_queries_use_the_composite_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    file_record, _ = _seed(db)
+    db.commit()
+    statuses = [CostItemStatus.warning, CostItemStatus.blocked]
+
+    # 明细按 Excel 行顺序读取：索引顺序即 ORDER BY，不需要额外排序
+    plan = _plan(db, lambda: db.query(PartItem).filter(PartItem.source_file_id == file_record.id)
+                 .order_by(*PartItem.file_order()).all())
+    assert "USING INDEX ix_part_items_file_row" in plan and "TEMP B-TREE" not in plan
+    # 按状态筛选 / 可计算行
+    plan = _plan(db, lambda: db.query(PartItem).filter(PartItem.source_file_id == file_record.id,
+                                                       PartItem.status.in_(statuses)).all())
+    assert "USING INDEX ix_part_items_file_status" in plan
+    plan = _plan(db, lambda: FileAggregateService(db).recompute([file_record.id]))
+    assert "SEARCH part_items USING INDEX ix_part_items_file_status" in plan
+    # 最新可用文件
+    plan = _plan(db, lambda: FileRecordService(db, AuditLogService(db)).get_latest_valid_file(
+        project_id=file_record.project_id, file_type=FileType.part_cost))
+    assert "USING INDEX ix_file_records_latest" in plan and "TEMP B-TREE" not in plan
+
+
+def test_migration_backfills_cost_item_row_no_in_insertion_order(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'v4.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    file_record, _ = _seed(db)
+    db.commit()
+    with engine.begin() as conn:
+        inserted = conn.execute(text(
+            "SELECT id FROM part_items WHERE source_file_id = :f ORDER BY rowid"), {"f": file_record.id}).scalars().all()
+        for table in ("material_items", "part_items", "labor_items", "logistics_items"):
+            conn.execute(text(f"DROP INDEX ix_{table}_file_row"))
+            conn.execute(text(f"ALTER TABLE {table} DROP COLUMN row_no"))
+        conn.execute(text("CREATE TABLE schema_migrations (id VARCHAR(100) PRIMARY KEY, applied_at DATETIME NOT NULL)"))
+        for done in ("0003_cost_rollup_backfill", "0004_cost_item_indexes"):
+            conn.execute(text("INSERT INTO schema_migrations VALUES (:id, CURRENT_TIMESTAMP)"), {"id": done})
+
+    # 行号回填后再建依赖 row_no 的索引
+    assert run_migrations(engine) == ["0005_cost_item_row_no", "0006_price_history_backfill", "0007_cost_item_indexes"]
+    with engine.connect() as conn:
+        numbered = conn.execute(text(
+            "SELECT id FROM part_items WHERE source_file_id = :f ORDER BY row_no"), {"f": file_record.id}).scalars().all()
+        row_nos = conn.execute(text("SELECT row_no FROM part_items ORDER BY row_no")).scalars().all()
+    assert numbered == inserted
+    assert row_nos == list(range(len(inserted)))
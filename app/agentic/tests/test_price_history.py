@@ -0,0 +1,121 @@
+#app/agentic/tests/test_price_history.py
+from datetime import datetime
+from decimal import Decimal
+from uuid import uuid4
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+import app.db.auto_init  # noqa: F401  注册所有模型
+from app.db.enums import CostItemStatus, FileType, ParseStatus, ValidationStatus
+from app.db.migrations import run_migrations
+from app.models.file_record import FileRecord
+from app.models.material_item import MaterialItem
+from app.models.price_series import PriceSeries
+from app.services.money import from_units
+from app.services.price_history_service import PriceHistoryService, price_key
+
+
+def _session(engine):
+    return sessionmaker(bind=engine, autoflush=False)()
+
+
+def _file(db, uploaded_at, prices, locked=True, status=CostItemStatus.ok, spec="10mm"):
+    file_record = FileRecord(
+        id=str(uuid4()), project_id=str(uuid4()), file_type=FileType.material_cost, uploader_id="u1", version=1,
+        parse_status=ParseStatus.parsed, validation_status=ValidationStatus.ok, locked=locked, created_at=uploaded_at,
+    )
+    db.add(file_record)
+    db.add_all(
+        MaterialItem(id=str(uuid4()), project_id=file_record.project_id, source_file_id=file_record.id,
+                     raw_name="钢板", normalized_name="钢板", spec=spec, material_grade="Q235",
+                     weight_kg=Decimal(1000), unit_price=Decimal(price), subtotal=Decimal(price), status=status)
+        for price in prices
+    )
+    db.flush()
+    return file_record.id
+
+
+def test_index_is_incremental_and_idempotent(db_engine):
+    db = _session(db_engine)
+    history = PriceHistoryService(db)
+    old = _file(db, datetime(2023, 6, 1), ["4000", "4100"])
+    unlocked = _file(db, datetime(2024, 5, 1), ["9999"], locked=False)
+    blocked = _file(db, datetime(2024, 5, 1), ["1"], status=CostItemStatus.blocked)
+
+    assert history.index_files([old, unlocked, blocked]) == 2
+    new = _file(db, datetime(2024, 4, 1), ["4500", "4600", "4700"], spec=" 10MM ")
+    assert history.index_files([new, old]) == 3  # old 已索引，不重复计入
+    assert history.index_files([new]) == 0
+
+    # 键归一化：" 10MM " 与 "10mm" 是同一条序列，且按时间排序
+    assert db.query(PriceSeries).count() == 1
+    series = history.series("钢板", "10mm", "q235")
+    assert series["price"].tolist() == [400000000, 410000000, 450000000, 460000000, 470000000]
+    assert price_key("钢板", "10mm", "Q235") == price_key("钢板", "１０ＭＭ", " q235")
+
+
+def test_stats_over_time_window(db_engine):
+    db = _session(db_engine)
+    history = PriceHistoryService(db)
+    ids = [
+        _file(db, datetime(2023, 1, 15), ["3000"]),
+        _file(db, datetime(2024, 3, 1), ["4000", "4200"]),
+        _file(db, datetime(2024, 5, 31), ["4400", "5000"]),
+    ]
+    history.index_files(ids)
+
+    now = datetime(2024, 6, 30)
+    recent = history.stats("钢板", "10mm", "Q235", months=12, now=now)
+    assert recent.count == 4
+    assert (recent.median, recent.min, recent.max) == (Decimal("4300.00000"), Decimal("4000.00000"), Decimal("5000.00000"))
+    assert recent.p90 == Decimal("4820.00000")
+    assert history.stats("钢板", "10mm", "Q235", months=None, now=now).count == 5
+    # 窗口终点之后的点不计入
+    assert history.stats("钢板", "10mm", "Q235", months=None, now=datetime(2024, 4, 1)).count == 3
+    assert history.stats("钢板", "12mm", "Q235") is None
+
+    assert history.rebuild() == 5
+    assert history.stats("钢板", "10mm", "Q235", months=None, now=now).count == 5
+
+
+def test_migration_backfills_index_from_already_locked_files(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'locked.db'}")
+    Base.metadata.create_all(engine)
+    db = _session(engine)
+    # 价格历史上线前就已核价锁定的文件
+    _file(db, datetime(2024, 3, 1), ["4000", "4200"])
+    _file(db, datetime(2024, 5, 1), ["9999"], locked=False)
+    db.commit()
+    db.close()
+
+    assert "0006_price_history_backfill" in run_migrations(engine)
+    db = _session(engine)
+    stats = PriceHistoryService(db).stats("钢板", "10mm", "Q235", months=None)
+    assert stats.count == 2 and stats.max == Decimal("4200.00000")
+    assert run_migrations(engine) == []
+
+
+def test_bands_refresh_incrementally_and_drive_validation(db_engine):
+    from app.services.audit_log_service import AuditLogService
+    from app.services.price_history_service import compute_band
+    from app.services.validation_service import ValidationService
+
+    db = _session(db_engine)
+    history = PriceHistoryService(db)
+    history.index_files([_file(db, datetime(2024, 1, 1), ["4000", "4100", "4200", "4300"])])
+    assert history.bands(MaterialItem, [("钢板", "10mm", "Q235")]) == {}  # 点数不足，不建区间
+
+    history.index_files([_file(db, datetime(2024, 2, 1), ["4400", "9000"])])
+    band = history.bands(MaterialItem, [("钢板", " 10MM", "Q235")])[("钢板", " 10MM", "Q235")]
+    expected = compute_band(history.series("钢板", "10mm", "Q235"))
+    assert (band.median, band.lower, band.upper) == tuple(
+        from_units(expected[name]) for name in ("median_units", "lower_units", "upper_units"))
+    assert band.lower < Decimal("4200") < band.upper < Decimal("9000")
+
+    # 新文件（未锁定）校验：离群单价为 warning，区间内为 ok
+    file_id = _file(db, datetime(2024, 3, 1), ["4250", "20000"], locked=False)
+    report = ValidationService(db, AuditLogService(db)).validate_file(db.get(FileRecord, file_id))
+    statuses = sorted((r.status, tuple(r.error_codes)) for r in report.item_results.values())
+    assert statuses == [("ok", ()), ("warning", ("PRICE_OUT_OF_BAND",))]
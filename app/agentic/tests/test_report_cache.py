@@ -0,0 +1,126 @@
+#app/agentic/tests/test_report_cache.py
+import os
+from decimal import Decimal
+from uuid import uuid4
+
+import openpyxl
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.orm import sessionmaker
+
+import app.db.auto_init  # noqa: F401  注册所有模型
+from app.db.enums import CostItemStatus, CostSummaryStatus, FileType, ParseStatus, ValidationStatus
+from app.models.audit_log import AuditLog
+from app.models.file_record import FileRecord
+from app.models.part_item import PartItem
+from app.models.project import Project
+from app.models.user import User
+from app.services import cost_calculation_service
+from app.services.audit_log_service import AuditLogService
+from app.services.cost_calculation_service import CostCalculationService
+from app.services.file_aggregate_service import FileAggregateService
+from app.services.report_cache import ReportCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ReportCache(str(tmp_path))
+    monkeypatch.setattr(cost_calculation_service, "report_cache", cache)
+    return cache
+
+
+def _session(engine):
+    return sessionmaker(bind=engine, autoflush=False)()
+
+
+def _calculate(db, service, project_id, user_id, version=1):
+    ids = {}
+    for file_type in (FileType.material_cost, FileType.part_cost, FileType.labor_cost, FileType.logistics_cost):
+        file_record = FileRecord(
+            id=str(uuid4()), project_id=project_id, file_type=file_type, uploader_id=user_id, version=version,
+            parse_status=ParseStatus.parsed, validation_status=ValidationStatus.ok, locked=False,
+        )
+        db.add(file_record)
+        ids[file_type] = file_record.id
+    db.add(PartItem(
+        id=str(uuid4()), project_id=project_id, source_file_id=ids[FileType.part_cost], raw_name="螺栓",
+        normalized_name="螺栓", quantity=Decimal(2), unit="件", unit_price=Decimal(5), subtotal=Decimal(10),
+        status=CostItemStatus.ok,
+    ))
+    db.flush()
+    FileAggregateService(db).rebuild(list(ids.values()))
+    summary = service.generate_cost_summary(
+        project_id=project_id,
+        material_file_id=ids[FileType.material_cost],
+        part_file_id=ids[FileType.part_cost],
+        labor_file_id=ids[FileType.labor_cost],
+        logistics_file_id=ids[FileType.logistics_cost],
+        operator_id=user_id,
+    )
+    db.flush()  # 路由中 generate 之后会 commit；这里 flush 让核价审计记录可查
+    return summary
+
+
+def test_report_rendered_once_and_evicted_when_replaced(db_engine, cache, monkeypatch):
+    db = _session(db_engine)
+    calculator = User(id=str(uuid4()), account="calc", display_name="核价人", password_hash="x")
+    exporter = User(id=str(uuid4()), account="exp", display_name="导出人", password_hash="x")
+    project = Project(id=str(uuid4()), raw_name="p", normalized_name="p", business_code="B1",
+                      contract_code="C1", spec_tags=["t"])
+    db.add_all([calculator, exporter, project])
+    db.flush()
+    service = CostCalculationService(db, AuditLogService(db))
+    summary = _calculate(db, service, project.id, calculator.id)
+
+    path = service.render_report_file(summary, exporter.id)
+    footer = list(openpyxl.load_workbook(path).active.iter_rows(values_only=True))[-1]
+    # 统计日期 / 统计人取自快照，与谁、何时导出无关
+    assert footer[:4] == ("统计日期", summary.calculated_at.strftime("%Y.%m.%d"), "统计人", "核价人")
+
+    # 第二次下载直接命中缓存，不再生成报告行
+    monkeypatch.setattr(service, "_report_rows", lambda *a, **k: pytest.fail("cache miss"))
+    assert service.render_report_file(summary, exporter.id) == path
+    monkeypatch.undo()
+    monkeypatch.setattr(cost_calculation_service, "report_cache", cache)
+
+    replacement = _calculate(db, service, project.id, calculator.id, version=2)
+    assert summary.status == CostSummaryStatus.REPLACED
+    assert not os.path.exists(path)
+    with pytest.raises(ValueError, match="Only active"):
+        service.render_report_file(summary, exporter.id)
+    assert cache.etag(service.render_report_file(replacement, exporter.id)) != cache.etag(path)
+
+
+def _footer(path):
+    return list(openpyxl.load_workbook(path).active.iter_rows(values_only=True))[-1]
+
+
+def test_report_key_follows_names_outside_the_snapshot(db_engine, cache):
+    db = _session(db_engine)
+    calculator = User(id=str(uuid4()), account="calc", display_name="核价人", password_hash="x")
+    exporter = User(id=str(uuid4()), account="exp", display_name="导出人", password_hash="x")
+    project = Project(id=str(uuid4()), raw_name="p", normalized_name="p", business_code="B1",
+                      contract_code="C1", spec_tags=["t"])
+    db.add_all([calculator, exporter, project])
+    db.flush()
+    service = CostCalculationService(db, AuditLogService(db))
+    summary = _calculate(db, service, project.id, calculator.id)
+
+    path = service.render_report_file(summary, exporter.id)
+    # 改名后 ETag 变化，重新渲染出新名字；同一内容的 ETag 不变
+    calculator.display_name = "核价人（新）"
+    db.flush()
+    renamed = service.render_report_file(summary, exporter.id)
+    assert cache.etag(renamed) != cache.etag(path)
+    assert _footer(renamed)[3] == "核价人（新）"
+    assert service.render_report_file(summary, exporter.id) == renamed
+    project.contract_code = "C2"
+    db.flush()
+    assert cache.etag(service.render_report_file(summary, exporter.id)) != cache.etag(renamed)
+
+    # 没有核价审计记录时统计人是导出人：不同导出人不共享缓存文件
+    db.execute(delete(AuditLog).where(AuditLog.entity_id == summary.id))
+    by_calculator = service.render_report_file(summary, calculator.id)
+    by_exporter = service.render_report_file(summary, exporter.id)
+    assert cache.etag(by_calculator) != cache.etag(by_exporter)
+    assert (_footer(by_calculator)[3], _footer(by_exporter)[3]) == ("核价人（新）", "导出人")
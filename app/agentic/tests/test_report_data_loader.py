@@ -0,0 +1,101 @@
+#app/agentic/tests/test_report_data_loader.py
+from decimal import Decimal
+from uuid import uuid4
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+import app.db.auto_init  # noqa: F401  注册所有模型
+from app.db.enums import CostItemStatus, CostSummaryStatus, FileType, LogisticsType, ParseStatus, ValidationStatus
+from app.models.cost_summary import CostSummary
+from app.models.file_record import FileRecord
+from app.models.labor_item import LaborItem
+from app.models.logistics_item import LogisticsItem
+from app.models.material_item import MaterialItem
+from app.models.part_item import PartItem
+from app.models.project import Project
+from app.models.user import User
+from app.services.report_data_loader import ReportDataLoader
+
+
+def _seed(db):
+    users = [User(id=str(uuid4()), account=f"u{i}", display_name=f"用户{i}", password_hash="x") for i in range(4)]
+    project = Project(id=str(uuid4()), raw_name="p", normalized_name="p", business_code="B1",
+                      contract_code="C1", spec_tags=["t"])
+    db.add_all(users + [project])
+    files = {}
+    for user, file_type in zip(users, (FileType.material_cost, FileType.part_cost,
+                                       FileType.labor_cost, FileType.logistics_cost)):
+        files[file_type] = FileRecord(
+            id=str(uuid4()), project_id=project.id, file_type=file_type, uploader_id=user.id, version=1,
+            parse_status=ParseStatus.parsed, validation_status=ValidationStatus.ok, locked=True,
+        )
+    db.add_all(files.values())
+
+    def common(file_type, status=CostItemStatus.ok):
+        return dict(id=str(uuid4()), project_id=project.id, source_file_id=files[file_type].id,
+                    subtotal=Decimal(1), status=status)
+
+    db.add_all([
+        MaterialItem(raw_name="钢板", normalized_name="钢板", **common(FileType.material_cost)),
+        MaterialItem(raw_name="角钢", normalized_name="角钢", **common(FileType.material_cost, CostItemStatus.warning)),
+        PartItem(raw_name="螺栓", normalized_name="螺栓", **common(FileType.part_cost, CostItemStatus.confirmed)),
+        LaborItem(raw_group="一班", normalized_group="一班", work_quantity=Decimal(3), unit="吨",
+                  **common(FileType.labor_cost)),
+        LogisticsItem(type=LogisticsType.TRANSPORT, description="运输", **common(FileType.logistics_cost)),
+    ])
+    summary = CostSummary(
+        id=str(uuid4()), project_id=project.id, calculation_version=1, status=CostSummaryStatus.ACTIVE,
+        material_file_id=files[FileType.material_cost].id, part_file_id=files[FileType.part_cost].id,
+        labor_file_id=files[FileType.labor_cost].id, logistics_file_id=files[FileType.logistics_cost].id,
+        material_cost=Decimal(1), part_cost=Decimal(1), labor_cost=Decimal(1), logistics_cost=Decimal(1),
+        total_cost=Decimal(4),
+    )
+    db.add(summary)
+    db.commit()
+    return summary, users
+
+
+def test_report_data_is_loaded_with_batched_queries(db_engine):
+    db = sessionmaker(bind=db_engine, autoflush=False)()
+    summary, users = _seed(db)
+    exporter_id = users[0].id
+    db.expire_all()
+    summary = db.get(CostSummary, summary.id)
+
+    statements = []
+    event.listen(db_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    loader = ReportDataLoader(db)
+    data = loader.load(summary, operator_id=exporter_id)
+    items = loader.items_by_section(data)
+
+    # project、files、审计记录、users（上传人 + 统计人）、items 各 1 条
+    assert len(statements) == 5
+    assert data.user_name(data.labor_file.uploader_id) == "用户2"
+    # 没有核价审计记录时，统计人退回为传入的导出人
+    assert data.operator_name == "用户0"
+    assert [row.name for row in items["material"]] == ["钢板"]
+    assert [row.name for row in items["part"]] == ["螺栓"]
+    assert [(row.name, row.quantity, row.unit) for row in items["labor"]] == [("一班", Decimal(3), "吨")]
+    assert [row.logistics_type for row in items["logistics"]] == [LogisticsType.TRANSPORT]
+
+
+def test_items_keep_file_row_order_within_each_section(db_engine):
+    db = sessionmaker(bind=db_engine, autoflush=False)()
+    summary, users = _seed(db)
+    material_file_id = summary.material_file_id
+    # 行号与写入顺序相反：章节内按行号（Excel 顺序）输出，不依赖 UNION ALL / 物理存储顺序
+    db.add_all([
+        MaterialItem(id=str(uuid4()), project_id=summary.project_id, source_file_id=material_file_id,
+                     raw_name=name, normalized_name=name, subtotal=Decimal(1), status=CostItemStatus.ok, row_no=row_no)
+        for row_no, name in ((9, "圆钢"), (5, "槽钢"), (7, "扁钢"))
+    ])
+    db.commit()
+    db.query(MaterialItem).filter_by(normalized_name="钢板").update({"row_no": 1})
+    db.commit()
+
+    loader = ReportDataLoader(db)
+    data = loader.load(summary, operator_id=users[0].id)
+    rows = list(loader.iter_items(data))
+    assert [row.section for row in rows] == ["material"] * 4 + ["part", "logistics", "labor"]
+    assert [row.name for row in rows[:4]] == ["钢板", "槽钢", "扁钢", "圆钢"]
@@ -0,0 +1,43 @@
+#app/agentic/tests/test_report_writer.py
+import datetime
+import io
+from decimal import Decimal
+
+import openpyxl
+import pandas as pd
+
+from app.services.report_writer import REPORT_SHEET_NAME, write_report_xlsx
+
+
+ROWS = [
+    ["产品直接生产成本统计"],
+    ["产品标签", ["a", "b"]],
+    ["钢板", "Q235", Decimal("1.50000"), None, "", datetime.datetime(2024, 1, 2, 3, 4, 5)],
+    ["", ""],
+]
+
+
+def _read(fileobj):
+    fileobj.seek(0)
+    sheet = openpyxl.load_workbook(fileobj)[REPORT_SHEET_NAME]
+    return [[(c.value, c.number_format) for c in row] for row in sheet.iter_rows()]
+
+
+def test_streamed_workbook_matches_dataframe_export():
+    expected = io.BytesIO()
+    with pd.ExcelWriter(expected, engine="openpyxl") as writer:
+        pd.DataFrame(ROWS).to_excel(writer, index=False, sheet_name=REPORT_SHEET_NAME)
+
+    streamed = io.BytesIO()
+    assert write_report_xlsx(iter(ROWS), streamed, column_count=6) == len(ROWS)
+
+    def trimmed(rows):
+        # 两种写法对行尾空单元格的处理不同
+        out = []
+        for row in rows:
+            while row and row[-1][0] in (None, ""):
+                row = row[:-1]
+            out.append(row)
+        return out
+
+    assert trimmed(_read(streamed)) == trimmed(_read(expected))
@@ -0,0 +1,132 @@
+#app/agentic/tests/test_revalidation_scheduler.py
+import threading
+import time
+
+from app.services import revalidation_scheduler as scheduler_module
+from app.services.revalidation_scheduler import RevalidationScheduler
+
+
+class _RecordingScheduler(RevalidationScheduler):
+    """不访问数据库，只记录每次实际执行的文件"""
+
+    def __init__(self, quiet_seconds):
+        super().__init__(quiet_seconds=quiet_seconds)
+        self.calls = []
+
+    def _validate(self, file_id):
+        self.calls.append(file_id)
+        self.runs += 1
+        return None
+
+
+def _wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_burst_of_edits_coalesces_into_one_validation():
+    scheduler = _RecordingScheduler(quiet_seconds=0.1)
+    for _ in range(20):
+        scheduler.mark_dirty("f1")
+    scheduler.mark_dirty("f2")
+    assert scheduler.is_stale("f1")
+
+    assert _wait_until(lambda: not scheduler.is_stale("f1") and not scheduler.is_stale("f2"))
+    assert sorted(scheduler.calls) == ["f1", "f2"]
+
+
+def test_run_now_skips_quiet_period_and_dequeues():
+    scheduler = _RecordingScheduler(quiet_seconds=60)
+    scheduler.mark_dirty("f1")
+    scheduler.run_now("f1")
+    assert scheduler.calls == ["f1"]
+    assert not scheduler.is_stale("f1")
+    # 未被标记的文件不执行，除非 force
+    scheduler.run_now("f2")
+    assert scheduler.calls == ["f1"]
+    scheduler.run_now("f2", force=True)
+    assert scheduler.calls == ["f1", "f2"]
+
+
+def test_worker_restart_registers_exit_flush_once(monkeypatch):
+    registered = []
+    monkeypatch.setattr(scheduler_module.atexit, "register", registered.append)
+    scheduler = _RecordingScheduler(quiet_seconds=0.01)
+    scheduler.mark_dirty("f1")
+    assert _wait_until(lambda: scheduler.calls == ["f1"])
+    # 模拟后台线程退出：下一次标记会重启线程
+    dead = threading.Thread(target=lambda: None)
+    dead.start()
+    dead.join()
+    scheduler._thread = dead
+    scheduler.mark_dirty("f2")
+
+    assert _wait_until(lambda: scheduler.calls == ["f1", "f2"])
+    assert scheduler._thread is not dead
+    assert registered == [scheduler.flush_all]
+
+
+def test_locked_file_is_not_revalidated(db_engine):
+    from decimal import Decimal
+    from uuid import uuid4
+
+    from sqlalchemy import select
+    from sqlalchemy.orm import sessionmaker
+
+    import app.db.auto_init  # noqa: F401  注册所有模型
+    from app.db.enums import CostItemStatus, FileType, ParseStatus, ValidationStatus
+    from app.models.file_cost_aggregate import FileCostAggregate
+    from app.models.file_record import FileRecord
+    from app.models.item_validation_record import ItemValidationRecord
+    from app.models.part_item import PartItem
+    from app.services.audit_log_service import AuditLogService
+    from app.services.item_edit_service import ItemEditService
+    from app.services.validation_service import ValidationService
+
+    Session = sessionmaker(bind=db_engine, autoflush=False)
+    db = Session()
+    file_record = FileRecord(
+        id=str(uuid4()), project_id="p1", file_type=FileType.part_cost, uploader_id="u1", version=1,
+        parse_status=ParseStatus.parsed, validation_status=ValidationStatus.pending, locked=False,
+    )
+    item = PartItem(
+        id=str(uuid4()), project_id="p1", source_file_id=file_record.id, raw_name="螺栓", normalized_name="螺栓",
+        quantity=Decimal(1), unit="件", unit_price=Decimal(10), subtotal=Decimal(10), status=CostItemStatus.ok,
+    )
+    file_id, item_id = file_record.id, item.id
+    db.add_all([file_record, item])
+    db.flush()
+    audit = AuditLogService(db)
+    validation = ValidationService(db, audit)
+    validation.validate_file(file_record)
+    db.commit()
+
+    def snapshot():
+        with Session() as s:
+            aggregate = s.get(FileCostAggregate, file_id)
+            return (
+                s.get(FileRecord, file_id).validation_status,
+                s.scalars(select(PartItem.status).where(PartItem.source_file_id == file_id)).all(),
+                s.scalars(select(ItemValidationRecord.id).where(ItemValidationRecord.file_id == file_id)).all(),
+                (aggregate.revision, aggregate.ok_count, aggregate.blocked_count, aggregate.calculable_subtotal_units),
+            )
+
+    scheduler = RevalidationScheduler(quiet_seconds=60, session_factory=Session)
+    # 编辑后排队（不立即校验），安静期结束前文件被成本报告锁定
+    ItemEditService(db, audit, validation).edit_item(
+        item_type="part", item_id=item_id, updates={"unit_price": None}, operator_id="u1", auto_validate=False,
+    )
+    scheduler.mark_dirty(file_id)
+    db.get(FileRecord, file_id).locked = True
+    db.commit()
+    db.close()
+    before = snapshot()
+
+    scheduler.flush_all()
+    assert scheduler.runs == 0
+    assert not scheduler.is_stale(file_id)
+    assert snapshot() == before
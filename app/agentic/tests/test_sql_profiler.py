@@ -0,0 +1,118 @@
+#app/agentic/tests/test_sql_profiler.py
+import json
+import logging
+from uuid import uuid4
+
+import pytest
+from flask import Flask, jsonify
+from sqlalchemy import insert, select
+from sqlalchemy.orm import sessionmaker
+
+import app.db.auto_init  # noqa: F401  注册所有模型
+from app.app_factory import BASE_DIR
+from app.db.sql_profiler import install_sql_profiler, profile_sql
+from app.models.project import Project
+from app.routes.sql_profiling import init_sql_profiling
+
+
+def _seed(engine, n):
+    ids = [str(uuid4()) for _ in range(n)]
+    with sessionmaker(bind=engine)() as db:
+        db.add_all([Project(id=pid, raw_name=f"P{i}") for i, pid in enumerate(ids)])
+        db.commit()
+    return ids
+
+
+def _fan_out(db, ids):
+    '''列表页的典型写法：先查列表，再对每个对象单独查'''
+    db.scalars(select(Project.id)).all()
+    return [db.get(Project, pid) for pid in ids]
+
+
+def test_profile_counts_queries_and_flags_repeated_statements(db_engine):
+    install_sql_profiler()
+    ids = _seed(db_engine, 4)
+
+    with sessionmaker(bind=db_engine, autoflush=False)() as db:
+        with profile_sql() as profile:
+            projects = _fan_out(db, ids)
+            assert db.get(Project, ids[0]) is projects[0]   # 已在 identity map 中，不查库
+        db.scalars(select(Project)).all()    # profile 之外，不计入
+
+    summary = profile.summary()
+    assert summary["query_count"] == 5
+    assert summary["distinct_statements"] == 2
+    assert summary["db_time_ms"] > 0
+    [repeated] = summary["n_plus_one"]
+    assert repeated["count"] == 4 and repeated["distinct_params"] == 4
+    assert repeated["sql"].startswith("SELECT ... FROM projects WHERE projects.id = ?")
+    assert summary["slowest"][0]["max_ms"] >= summary["slowest"][-1]["max_ms"]
+
+
+def test_same_parameters_and_bulk_inserts_are_not_n_plus_one(db_engine):
+    install_sql_profiler()
+    ids = _seed(db_engine, 1)
+
+    with db_engine.connect() as conn:
+        with profile_sql() as profile:
+            for _ in range(5):
+                conn.execute(select(Project.raw_name).where(Project.id == ids[0]))
+            conn.execute(insert(Project), [{"id": str(uuid4()), "raw_name": f"B{i}"} for i in range(10)])
+            conn.rollback()
+
+    assert profile.query_count == 6
+    assert profile.n_plus_one() == []
+
+
+def _app(mode, db_engine):
+    flask_app = Flask(__name__, template_folder=f"{BASE_DIR}/templates")
+    flask_app.config["SQL_PROFILER"] = mode
+    init_sql_profiling(flask_app)
+    Session = sessionmaker(bind=db_engine, autoflush=False)
+    ids = _seed(db_engine, 3)
+
+    @flask_app.route("/page")
+    def page():
+        with Session() as db:
+            _fan_out(db, ids)
+        return "<html><body><h1>projects</h1></body></html>"
+
+    @flask_app.route("/api")
+    def api():
+        with Session() as db:
+            db.get(Project, ids[0])
+        return jsonify(ok=True)
+
+    return flask_app.test_client()
+
+
+def test_request_profile_goes_to_header_log_and_panel(db_engine, caplog):
+    client = _app("panel", db_engine)
+
+    with caplog.at_level(logging.INFO, logger="sql_profile"):
+        page = client.get("/page")
+        api = client.get("/api")
+
+    assert page.headers["X-SQL-Profile"].startswith("queries=4; db_ms=")
+    assert page.headers["X-SQL-Profile"].endswith("n_plus_one=1")
+    assert page.headers["Server-Timing"].startswith("db;dur=")
+    html = page.get_data(as_text=True)
+    assert "SQL：4 条查询" in html and html.index("SQL：4 条查询") < html.index("</body>")
+    assert api.json == {"ok": True}
+    assert api.headers["X-SQL-Profile"].startswith("queries=1;")
+
+    records = [r for r in caplog.records if r.name == "sql_profile"]
+    logged = [json.loads(r.getMessage()) for r in records]
+    assert [(r["path"], r["query_count"]) for r in logged] == [("/page", 4), ("/api", 1)]
+    assert records[0].levelno == logging.WARNING and records[1].levelno == logging.INFO
+    assert logged[0]["endpoint"] == "page" and logged[0]["status"] == 200
+
+
+def test_profiling_is_off_by_default(db_engine):
+    client = _app("off", db_engine)
+    response = client.get("/page")
+    assert "X-SQL-Profile" not in response.headers
+    assert "条查询" not in response.get_data(as_text=True)
+
+    with pytest.raises(ValueError):
+        _app("verbose", db_engine)
@@ -0,0 +1,171 @@
+#app/agentic/tests/test_unit_of_work.py
+from functools import partial
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from flask import Flask, abort
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+import app.db.auto_init  # noqa: F401  注册所有模型
+from app.agentic.execution.executor import PythonExecutor
+from app.agentic.schemas.tool_result import ToolResult
+from app.db.unit_of_work import UnitOfWork
+from app.models.project import Project
+from app.routes import request_scope
+
+
+def _factory(engine, opened):
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    def open_session():
+        db = Session()
+        opened.append(db)
+        return db
+    return open_session
+
+
+def _count_projects(engine):
+    with sessionmaker(bind=engine)() as db:
+        return db.scalar(select(func.count()).select_from(Project))
+
+
+def test_session_and_services_are_built_lazily_and_shared(db_engine):
+    opened = []
+    uow = UnitOfWork(_factory(db_engine, opened))
+    assert not uow.started and opened == []
+
+    services = uow.services
+    assert len(opened) == 1 and uow.started
+    assert services.item_edit is services.item_edit
+    # 依赖的服务也从容器取：item_edit 与 validation 共用同一个 ValidationService / AuditLogService
+    assert services.item_edit.validation_service is services.validation
+    assert services.validation.audit_log_service is services.audit
+    assert services.projects.db is uow.session
+
+    uow.close()
+    assert not uow.started
+    assert uow.services is not services
+
+
+def test_context_manager_commits_on_success_and_rolls_back_on_error(db_engine):
+    opened = []
+    with UnitOfWork(_factory(db_engine, opened)) as uow:
+        uow.session.add(Project(id=str(uuid4()), raw_name="P1"))
+    assert _count_projects(db_engine) == 1
+
+    with pytest.raises(RuntimeError):
+        with UnitOfWork(_factory(db_engine, opened)) as uow:
+            uow.session.add(Project(id=str(uuid4()), raw_name="P2"))
+            uow.session.flush()
+            raise RuntimeError("boom")
+    assert _count_projects(db_engine) == 1
+
+
+@pytest.fixture
+def web(db_engine, monkeypatch):
+    opened = []
+    monkeypatch.setattr(request_scope, "UnitOfWork", partial(UnitOfWork, _factory(db_engine, opened)))
+    flask_app = Flask(__name__)
+    request_scope.init_request_scope(flask_app)
+
+    @flask_app.route("/projects/<name>", methods=["POST"])
+    def create(name):
+        uow = request_scope.request_uow()
+        assert request_scope.request_uow() is uow
+        uow.session.add(Project(id=str(uuid4()), raw_name=name))
+        if name == "bad":
+            abort(400)
+        if name == "crash":
+            uow.session.flush()
+            raise RuntimeError("boom")
+        return "ok"
+
+    @flask_app.route("/ping")
+    def ping():
+        return "pong"
+
+    return SimpleNamespace(client=flask_app.test_client(), opened=opened, engine=db_engine)
+
+
+def test_request_scope_commits_once_per_successful_request(web):
+    assert web.client.post("/projects/a").status_code == 200
+    assert web.client.post("/projects/bad").status_code == 400
+    assert web.client.post("/projects/crash").status_code == 500
+    assert web.client.get("/ping").status_code == 200
+
+    # 每个访问数据库的请求一个 Session；/ping 没有借出连接；4xx / 异常的请求回滚
+    assert len(web.opened) == 3
+    with sessionmaker(bind=web.engine)() as db:
+        assert db.scalars(select(Project.raw_name)).all() == ["a"]
+
+
+def test_executor_opens_a_unit_of_work_for_tools_taking_db(db_engine):
+    opened = []
+    calls = []
+
+    def add_project(db, name):
+        calls.append(db)
+        db.add(Project(id=str(uuid4()), raw_name=name))
+        db.flush()
+        return ToolResult(tool_name="add_project", ok=name != "rejected")
+
+    def ping(text):
+        return ToolResult(tool_name="ping", ok=True, data=text)
+
+    registry = SimpleNamespace(get={"add_project": SimpleNamespace(func=add_project),
+                                    "ping": SimpleNamespace(func=ping)}.get)
+    executor = PythonExecutor(registry, uow_factory=partial(UnitOfWork, _factory(db_engine, opened)))
+    allow = {"add_project", "ping"}
+
+    assert executor.execute(tool_name="add_project", args={"name": "kept"}, allowlist=allow).ok
+    assert not executor.execute(tool_name="add_project", args={"name": "rejected"}, allowlist=allow).ok
+    assert executor.execute(tool_name="ping", args={"text": "hi"}, allowlist=allow).data == "hi"
+
+    # 调用方自己传 db 时不接管提交
+    own = sessionmaker(bind=db_engine, autoflush=False)()
+    executor.execute(tool_name="add_project", args={"db": own, "name": "caller"}, allowlist=allow)
+    own.rollback()
+    own.close()
+
+    assert len(opened) == 2 and calls[:2] == opened and calls[2] is own
+    with sessionmaker(bind=db_engine)() as db:
+        assert db.scalars(select(Project.raw_name)).all() == ["kept"]
+
+
+def test_executor_owns_the_transaction_of_db_tools(db_engine):
+    from decimal import Decimal
+
+    from app.agentic.tools.validate_file_tool import validate_file_tool
+    from app.db.enums import CostItemStatus, FileType, ParseStatus, ValidationStatus
+    from app.models.file_record import FileRecord
+    from app.models.part_item import PartItem
+
+    Session = sessionmaker(bind=db_engine, autoflush=False)
+    parsed, pending = str(uuid4()), str(uuid4())
+    with Session() as db:
+        for version, file_id, parse_status in ((1, parsed, ParseStatus.parsed), (2, pending, ParseStatus.pending)):
+            db.add(FileRecord(id=file_id, project_id="p1", file_type=FileType.part_cost, uploader_id="u1",
+                              version=version, parse_status=parse_status, validation_status=ValidationStatus.pending,
+                              locked=False))
+        db.add(PartItem(id=str(uuid4()), project_id="p1", source_file_id=parsed, raw_name="螺栓",
+                        normalized_name="螺栓", quantity=Decimal(1), unit="件", unit_price=Decimal(10),
+                        subtotal=Decimal(10), status=CostItemStatus.ok))
+        db.commit()
+
+    opened = []
+    registry = SimpleNamespace(get={"validate_file_tool": SimpleNamespace(func=validate_file_tool)}.get)
+    executor = PythonExecutor(registry, uow_factory=partial(UnitOfWork, _factory(db_engine, opened)))
+    allow = {"validate_file_tool"}
+
+    assert executor.execute(tool_name="validate_file_tool", args={"file_id": parsed, "operator_id": "u1"},
+                            allowlist=allow).ok
+    assert not executor.execute(tool_name="validate_file_tool", args={"file_id": pending, "operator_id": "u1"},
+                                allowlist=allow).ok
+
+    # tool 只 flush，结果由 executor 在边界提交；每次调用用完即关闭
+    assert len(opened) == 2 and all(not db.in_transaction() for db in opened)
+    with Session() as db:
+        assert db.get(FileRecord, parsed).validation_status != ValidationStatus.pending
+        assert db.get(FileRecord, pending).validation_status == ValidationStatus.pending
@@ -0,0 +1,120 @@
+#app/agentic/tests/test_validate_project.py
+import threading
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+import app.db.auto_init  # noqa: F401  注册所有模型
+from app.db.enums import CostItemStatus, FileType, LogisticsType, ParseStatus, ValidationStatus
+from app.models.file_record import FileRecord
+from app.models.logistics_item import LogisticsItem
+from app.models.material_item import MaterialItem
+from app.models.part_item import PartItem
+from app.services.audit_log_service import AuditLogService
+from app.services.validation_service import ValidationService
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'project.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def _file(db, project_id, file_type):
+    file_record = FileRecord(
+        id=str(uuid4()), project_id=project_id, file_type=file_type, uploader_id="u1", version=1,
+        parse_status=ParseStatus.parsed, validation_status=ValidationStatus.pending, locked=False,
+    )
+    db.add(file_record)
+    return file_record.id
+
+
+def _seed(db, material_weight=Decimal("1000"), logistics_subtotal=Decimal("80")):
+    '''材料 / 配件 / 运费三类文件，没有人工文件'''
+    project_id = str(uuid4())
+    material = _file(db, project_id, FileType.material_cost)
+    part = _file(db, project_id, FileType.part_cost)
+    logistics = _file(db, project_id, FileType.logistics_cost)
+    db.add_all([
+        MaterialItem(id=str(uuid4()), project_id=project_id, source_file_id=material, raw_name="钢板",
+                     normalized_name="钢板", quantity=Decimal(1), weight_kg=material_weight,
+                     unit_price=Decimal(5), subtotal=Decimal(5), status=CostItemStatus.warning),
+        PartItem(id=str(uuid4()), project_id=project_id, source_file_id=part, raw_name="螺栓",
+                 normalized_name="螺栓", quantity=Decimal(2), unit="件", unit_price=Decimal(10),
+                 subtotal=Decimal(20), status=CostItemStatus.warning),
+        LogisticsItem(id=str(uuid4()), project_id=project_id, source_file_id=logistics,
+                      type=LogisticsType.TRANSPORT, description="运输", subtotal=logistics_subtotal, status=CostItemStatus.warning),
+    ])
+    return project_id, {"material": material, "part": part, "logistics": logistics}
+
+
+def _validate(db, project_id, **kwargs):
+    return ValidationService(db, AuditLogService(db)).validate_project(project_id, **kwargs)
+
+
+@pytest.mark.parametrize("material_weight, logistics_subtotal, expected", [
+    (Decimal("1000"), Decimal("80"), ValidationStatus.pending),   # 全部 ok，但缺人工文件
+    (None, Decimal("80"), ValidationStatus.warning),
+    (None, None, ValidationStatus.blocked),
+])
+def test_parallel_validation_merges_file_statuses(file_engine, material_weight, logistics_subtotal, expected):
+    db = sessionmaker(bind=file_engine, autoflush=False)()
+    # 只 flush 未提交：分派前提交，worker 的独立连接才能读到
+    project_id, files = _seed(db, material_weight, logistics_subtotal)
+    db.flush()
+
+    report = _validate(db, project_id, max_workers=3)
+    db.commit()
+
+    assert report.validation_status == expected.value
+    assert report.missing_file_types == [FileType.labor_cost.value]
+    assert report.total_items == 3
+    with sessionmaker(bind=file_engine)() as check:
+        statuses = {name: check.get(FileRecord, file_id).validation_status.value for name, file_id in files.items()}
+        item_statuses = {item.source_file_id: item.status.value
+                         for model in (MaterialItem, PartItem, LogisticsItem) for item in check.query(model)}
+    assert statuses == {name: summary.validation_status for name, summary in
+                        zip(("material", "part", "logistics"), (report.file_reports[t.value] for t in (
+                            FileType.material_cost, FileType.part_cost, FileType.logistics_cost)))}
+    assert statuses["part"] == "ok"
+    assert item_statuses[files["part"]] == "ok"
+    assert statuses["material"] == ("ok" if material_weight else "warning")
+    assert statuses["logistics"] == ("ok" if logistics_subtotal else ValidationStatus.blocked.value)
+
+
+def test_workers_only_read(file_engine):
+    db = sessionmaker(bind=file_engine, autoflush=False)()
+    project_id, _ = _seed(db, material_weight=None)
+    db.commit()
+
+    main = threading.get_ident()
+    statements = []
+    event.listen(file_engine, "before_cursor_execute",
+                 lambda *args: statements.append((threading.get_ident(), args[2].lstrip().split()[0].upper())))
+    report = _validate(db, project_id, max_workers=3)
+    db.commit()
+
+    worker_statements = [verb for ident, verb in statements if ident != main]
+    assert worker_statements and set(worker_statements) == {"SELECT"}
+    # 写入都在调用方 session 中
+    assert {"UPDATE", "INSERT"} <= {verb for ident, verb in statements if ident == main}
+    assert report.validation_status == "warning"
+
+
+def test_single_connection_bind_runs_sequentially(db_engine):
+    # 内存 SQLite：每个线程各自一个空库，不能并行；在调用方 session 中顺序执行，且不提交
+    db = sessionmaker(bind=db_engine, autoflush=False)()
+    project_id, files = _seed(db, logistics_subtotal=None)
+
+    report = _validate(db, project_id, max_workers=4)
+
+    assert report.validation_status == ValidationStatus.blocked.value
+    assert db.get(FileRecord, files["logistics"]).validation_status == ValidationStatus.blocked
+    db.rollback()
+    assert db.get(FileRecord, files["logistics"]) is None
@@ -0,0 +1,162 @@
+#app/agentic/tests/test_validation_rules.py
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app.models.material_item import MaterialItem
+from app.models.logistics_item import LogisticsItem
+from app.services.validation_rules import all_rule_codes, get_plan
+
+
+def _material(**kw):
+    base = dict(id="m1", quantity=Decimal("1"), weight_kg=Decimal("1000"), unit_price=Decimal("5"), subtotal=Decimal("5"))
+    base.update(kw)
+    return SimpleNamespace(**base)
+
+
+def test_material_plan_matches_rules():
+    plan = get_plan(MaterialItem)
+    assert plan.evaluate_item(_material(), False).status == "ok"
+    assert plan.evaluate_item(_material(subtotal=Decimal("50")), False).error_codes == ["RULE_INCONSISTENT"]
+    r = plan.evaluate_item(_material(weight_kg=None), False)
+    assert (r.status, r.error_codes) == ("warning", ["MISSING_SYSTEM"])
+    r = plan.evaluate_item(_material(weight_kg=None, subtotal=None), False)
+    assert (r.status, r.error_codes) == ("blocked", ["MISSING_ALL"])
+    r = plan.evaluate_item(_material(quantity=Decimal("-1")), False)
+    assert (r.status, r.error_codes) == ("blocked", ["NEGATIVE_VALUE"])
+    assert plan.evaluate_item(_material(subtotal=None, weight_kg=None), True).status == "confirmed"
+
+
+def test_disabled_rule_is_skipped():
+    plan = get_plan(MaterialItem, {"RULE_INCONSISTENT"})
+    assert plan.evaluate_item(_material(subtotal=Decimal("50")), False).status == "ok"
+    # 派生 plan 被缓存
+    assert plan is get_plan(MaterialItem, {"RULE_INCONSISTENT"})
+
+
+def test_plan_version_tracks_enabled_rules():
+    base = get_plan(MaterialItem)
+    assert base.version == get_plan(MaterialItem, set()).version
+    assert base.version != get_plan(MaterialItem, {"RULE_INCONSISTENT"}).version
+    assert base.version != get_plan(LogisticsItem).version
+
+
+def test_column_batch_evaluation():
+    plan = get_plan(LogisticsItem)
+    results = list(plan.evaluate_columns(
+        ["a", "b", "c"],
+        [False, False, False],
+        {"subtotal": [Decimal("1"), None, Decimal("-2")]},
+    ))
+    assert [r.status for r in results] == ["ok", "blocked", "blocked"]
+    assert results[1].error_codes == ["MISSING_SUBTOTAL"]
+
+
+def _material_row(item_id, **kw):
+    base = dict(
+        id=item_id, raw_name="钢板", normalized_name=None, spec="10mm", material_grade="Q235",
+        supplier="A", quantity=Decimal("1"), unit="张", weight_kg=Decimal("1000"),
+        unit_price=Decimal("5"), subtotal=Decimal("5"),
+    )
+    base.update(kw)
+    return SimpleNamespace(**base)
+
+
+def test_duplicate_rows_are_grouped_by_fingerprint():
+    plan = get_plan(MaterialItem)
+    items = [
+        _material_row("a"),
+        # 全角/空白/大小写/小数位不同，归一化后仍是同一指纹
+        _material_row("b", raw_name=" 钢板 ", spec="１０MM", quantity=Decimal("1.00")),
+        _material_row("c", unit_price=Decimal("6"), subtotal=Decimal("6")),
+        _material_row("d", weight_kg=None),
+        _material_row("e", weight_kg=None),
+    ]
+    results = {i.id: plan.evaluate_item(i, False) for i in items}
+    results["e"] = plan.evaluate_item(items[4], True)
+    plan.apply_cross_row_rules(items, results)
+
+    assert (results["a"].status, results["a"].error_codes) == ("warning", ["DUPLICATE_ROW"])
+    assert results["b"].error_codes == ["DUPLICATE_ROW"]
+    assert results["c"].status == "ok"
+    # 已有 warning 的行追加 error code；人工确认的行不再被标记
+    assert results["d"].error_codes == ["MISSING_SYSTEM", "DUPLICATE_ROW"]
+    assert results["e"].status == "confirmed"
+
+    disabled = get_plan(MaterialItem, {"DUPLICATE_ROW"})
+    results = {i.id: disabled.evaluate_item(i, False) for i in items[:2]}
+    disabled.apply_cross_row_rules(items[:2], results)
+    assert results["a"].status == "ok"
+
+
+def test_labor_consistency_uses_unit_aware_processing_fee():
+    from app.models.labor_item import LaborItem
+    from app.services.labor_fees import labor_fee_columns, labor_fees, money_values
+
+    # 单价按每吨：kg 单位的加工费 = 数量 * 单价 * 0.001
+    assert labor_fees(Decimal("2000"), "kg", Decimal("300")) == (Decimal("600"), Decimal("10"))
+    assert labor_fees(Decimal("2"), "吨", Decimal("300")) == (Decimal("600"), Decimal("10"))
+    columns = labor_fee_columns([Decimal("2000"), Decimal("2"), None], ["kg", "吨", "吨"], [Decimal("300"), Decimal("300"), None])
+    assert columns.processing_fee.tolist() == [60000000, 60000000, 0]
+    assert money_values(columns.ton_bonus) == [Decimal("10"), Decimal("10"), Decimal("0")]
+    # 整数单位精确计算：没有 float64 的二进制误差，半单位按 ROUND_HALF_UP 进位
+    columns = labor_fee_columns([Decimal("3"), Decimal("1.1"), Decimal("504.54")], ["吨", "kg", "kg"],
+                                [Decimal("0.1"), Decimal("3"), Decimal("6883.25")])
+    assert [str(v) for v in money_values(columns.processing_fee)] == ["0.30000", "0.00330", "3472.87496"]
+    assert [str(v) for v in money_values(columns.ton_bonus)] == ["15.00000", "0.00550", "2.52270"]
+
+    plan = get_plan(LaborItem)
+
+    def labor(unit, quantity, subtotal):
+        return SimpleNamespace(id="l1", work_quantity=quantity, unit=unit, unit_price=Decimal("300"),
+                               extra_subsidies=Decimal("0"), ton_bonus=Decimal("10"), subtotal=subtotal)
+
+    assert plan.evaluate_item(labor("kg", Decimal("2000"), Decimal("610")), False).status == "ok"
+    assert plan.evaluate_item(labor("吨", Decimal("2"), Decimal("610")), False).status == "ok"
+    assert plan.evaluate_item(labor("kg", Decimal("2000"), Decimal("600010")), False).error_codes == ["RULE_INCONSISTENT"]
+
+
+def test_labor_fee_columns_match_row_by_row_labor_fees():
+    import random
+
+    from app.services.labor_fees import labor_fee_columns, labor_fees, money_values
+    from app.services.money import from_units, to_units
+
+    rng = random.Random(20240601)
+    quantities = [Decimal(rng.randint(-10 ** 7, 10 ** 9)).scaleb(-rng.randint(0, 5)) for _ in range(20000)]
+    prices = [Decimal(rng.randint(0, 10 ** 9)).scaleb(-rng.randint(0, 5)) for _ in range(20000)]
+    units = [rng.choice(["吨", "kg", "千克", None]) for _ in range(20000)]
+    quantities[0], prices[0] = None, None
+
+    columns = labor_fee_columns(quantities, units, prices)
+    expected = [labor_fees(q, u, p) for q, u, p in zip(quantities, units, prices)]
+    assert money_values(columns.processing_fee) == [from_units(to_units(fee)) for fee, _ in expected]
+    assert money_values(columns.ton_bonus) == [from_units(to_units(bonus)) for _, bonus in expected]
+
+
+def test_price_band_rule_flags_prices_outside_the_band():
+    plan = get_plan(MaterialItem)
+    band = SimpleNamespace(lower=Decimal("4.00000"), upper=Decimal("6.00000"), median=Decimal("5.00000"), point_count=12)
+    bands = {("钢板", "10mm", "Q235"): band}
+    requested = []
+
+    def load_bands(keys):
+        requested.append(keys)
+        return bands
+    items = [
+        _material_row("in", normalized_name="钢板"),
+        _material_row("out", normalized_name="钢板", unit_price=Decimal("7"), subtotal=Decimal("7")),
+        _material_row("unknown", normalized_name="钢板", spec="12mm", unit_price=Decimal("70"), subtotal=Decimal("70")),
+        _material_row("bundle", normalized_name="钢板", unit_price=Decimal("0"), subtotal=Decimal("0")),
+    ]
+    results = {i.id: plan.evaluate_item(i, False) for i in items}
+    plan.apply_band_rules(items, results, load_bands, skip={"bundle"})
+
+    # 一次加载本文件出现的全部键
+    assert requested == [{("钢板", "10mm", "Q235"), ("钢板", "12mm", "Q235")}]
+    assert results["in"].status == "ok"
+    assert (results["out"].status, results["out"].error_codes) == ("warning", ["PRICE_OUT_OF_BAND"])
+    assert results["out"].messages[0].startswith("单价 7.00000 超出历史单价区间 [4.00000, 6.00000]")
+    # 没有历史区间的键、不参与比较的行不标记
+    assert results["unknown"].status == "ok" and results["bundle"].status == "ok"
+    assert "PRICE_OUT_OF_BAND" in all_rule_codes()["part"]
+    assert get_plan(MaterialItem, {"PRICE_OUT_OF_BAND"}).band_rules == ()
@@ -0,0 +1,258 @@
+#app/agentic/tests/test_validation_service.py
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import app.db.auto_init  # noqa: F401  注册所有模型
+from app.agentic.schemas.dto.validate_report_dto import ValidationReportDTO
+from app.agentic.tools.validate_file_tool import validate_file_tool
+from app.db.enums import CostItemStatus, FileType, ParseStatus, ValidationStatus
+from app.models.file_record import FileRecord
+from app.models.material_item import MaterialItem
+from app.models.part_item import PartItem
+from app.services import validation_rules
+from app.services.audit_log_service import AuditLogService
+from app.services.validation_service import ValidationService
+
+
+def _session(engine):
+    return sessionmaker(bind=engine, autoflush=False)()
+
+
+def _file(db, file_type=FileType.part_cost):
+    file_record = FileRecord(
+        id=str(uuid4()), project_id="p1", file_type=file_type, uploader_id="u1", version=1,
+        parse_status=ParseStatus.parsed, validation_status=ValidationStatus.pending, locked=False,
+    )
+    db.add(file_record)
+    return file_record
+
+
+def _part(file_record, row_no, **kw):
+    base = dict(id=str(uuid4()), project_id=file_record.project_id, source_file_id=file_record.id, row_no=row_no,
+                raw_name=f"配件{row_no}", normalized_name=f"配件{row_no}", quantity=Decimal(1), unit="件",
+                unit_price=Decimal(10), subtotal=Decimal(10), status=CostItemStatus.warning)
+    base.update(kw)
+    return PartItem(**base)
+
+
+def _material(file_record, row_no, **kw):
+    base = dict(id=str(uuid4()), project_id=file_record.project_id, source_file_id=file_record.id, row_no=row_no,
+                raw_name=f"钢板{row_no}", normalized_name=f"钢板{row_no}", quantity=Decimal(1),
+                weight_kg=Decimal(1000), unit_price=Decimal(5), subtotal=Decimal(5), status=CostItemStatus.warning)
+    base.update(kw)
+    return MaterialItem(**base)
+
+
+def test_bundle_anchor_follows_row_no_not_insert_order(db_engine):
+    db = _session(db_engine)
+    file_record = _file(db)
+    # 行号与写入顺序相反：组内 Excel 第一行（row_no 0）才是锚点
+    second = _part(file_record, 1, bundle_key=1)
+    first = _part(file_record, 0, bundle_key=1)
+    db.add_all([second, first])
+    db.commit()
+
+    report = ValidationService(db, AuditLogService(db)).validate_file(file_record)
+
+    assert report.item_results[first.id].status == "ok"
+    assert first.is_calculable
+    assert report.item_results[second.id].error_codes == ["BUNDLE_MULTI_ANCHOR"]
+
+
+def _seed_mixed(db):
+    '''ok / warning / 两种 blocked 交错的材料文件，返回 (file_record, 类别 -> 按行号排列的 item id)'''
+    file_record = _file(db, FileType.material_cost)
+    kinds = ["blocked_negative", "ok", "warning", "blocked_missing", "blocked_negative",
+             "warning", "blocked_missing", "ok", "blocked_negative", "warning"]
+    overrides = {
+        "ok": {},
+        "warning": {"weight_kg": None},
+        "blocked_negative": {"quantity": Decimal(-1)},
+        "blocked_missing": {"weight_kg": None, "subtotal": None},
+    }
+    items = [_material(file_record, row_no, **overrides[kind]) for row_no, kind in enumerate(kinds)]
+    db.add_all(items)
+    db.commit()
+    ids = {}
+    for kind, item in zip(kinds, items):
+        ids.setdefault(kind, []).append(item.id)
+        if kind.startswith("blocked_"):
+            ids.setdefault("blocked", []).append(item.id)
+        if kind != "ok":
+            ids.setdefault("issues", []).append(item.id)
+    return file_record, ids
+
+
+def _read_pages(service, file_id, **kwargs):
+    pages, cursor = [], None
+    while True:
+        page = service.list_item_results(file_id, cursor=cursor, **kwargs)
+        pages.append(page)
+        if page.next_cursor is None:
+            return pages
+        cursor = page.next_cursor
+
+
+def test_list_item_results_pages_until_cursor_is_none(db_engine):
+    db = _session(db_engine)
+    file_record, ids = _seed_mixed(db)
+    service = ValidationService(db, AuditLogService(db))
+    service.validate_file_summary(file_record)
+
+    pages = _read_pages(service, file_record.id, status="blocked", limit=2)
+
+    assert [len(p.items) for p in pages] == [2, 2, 1]
+    assert [i.item_id for p in pages for i in p.items] == ids["blocked"]
+    assert all(p.next_cursor is not None for p in pages[:-1])
+    # 恰好取完：没有下一页
+    exact = service.list_item_results(file_record.id, status="warning", limit=len(ids["warning"]))
+    assert [i.item_id for i in exact.items] == ids["warning"]
+    assert exact.next_cursor is None
+    # 不限 status：blocked 和 warning 交错，仍按行号
+    everything = _read_pages(service, file_record.id, limit=3)
+    assert [i.item_id for p in everything for i in p.items] == ids["issues"]
+    assert [i.item_id for i in service.iter_item_results(file_record.id, status="blocked", batch_size=2)] \
+        == ids["blocked"]
+
+
+def test_list_item_results_filters_by_status_and_error_code(db_engine):
+    db = _session(db_engine)
+    file_record, ids = _seed_mixed(db)
+    service = ValidationService(db, AuditLogService(db))
+    service.validate_file_summary(file_record)
+
+    missing = _read_pages(service, file_record.id, error_code="MISSING_ALL", limit=1)
+    assert [i.item_id for p in missing for i in p.items] == ids["blocked_missing"]
+    assert all("MISSING_ALL" in i.error_codes and i.status == "blocked" for p in missing for i in p.items)
+    negative = service.list_item_results(file_record.id, status="blocked", error_code="NEGATIVE_VALUE")
+    assert [i.item_id for i in negative.items] == ids["blocked_negative"]
+    assert service.list_item_results(file_record.id, status="warning", error_code="NEGATIVE_VALUE").items == []
+
+    with pytest.raises(ValueError):
+        service.list_item_results(file_record.id, status="ok")
+    with pytest.raises(ValueError):
+        service.list_item_results(file_record.id, limit=0)
+
+
+def test_paged_report_dto_continues_with_cursor(db_engine):
+    db = _session(db_engine)
+    file_record, ids = _seed_mixed(db)
+    service = ValidationService(db, AuditLogService(db))
+    service.validate_file_summary(file_record)
+
+    dto = ValidationReportDTO.from_paged_report(service.get_paged_report(file_record, page_size=2))
+
+    assert dto.id == file_record.id
+    assert dto.validation_status == ValidationStatus.blocked.value
+    assert (dto.summary.total_items, dto.summary.ok_count, dto.summary.warning_count, dto.summary.blocked_count) \
+        == (10, 2, 3, 5)
+    assert not dto.summary.is_ready_for_summary
+    assert [i.item_id for i in dto.blocked_items] == ids["blocked"][:2]
+    assert [i.item_id for i in dto.warning_items] == ids["warning"][:2]
+    assert all(i.explanation == "; ".join(i.messages) for i in dto.blocked_items + dto.warning_items)
+    assert dto.error_code_counts["NEGATIVE_VALUE"] == 3
+    assert dto.error_code_counts["MISSING_ALL"] == 2
+
+    # 用 DTO 里的游标继续读，与直接分页的下一页一致，且计数不受分页影响
+    following = ValidationReportDTO.from_paged_report(service.get_paged_report(
+        file_record, page_size=2,
+        blocked_cursor=dto.blocked_next_cursor, warning_cursor=dto.warning_next_cursor,
+    ))
+    assert [i.item_id for i in following.blocked_items] == ids["blocked"][2:4]
+    assert [i.item_id for i in following.warning_items] == ids["warning"][2:]
+    assert following.warning_next_cursor is None
+    assert following.error_code_counts == dto.error_code_counts
+
+    narrowed = ValidationReportDTO.from_paged_report(
+        service.get_paged_report(file_record, page_size=2, error_code="MISSING_ALL")
+    )
+    assert [i.item_id for i in narrowed.blocked_items] == ids["blocked_missing"]
+    assert narrowed.blocked_next_cursor is None
+    assert narrowed.warning_items == []
+
+
+def test_validate_file_tool_returns_first_page(db_engine):
+    db = _session(db_engine)
+    file_record, ids = _seed_mixed(db)
+
+    result = validate_file_tool(db=db, file_id=file_record.id, operator_id="u1")
+
+    assert result.ok, result.error_message
+    service = ValidationService(db, AuditLogService(db))
+    assert result.data == ValidationReportDTO.from_paged_report(service.get_paged_report(file_record)).model_dump()
+    assert [i["item_id"] for i in result.data["blocked_items"]] == ids["blocked"]
+    assert result.data["blocked_next_cursor"] is None
+
+
+def _code_counts(service, file_id):
+    '''按持久化的明细重新数一遍每个 error code 命中的 item 数'''
+    counts = {}
+    for result in service.iter_item_results(file_id):
+        for code in set(result.error_codes):
+            counts[code] = counts.get(code, 0) + 1
+    return counts
+
+
+def test_error_code_index_is_rewritten_on_revalidation(db_engine):
+    db = _session(db_engine)
+    file_record, ids = _seed_mixed(db)
+    service = ValidationService(db, AuditLogService(db))
+    service.validate_file_summary(file_record)
+    db.commit()
+
+    assert service.list_items_with_error(file_record.id, "MISSING_ALL") == ids["blocked_missing"]
+    assert service.list_items_with_error(file_record.id, "NEGATIVE_VALUE") == ids["blocked_negative"]
+    assert service.get_error_code_counts(file_record.id) == _code_counts(service, file_record.id) \
+        == {"MISSING_ALL": 2, "MISSING_SYSTEM": 3, "NEGATIVE_VALUE": 3}
+
+    # 修好一行 MISSING_ALL，关掉 NEGATIVE_VALUE 后重新校验：旧的索引行不能残留
+    db.get(MaterialItem, ids["blocked_missing"][0]).weight_kg = Decimal(1000)
+    db.get(MaterialItem, ids["blocked_missing"][0]).subtotal = Decimal(5)
+    service.set_rule_enabled(project_id=file_record.project_id, rule_code="NEGATIVE_VALUE",
+                             enabled=False, operator_id="u1")
+    service.validate_file_summary(file_record)
+    db.commit()
+
+    assert service.list_items_with_error(file_record.id, "MISSING_ALL") == ids["blocked_missing"][1:]
+    assert service.list_items_with_error(file_record.id, "NEGATIVE_VALUE") == []
+    assert service.get_error_code_counts(file_record.id) == _code_counts(service, file_record.id) \
+        == {"MISSING_ALL": 1, "MISSING_SYSTEM": 3}
+    assert [i.item_id for i in service.iter_item_results(file_record.id, error_code="MISSING_SYSTEM")] \
+        == service.list_items_with_error(file_record.id, "MISSING_SYSTEM") == ids["warning"]
+
+
+def test_results_outdated_follows_rule_version(db_engine, monkeypatch):
+    db = _session(db_engine)
+    file_record, _ = _seed_mixed(db)
+    service = ValidationService(db, AuditLogService(db))
+
+    # 有 blocked / warning 项却没有任何明细
+    assert service.results_outdated(file_record)
+    service.validate_file_summary(file_record)
+    db.commit()
+    assert not service.results_outdated(file_record)
+
+    # 项目级规则开关改变了生效 plan 的 version
+    service.set_rule_enabled(project_id=file_record.project_id, rule_code="MISSING_SYSTEM",
+                             enabled=False, operator_id="u1")
+    assert service.results_outdated(file_record)
+    service.validate_file_summary(file_record)
+    db.commit()
+    assert not service.results_outdated(file_record)
+    service.set_rule_enabled(project_id=file_record.project_id, rule_code="MISSING_SYSTEM",
+                             enabled=True, operator_id="u1")
+    service.validate_file_summary(file_record)
+    db.commit()
+    assert not service.results_outdated(file_record)
+
+    # 规则语义升级：RULES_REVISION 递增后 plan 指纹随之变化
+    plan = validation_rules.get_plan(MaterialItem)
+    monkeypatch.setattr(validation_rules, "RULES_REVISION", validation_rules.RULES_REVISION + 1)
+    monkeypatch.setattr(plan, "version", plan._fingerprint())
+    assert service.results_outdated(file_record)
+    service.validate_file_summary(file_record)
+    db.commit()
+    assert not service.results_outdated(file_record)
@@ -1,13 +1,10 @@
 from app.agentic.schemas.tool_result import ToolResult
 from app.agentic.schemas.error_type import ErrorType
 
-from app.services.audit_log_service import AuditLogService
-from app.services.item_edit_service import ItemEditService
-from app.services.validation_service import ValidationService
-
 from app.agentic.schemas.dto.validate_report_dto import ValidationReportDTO
 from app.models.batchEditItemsInput import BatchConfirmWarningItemsInput
-from app.db.session import get_session
+from app.db.unit_of_work import UnitOfWork
+from app.models.file_record import FileRecord
 
 import sqlite3
 from sqlalchemy.exc import SQLAlchemyError, OperationalError     
@@ -60,12 +57,12 @@ def batch_confirm_items_tool(args: dict) -> ToolResult:
             error_message=str(e),
         )
 
-    db = get_session()
+    uow = UnitOfWork()
 
     try:
-        audit = AuditLogService(db)
-        validation_service=ValidationService(db, audit)
-        service = ItemEditService(db, audit_log_service=audit, validation_service=validation_service)
+        db = uow.session
+        validation_service = uow.services.validation
+        service = uow.services.item_edit
 
         result = service.batch_confirm_items(
             item_type_lst=input_dto.item_type_lst,
@@ -77,9 +74,11 @@ def batch_confirm_items_tool(args: dict) -> ToolResult:
         # 获取 source_file_id
         # --------------------------
 
-        db.commit()
+        uow.commit()
     
-        report_dto = ValidationReportDTO.from_domain_model(result)
+        report_dto = ValidationReportDTO.from_paged_report(
+            validation_service.get_paged_report(db.get(FileRecord, result.id))
+        )
         return ToolResult(
             ok=True,
             tool_name="batch_confirm_items_tool",
@@ -88,7 +87,7 @@ def batch_confirm_items_tool(args: dict) -> ToolResult:
         )
         
     except Exception as e:
-        db.rollback()
+        uow.rollback()
         error_type,explanation,msg =_classify_batch_confirm_items_error(e)
         return ToolResult( 
             ok=False,
@@ -100,7 +99,7 @@ def batch_confirm_items_tool(args: dict) -> ToolResult:
             irreversible=False,
         )
     finally:
-        db.close()
+        uow.close()
 
 # Part 3 ToolSpec 注册
 tool_registry.register(ToolSpec(
@@ -110,7 +110,7 @@ def bind_validated_file_to_project_tool(
         raw.status = RawUploadStatus.bound
         raw.storage_path = final_path
 
-        db.commit()
+        db.flush()  # 提交 / 回滚由 executor 的工作单元统一处理
 
         dto = FileRecordDTO.from_orm_model(file_record)
         return ToolResult(
@@ -123,15 +123,12 @@ def bind_validated_file_to_project_tool(
         )
 
     except Exception as e:
-        db.rollback()
         return ToolResult(
             tool_name="bind_validated_file_to_project_tool",
             ok=False,
             error_type=ErrorType.SYSTEM_ERROR,
             error_message=str(e),
         )
-    finally:
-        db.close()
         
 # ---- ToolSpec 注册 ----
 
@@ -82,7 +82,7 @@ def confirm_raw_upload_tool(
             operator_id=operator_id,
         )
 
-        db.commit()
+        db.flush()  # 提交 / 回滚由 executor 的工作单元统一处理
 
         return ToolResult(
             tool_name="confirm_raw_upload_tool",
@@ -98,7 +98,6 @@ def confirm_raw_upload_tool(
         )
 
     except Exception as e:
-        db.rollback()
         error_type, error_message, explanation = _classify_confirm_error(e)
         return ToolResult(
             tool_name="confirm_raw_upload_tool",
@@ -107,8 +106,6 @@ def confirm_raw_upload_tool(
             error_message=error_message,
             explanation=explanation,
         )
-    finally:
-        db.close()
 
 # ---- ToolSpec 注册 ----
 
@@ -71,7 +71,7 @@ def create_project_tool(
             operator_id=operator_id,
         )
 
-        db.commit()
+        db.flush()  # 提交 / 回滚由 executor 的工作单元统一处理
         db.refresh(project)
         dto = ProjectDTO.from_orm_model(project)
 
@@ -88,7 +88,6 @@ def create_project_tool(
         )
 
     except Exception as e:
-        db.rollback()
         error_type, explain_msg = _classify_create_project_error(e)
         return ToolResult(
             tool_name="create_project_tool",
@@ -99,8 +98,6 @@ def create_project_tool(
             side_effect=False,
             irreversible=False,
         )
-    finally:
-        db.close()
 
 # ---- ToolSpec 注册 ----
 
@@ -121,7 +121,7 @@ def create_update_file_record_tool(
             operator_id=operator_id,
         )
 
-        db.commit()
+        db.flush()  # 提交 / 回滚由 executor 的工作单元统一处理
         db.refresh(file_record)
 
         dto = FileRecordDTO.from_orm_model(file_record)
@@ -139,7 +139,6 @@ def create_update_file_record_tool(
         )
 
     except Exception as e:
-        db.rollback()
         error_type, explanation = _classify_error(e)
 
         return ToolResult(
@@ -151,8 +150,6 @@ def create_update_file_record_tool(
             side_effect=False,
             irreversible=False,
         )
-    finally:
-        db.close()
 
 
 # ---- ToolSpec ----
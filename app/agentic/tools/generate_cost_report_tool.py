@@ -90,7 +90,6 @@ def generate_cost_report_tool(
         )
         
     try:
-        # 显式事务边界：tool 层负责提交/回滚，executor 不要重复做
         df_report = service.generate_df_report(
             cost_summary=cost_summary,
             operator_id=operator_id,
@@ -109,7 +108,6 @@ def generate_cost_report_tool(
         )
 
     except Exception as e:
-        db.rollback()
         et,msg,explain =_classify_generate_report_error(e)
         return ToolResult(
             tool_name="generate_cost_summary_tool",
@@ -122,8 +120,6 @@ def generate_cost_report_tool(
             irreversible=False,
             audit_ref_id=None,
         )
-    finally:
-        db.close()
 #Part 3 注册工具，import时自动注册
 tool_registry.register(ToolSpec(
             name="generate_cost_report_tool",
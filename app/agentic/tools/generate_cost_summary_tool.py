@@ -9,6 +9,7 @@ from app.agentic.schemas.dto.cost_summary_dto import CostSummaryDTO
 
 from app.services.cost_calculation_service import CostCalculationService
 from app.services.audit_log_service import AuditLogService
+from app.services.revalidation_scheduler import revalidation_scheduler
 
 from app.agentic.schemas.tool_spec import ToolSpec
 from app.agentic.schemas.risk_profile import ToolRiskProfile
@@ -109,7 +110,12 @@ def generate_cost_summary_tool(
     service = CostCalculationService(db=db, audit_log_service=audit)
 
     try:
-        # 显式事务边界：tool 层负责提交/回滚，executor 不要重复做
+        # 页面上的编辑可能还在等待后台重校验，先同步执行，避免按过期状态计算
+        revalidation_scheduler.run_pending(
+            [material_file_id, part_file_id, labor_file_id, logistics_file_id]
+        )
+        db.expire_all()
+
         summary = service.generate_cost_summary(
             project_id=project_id,
             material_file_id=material_file_id,
@@ -118,7 +124,7 @@ def generate_cost_summary_tool(
             logistics_file_id=logistics_file_id,
             operator_id=operator_id,
         )
-        db.commit()
+        db.flush()  # 提交 / 回滚由 executor 的工作单元统一处理
         db.refresh(summary)  # 刷新以获取最新状态，尤其是关联的文件记录状态（locked）
         dto = CostSummaryDTO.from_domain_model(summary)
 
@@ -137,7 +143,6 @@ def generate_cost_summary_tool(
         )
 
     except Exception as e:
-        db.rollback()
         et,msg,explain = _classify_generate_summary_error(e)
         return ToolResult(
             tool_name="generate_cost_summary_tool",
@@ -150,8 +155,6 @@ def generate_cost_summary_tool(
             irreversible=False,
             audit_ref_id=None,
         )
-    finally:
-        db.close()
 #Part 3 注册工具，import时自动注册
 tool_registry.register(ToolSpec(
             name="generate_cost_summary_tool",
@@ -99,8 +99,6 @@ def list_raw_uploads_tool(
             error_message=error_message,
             explanation=explanation,
         )
-    finally:
-        db.close()
         
 #Part 3 注册工具，import时自动注册
 tool_registry.register(ToolSpec(
@@ -0,0 +1,102 @@
+import sqlite3
+from typing import Optional
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+
+from app.agentic.schemas.tool_result import ToolResult
+from app.agentic.schemas.error_type import ErrorType
+from app.agentic.schemas.dto.validate_report_dto import ValidationIssueDTO
+from app.services.validation_service import ValidationService, DEFAULT_PAGE_SIZE
+from app.services.audit_log_service import AuditLogService
+from app.models.file_record import FileRecord
+
+from app.agentic.schemas.tool_spec import ToolSpec
+from app.agentic.schemas.risk_profile import ToolRiskProfile
+from app.agentic.tools.registry import tool_registry
+
+#Part 1 错误分类
+def _classify_list_validation_issues_error(e: Exception) -> tuple[ErrorType, str, str]:
+    msg = str(e).lower()
+    if isinstance(e, (OperationalError, sqlite3.OperationalError, SQLAlchemyError)):
+        return ErrorType.DATABASE_ERROR, msg, "Database error occurred. Retry once or escalate."
+    # 输入类：status / limit 非法
+    if isinstance(e, ValueError):
+        return ErrorType.INPUT_ERROR, msg, "status must be 'blocked' or 'warning', limit must be positive."
+    return ErrorType.SYSTEM_ERROR, msg, "Unexpected system error. Retry once or escalate."
+
+#Part 2 Tool 实现
+def list_validation_issues_tool(
+    *,
+    db: Session,
+    file_id: str,
+    status: Optional[str] = None,
+    error_code: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> ToolResult:
+    '''
+    分页读取最近一次校验的 blocked / warning 明细（只读，不重新校验）
+    '''
+    service = ValidationService(db, AuditLogService(db))
+    try:
+        if not db.get(FileRecord, file_id):
+            return ToolResult(
+                tool_name="list_validation_issues_tool",
+                ok=False,
+                error_type=ErrorType.INPUT_ERROR,
+                error_message=f"FileRecord {file_id} not found.",
+                explanation="The file does not exist. Check the file_id.",
+            )
+        page = service.list_item_results(
+            file_id,
+            status=status,
+            error_code=error_code,
+            cursor=cursor,
+            limit=limit,
+        )
+        return ToolResult(
+            tool_name="list_validation_issues_tool",
+            ok=True,
+            data={
+                "file_id": file_id,
+                "items": [ValidationIssueDTO.from_result(i).model_dump() for i in page.items],
+                "next_cursor": page.next_cursor,
+            },
+            explanation=(
+                f"{len(page.items)} issues returned. "
+                + ("Pass next_cursor to read the next page." if page.next_cursor is not None else "No more issues.")
+            ),
+            side_effect=False,
+            irreversible=False,
+        )
+    except Exception as e:
+        error_type, error_message, explanation = _classify_list_validation_issues_error(e)
+        return ToolResult(
+            tool_name="list_validation_issues_tool",
+            ok=False,
+            error_type=error_type,
+            error_message=error_message,
+            explanation=explanation,
+        )
+
+#Part 3 注册工具，import时自动注册
+tool_registry.register(ToolSpec(
+            name="list_validation_issues_tool",
+            func=list_validation_issues_tool,
+            description="Page through blocked / warning items of the latest validation of a file",
+            input_schema={"db": "Session",
+                          "file_id": "str",
+                          "status": "'blocked' | 'warning' | None",
+                          "error_code": "str | None",
+                          "cursor": "int | None",
+                          "limit": "int"},
+            output_schema= "ToolResult",
+            risk_profile=ToolRiskProfile(
+                modifies_persistent_data=False,
+                irreversible=False,
+                deletes_data=False,
+                affects_multiple_records=False,
+                require_human_auth=False
+            )
+        )
+    )
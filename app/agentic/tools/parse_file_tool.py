@@ -101,7 +101,7 @@ def parse_file_tool(
         #调用ingest service进行解析，捕获异常并分类，返回结构化结果
         ingest_service.ingest(file)
 
-        db.commit()
+        db.flush()  # 提交 / 回滚由 executor 的工作单元统一处理
         db.refresh(file)
         #返回成功结果，转化成dto
         dto = FileRecordDTO.from_orm_model(file)
@@ -116,7 +116,6 @@ def parse_file_tool(
         )
 
     except Exception as e:
-        db.rollback()
         
         et,msg = _classify_parse_file_error(e)
 
@@ -148,8 +147,6 @@ def parse_file_tool(
             side_effect=False,
             irreversible=False,
         )
-    finally:
-        db.close()
         
 #Part 3 注册工具，import时自动注册
 tool_registry.register(ToolSpec(
@@ -63,12 +63,13 @@ def validate_file_tool(
                 audit_ref_id=None,
             )
         #调用validation_service.validate_file()
-        report = service.validate_file(file)
+        #只取计数，明细已持久化，DTO 里只带第一页
+        service.validate_file_summary(file)
         
 
-        db.commit()
+        db.flush()  # 提交 / 回滚由 executor 的工作单元统一处理
         #将ValidationReport转换成DTO
-        dto = ValidationReportDTO.from_domain_model(report)
+        dto = ValidationReportDTO.from_paged_report(service.get_paged_report(file))
         #返回tool result
         return ToolResult(
             tool_name="validate_file_tool",
@@ -79,14 +80,14 @@ def validate_file_tool(
                 f"Total: {dto.summary.total_items}, "
                 f"Blocked:{dto.summary.blocked_count}, "
                 f"Warning:{dto.summary.warning_count}. "
-                "If blocked > 0 → enter HUMAN_CORRECTION_LOOP."
+                "If blocked > 0 → enter HUMAN_CORRECTION_LOOP. "
+                "Use list_validation_issues_tool with the next cursors to read more items."
             ),
             side_effect=True,
             irreversible=False
         )
     #分类错误，Validate_file的错误没那么复杂
     except Exception as e:
-        db.rollback()
         return ToolResult(
             tool_name="validate_file_tool",
             ok=False,
@@ -98,8 +99,6 @@ def validate_file_tool(
             irreversible=False,
             audit_ref_id=None,
         )
-    finally:
-        db.close()
 
 #Part 3 注册工具，import时自动注册
 spec = ToolSpec(
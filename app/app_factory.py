@@ -47,6 +47,9 @@ def create_app(config_name='development'):
     app.config['EXCEL_UPLOAD_FOLDER'] = EXCEL_UPLOAD_FOLDER
     app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_UPLOAD_SIZE', 10485760))  # 10MB
     
+    # SQL 剖析：off / on / panel（见 app/routes/sql_profiling.py）
+    app.config['SQL_PROFILER'] = os.getenv('SQL_PROFILER', 'off')
+    
     # Session 配置
     app.config['SESSION_TYPE'] = 'filesystem'
     app.config['SESSION_PERMANENT'] = False
@@ -67,6 +70,7 @@ def create_app(config_name='development'):
     from app.routes.report import report_bp
     from app.routes.audit import audit_bp
     from app.routes.user import user_bp
+    from app.routes.portfolio import portfolio_bp
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(project_bp)
@@ -74,6 +78,15 @@ def create_app(config_name='development'):
     app.register_blueprint(report_bp)
     app.register_blueprint(audit_bp)
     app.register_blueprint(user_bp)
+    app.register_blueprint(portfolio_bp)
+    
+    # SQL 剖析（默认关闭）；先于工作单元注册，请求结束时的提交也计入
+    from app.routes.sql_profiling import init_sql_profiling
+    init_sql_profiling(app)
+    
+    # 请求级工作单元：一个请求一个 Session，请求结束时统一提交 / 回滚
+    from app.routes.request_scope import init_request_scope
+    init_request_scope(app)
     
     # 注册错误处理
     register_error_handlers(app)
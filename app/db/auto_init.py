@@ -5,6 +5,7 @@
 from sqlalchemy import inspect
 from app.db.session import get_engine, get_session
 from app.db.init_db import init_db
+from app.db.migrations import run_migrations
 from app.services.user_service import UserService
 #-------------------导入所有表-----------------------
 from app.models.user import User
@@ -18,6 +19,11 @@ from app.models.cost_summary import CostSummary
 from app.models.name_mapping import NameMapping
 from app.models.audit_log import AuditLog
 from app.models.raw_upload_record import RawUploadRecord
+from app.models.validation_rule_setting import ValidationRuleSetting
+from app.models.item_validation_record import ItemValidationRecord, ItemValidationErrorCode
+from app.models.file_cost_aggregate import FileCostAggregate
+from app.models.price_series import PriceSeries, PriceIndexedFile, PriceBand
+from app.models.cost_rollup import CostRollup, ProjectCostRollup
 
 def check_tables_exist() -> bool:
     """检查数据库表是否存在"""
@@ -94,6 +100,13 @@ def auto_init():
             raise
     else:
         print("✅ 数据库表已存在")
+        # create_all 只创建缺失的表，用于补齐新版本新增的表
+        init_db()
+
+    # 已有表的结构变更 / 数据回填
+    executed = run_migrations(get_engine())
+    for migration_id in executed:
+        print(f"🔧 已执行数据库升级: {migration_id}")
 
     if not check_admin_user_exists():
         print("👤 管理员用户不存在，正在创建...")
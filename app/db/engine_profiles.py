@@ -0,0 +1,148 @@
+"""
+数据库 Engine 配置档（profile）
+get_engine 按 DATABASE_PROFILE 环境变量选择：
+- tuned（默认）：SQLite 文件库开启 WAL，连接建立时设置 synchronous / cache_size / mmap_size /
+  busy_timeout / temp_store，并按多线程 Flask 配置连接池；
+  PostgreSQL 使用同样的连接池大小，借出前 pre-ping、定期回收连接
+- basic：SQLite 只设置 check_same_thread=False（原先的做法），PostgreSQL 用 SQLAlchemy 默认值，用于排查问题
+
+WAL 下读不阻塞写、写不阻塞读，同一时刻只有一个写事务；其它写事务在 busy_timeout 内由
+SQLite 的 busy handler 反复重试取锁（逐步加长等待），超时才报 database is locked
+内存库（sqlite:// 或 :memory:）不适用 WAL 和连接池，只保留 check_same_thread=False
+"""
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, URL, make_url
+
+DEFAULT_PROFILE = "tuned"
+
+
+@dataclass(frozen=True)
+class EngineProfile:
+    '''连接参数与连接池配置（PRAGMA 类字段只对 SQLite 生效）'''
+    name: str
+    journal_mode: Optional[str] = None      # None 表示不修改
+    synchronous: Optional[str] = None
+    cache_size_kib: Optional[int] = None    # PRAGMA cache_size 取负数即按 KiB 计
+    mmap_size: Optional[int] = None
+    busy_timeout_ms: Optional[int] = None
+    temp_store: Optional[str] = None
+    pool_size: Optional[int] = None         # None 表示使用 SQLAlchemy 默认连接池
+    max_overflow: int = 0
+    pool_timeout: float = 30
+    pool_pre_ping: bool = False             # 只对 PostgreSQL 生效：服务端重启 / 断线后自动换连接
+    pool_recycle: int = -1                  # 秒，-1 表示不回收
+
+    def pragmas(self) -> Dict[str, Any]:
+        '''连接建立时执行的 PRAGMA（按执行顺序）'''
+        values = {
+            # busy_timeout 先设：切换 journal_mode 本身也可能需要等锁
+            "busy_timeout": self.busy_timeout_ms,
+            "journal_mode": self.journal_mode,
+            "synchronous": self.synchronous,
+            "cache_size": -self.cache_size_kib if self.cache_size_kib else None,
+            "mmap_size": self.mmap_size,
+            "temp_store": self.temp_store,
+        }
+        return {key: value for key, value in values.items() if value is not None}
+
+
+PROFILES: Dict[str, EngineProfile] = {
+    "basic": EngineProfile(name="basic"),
+    "tuned": EngineProfile(
+        name="tuned",
+        journal_mode="WAL",
+        synchronous="NORMAL",           # WAL 下 NORMAL 不会损坏数据库，只在断电时可能丢最后几个提交
+        cache_size_kib=64 * 1024,
+        mmap_size=256 * 1024 * 1024,
+        busy_timeout_ms=15_000,
+        temp_store="MEMORY",
+        pool_size=8,                    # Flask 每个请求一个线程，连接按线程从池中借还
+        max_overflow=16,
+        pool_timeout=30,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+    ),
+}
+
+
+def get_profile(name: Optional[str] = None) -> EngineProfile:
+    '''
+    按名称取配置档
+
+    :param name: 配置档名称，None 时读 DATABASE_PROFILE 环境变量（默认 tuned）
+    :raises ValueError: 未知的配置档
+    '''
+    name = (name or os.environ.get("DATABASE_PROFILE") or DEFAULT_PROFILE).strip().lower()
+    if name not in PROFILES:
+        raise ValueError(f"未知的 DATABASE_PROFILE：{name}（可选：{', '.join(PROFILES)}）")
+    return PROFILES[name]
+
+
+def _is_memory_db(url: URL) -> bool:
+    return url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+
+
+def engine_options(url: str, profile: EngineProfile) -> Dict[str, Any]:
+    '''
+    create_engine 的参数
+
+    :param url: DATABASE_URL
+    :param profile: 配置档
+    '''
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        return _pool_options(profile, postgres=True)
+    if backend != "sqlite":
+        return {}
+
+    connect_args: Dict[str, Any] = {"check_same_thread": False}
+    options: Dict[str, Any] = {"connect_args": connect_args}
+    if _is_memory_db(parsed):
+        return options
+
+    if profile.busy_timeout_ms is not None:
+        # pysqlite 的 timeout 就是 sqlite3_busy_timeout，与 PRAGMA busy_timeout 保持一致
+        connect_args["timeout"] = profile.busy_timeout_ms / 1000
+    options.update(_pool_options(profile, postgres=False))
+    return options
+
+
+def _pool_options(profile: EngineProfile, postgres: bool) -> Dict[str, Any]:
+    if profile.pool_size is None:
+        return {}
+    options: Dict[str, Any] = dict(
+        pool_size=profile.pool_size,
+        max_overflow=profile.max_overflow,
+        pool_timeout=profile.pool_timeout,
+    )
+    if postgres:
+        options.update(pool_pre_ping=profile.pool_pre_ping, pool_recycle=profile.pool_recycle)
+    return options
+
+
+def install_pragmas(engine: Engine, profile: EngineProfile) -> None:
+    '''
+    在 engine 的每个新连接上执行配置档的 PRAGMA
+
+    :param engine: Engine（非 SQLite 或内存库时不做任何事）
+    :param profile: 配置档
+    '''
+    if engine.dialect.name != "sqlite" or _is_memory_db(engine.url):
+        return
+    pragmas = profile.pragmas()
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for key, value in pragmas.items():
+                cursor.execute(f"PRAGMA {key}={value}")
+        finally:
+            cursor.close()
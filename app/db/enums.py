@@ -29,6 +29,7 @@ class AuditEntityType(enum.Enum):
     LaborItem = "labor_item"
     LogisticsItem = "logistics_item"
     CostSummary = "cost_summary"
+    ValidationRuleSetting = "validation_rule_setting"
 
 
 class AuditAction(enum.Enum):
@@ -0,0 +1,167 @@
+"""
+数据库结构升级（已有数据库）
+create_all 只会创建缺失的表，不会修改已有表；需要改动已有表结构 / 回填数据的变更
+在这里登记为一个升级步骤，按顺序执行，已执行的步骤记录在 schema_migrations 表中
+
+每个步骤都应当可重复执行：新建的数据库（create_all 已是最新结构）上只做检查、不做修改
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+# 升级记录表不属于业务模型，单独的 MetaData，不参与 Base.metadata.create_all
+_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("id", String(100), primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    '''一个升级步骤'''
+    id: str
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+# =========
+# 升级步骤
+# =========
+def _cost_rollup_backfill(conn: Connection) -> None:
+    '''
+    CostRollup / ProjectCostRollup（create_all 新建的空表）从已有 CostSummary 回填
+
+    新数据库上没有 CostSummary，重建结果为空
+    '''
+    from app.services.cost_rollup_service import CostRollupService
+
+    db = Session(bind=conn, autoflush=False)
+    try:
+        CostRollupService(db).rebuild()
+        db.flush()
+    finally:
+        db.close()
+
+
+def _cost_item_row_no(conn: Connection) -> None:
+    '''
+    四张 item 表新增 row_no（文件内的 Excel 行顺序），已有行按插入顺序回填
+
+    SQLite 按 rowid（即写入时的 Excel 顺序）编号；其他数据库没有稳定的插入顺序，按 created_at, id
+    '''
+    from app.models.labor_item import LaborItem
+    from app.models.logistics_item import LogisticsItem
+    from app.models.material_item import MaterialItem
+    from app.models.part_item import PartItem
+
+    insertion_order = "rowid" if conn.dialect.name == "sqlite" else "created_at, id"
+    for model in (MaterialItem, PartItem, LaborItem, LogisticsItem):
+        table = model.__table__.name
+        columns = {c["name"] for c in inspect(conn).get_columns(table)}
+        if "row_no" in columns:
+            continue
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN row_no INTEGER NOT NULL DEFAULT 0"))
+        conn.execute(text(
+            f"UPDATE {table} SET row_no = numbered.row_no FROM ("
+            f"SELECT id, ROW_NUMBER() OVER (PARTITION BY source_file_id ORDER BY {insertion_order}) - 1 AS row_no "
+            f"FROM {table}) AS numbered WHERE {table}.id = numbered.id"
+        ))
+
+
+def _price_history_backfill(conn: Connection) -> None:
+    '''
+    价格历史（PriceSeries / PriceBand，create_all 新建的空表）从已锁定文件回填
+
+    之后由核价锁定文件时增量更新；新数据库上没有已锁定文件，重建结果为空
+    '''
+    from app.services.price_history_service import PriceHistoryService
+
+    db = Session(bind=conn, autoflush=False)
+    try:
+        PriceHistoryService(db).rebuild()
+        db.flush()
+    finally:
+        db.close()
+
+
+# 步骤 id 一经发布不再改动或复用；file_cost_aggregates 建表时已是整数单位、带 revision 的结构，没有 0001 / 0002；
+# 0004 的单列索引被 0007 的复合索引取代
+def _cost_item_indexes(conn: Connection) -> None:
+    '''
+    四张 item 表的 (source_file_id, row_no, id) / (source_file_id, status, is_calculable) 索引
+    （见 BaseCostItemMixin.__table_args__）和 FileRecord 最新文件查询的索引
+
+    create_all 不会给已有表补索引；须在 row_no 列（0005）之后执行。
+    早期版本的单列索引 ix_<table>_source_file 被前者覆盖，删除；已存在的索引跳过
+    '''
+    from app.models.file_record import FileRecord
+    from app.models.labor_item import LaborItem
+    from app.models.logistics_item import LogisticsItem
+    from app.models.material_item import MaterialItem
+    from app.models.part_item import PartItem
+
+    for model in (MaterialItem, PartItem, LaborItem, LogisticsItem, FileRecord):
+        table = model.__table__
+        legacy = f"ix_{table.name}_source_file"
+        if legacy in {index["name"] for index in inspect(conn).get_indexes(table.name)}:
+            conn.execute(text(f"DROP INDEX {legacy}"))
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        "0003_cost_rollup_backfill",
+        "跨项目成本汇总表从已有 CostSummary 回填",
+        _cost_rollup_backfill,
+    ),
+    Migration(
+        "0005_cost_item_row_no",
+        "成本 item 表新增文件内行号并按插入顺序回填",
+        _cost_item_row_no,
+    ),
+    Migration(
+        "0006_price_history_backfill",
+        "跨项目单价历史从已锁定文件回填",
+        _price_history_backfill,
+    ),
+    Migration(
+        "0007_cost_item_indexes",
+        "成本 item 表按文件 / 状态查询的复合索引与 FileRecord 最新文件索引",
+        _cost_item_indexes,
+    ),
+]
+
+
+# =========
+# 执行
+# =========
+def run_migrations(engine: Engine) -> List[str]:
+    '''
+    按顺序执行尚未执行的升级步骤，每个步骤一个事务
+
+    须在 init_db（create_all）之后调用
+    :param engine: Engine
+    :return: 本次执行的步骤 id
+    '''
+    _metadata.create_all(engine)
+    with engine.connect() as conn:
+        applied = set(conn.execute(select(schema_migrations.c.id)).scalars())
+
+    executed = []
+    for migration in MIGRATIONS:
+        if migration.id in applied:
+            continue
+        with engine.begin() as conn:
+            migration.upgrade(conn)
+            conn.execute(schema_migrations.insert().values(id=migration.id, applied_at=datetime.now()))
+        executed.append(migration.id)
+    return executed
@@ -1,23 +1,37 @@
 # app/db/session.py
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 import os
+from typing import Optional
+
+from app.db.engine_profiles import engine_options, get_profile, install_pragmas
 
 _engine = None
 _SessionLocal = None
 
 
+def build_engine(db_url: str, profile_name: Optional[str] = None):
+    '''
+    按配置档创建 Engine（见 app.db.engine_profiles）
+
+    :param db_url: DATABASE_URL
+    :param profile_name: 配置档名称，None 时读 DATABASE_PROFILE 环境变量
+    '''
+    profile = get_profile(profile_name)
+    engine = create_engine(db_url, **engine_options(db_url, profile))
+    install_pragmas(engine, profile)
+    return engine
+
+
 def get_engine():
     global _engine
     if _engine is None:
         db_url = os.environ.get("DATABASE_URL")
-        print(f"Using database URL: {db_url}")
         if not db_url:
             raise RuntimeError("DATABASE_URL not set")
-        _engine = create_engine(
-            db_url,
-            connect_args={"check_same_thread": False}
-        )
+        print(f"Using database URL: {make_url(db_url).render_as_string(hide_password=True)}")
+        _engine = build_engine(db_url)
     return _engine
 
 
@@ -0,0 +1,166 @@
+"""
+SQL 剖析：统计一段代码（一次 Web 请求、一次 tool 调用、一段脚本）执行的 SQL
+
+install_sql_profiler() 在 SQLAlchemy Engine 上挂 before/after_cursor_execute 事件，
+语句记到当前上下文（contextvars）里活动的 SqlProfile；没有活动的 SqlProfile 时只多一次
+ContextVar 读取。每个线程 / 协程有自己的上下文，后台线程（重校验、批量导出）不会记到请求里。
+
+N+1：同一条 SQL 文本以不同参数执行多次，通常是循环里逐个对象查询
+（例如列表页对每个项目分别查最新文件和报告），汇总里按语句列出次数和不同参数组数。
+
+用法：
+    install_sql_profiler()
+    with profile_sql() as profile:
+        ...
+    profile.summary()
+"""
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Type, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# 同一语句以不同参数执行达到该次数时视为 N+1
+DEFAULT_N_PLUS_ONE_THRESHOLD = 3
+DEFAULT_SLOWEST = 5
+_STATEMENT_PREVIEW = 300
+_SELECT_COLUMNS = re.compile(r"^SELECT (?=.{80})(?:(?! FROM ).)+ FROM ")
+
+_active: ContextVar[Optional["SqlProfile"]] = ContextVar("sql_profile", default=None)
+_installed: set = set()
+
+
+@dataclass
+class StatementStats:
+    '''同一 SQL 文本的累计'''
+    statement: str
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    params: set = field(default_factory=set)   # 不同参数组（executemany 不计）
+
+    @property
+    def distinct_params(self) -> int:
+        return len(self.params)
+
+
+@dataclass
+class SqlProfile:
+    '''一段代码执行的 SQL'''
+    query_count: int = 0
+    db_time_ms: float = 0.0
+    statements: Dict[str, StatementStats] = field(default_factory=dict)
+
+    def record(self, statement: str, parameters: Any, executemany: bool, elapsed_ms: float) -> None:
+        self.query_count += 1
+        self.db_time_ms += elapsed_ms
+        stats = self.statements.get(statement)
+        if stats is None:
+            stats = self.statements[statement] = StatementStats(statement)
+        stats.count += 1
+        stats.total_ms += elapsed_ms
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+        if not executemany:
+            stats.params.add(repr(parameters))
+
+    def slowest(self, limit: int = DEFAULT_SLOWEST) -> List[StatementStats]:
+        '''单次耗时最长的语句'''
+        return sorted(self.statements.values(), key=lambda s: s.max_ms, reverse=True)[:limit]
+
+    def n_plus_one(self, threshold: int = DEFAULT_N_PLUS_ONE_THRESHOLD) -> List[StatementStats]:
+        '''以不同参数重复执行 >= threshold 次的语句（按次数降序）'''
+        repeated = [s for s in self.statements.values() if s.distinct_params >= threshold]
+        return sorted(repeated, key=lambda s: s.count, reverse=True)
+
+    def summary(self, slowest: int = DEFAULT_SLOWEST,
+                n_plus_one_threshold: int = DEFAULT_N_PLUS_ONE_THRESHOLD) -> Dict[str, Any]:
+        '''可 JSON 序列化的汇总（日志、响应头、调试面板共用）'''
+        return {
+            "query_count": self.query_count,
+            "db_time_ms": round(self.db_time_ms, 3),
+            "distinct_statements": len(self.statements),
+            "slowest": [
+                {"sql": _preview(s.statement), "max_ms": round(s.max_ms, 3), "count": s.count}
+                for s in self.slowest(slowest)
+            ],
+            "n_plus_one": [
+                {"sql": _preview(s.statement), "count": s.count, "distinct_params": s.distinct_params,
+                 "total_ms": round(s.total_ms, 3)}
+                for s in self.n_plus_one(n_plus_one_threshold)
+            ],
+        }
+
+
+def _preview(statement: str) -> str:
+    statement = " ".join(statement.split())
+    # ORM 语句的列清单很长，省略后才能看到 FROM / WHERE
+    statement = _SELECT_COLUMNS.sub("SELECT ... FROM ", statement, count=1)
+    if len(statement) > _STATEMENT_PREVIEW:
+        return statement[:_STATEMENT_PREVIEW] + " ..."
+    return statement
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active.get() is not None:
+        conn.info.setdefault("sql_profiler_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("sql_profiler_start")
+    if not starts:
+        return   # 语句开始时没有活动的 profile
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+    profile = _active.get()
+    if profile is not None:
+        profile.record(statement, parameters, executemany, elapsed_ms)
+
+
+def _handle_error(exception_context):
+    # 出错的语句没有 after_cursor_execute，丢掉它的开始时间
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("sql_profiler_start"):
+        conn.info["sql_profiler_start"].pop()
+
+
+def install_sql_profiler(target: Union[Engine, Type[Engine]] = Engine) -> None:
+    '''
+    挂上剖析事件（重复调用无副作用）
+
+    :param target: 某个 Engine；默认 Engine 类，即所有 Engine（包括之后创建的）
+    '''
+    if target in _installed:
+        return
+    event.listen(target, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target, "after_cursor_execute", _after_cursor_execute)
+    event.listen(target, "handle_error", _handle_error)
+    _installed.add(target)
+
+
+def start_profile() -> Any:
+    '''开始记录到一个新的 SqlProfile，返回交给 stop_profile 的 token'''
+    return _active.set(SqlProfile())
+
+
+def stop_profile(token: Any) -> SqlProfile:
+    '''结束 start_profile 开始的记录，返回 SqlProfile'''
+    profile = _active.get()
+    _active.reset(token)
+    return profile
+
+
+def current_profile() -> Optional[SqlProfile]:
+    return _active.get()
+
+
+@contextmanager
+def profile_sql() -> Iterator[SqlProfile]:
+    '''在 with 块内记录 SQL（需要先 install_sql_profiler）'''
+    token = start_profile()
+    try:
+        yield _active.get()
+    finally:
+        _active.reset(token)
@@ -0,0 +1,9 @@
+# app/db/types.py
+"""
+跨数据库的列类型
+"""
+from sqlalchemy import JSON
+from sqlalchemy.dialects.postgresql import JSONB
+
+# SQLite 存为 TEXT；PostgreSQL 用 JSONB（二进制存储，读取不必重新解析，可建 GIN 索引）
+JSONType = JSON().with_variant(JSONB(), "postgresql")
@@ -0,0 +1,80 @@
+"""
+工作单元（unit of work）：一次 Web 请求 / 一次 agent tool 调用共用一个 Session，
+服务从 ServiceContainer 按需构建，在边界处统一提交或回滚
+
+- Web 请求：app.routes.request_scope.request_uow()，请求结束时提交（响应 < 400）或回滚
+- Tool 调用：PythonExecutor 为声明了 db 参数的 tool 打开一个 UnitOfWork
+- 脚本 / 后台任务：with UnitOfWork() as uow: ...（正常退出提交，异常回滚）
+
+Session 在第一次访问 uow.session 时才创建，不访问数据库的请求不会借出连接
+"""
+from typing import TYPE_CHECKING, Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.db.session import get_session
+
+if TYPE_CHECKING:
+    from app.services.container import ServiceContainer
+
+
+class UnitOfWork:
+    '''一个 Session + 该 Session 上的服务容器'''
+
+    def __init__(self, session_factory: Callable[[], Session] = get_session):
+        self._session_factory = session_factory
+        self._session: Optional[Session] = None
+        self._services = None
+
+    # =========
+    # Session / 服务
+    # =========
+    @property
+    def session(self) -> Session:
+        if self._session is None:
+            self._session = self._session_factory()
+        return self._session
+
+    @property
+    def services(self) -> "ServiceContainer":
+        '''服务容器（第一次访问时创建 Session）'''
+        if self._services is None:
+            from app.services.container import ServiceContainer
+            self._services = ServiceContainer(self.session)
+        return self._services
+
+    @property
+    def started(self) -> bool:
+        '''是否已经创建过 Session'''
+        return self._session is not None
+
+    # =========
+    # 边界
+    # =========
+    def commit(self) -> None:
+        '''提交（尚未创建 Session 时什么都不做）；也可在边界前调用，作为中途的持久化点'''
+        if self._session is not None:
+            self._session.commit()
+
+    def rollback(self) -> None:
+        if self._session is not None:
+            self._session.rollback()
+
+    def close(self) -> None:
+        '''归还连接；之后再访问 session 会创建新的 Session'''
+        if self._session is not None:
+            self._session.close()
+        self._session = None
+        self._services = None
+
+    def __enter__(self) -> "UnitOfWork":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None:
+                self.commit()
+            else:
+                self.rollback()
+        finally:
+            self.close()
@@ -4,11 +4,11 @@ from sqlalchemy import (
     String,
     DateTime,
     Enum,
-    JSON,
     func,
     TypeDecorator,
 )
 from app.db.base import Base
+from app.db.types import JSONType
 from app.db.enums import AuditEntityType, AuditAction
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime
@@ -99,8 +99,8 @@ class AuditLog(Base):
 
     changed_attribute :Mapped[str] = mapped_column(String(100), nullable=False,comment="Attribute that was changed")
 
-    before_value :Mapped[dict] = mapped_column(JSON, nullable=True,comment="Value before the change")  # 非每一个变更都有前值，后值，如create
-    after_value :Mapped[dict] = mapped_column(JSON, nullable=True,comment="Value after the change")    # 非每一个变更都有前值，后值，如delete
+    before_value :Mapped[dict] = mapped_column(JSONType, nullable=True,comment="Value before the change")  # 非每一个变更都有前值，后值，如create
+    after_value :Mapped[dict] = mapped_column(JSONType, nullable=True,comment="Value after the change")    # 非每一个变更都有前值，后值，如delete
 
     operator_id :Mapped[str] = mapped_column(String(36), nullable=False,comment="User ID of the operator who performed the action")
 
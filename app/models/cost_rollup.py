@@ -0,0 +1,96 @@
+# app/models/cost_rollup.py
+from sqlalchemy import (
+    String,
+    Integer,
+    BigInteger,
+    DateTime,
+    Enum,
+    UniqueConstraint,
+    func,
+)
+from app.db.base import Base
+from app.db.enums import CostSummaryStatus
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+
+
+class CostRollupMeasuresMixin:
+    """
+    Summed CostSummary amounts shared by the rollup tables.
+
+    Money is stored in integer units (app.services.money, 1 yuan = 10^5),
+    so incremental UPDATEs never accumulate rounding error.
+    """
+
+    month :Mapped[str] = mapped_column(String(7), nullable=False, comment="calculated_at month, YYYY-MM")
+    status :Mapped[CostSummaryStatus] = mapped_column(
+        Enum(CostSummaryStatus, name="cost_summary_status"),
+        nullable=False,
+        comment="CostSummary status",
+    )
+
+    summary_count :Mapped[int] = mapped_column(Integer, nullable=False, default=0, comment="Number of CostSummaries")
+    material_units :Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, comment="SUM(material_cost)")
+    part_units :Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, comment="SUM(part_cost)")
+    labor_units :Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, comment="SUM(labor_cost)")
+    logistics_units :Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, comment="SUM(logistics_cost)")
+    total_units :Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, comment="SUM(total_cost)")
+
+    updated_at :Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+        comment="Last update timestamp"
+    )
+
+
+class CostRollup(CostRollupMeasuresMixin, Base):
+    """
+    Portfolio CostSummary totals by (spec_tag, month, status).
+
+    A summary is counted under every spec_tag of its project ('' when the
+    project has none) and once more under '*', so "all projects" totals
+    never double count multi-tag projects. Maintained in the same
+    transaction that creates / replaces CostSummaries or edits spec_tags
+    (see CostRollupService).
+    """
+
+    __tablename__ = "cost_rollups"
+    __table_args__ = (
+        UniqueConstraint("spec_tag", "month", "status", name="uq_cost_rollup_key"),
+    )
+
+    id :Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+
+    spec_tag :Mapped[str] = mapped_column(String(100), nullable=False, comment="Project spec tag, '' untagged, '*' all")
+
+    def __repr__(self) -> str:
+        return (
+            f"<CostRollup tag={self.spec_tag!r} month={self.month} "
+            f"status={self.status} summaries={self.summary_count} total_units={self.total_units}>"
+        )
+
+
+class ProjectCostRollup(CostRollupMeasuresMixin, Base):
+    """
+    Per-project CostSummary totals by (project_id, month, status).
+
+    Backs project-level drill-down and multi-tag filters, and is the source
+    of the deltas when a project's spec_tags change.
+    """
+
+    __tablename__ = "project_cost_rollups"
+    __table_args__ = (
+        UniqueConstraint("project_id", "month", "status", name="uq_project_cost_rollup_key"),
+    )
+
+    id :Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+
+    project_id :Mapped[str] = mapped_column(String(36), nullable=False, comment="Project ID")
+
+    def __repr__(self) -> str:
+        return (
+            f"<ProjectCostRollup project={self.project_id} month={self.month} "
+            f"status={self.status} summaries={self.summary_count} total_units={self.total_units}>"
+        )
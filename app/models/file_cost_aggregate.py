@@ -0,0 +1,75 @@
+# app/models/file_cost_aggregate.py
+from sqlalchemy import (
+    String,
+    Integer,
+    BigInteger,
+    DateTime,
+    func,
+    text,
+)
+from app.db.base import Base
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+
+
+class FileCostAggregate(Base):
+    """
+    Incrementally maintained per-FileRecord totals of its cost items.
+
+    Kept in the same transaction as the writes that change them (ingest,
+    item edit / confirm, validation), so cost calculation reads one row
+    instead of re-summing every item. A missing row is rebuilt from the
+    items on first read; check_file_aggregates.py reports drift.
+    """
+
+    __tablename__ = "file_cost_aggregates"
+
+    file_id :Mapped[str] = mapped_column(String(36), primary_key=True, comment="FileRecord ID")
+
+    project_id :Mapped[str] = mapped_column(String(36), nullable=False, comment="Project ID")
+
+    # =========
+    # 💰 可计算 item 的小计（is_calculable = True）
+    # 以整数单位存储（app.services.money，1 元 = 10^5），增量 UPDATE 不累积浮点误差
+    # =========
+    calculable_subtotal_units :Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False,
+        default=0,
+        comment="SUM(subtotal) of calculable items, in 1e-5 units",
+    )
+    calculable_count :Mapped[int] = mapped_column(Integer, nullable=False, default=0, comment="Number of calculable items")
+
+    # =========
+    # 📊 各状态 item 数
+    # =========
+    item_count :Mapped[int] = mapped_column(Integer, nullable=False, default=0, comment="Number of items")
+    ok_count :Mapped[int] = mapped_column(Integer, nullable=False, default=0, comment="Items with status ok")
+    warning_count :Mapped[int] = mapped_column(Integer, nullable=False, default=0, comment="Items with status warning")
+    confirmed_count :Mapped[int] = mapped_column(Integer, nullable=False, default=0, comment="Items with status confirmed")
+    blocked_count :Mapped[int] = mapped_column(Integer, nullable=False, default=0, comment="Items with status blocked")
+
+    # =========
+    # 🔖 内容戳：每次写入（覆盖 / 增量）+1，供按文件内容缓存的读路径判断是否失效
+    # =========
+    revision :Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default=text("0"),
+        comment="Incremented on every write of this row",
+    )
+
+    updated_at :Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+        comment="Last update timestamp"
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<FileCostAggregate file={self.file_id} "
+            f"subtotal_units={self.calculable_subtotal_units} items={self.item_count} rev={self.revision}>"
+        )
@@ -7,6 +7,7 @@ from sqlalchemy import (
     Boolean,
     Integer,
     UniqueConstraint,
+    Index,
     func,
 )
 from app.db.base import Base
@@ -23,6 +24,17 @@ class FileRecord(Base):
         "version",
         name="uq_filerecord_project_type_version"
     ),
+    # 最新可用文件：WHERE project_id = ? AND file_type = ? AND parse_status = ? AND locked = ?
+    # [AND validation_status IN (...)] ORDER BY version DESC，按版本倒序扫描索引，状态在索引内过滤
+    Index(
+        "ix_file_records_latest",
+        "project_id",
+        "file_type",
+        "parse_status",
+        "locked",
+        "version",
+        "validation_status",
+    ),
 )
     # =========
     # 🔒 Immutable facts
@@ -0,0 +1,85 @@
+# app/models/item_validation_record.py
+from sqlalchemy import (
+    String,
+    Integer,
+    Index,
+)
+from app.db.base import Base
+from app.db.types import JSONType
+from sqlalchemy.orm import Mapped, mapped_column
+from typing import List
+
+
+class ItemValidationRecord(Base):
+    """
+    Persisted validation result of a non-ok cost item (blocked / warning).
+
+    Rows of one file are replaced as a whole on every validate_file, so the
+    table always mirrors the latest validation run. ok / confirmed items are
+    not stored: their state is fully described by Item.status.
+    """
+
+    __tablename__ = "item_validation_results"
+    __table_args__ = (
+        # 分页游标：WHERE file_id = ? AND status = ? AND seq > ? ORDER BY seq
+        Index("ix_item_validation_results_file_status", "file_id", "status", "seq"),
+        # 单项查询 / 与 error code 索引表关联
+        Index("ix_item_validation_results_file_item", "file_id", "item_id"),
+    )
+
+    id :Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+
+    file_id :Mapped[str] = mapped_column(String(36), nullable=False, comment="Source FileRecord ID")
+
+    item_id :Mapped[str] = mapped_column(String(36), nullable=False, comment="Cost item ID")
+
+    seq :Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        comment="Position of the item in the validation run, used as page cursor",
+    )
+
+    status :Mapped[str] = mapped_column(String(16), nullable=False, comment="blocked | warning")
+
+    error_codes :Mapped[List[str]] = mapped_column(JSONType, nullable=False, default=list, comment="Error codes")
+
+    messages :Mapped[List[str]] = mapped_column(JSONType, nullable=False, default=list, comment="Human readable messages")
+
+    rule_version :Mapped[str] = mapped_column(
+        String(32),
+        nullable=True,
+        comment="ValidationPlan.version that produced this result",
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<ItemValidationRecord file={self.file_id} "
+            f"item={self.item_id} status={self.status}>"
+        )
+
+
+class ItemValidationErrorCode(Base):
+    """
+    One row per (item, error code) of ItemValidationRecord.error_codes.
+
+    JSON arrays cannot be indexed portably, so error codes are exploded here
+    to answer "all items of this file with code X" with an index range scan.
+    """
+
+    __tablename__ = "item_validation_error_codes"
+    __table_args__ = (
+        Index("ix_item_validation_error_codes_file_code", "file_id", "error_code", "seq"),
+    )
+
+    id :Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+
+    file_id :Mapped[str] = mapped_column(String(36), nullable=False, comment="Source FileRecord ID")
+
+    error_code :Mapped[str] = mapped_column(String(64), nullable=False, comment="Validation rule code")
+
+    item_id :Mapped[str] = mapped_column(String(36), nullable=False, comment="Cost item ID")
+
+    seq :Mapped[int] = mapped_column(Integer, nullable=False, comment="Same seq as ItemValidationRecord")
+
+    def __repr__(self) -> str:
+        return f"<ItemValidationErrorCode file={self.file_id} code={self.error_code} item={self.item_id}>"
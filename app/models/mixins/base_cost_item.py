@@ -1,7 +1,7 @@
 # app/models/mixins/base_cost_item.py
 from typing import Optional
-from sqlalchemy import String, DateTime, Enum, Boolean, func, text
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, DateTime, Enum, Boolean, Index, Integer, func, text
+from sqlalchemy.orm import Mapped, declared_attr, mapped_column
 from datetime import datetime
 from app.db.enums import CostItemStatus
 
@@ -15,6 +15,16 @@ class BaseCostItemMixin:
     - Derived from exactly one FileRecord
     - Status maintained by system
     """
+    @declared_attr.directive
+    def __table_args__(cls):
+        return (
+            # 按文件读取明细（明细页、校验、报告）：WHERE source_file_id = ? ORDER BY row_no, id（file_order），
+            # 顺序由查询的 ORDER BY 保证，索引只免去排序
+            Index(f"ix_{cls.__tablename__}_file_row", "source_file_id", "row_no", "id"),
+            # 按文件 + 状态 / 可计算筛选与分组计数（状态筛选、聚合重算、可计算 item）
+            Index(f"ix_{cls.__tablename__}_file_status", "source_file_id", "status", "is_calculable"),
+        )
+
     # =========
     # Identity & source
     # =========
@@ -22,6 +32,13 @@ class BaseCostItemMixin:
 
     project_id :Mapped[str] = mapped_column(String(36), nullable=False,comment="Associated project ID")
     source_file_id :Mapped[str] = mapped_column(String(36), nullable=False,comment="Source FileRecord ID")
+    row_no :Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default=text("0"),
+        comment="Row order within the source file (Excel order, assigned at ingest)"
+    )
     # =========
     # 🔁 System maintained status
     # =========
@@ -38,6 +55,11 @@ class BaseCostItemMixin:
         server_default=text("true"),  # DB 层默认（PostgreSQL）
         comment="Whether this item participates in cost calculation (bundle anchor only)"
     )
+    @classmethod
+    def file_order(cls) -> tuple:
+        """ORDER BY columns for the rows of one source file: Excel row order, then id."""
+        return (cls.row_no, cls.id)
+
     # =========
     # ⏱ Timestamps
     # =========
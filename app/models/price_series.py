@@ -0,0 +1,133 @@
+# app/models/price_series.py
+from sqlalchemy import (
+    String,
+    Integer,
+    BigInteger,
+    LargeBinary,
+    DateTime,
+    UniqueConstraint,
+    func,
+)
+from app.db.base import Base
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+
+
+class PriceSeries(Base):
+    """
+    Cross-project unit-price history of one item key.
+
+    One row per (item_type, price_key); price_key is the normalized
+    (normalized_name, spec, material_grade) of the item. The points are a
+    packed, time-ordered array of (observed_at, unit_price) pairs built from
+    ok / confirmed items of locked FileRecords (see PriceHistoryService), so
+    "median price over the last N months" reads a single row.
+    """
+
+    __tablename__ = "price_series"
+    __table_args__ = (
+        UniqueConstraint("item_type", "price_key", name="uq_price_series_key"),
+    )
+
+    id :Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+
+    item_type :Mapped[str] = mapped_column(String(32), nullable=False, comment="Cost item class, e.g. MaterialItem")
+
+    price_key :Mapped[str] = mapped_column(String(700), nullable=False, comment="Normalized name / spec / grade")
+
+    # =========
+    # 🔤 首次出现时的原始写法（展示用）
+    # =========
+    name :Mapped[str] = mapped_column(String(255), nullable=True, comment="normalized_name as first indexed")
+    spec :Mapped[str] = mapped_column(String(255), nullable=True, comment="Spec as first indexed")
+    material_grade :Mapped[str] = mapped_column(String(100), nullable=True, comment="Grade as first indexed")
+
+    # =========
+    # 📈 价格序列
+    # =========
+    points :Mapped[bytes] = mapped_column(
+        LargeBinary,
+        nullable=False,
+        comment="Packed little-endian int64 pairs (observed_at epoch seconds, unit_price in 1e-5 units), time ordered",
+    )
+    point_count :Mapped[int] = mapped_column(Integer, nullable=False, default=0, comment="Number of points")
+
+    updated_at :Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+        comment="Last update timestamp"
+    )
+
+    def __repr__(self) -> str:
+        return f"<PriceSeries {self.item_type} key={self.price_key!r} points={self.point_count}>"
+
+
+class PriceIndexedFile(Base):
+    """
+    FileRecords already folded into PriceSeries.
+
+    Makes indexing idempotent: a file is added at most once, whether by the
+    incremental hook or by a full rebuild.
+    """
+
+    __tablename__ = "price_indexed_files"
+
+    file_id :Mapped[str] = mapped_column(String(36), primary_key=True, comment="FileRecord ID")
+
+    point_count :Mapped[int] = mapped_column(Integer, nullable=False, default=0, comment="Points contributed")
+
+    indexed_at :Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+        comment="Indexing timestamp"
+    )
+
+    def __repr__(self) -> str:
+        return f"<PriceIndexedFile file={self.file_id} points={self.point_count}>"
+
+
+class PriceBand(Base):
+    """
+    Robust unit-price band of one PriceSeries key: median ± k·MAD.
+
+    Refreshed together with its PriceSeries row whenever new points are
+    indexed, so validation reads a precomputed band per key (hash lookup)
+    instead of aggregating history. Keys with too few points have no band.
+    """
+
+    __tablename__ = "price_bands"
+    __table_args__ = (
+        UniqueConstraint("item_type", "price_key", name="uq_price_bands_key"),
+    )
+
+    id :Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+
+    item_type :Mapped[str] = mapped_column(String(32), nullable=False, comment="Cost item class, e.g. MaterialItem")
+
+    price_key :Mapped[str] = mapped_column(String(700), nullable=False, comment="Same key as PriceSeries")
+
+    # =========
+    # 📏 区间（money 整数单位）
+    # =========
+    point_count :Mapped[int] = mapped_column(Integer, nullable=False, comment="Points the band was computed from")
+    median_units :Mapped[int] = mapped_column(BigInteger, nullable=False, comment="Median unit price")
+    mad_units :Mapped[int] = mapped_column(BigInteger, nullable=False, comment="Median absolute deviation")
+    lower_units :Mapped[int] = mapped_column(BigInteger, nullable=False, comment="Lowest unit price inside the band")
+    upper_units :Mapped[int] = mapped_column(BigInteger, nullable=False, comment="Highest unit price inside the band")
+
+    updated_at :Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+        comment="Last update timestamp"
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<PriceBand {self.item_type} key={self.price_key!r} "
+            f"[{self.lower_units}, {self.upper_units}] n={self.point_count}>"
+        )
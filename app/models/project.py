@@ -1,10 +1,11 @@
 # app/models/project.py
 from app.db.base import Base
+from app.db.types import JSONType
 from app.db.enums import ProjectIdentifierStatus, ProjectNameStatus
 from datetime import datetime
 from typing import Optional, List
 
-from sqlalchemy import Column, String, DateTime, Enum, JSON, func
+from sqlalchemy import Column, String, DateTime, Enum, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 
@@ -73,7 +74,7 @@ class Project(Base):
         nullable=True,
         comment="Normalized project name(editable)",)
     spec_tags : Mapped[Optional[List[str]]] = mapped_column(
-        JSON, 
+        JSONType,
         nullable=True,
         comment="Specification tags associated with the project(editable)",)
     # =========
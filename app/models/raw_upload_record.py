@@ -2,12 +2,13 @@
 
 from operator import index
 
-from sqlalchemy import String, DateTime, Enum, Integer,JSON, UniqueConstraint
+from sqlalchemy import String, DateTime, Enum, Integer, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime
 from uuid import uuid4
 
 from app.db.base import Base
+from app.db.types import JSONType
 import enum
 from app.db.enums import RawUploadStatus, FileType
 
@@ -61,7 +62,7 @@ class RawUploadRecord(Base):
     )
     
     detected_columns: Mapped[list | None] = mapped_column(
-        JSON,
+        JSONType,
         nullable=True,
         comment="Detected column names during probe"
     )
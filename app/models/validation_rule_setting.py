@@ -0,0 +1,60 @@
+# app/models/validation_rule_setting.py
+from sqlalchemy import (
+    String,
+    Boolean,
+    DateTime,
+    UniqueConstraint,
+    func,
+)
+from app.db.base import Base
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+
+
+class ValidationRuleSetting(Base):
+    """
+    Per-project toggle of a validation rule.
+    A rule is enabled unless a row with enabled=False exists for (project_id, rule_code).
+    """
+
+    __tablename__ = "validation_rule_settings"
+    __table_args__ = (
+        UniqueConstraint(
+            "project_id",
+            "rule_code",
+            name="uq_validation_rule_setting_project_code"
+        ),
+    )
+
+    id :Mapped[str] = mapped_column(String(36), primary_key=True, comment="Setting UUID")
+
+    project_id :Mapped[str] = mapped_column(String(36), nullable=False, comment="Project ID")
+
+    rule_code :Mapped[str] = mapped_column(
+        String(64),
+        nullable=False,
+        comment="Validation rule code, e.g. RULE_INCONSISTENT",
+    )
+
+    enabled :Mapped[bool] = mapped_column(
+        Boolean,
+        nullable=False,
+        default=True,
+        comment="Whether the rule is evaluated for this project",
+    )
+
+    updated_by :Mapped[str] = mapped_column(String(36), nullable=True, comment="User ID of the last operator")
+
+    updated_at :Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+        comment="Last update timestamp"
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<ValidationRuleSetting project={self.project_id} "
+            f"code={self.rule_code} enabled={self.enabled}>"
+        )
@@ -1,7 +1,7 @@
 # app/routes/audit.py
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session,abort
 from app.presentation.constants import ACTION_COLOR_MAP
-from app.db.session import get_session
+from app.routes.request_scope import request_uow
 from app.models.audit_log import AuditLog
 from sqlalchemy import desc, or_,and_
 from datetime import datetime, timedelta
@@ -26,7 +26,8 @@ def list_logs():
     if check:
         return check
     
-    db = get_session()
+    uow = request_uow()
+    db = uow.session
     try:
         # 获取筛选参数
         project_id = request.args.get('project_id', '').strip() or None
@@ -116,6 +117,4 @@ def list_logs():
     except Exception as e:
         traceback.print_exc()
         raise
-    finally:
-        db.close()
 
@@ -1,8 +1,6 @@
 # app/routes/auth.py
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from app.db.session import get_session
-from app.services.user_service import UserService
-from app.services.audit_log_service import AuditLogService
+from app.routes.request_scope import request_uow
 
 auth_bp = Blueprint('auth', __name__, url_prefix='')
 
@@ -19,9 +17,9 @@ def login():
             flash('请输入账号和密码', 'error')
             return render_template('auth/login.html')
         
-        db = get_session()
+        uow = request_uow()
         try:
-            user_service = UserService(db)
+            user_service = uow.services.users
             user = user_service.authenticate(account=account, password=password)
             
             # 登录成功，设置 session
@@ -32,7 +30,7 @@ def login():
             
             # 记录登录日志
             from app.db.enums import AuditEntityType
-            audit_log_service = AuditLogService(db)
+            audit_log_service = uow.services.audit
             audit_log_service.record_create(
                 project_id=None,
                 entity_type=AuditEntityType.User,
@@ -40,19 +38,18 @@ def login():
                 operator_id=user.id,
             )
             
-            db.commit()
-            
             flash('登录成功', 'success')
             return redirect(url_for('project.list_projects'))
             
         except ValueError as e:
+            uow.rollback()
             flash('账号或密码错误', 'error')
         except PermissionError as e:
+            uow.rollback()
             flash('账号已被禁用，请联系管理员', 'error')
         except Exception as e:
+            uow.rollback()
             flash(f'登录失败: {str(e)}', 'error')
-        finally:
-            db.close()
     
     return render_template('auth/login.html')
 
@@ -62,21 +59,18 @@ def logout():
     """登出"""
     user_id = session.get('user_id')
     if user_id:
-        db = get_session()
+        uow = request_uow()
         try:
             from app.db.enums import AuditEntityType
-            audit_log_service = AuditLogService(db)
+            audit_log_service = uow.services.audit
             audit_log_service.record_create(
                 project_id=None,
                 entity_type=AuditEntityType.User,
                 entity_id=user_id,
                 operator_id=user_id,
             )
-            db.commit()
         except:
-            pass
-        finally:
-            db.close()
+            uow.rollback()
     
     session.clear()
     flash('已退出登录', 'info')
@@ -0,0 +1,116 @@
+# app/routes/portfolio.py
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
+from werkzeug.datastructures import MultiDict
+from app.routes.request_scope import request_uow
+from app.services.cost_rollup_service import ROLLUP_GROUP_BY
+from app.db.enums import CostSummaryStatus
+
+portfolio_bp = Blueprint('portfolio', __name__, url_prefix='/portfolio')
+
+# 每个维度下钻时的下一级维度
+DRILL_DOWN = {'tag': 'month', 'month': 'project', 'status': 'tag'}
+
+
+def require_login():
+    """检查登录状态"""
+    if 'user_id' not in session:
+        flash('请先登录', 'error')
+        return redirect(url_for('auth.login'))
+    return None
+
+
+def parse_rollup_filters(args) -> dict:
+    """
+    从查询参数解析汇总条件（CostRollupService.query 的参数）
+    - tag：可重复，只统计带有其中任一标签的项目
+    - from / to：月份范围（YYYY-MM，含）
+    - status：可重复，active / replaced / all，默认 active
+    - group_by：逗号分隔的维度（tag / month / status / project），默认 tag
+    格式错误抛出 ValueError
+    """
+    statuses = [s for s in args.getlist('status') if s] or [CostSummaryStatus.ACTIVE.value]
+    group_by = [g.strip() for value in args.getlist('group_by') for g in value.split(',') if g.strip()]
+    return {
+        'group_by': group_by or ['tag'],
+        'tags': [t.strip() for t in args.getlist('tag') if t.strip()],
+        'month_from': args.get('from') or None,
+        'month_to': args.get('to') or None,
+        'statuses': None if 'all' in statuses else [CostSummaryStatus(s) for s in statuses],
+    }
+
+
+def drill_down_url(filters: dict, key: dict):
+    """
+    汇总行的下钻链接：在当前条件上固定该行的维度取值，按下一级维度分组
+    项目行链接到项目详情；未分类标签无法作为筛选条件，返回 None
+    """
+    if 'project' in key:
+        return url_for('project.detail', project_id=key['project'])
+    if 'tag' in key and key['tag'] is None:
+        return None
+
+    args = {
+        'tag': filters['tags'],
+        'from': filters['month_from'],
+        'to': filters['month_to'],
+        'status': [s.value for s in filters['statuses']] if filters['statuses'] is not None else ['all'],
+    }
+    for name, value in key.items():
+        if name == 'tag':
+            args['tag'] = [value]
+        elif name == 'month':
+            args['from'] = args['to'] = value
+        elif name == 'status':
+            args['status'] = [value.value]
+    args['group_by'] = DRILL_DOWN[list(key)[-1]]
+    return url_for('portfolio.dashboard', **{name: value for name, value in args.items() if value})
+
+
+@portfolio_bp.route('/', methods=['GET'])
+def dashboard():
+    """跨项目成本汇总看板"""
+    check = require_login()
+    if check:
+        return check
+
+    uow = request_uow()
+    rollup_service = uow.services.cost_rollups
+    try:
+        filters = parse_rollup_filters(request.args)
+        result = rollup_service.query(**filters)
+    except ValueError as e:
+        flash(f'筛选条件无效: {e}', 'error')
+        filters = parse_rollup_filters(MultiDict())
+        result = rollup_service.query(**filters)
+    return render_template('portfolio/index.html',
+                         result=result,
+                         filters=filters,
+                         all_tags=rollup_service.tags(),
+                         group_by_options=ROLLUP_GROUP_BY,
+                         rows=[(row, drill_down_url(filters, row.key)) for row in result.rows])
+
+
+@portfolio_bp.route('/rollup.json')
+def rollup_json():
+    """
+    跨项目成本汇总（JSON），参数同看板：tag / from / to / status / group_by
+    只读取预先汇总的 CostRollup，不扫描 CostSummary / item 表
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': '请先登录'}), 401
+
+    uow = request_uow()
+    try:
+        filters = parse_rollup_filters(request.args)
+        result = uow.services.cost_rollups.query(**filters)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'filters': {
+            'tags': filters['tags'],
+            'from': filters['month_from'],
+            'to': filters['month_to'],
+            'statuses': [s.value for s in filters['statuses']] if filters['statuses'] is not None else None,
+        },
+        **result.as_dict(),
+    })
@@ -1,19 +1,14 @@
 # app/routes/report.py
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, send_file
-from app.db.session import get_session
-from app.services.cost_calculation_service import CostCalculationService
-from app.services.audit_log_service import AuditLogService
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, send_file, jsonify
+from app.routes.request_scope import request_uow
+from app.services.cost_calculation_service import SCENARIO_CATEGORIES
+from app.services.report_writer import XLSX_MIMETYPE
+from app.services.report_cache import report_cache
+from app.services.revalidation_scheduler import revalidation_scheduler
 from app.models.cost_summary import CostSummary
 from app.models.project import Project
-from app.models.file_record import FileRecord
-from app.models.material_item import MaterialItem
-from app.models.part_item import PartItem
-from app.models.labor_item import LaborItem
-from app.models.logistics_item import LogisticsItem
-from app.db.enums import CostSummaryStatus, CostItemStatus, FileType
+from app.db.enums import CostSummaryStatus, FileType
 from sqlalchemy import desc
-import pandas as pd
-import io
 
 report_bp = Blueprint('report', __name__, url_prefix='/projects/<project_id>/reports')
 
@@ -33,75 +28,124 @@ def calculate_cost(project_id):
     if check:
         return check
     
-    db = get_session()
-    try:
-        project = db.query(Project).get(project_id)
-        if not project:
-            flash('项目不存在', 'error')
-            return redirect(url_for('project.list_projects'))
+    uow = request_uow()
+    db = uow.session
+    project = db.query(Project).get(project_id)
+    if not project:
+        flash('项目不存在', 'error')
+        return redirect(url_for('project.list_projects'))
+    
+    if request.method == 'POST':
+        material_file_id = request.form.get('material_file_id')
+        part_file_id = request.form.get('part_file_id')
+        labor_file_id = request.form.get('labor_file_id')
+        logistics_file_id = request.form.get('logistics_file_id')
         
-        if request.method == 'POST':
-            material_file_id = request.form.get('material_file_id')
-            part_file_id = request.form.get('part_file_id')
-            labor_file_id = request.form.get('labor_file_id')
-            logistics_file_id = request.form.get('logistics_file_id')
+        if not all([material_file_id, part_file_id, labor_file_id, logistics_file_id]):
+            flash('请选择所有必需的文件版本', 'error')
+            return redirect(url_for('report.calculate_cost', project_id=project_id))
+        
+        try:
+            # 计算前先执行排队中的重校验，保证按最新的校验状态判断（排队状态在进程内，仅支持单进程部署）
+            revalidation_scheduler.run_pending(
+                [material_file_id, part_file_id, labor_file_id, logistics_file_id]
+            )
+            db.expire_all()
             
-            if not all([material_file_id, part_file_id, labor_file_id, logistics_file_id]):
-                flash('请选择所有必需的文件版本', 'error')
-                return redirect(url_for('report.calculate_cost', project_id=project_id))
+            cost_service = uow.services.cost_calculation
             
-            try:
-                audit_log_service = AuditLogService(db)
-                cost_service = CostCalculationService(db, audit_log_service)
-                
-                cost_summary = cost_service.generate_cost_summary(
-                    project_id=project_id,
-                    material_file_id=material_file_id,
-                    part_file_id=part_file_id,
-                    labor_file_id=labor_file_id,
-                    logistics_file_id=logistics_file_id,
-                    operator_id=session['user_id']
-                )
-                
-                db.commit()
-                flash('成本计算成功', 'success')
-                return redirect(url_for('report.view_report', project_id=project_id, report_id=cost_summary.id))
-            except Exception as e:
-                db.rollback()
-                flash(f'计算失败: {str(e)}', 'error')
-                return redirect(url_for('report.calculate_cost', project_id=project_id))
-        
-        # GET 请求：显示计算页面
-        from app.services.file_record_service import FileRecordService
-        audit_log_service = AuditLogService(db)
-        file_service = FileRecordService(db, audit_log_service)
-        
-        # 获取各类型文件的所有可用版本
-        material_files = file_service.list_file_records(
-            project_id=project_id,
-            file_type=FileType.material_cost
-        )
-        part_files = file_service.list_file_records(
-            project_id=project_id,
-            file_type=FileType.part_cost
-        )
-        labor_files = file_service.list_file_records(
-            project_id=project_id,
-            file_type=FileType.labor_cost
-        )
-        logistics_files = file_service.list_file_records(
-            project_id=project_id,
-            file_type=FileType.logistics_cost
-        )
-        
-        return render_template('report/calculate.html',
-                             project=project,
-                             material_files=material_files,
-                             part_files=part_files,
-                             labor_files=labor_files,
-                             logistics_files=logistics_files)
-    finally:
-        db.close()
+            cost_summary = cost_service.generate_cost_summary(
+                project_id=project_id,
+                material_file_id=material_file_id,
+                part_file_id=part_file_id,
+                labor_file_id=labor_file_id,
+                logistics_file_id=logistics_file_id,
+                operator_id=session['user_id']
+            )
+            
+            flash('成本计算成功', 'success')
+            return redirect(url_for('report.view_report', project_id=project_id, report_id=cost_summary.id))
+        except Exception as e:
+            uow.rollback()
+            flash(f'计算失败: {str(e)}', 'error')
+            return redirect(url_for('report.calculate_cost', project_id=project_id))
+    
+    # GET 请求：显示计算页面
+    file_service = uow.services.file_records
+    
+    # 获取各类型文件的所有可用版本
+    material_files = file_service.list_file_records(
+        project_id=project_id,
+        file_type=FileType.material_cost
+    )
+    part_files = file_service.list_file_records(
+        project_id=project_id,
+        file_type=FileType.part_cost
+    )
+    labor_files = file_service.list_file_records(
+        project_id=project_id,
+        file_type=FileType.labor_cost
+    )
+    logistics_files = file_service.list_file_records(
+        project_id=project_id,
+        file_type=FileType.logistics_cost
+    )
+    
+    return render_template('report/calculate.html',
+                         project=project,
+                         material_files=material_files,
+                         part_files=part_files,
+                         labor_files=labor_files,
+                         logistics_files=logistics_files)
+
+
+@report_bp.route('/scenarios')
+def compare_scenarios(project_id):
+    """
+    版本组合对比（只读，JSON）
+    参数：material_file_id / part_file_id / labor_file_id / logistics_file_id，每个可重复多次
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': '请先登录'}), 401
+
+    uow = request_uow()
+    candidates = {
+        category: request.args.getlist(f'{category}_file_id')
+        for category in SCENARIO_CATEGORIES
+    }
+    cost_service = uow.services.cost_calculation
+    try:
+        comparison = cost_service.evaluate_scenarios(project_id=project_id, candidates=candidates)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'project_id': comparison.project_id,
+        'files': {
+            file_id: {
+                'category': f.category,
+                'version': f.version,
+                'original_name': f.original_name,
+                'validation_status': f.validation_status,
+                'locked': f.locked,
+                'subtotal': str(f.subtotal),
+                'usable': f.usable,
+                'reason': f.reason,
+                # 还有编辑等待后台重校验时，validation_status 可能已过期（仅本进程的排队，调度器只支持单进程部署）
+                'validation_stale': revalidation_scheduler.is_stale(file_id),
+            }
+            for file_id, f in comparison.files.items()
+        },
+        'scenarios': [
+            {
+                'file_ids': sc.file_ids,
+                'costs': {c: str(v) for c, v in sc.costs.items()},
+                'total_cost': str(sc.total_cost),
+                'usable': sc.usable,
+            }
+            for sc in comparison.scenarios
+        ],
+    })
 
 
 @report_bp.route('/<report_id>')
@@ -111,56 +155,85 @@ def view_report(project_id, report_id):
     if check:
         return check
     
-    db = get_session()
+    uow = request_uow()
+    db = uow.session
+    cost_summary = db.query(CostSummary).get(report_id)
+    if not cost_summary or cost_summary.project_id != project_id:
+        flash('报告不存在', 'error')
+        return redirect(url_for('project.detail', project_id=project_id))
+    
+    # 项目、文件各一次查询，四类明细一条 UNION ALL
+    loader = uow.services.report_data
+    data = loader.load(cost_summary)
+    items = loader.items_by_section(data)
+    
+    return render_template('report/view.html',
+                         project=data.project,
+                         cost_summary=cost_summary,
+                         material_file=data.material_file,
+                         part_file=data.part_file,
+                         labor_file=data.labor_file,
+                         logistics_file=data.logistics_file,
+                         materials=items["material"],
+                         parts=items["part"],
+                         labors=items["labor"],
+                         logistics=items["logistics"])
+
+
+# 版本对比页最多展示的变化条数（JSON 接口默认返回全部）
+DIFF_PAGE_LIMIT = 500
+
+
+@report_bp.route('/<report_id>/diff')
+def diff_report(project_id, report_id):
+    """
+    与另一个核价版本对比
+    参数：base（对比的 CostSummary ID，默认为上一个核价版本）
+    """
+    check = require_login()
+    if check:
+        return check
+
+    uow = request_uow()
+    db = uow.session
+    diff_service = uow.services.cost_summary_diff
     try:
-        cost_summary = db.query(CostSummary).get(report_id)
-        if not cost_summary or cost_summary.project_id != project_id:
-            flash('报告不存在', 'error')
-            return redirect(url_for('project.detail', project_id=project_id))
-        
-        project = db.query(Project).get(project_id)
-        
-        # 获取文件信息
-        material_file = db.query(FileRecord).get(cost_summary.material_file_id)
-        part_file = db.query(FileRecord).get(cost_summary.part_file_id)
-        labor_file = db.query(FileRecord).get(cost_summary.labor_file_id)
-        logistics_file = db.query(FileRecord).get(cost_summary.logistics_file_id)
-        
-        # 获取明细数据
-        materials = db.query(MaterialItem).filter(
-            MaterialItem.source_file_id == cost_summary.material_file_id,
-            MaterialItem.status.in_([CostItemStatus.ok, CostItemStatus.confirmed])
-        ).all()
-        
-        parts = db.query(PartItem).filter(
-            PartItem.source_file_id == cost_summary.part_file_id,
-            PartItem.status.in_([CostItemStatus.ok, CostItemStatus.confirmed])
-        ).all()
-        
-        labors = db.query(LaborItem).filter(
-            LaborItem.source_file_id == cost_summary.labor_file_id,
-            LaborItem.status.in_([CostItemStatus.ok, CostItemStatus.confirmed])
-        ).all()
-        
-        logistics = db.query(LogisticsItem).filter(
-            LogisticsItem.source_file_id == cost_summary.logistics_file_id,
-            LogisticsItem.status.in_([CostItemStatus.ok, CostItemStatus.confirmed]),
-            LogisticsItem.is_calculable.is_(True)
-        ).all()
-        
-        return render_template('report/view.html',
-                             project=project,
-                             cost_summary=cost_summary,
-                             material_file=material_file,
-                             part_file=part_file,
-                             labor_file=labor_file,
-                             logistics_file=logistics_file,
-                             materials=materials,
-                             parts=parts,
-                             labors=labors,
-                             logistics=logistics)
-    finally:
-        db.close()
+        base, target = diff_service.resolve(project_id, report_id, request.args.get('base'))
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('project.detail', project_id=project_id))
+
+    diff = diff_service.diff(base, target)
+    versions = (
+        db.query(CostSummary)
+        .filter(CostSummary.project_id == project_id, CostSummary.id != target.id)
+        .order_by(desc(CostSummary.calculation_version))
+        .all()
+    )
+    return render_template('report/diff.html',
+                         project=db.query(Project).get(project_id),
+                         diff=diff,
+                         changes=diff.changes[:DIFF_PAGE_LIMIT],
+                         versions=versions)
+
+
+@report_bp.route('/<report_id>/diff.json')
+def diff_report_json(project_id, report_id):
+    """
+    与另一个核价版本对比（JSON）
+    参数：base（同上）；limit（最多返回的变化条数，默认全部）
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': '请先登录'}), 401
+
+    uow = request_uow()
+    diff_service = uow.services.cost_summary_diff
+    try:
+        base, target = diff_service.resolve(project_id, report_id, request.args.get('base'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    limit = request.args.get('limit', type=int)
+    return jsonify(diff_service.diff(base, target).as_dict(limit=limit))
 
 
 @report_bp.route('/<report_id>/download/excel')
@@ -170,37 +243,31 @@ def download_excel(project_id, report_id):
     if check:
         return check
     
-    db = get_session()
-    try:
-        cost_summary = db.query(CostSummary).get(report_id)
-        if not cost_summary or cost_summary.project_id != project_id:
-            flash('报告不存在', 'error')
-            return redirect(url_for('project.detail', project_id=project_id))
-        
-        audit_log_service = AuditLogService(db)
-        cost_service = CostCalculationService(db, audit_log_service)
-        
-        df = cost_service.generate_df_report(
-            cost_summary=cost_summary,
-            operator_id=session.get('user_id', 'unknown')
-        )
-        
-        # 生成 Excel
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='成本报告')
-        
-        output.seek(0)
-        
-        project = db.query(Project).get(project_id)
-        filename = f"{project.raw_name}_成本报告_v{cost_summary.calculation_version}.xlsx"
-        
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=filename
-        )
-    finally:
-        db.close()
+    uow = request_uow()
+    db = uow.session
+    cost_summary = db.query(CostSummary).get(report_id)
+    if not cost_summary or cost_summary.project_id != project_id:
+        flash('报告不存在', 'error')
+        return redirect(url_for('project.detail', project_id=project_id))
+    
+    cost_service = uow.services.cost_calculation
+    
+    # 报告按 summary + 表头内容缓存在本地磁盘，重复下载不再查询 item / 渲染
+    report_path = cost_service.render_report_file(
+        cost_summary=cost_summary,
+        operator_id=session.get('user_id', 'unknown')
+    )
+    
+    project = db.query(Project).get(project_id)
+    filename = f"{project.raw_name}_成本报告_v{cost_summary.calculation_version}.xlsx"
+    
+    # conditional=True：带 If-None-Match 且 ETag 一致时直接返回 304
+    return send_file(
+        report_path,
+        mimetype=XLSX_MIMETYPE,
+        as_attachment=True,
+        download_name=filename,
+        etag=report_cache.etag(report_path),
+        conditional=True,
+    )
 
@@ -0,0 +1,48 @@
+# app/routes/request_scope.py
+"""
+请求级工作单元：每个请求最多一个 Session（第一次 request_uow().session 时创建）
+
+边界：
+- after_request：响应状态 < 400 时提交，否则回滚（提交失败按未处理异常返回 500）
+- teardown_request：有未处理异常时回滚；总是关闭 Session、归还连接
+视图函数不在成功路径上提交，只在需要中途持久化时调用 uow.commit()
+（先保存解析结果再做可能失败的校验；把文件交给后台重校验之前）；
+捕获异常后继续渲染 / 重定向（响应 < 400）的分支必须先 uow.rollback()，否则部分写入会在边界提交
+"""
+from flask import Flask, g
+
+from app.db.unit_of_work import UnitOfWork
+
+_G_KEY = "unit_of_work"
+
+
+def request_uow() -> UnitOfWork:
+    '''当前请求的工作单元（须在请求上下文中调用）'''
+    uow = g.get(_G_KEY)
+    if uow is None:
+        uow = UnitOfWork()
+        setattr(g, _G_KEY, uow)
+    return uow
+
+
+def init_request_scope(app: Flask) -> None:
+    '''注册请求边界的提交 / 回滚 / 关闭'''
+
+    @app.after_request
+    def _finish_unit_of_work(response):
+        uow = g.get(_G_KEY)
+        if uow is not None and uow.started:
+            if response.status_code < 400:
+                uow.commit()
+            else:
+                uow.rollback()
+        return response
+
+    @app.teardown_request
+    def _close_unit_of_work(exc):
+        uow = g.pop(_G_KEY, None)
+        if uow is None:
+            return
+        if exc is not None:
+            uow.rollback()
+        uow.close()
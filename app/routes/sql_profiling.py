@@ -0,0 +1,96 @@
+# app/routes/sql_profiling.py
+"""
+请求级 SQL 剖析（按需开启，默认关闭）
+
+SQL_PROFILER 环境变量（app.config['SQL_PROFILER']）：
+- off（默认）：不挂任何事件
+- on：每个请求记录查询数、数据库耗时、最慢语句和 N+1 语句，
+  写入响应头（X-SQL-Profile、Server-Timing）和一行 JSON 日志（logs/app.log，logger sql_profile）
+- panel：在 on 的基础上，HTML 页面底部插入调试面板
+
+统计范围是视图函数和模板渲染里执行的 SQL，以及请求结束时工作单元的提交
+"""
+import json
+import time
+
+from flask import Flask, g, render_template, request
+
+from app.db.sql_profiler import install_sql_profiler, start_profile, stop_profile
+from app.logger import get_logger
+
+SQL_PROFILER_MODES = ("off", "on", "panel")
+
+_G_KEY = "sql_profile_token"
+
+logger = get_logger("sql_profile")
+
+
+def init_sql_profiling(app: Flask) -> None:
+    '''
+    按 app.config['SQL_PROFILER'] 注册请求剖析
+    须在 init_request_scope 之前调用：after_request 按注册的逆序执行，这样请求边界的提交也计入
+
+    :raises ValueError: 未知的 SQL_PROFILER
+    '''
+    mode = str(app.config.get('SQL_PROFILER') or 'off').strip().lower()
+    if mode not in SQL_PROFILER_MODES:
+        raise ValueError(f"未知的 SQL_PROFILER：{mode}（可选：{', '.join(SQL_PROFILER_MODES)}）")
+    if mode == 'off':
+        return
+
+    install_sql_profiler()
+    show_panel = mode == 'panel'
+
+    @app.before_request
+    def _start_sql_profile():
+        g.sql_profile_started = time.perf_counter()
+        setattr(g, _G_KEY, start_profile())
+
+    @app.after_request
+    def _finish_sql_profile(response):
+        token = g.pop(_G_KEY, None)
+        if token is None:
+            return response
+        profile = stop_profile(token)
+        summary = profile.summary()
+
+        response.headers['X-SQL-Profile'] = (
+            f"queries={summary['query_count']}; db_ms={summary['db_time_ms']}; "
+            f"n_plus_one={len(summary['n_plus_one'])}"
+        )
+        response.headers.add('Server-Timing', f'db;dur={summary["db_time_ms"]};desc="{summary["query_count"]} queries"')
+
+        record = {
+            'event': 'sql_profile',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - g.sql_profile_started) * 1000, 3),
+            **summary,
+        }
+        line = json.dumps(record, ensure_ascii=False)
+        if summary['n_plus_one']:
+            logger.warning(line)
+        else:
+            logger.info(line)
+
+        if show_panel and response.mimetype == 'text/html' and not response.direct_passthrough:
+            _inject_panel(response, record)
+        return response
+
+    @app.teardown_request
+    def _discard_sql_profile(exc):
+        # 未处理异常时 after_request 不执行，在这里结束记录
+        token = g.pop(_G_KEY, None)
+        if token is not None:
+            stop_profile(token)
+
+
+def _inject_panel(response, record) -> None:
+    body = response.get_data(as_text=True)
+    index = body.rfind('</body>')
+    if index < 0:
+        return
+    panel = render_template('debug/sql_profile.html', profile=record)
+    response.set_data(body[:index] + panel + body[index:])
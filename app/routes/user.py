@@ -1,7 +1,6 @@
 # app/routes/user.py
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from app.db.session import get_session
-from app.services.user_service import UserService
+from app.routes.request_scope import request_uow
 from app.models.user import User
 
 user_bp = Blueprint('user', __name__, url_prefix='/users')
@@ -31,12 +30,10 @@ def list_users():
     if check:
         return check
     
-    db = get_session()
-    try:
-        users = db.query(User).order_by(User.created_at.desc()).all()
-        return render_template('user/list.html', users=users)
-    finally:
-        db.close()
+    uow = request_uow()
+    db = uow.session
+    users = db.query(User).order_by(User.created_at.desc()).all()
+    return render_template('user/list.html', users=users)
 
 
 @user_bp.route('/create', methods=['GET', 'POST'])
@@ -57,9 +54,9 @@ def create_user():
             flash('账号和密码不能为空', 'error')
             return render_template('user/create.html')
         
-        db = get_session()
+        uow = request_uow()
         try:
-            user_service = UserService(db)
+            user_service = uow.services.users
             user = user_service.create_user(
                 account=account,
                 password=password,
@@ -67,16 +64,14 @@ def create_user():
                 email=email,
                 phone_number=phone_number
             )
-            db.commit()
             flash('用户创建成功', 'success')
             return redirect(url_for('user.list_users'))
         except ValueError as e:
+            uow.rollback()
             flash(str(e), 'error')
         except Exception as e:
-            db.rollback()
+            uow.rollback()
             flash(f'创建失败: {str(e)}', 'error')
-        finally:
-            db.close()
     
     return render_template('user/create.html')
 
@@ -88,29 +83,26 @@ def edit_user(user_id):
     if check:
         return check
     
-    db = get_session()
-    try:
-        user = db.query(User).get(user_id)
-        if not user:
-            flash('用户不存在', 'error')
-            return redirect(url_for('user.list_users'))
+    uow = request_uow()
+    db = uow.session
+    user = db.query(User).get(user_id)
+    if not user:
+        flash('用户不存在', 'error')
+        return redirect(url_for('user.list_users'))
+    
+    if request.method == 'POST':
+        display_name = request.form.get('display_name', '').strip() or None
+        email = request.form.get('email', '').strip() or None
+        phone_number = request.form.get('phone_number', '').strip() or None
         
-        if request.method == 'POST':
-            display_name = request.form.get('display_name', '').strip() or None
-            email = request.form.get('email', '').strip() or None
-            phone_number = request.form.get('phone_number', '').strip() or None
-            
-            user.display_name = display_name
-            user.email = email
-            user.phone_number = phone_number
-            
-            db.commit()
-            flash('用户信息更新成功', 'success')
-            return redirect(url_for('user.list_users'))
+        user.display_name = display_name
+        user.email = email
+        user.phone_number = phone_number
         
-        return render_template('user/edit.html', user=user)
-    finally:
-        db.close()
+        flash('用户信息更新成功', 'success')
+        return redirect(url_for('user.list_users'))
+    
+    return render_template('user/edit.html', user=user)
 
 
 @user_bp.route('/<user_id>/reset-password', methods=['POST'])
@@ -125,17 +117,14 @@ def reset_password(user_id):
         flash('新密码不能为空', 'error')
         return redirect(url_for('user.list_users'))
     
-    db = get_session()
+    uow = request_uow()
     try:
-        user_service = UserService(db)
+        user_service = uow.services.users
         user_service.reset_password(user_id=user_id, new_password=new_password)
-        db.commit()
         flash('密码重置成功', 'success')
     except Exception as e:
-        db.rollback()
+        uow.rollback()
         flash(f'重置失败: {str(e)}', 'error')
-    finally:
-        db.close()
     
     return redirect(url_for('user.list_users'))
 
@@ -147,7 +136,8 @@ def toggle_user_status(user_id):
     if check:
         return check
     
-    db = get_session()
+    uow = request_uow()
+    db = uow.session
     try:
         user = db.query(User).get(user_id)
         if not user:
@@ -155,15 +145,12 @@ def toggle_user_status(user_id):
             return redirect(url_for('user.list_users'))
         
         user.is_active = not user.is_active
-        db.commit()
         
         status = '启用' if user.is_active else '禁用'
         flash(f'用户已{status}', 'success')
     except Exception as e:
-        db.rollback()
+        uow.rollback()
         flash(f'操作失败: {str(e)}', 'error')
-    finally:
-        db.close()
     
     return redirect(url_for('user.list_users'))
 
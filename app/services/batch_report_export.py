@@ -0,0 +1,342 @@
+# app/services/batch_report_export.py
+"""
+多项目成本报告批量导出（月末财务导出）。
+
+- 按项目筛选条件选出每个项目最新的 ACTIVE CostSummary（不重新计算）
+- 在进程池中渲染：每个 worker 用独立 session 调用 render_report_file，
+  报告直接写入 report_cache（已缓存的报告不再渲染）
+- 主进程按完成顺序把 xlsx 写入 zip，最后写 manifest.json（每个项目的结果 / 错误）
+- progress 回调在每个报告完成后调用，可用于 CLI 输出或网页轮询
+
+单个 worker 的内存有上界：报告是 write-only 流式渲染（与行数无关），
+并且每个 worker 渲染 WORKER_MAX_TASKS 份报告后由新进程替换，不累积内存。
+"""
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import IO, Callable, Dict, List, Optional, Sequence
+from uuid import uuid4
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from app.db.enums import CostSummaryStatus
+from app.db.session import get_session
+from app.logger import get_logger
+from app.models.cost_summary import CostSummary
+from app.models.project import Project
+from app.services.report_cache import report_cache
+
+logger = get_logger(__name__)
+
+# 默认 worker 数（环境变量 BATCH_EXPORT_WORKERS）
+DEFAULT_EXPORT_WORKERS = int(os.getenv("BATCH_EXPORT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# 每个 worker 进程最多渲染的报告数，之后换新进程
+WORKER_MAX_TASKS = 20
+
+MANIFEST_NAME = "manifest.json"
+
+# 网页批量导出任务的保留时间（秒），过期的 zip 在下次启动任务时清理
+JOB_TTL_SECONDS = 3600
+
+
+@dataclass
+class ExportTarget:
+    '''一个待导出的项目及其最新 ACTIVE CostSummary'''
+    project_id: str
+    project_name: str
+    business_code: Optional[str]
+    cost_summary_id: str
+    calculation_version: int
+    total_cost: str
+    filename: str
+
+
+@dataclass
+class ExportResult:
+    '''manifest 中的一行'''
+    project_id: str
+    project_name: str
+    business_code: Optional[str]
+    cost_summary_id: str
+    calculation_version: int
+    total_cost: str
+    filename: Optional[str]
+    ok: bool
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchExportProgress:
+    total: int
+    done: int = 0
+    failed: int = 0
+    # 最近完成的项目名
+    current: Optional[str] = None
+
+
+# =========
+# 选择导出对象
+# =========
+def select_export_targets(
+    db: Session,
+    *,
+    project_ids: Optional[Sequence[str]] = None,
+    search: Optional[str] = None,
+) -> List[ExportTarget]:
+    '''
+    选出符合条件、且有 ACTIVE CostSummary 的项目（每个项目取 calculation_version 最大的一份）
+
+    :param db: Session
+    :param project_ids: 只导出这些项目；None 表示不限
+    :param search: 与项目列表页相同的搜索：项目名 / 项目编号 / 合同编号包含该文本
+    :return: 按项目名排序的导出对象
+    '''
+    latest = (
+        select(CostSummary.project_id, func.max(CostSummary.calculation_version).label("version"))
+        .where(CostSummary.status == CostSummaryStatus.ACTIVE)
+        .group_by(CostSummary.project_id)
+        .subquery()
+    )
+    stmt = (
+        select(Project, CostSummary)
+        .join(latest, latest.c.project_id == Project.id)
+        .join(
+            CostSummary,
+            (CostSummary.project_id == latest.c.project_id)
+            & (CostSummary.calculation_version == latest.c.version)
+            & (CostSummary.status == CostSummaryStatus.ACTIVE),
+        )
+        .order_by(Project.raw_name, Project.id)
+    )
+    if project_ids is not None:
+        stmt = stmt.where(Project.id.in_(list(project_ids)))
+    if search:
+        stmt = stmt.where(or_(
+            Project.raw_name.contains(search),
+            Project.business_code.contains(search),
+            Project.contract_code.contains(search),
+        ))
+
+    targets = []
+    used_names = set()
+    for project, summary in db.execute(stmt):
+        filename = _safe_filename(f"{project.raw_name}_成本报告_v{summary.calculation_version}.xlsx")
+        if filename in used_names:
+            # 重名项目：加上项目ID前缀区分
+            filename = f"{project.id[:8]}_{filename}"
+        used_names.add(filename)
+        targets.append(ExportTarget(
+            project_id=project.id,
+            project_name=project.raw_name,
+            business_code=project.business_code,
+            cost_summary_id=summary.id,
+            calculation_version=summary.calculation_version,
+            total_cost=str(summary.total_cost),
+            filename=filename,
+        ))
+    return targets
+
+
+def _safe_filename(name: str) -> str:
+    return name.replace('/', '_').replace('\\', '_').replace(':', '_')
+
+
+# =========
+# 进程池渲染 + 打包
+# =========
+def _init_worker(cache_root: str) -> None:
+    '''worker 进程初始化：与主进程使用同一个缓存目录'''
+    report_cache.root = cache_root
+
+
+def _render_in_worker(cost_summary_id: str, operator_id: Optional[str]) -> str:
+    '''在 worker 进程中用独立 session 渲染一份报告，返回缓存文件路径'''
+    from app.services.audit_log_service import AuditLogService
+    from app.services.cost_calculation_service import CostCalculationService
+
+    db = get_session()
+    try:
+        summary = db.get(CostSummary, cost_summary_id)
+        if summary is None:
+            raise ValueError(f"CostSummary not found: {cost_summary_id}")
+        return CostCalculationService(db, AuditLogService(db)).render_report_file(summary, operator_id)
+    finally:
+        db.close()
+
+
+def export_reports_zip(
+    targets: Sequence[ExportTarget],
+    fileobj: IO[bytes],
+    *,
+    operator_id: Optional[str] = None,
+    workers: int = DEFAULT_EXPORT_WORKERS,
+    progress: Optional[Callable[[BatchExportProgress], None]] = None,
+) -> List[ExportResult]:
+    '''
+    在进程池中渲染每个导出对象的报告，写入 zip（xlsx + manifest.json）
+
+    单个项目失败不影响其它项目，错误记录在 manifest 中
+
+    :param targets: select_export_targets 的结果
+    :param fileobj: 可写的二进制文件对象
+    :param operator_id: 报告"统计人"的兜底用户ID（见 iter_report_rows）
+    :param workers: 进程数；1 表示在当前进程中顺序渲染
+    :param progress: 每完成一份报告调用一次
+    :return: 与 manifest 内容相同的结果列表（按 targets 顺序）
+    '''
+    state = BatchExportProgress(total=len(targets))
+    results: Dict[str, ExportResult] = {}
+
+    def finished(target: ExportTarget, path: Optional[str], error: Optional[str]) -> None:
+        if path is not None:
+            archive.write(path, arcname=target.filename)
+        else:
+            state.failed += 1
+            logger.warning("Batch export failed for project %s: %s", target.project_id, error)
+        results[target.cost_summary_id] = ExportResult(
+            project_id=target.project_id,
+            project_name=target.project_name,
+            business_code=target.business_code,
+            cost_summary_id=target.cost_summary_id,
+            calculation_version=target.calculation_version,
+            total_cost=target.total_cost,
+            filename=target.filename if path is not None else None,
+            ok=path is not None,
+            error=error,
+        )
+        state.done += 1
+        state.current = target.project_name
+        if progress is not None:
+            progress(state)
+
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        if workers <= 1 or len(targets) <= 1:
+            for target in targets:
+                try:
+                    path, error = _render_in_worker(target.cost_summary_id, operator_id), None
+                except Exception as e:
+                    path, error = None, str(e)
+                finished(target, path, error)
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(targets)),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(report_cache.root,),
+                max_tasks_per_child=WORKER_MAX_TASKS,
+            ) as pool:
+                futures = {
+                    pool.submit(_render_in_worker, target.cost_summary_id, operator_id): target
+                    for target in targets
+                }
+                for future in as_completed(futures):
+                    try:
+                        path, error = future.result(), None
+                    except Exception as e:
+                        path, error = None, str(e)
+                    finished(futures[future], path, error)
+
+        ordered = [results[t.cost_summary_id] for t in targets]
+        archive.writestr(MANIFEST_NAME, json.dumps({
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "total": state.total,
+            "failed": state.failed,
+            "reports": [asdict(r) for r in ordered],
+        }, ensure_ascii=False, indent=2))
+    return ordered
+
+
+# =========
+# 网页批量导出任务
+# =========
+@dataclass
+class BatchExportJob:
+    id: str
+    progress: BatchExportProgress
+    # running / finished / failed
+    status: str = "running"
+    zip_path: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+
+    def as_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": self.progress.total,
+            "done": self.progress.done,
+            "failed": self.progress.failed,
+            "current": self.progress.current,
+            "error": self.error,
+        }
+
+
+class BatchExportJobs:
+    '''
+    进程内的批量导出任务表：后台线程驱动进程池，页面轮询进度，完成后下载 zip
+
+    :param root: zip 的存放目录
+    :param workers: 每个任务的进程数
+    '''
+
+    def __init__(self, root: str, workers: int = DEFAULT_EXPORT_WORKERS):
+        self.root = root
+        self.workers = workers
+        self._jobs: Dict[str, BatchExportJob] = {}
+        self._lock = threading.Lock()
+
+    def start(self, targets: Sequence[ExportTarget], operator_id: Optional[str] = None) -> BatchExportJob:
+        '''启动一个批量导出任务并立即返回'''
+        self._expire()
+        job = BatchExportJob(id=str(uuid4()), progress=BatchExportProgress(total=len(targets)))
+        with self._lock:
+            self._jobs[job.id] = job
+        threading.Thread(
+            target=self._run,
+            args=(job, list(targets), operator_id),
+            name=f"batch-export-{job.id[:8]}",
+            daemon=True,
+        ).start()
+        return job
+
+    def get(self, job_id: str) -> Optional[BatchExportJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: BatchExportJob, targets: List[ExportTarget], operator_id: Optional[str]) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, f"{job.id}.zip")
+        try:
+            with open(path, "wb") as output:
+                export_reports_zip(targets, output, operator_id=operator_id, workers=self.workers,
+                                   progress=lambda state: setattr(job, "progress", BatchExportProgress(**asdict(state))))
+            job.zip_path = path
+            job.status = "finished"
+        except Exception as e:
+            logger.exception("Batch export job %s failed", job.id)
+            job.error = str(e)
+            job.status = "failed"
+
+    def _expire(self) -> None:
+        now = time.time()
+        with self._lock:
+            expired = [j for j in self._jobs.values()
+                       if j.status != "running" and now - j.created_at > JOB_TTL_SECONDS]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            if job.zip_path and os.path.exists(job.zip_path):
+                os.remove(job.zip_path)
+
+
+# 进程内共享实例（与 report_cache 一样由路由直接引用）
+batch_export_jobs = BatchExportJobs(os.path.join(tempfile.gettempdir(), "cost_sys_batch_export"))
@@ -0,0 +1,83 @@
+# app/services/container.py
+from functools import cached_property
+
+from sqlalchemy.orm import Session
+
+from app.services.audit_log_service import AuditLogService
+from app.services.cost_calculation_service import CostCalculationService
+from app.services.cost_rollup_service import CostRollupService
+from app.services.cost_summary_diff_service import CostSummaryDiffService
+from app.services.excel_ingest_service import ExcelIngestService
+from app.services.file_aggregate_service import FileAggregateService
+from app.services.file_record_service import FileRecordService
+from app.services.item_edit_service import ItemEditService
+from app.services.name_normalization_service import NameNormalizationService
+from app.services.project_service import ProjectService
+from app.services.report_data_loader import ReportDataLoader
+from app.services.user_service import UserService
+from app.services.validation_service import ValidationService
+
+
+class ServiceContainer:
+    """
+    一个 Session 上的服务实例：第一次访问时构建，同一工作单元内复用
+
+    服务之间的依赖（audit、name_normalization、validation 等）也从容器取，
+    所以一次请求里所有服务共用同一个 AuditLogService / ValidationService。
+    由 UnitOfWork.services 提供，不单独创建。
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @cached_property
+    def audit(self) -> AuditLogService:
+        return AuditLogService(self.db)
+
+    @cached_property
+    def name_normalization(self) -> NameNormalizationService:
+        return NameNormalizationService(self.db, self.audit)
+
+    @cached_property
+    def file_records(self) -> FileRecordService:
+        return FileRecordService(self.db, self.audit)
+
+    @cached_property
+    def excel_ingest(self) -> ExcelIngestService:
+        return ExcelIngestService(self.db, self.audit, self.name_normalization, self.file_records)
+
+    @cached_property
+    def validation(self) -> ValidationService:
+        return ValidationService(self.db, self.audit)
+
+    @cached_property
+    def item_edit(self) -> ItemEditService:
+        return ItemEditService(self.db, self.audit, self.validation)
+
+    @cached_property
+    def cost_calculation(self) -> CostCalculationService:
+        return CostCalculationService(self.db, self.audit)
+
+    @cached_property
+    def projects(self) -> ProjectService:
+        return ProjectService(self.db, self.audit, self.name_normalization)
+
+    @cached_property
+    def users(self) -> UserService:
+        return UserService(self.db)
+
+    @cached_property
+    def file_aggregates(self) -> FileAggregateService:
+        return FileAggregateService(self.db)
+
+    @cached_property
+    def cost_rollups(self) -> CostRollupService:
+        return CostRollupService(self.db)
+
+    @cached_property
+    def cost_summary_diff(self) -> CostSummaryDiffService:
+        return CostSummaryDiffService(self.db)
+
+    @cached_property
+    def report_data(self) -> ReportDataLoader:
+        return ReportDataLoader(self.db)
@@ -1,22 +1,105 @@
-from typing import Optional, Dict
+from typing import Optional, Dict, Iterator, List, Sequence
+from dataclasses import dataclass
 from decimal import Decimal
+from itertools import islice, product
 from uuid import uuid4
 from datetime import datetime
 import pandas as pd
 from decimal import Decimal
 from pandas import DataFrame
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
 from app.models.project import Project
-from app.models.user import User
 from app.models.file_record import FileRecord, ValidationStatus
 from app.models.cost_summary import CostSummary
+from app.models.file_cost_aggregate import FileCostAggregate
 from app.models.material_item import MaterialItem
 from app.models.part_item import PartItem
 from app.models.labor_item import LaborItem
 from app.models.logistics_item import LogisticsItem
 from app.services.audit_log_service import AuditLogService
-from app.db.enums import CostSummaryStatus, CostItemStatus
+from app.services.cost_preview_cache import cost_preview_cache
+from app.services.cost_rollup_service import CostRollupService
+from app.services.file_aggregate_service import FileAggregateService
+from app.services.report_cache import report_cache
+from app.services.report_writer import write_report_xlsx
+from app.services.report_data_loader import ReportDataLoader, ReportData, REPORT_FETCH_SIZE
+from app.services.labor_fees import labor_fee_columns, money_values
+from app.services.money import from_units
+from app.services.price_history_service import PriceHistoryService
+from app.db.enums import CostSummaryStatus, CostItemStatus, FileType, ParseStatus
+
+
+# 方案对比的成本类别 -> 对应的 FileType（顺序即组合中的类别顺序）
+SCENARIO_CATEGORIES = {
+    "material": FileType.material_cost,
+    "part": FileType.part_cost,
+    "labor": FileType.labor_cost,
+    "logistics": FileType.logistics_cost,
+}
+
+# 一次对比最多的组合数（各类别候选数的乘积）
+MAX_SCENARIOS = 1000
+
+# 成本报告的列数（最长的明细行）
+REPORT_COLUMN_COUNT = 9
+
+
+@dataclass
+class ScenarioFileTotal:
+    '''参与方案对比的单个文件及其可计算小计（每个文件只计算一次）'''
+    file_id: str
+    category: str
+    version: Optional[int]
+    original_name: Optional[str]
+    validation_status: str
+    locked: bool
+    subtotal: Decimal
+    # 能否直接用于 generate_cost_summary；不能时 reason 为原因
+    usable: bool
+    reason: Optional[str] = None
+
+
+@dataclass
+class CostScenario:
+    '''一个文件版本组合的成本（纯内存计算，不落库）'''
+    # category -> file_id
+    file_ids: Dict[str, str]
+    # category -> 该类别成本
+    costs: Dict[str, Decimal]
+    total_cost: Decimal
+    # 组合中的文件全部可用于核价
+    usable: bool
+
+
+@dataclass(frozen=True)
+class CostPreview:
+    '''按各类别最新可用文件的成本预览（只读，不落库；会被缓存，不要修改）'''
+    project_id: str
+    # category -> 最新可用文件（没有可用文件的类别不在其中）
+    file_ids: Dict[str, str]
+    file_versions: Dict[str, Optional[int]]
+    # category -> 该类别成本
+    costs: Dict[str, Decimal]
+    # 没有可用文件的类别
+    missing: List[str]
+    # 已有类别成本之和（不完整时仅供参考）
+    total_cost: Decimal
+
+    @property
+    def complete(self) -> bool:
+        return not self.missing
+
+
+@dataclass
+class ScenarioComparison:
+    project_id: str
+    # file_id -> ScenarioFileTotal
+    files: Dict[str, ScenarioFileTotal]
+    # 可用组合在前，按 total_cost 升序
+    scenarios: List[CostScenario]
+
+
 class CostCalculationService:
     """
     Generate immutable CostSummary snapshot and freeze source FileRecords.
@@ -29,6 +112,10 @@ class CostCalculationService:
     ):
         self.db = db
         self.audit_log_service = audit_log_service
+        self.aggregates = FileAggregateService(db)
+        self.report_loader = ReportDataLoader(db)
+        self.price_history = PriceHistoryService(db)
+        self.rollups = CostRollupService(db)
         
     def generate_cost_summary(
         self,
@@ -58,12 +145,10 @@ class CostCalculationService:
         # 0️⃣ 事务开始
         # =========
 
-        # 1️⃣ 加载 FileRecords
-        material_file = self._load_file(material_file_id)
-        part_file = self._load_file(part_file_id)
-        labor_file = self._load_file(labor_file_id)
-        logistics_file = self._load_file(logistics_file_id)
-            
+        # 1️⃣ 加载 FileRecords（一次 IN 查询）
+        material_file, part_file, labor_file, logistics_file = self._load_files(
+            [material_file_id, part_file_id, labor_file_id, logistics_file_id]
+        )
 
         files = [material_file, part_file, labor_file, logistics_file]
 
@@ -72,16 +157,16 @@ class CostCalculationService:
         for f in files:
             self._assert_file_usable_for_caculation(f, project_id)
 
-        # 3️⃣ 汇总每个 FileRecord 的成本并计算项目直接成本
-        material_cost = self._sum_items(MaterialItem, material_file.id)
-        part_cost = self._sum_items(PartItem, part_file.id)
-        labor_cost = self._sum_items(LaborItem, labor_file.id)
-        logistics_cost = self._sum_items(LogisticsItem, logistics_file.id)
-            
+        # 3️⃣ 读取每个 FileRecord 的聚合行（FileCostAggregate，一次 IN 查询）并计算项目直接成本
+        # 合计在整数单位上相加，最后才转成 Decimal
+        totals = self.aggregates.get_many([f.id for f in files])
+        material_cost = totals[material_file.id].calculable_subtotal
+        part_cost = totals[part_file.id].calculable_subtotal
+        labor_cost = totals[labor_file.id].calculable_subtotal
+        logistics_cost = totals[logistics_file.id].calculable_subtotal
 
-        total_cost = (
-            material_cost + part_cost + labor_cost + logistics_cost
-        )
+
+        total_cost = from_units(sum(totals[f.id].calculable_subtotal_units for f in files))
 
         # 4️⃣ 计算新的 calculation_version
         new_version = self._next_calculation_version(project_id)
@@ -115,6 +200,12 @@ class CostCalculationService:
         #入库
         self.db.add(summary)
         self.db.flush()
+
+        # 计入跨项目成本汇总（CostRollup，同一事务）
+        self.rollups.add_summary(summary)
+
+        # 已锁定文件的单价进入跨项目价格历史（增量）
+        self.price_history.index_files([f.id for f in files])
         
         # 8️，写 AuditLog
         self.audit_log_service.record_create(
@@ -126,6 +217,146 @@ class CostCalculationService:
 
         return summary
     
+    def evaluate_scenarios(
+        self,
+        *,
+        project_id: str,
+        candidates: Dict[str, Sequence[str]],
+    ) -> ScenarioComparison:
+        '''
+        只读的"如果用这些版本会是多少钱"：对每个类别的候选文件求笛卡尔积，
+        返回每个组合的成本。不创建 CostSummary、不锁定文件、不写任何数据
+
+        - 每个候选文件的小计只读取一次（FileCostAggregate，一次 IN 查询）
+        - 组合成本在内存中相加，数百个组合也是毫秒级
+
+        :param project_id: 项目ID
+        :type project_id: str
+        :param candidates: category（material / part / labor / logistics）-> 候选 FileRecord ID 列表
+        :type candidates: Dict[str, Sequence[str]]
+        :return: ScenarioComparison
+        :rtype: ScenarioComparison
+        '''
+        unknown = set(candidates) - set(SCENARIO_CATEGORIES)
+        if unknown:
+            raise ValueError(f"Unknown cost category: {', '.join(sorted(unknown))}")
+
+        # 1️⃣ 每个类别至少一个候选，去重并保持顺序
+        per_category: Dict[str, List[str]] = {}
+        for category in SCENARIO_CATEGORIES:
+            ids = list(dict.fromkeys(i for i in candidates.get(category) or [] if i))
+            if not ids:
+                raise ValueError(f"At least one {category} file_id is required")
+            per_category[category] = ids
+
+        scenario_count = 1
+        for ids in per_category.values():
+            scenario_count *= len(ids)
+        if scenario_count > MAX_SCENARIOS:
+            raise ValueError(f"Too many scenarios: {scenario_count} > {MAX_SCENARIOS}")
+
+        # 2️⃣ 一次加载全部候选 FileRecord 和聚合小计（缺失的聚合行只计算，不写回）
+        all_ids = [i for ids in per_category.values() for i in ids]
+        records = dict(zip(all_ids, self._load_files(all_ids)))
+        totals = self.aggregates.get_many(all_ids, rebuild_missing=False)
+
+        files: Dict[str, ScenarioFileTotal] = {}
+        for category, ids in per_category.items():
+            for file_id in ids:
+                f = records[file_id]
+                if f.project_id != project_id:
+                    raise ValueError("FileRecord does not belong to project")
+                if f.file_type != SCENARIO_CATEGORIES[category]:
+                    raise ValueError(f"FileRecord {file_id} is not a {SCENARIO_CATEGORIES[category].value} file")
+                try:
+                    self._assert_file_usable_for_caculation(f, project_id)
+                    reason = None
+                except ValueError as e:
+                    reason = str(e)
+                files[file_id] = ScenarioFileTotal(
+                    file_id=file_id,
+                    category=category,
+                    version=f.version,
+                    original_name=f.original_name,
+                    validation_status=f.validation_status.value,
+                    locked=f.locked,
+                    subtotal=totals[file_id].calculable_subtotal,
+                    usable=reason is None,
+                    reason=reason,
+                )
+
+        # 3️⃣ 笛卡尔积，内存中求和
+        categories = list(per_category)
+        scenarios: List[CostScenario] = []
+        for combo in product(*(
+            [files[file_id] for file_id in per_category[category]] for category in categories
+        )):
+            scenarios.append(CostScenario(
+                file_ids={c: ft.file_id for c, ft in zip(categories, combo)},
+                costs={c: ft.subtotal for c, ft in zip(categories, combo)},
+                total_cost=from_units(sum(totals[ft.file_id].calculable_subtotal_units for ft in combo)),
+                usable=all(ft.usable for ft in combo),
+            ))
+        scenarios.sort(key=lambda sc: (not sc.usable, sc.total_cost))
+
+        return ScenarioComparison(project_id=project_id, files=files, scenarios=scenarios)
+
+    def preview_cost(self, project_id: str) -> CostPreview:
+        '''
+        只读的成本预览：各类别取最新可用文件（口径同 FileRecordService.get_latest_valid_file：
+        已解析、校验 ok / confirmed、未锁定），四类成本读 FileCostAggregate。
+        不创建 CostSummary、不锁定文件、不写审计记录
+
+        - 一条查询选出各类别最新可用文件及其聚合行 revision（文件戳）
+        - 按文件戳缓存（cost_preview_cache）：新版本、item 编辑、重新校验都会改变戳，无需驱逐
+        - 聚合行缺失的文件只计算不写回，此时没有可靠的戳，结果不缓存
+
+        :param project_id: 项目ID
+        :type project_id: str
+        :return: CostPreview
+        :rtype: CostPreview
+        '''
+        categories = {file_type: category for category, file_type in SCENARIO_CATEGORIES.items()}
+        rows = self.db.execute(
+            select(FileRecord.id, FileRecord.file_type, FileRecord.version, FileCostAggregate.revision)
+            .outerjoin(FileCostAggregate, FileCostAggregate.file_id == FileRecord.id)
+            .where(
+                FileRecord.project_id == project_id,
+                FileRecord.file_type.in_(list(categories)),
+                FileRecord.parse_status == ParseStatus.parsed,
+                FileRecord.validation_status.in_([ValidationStatus.ok, ValidationStatus.confirmed]),
+                FileRecord.locked.is_(False),
+            )
+            .order_by(FileRecord.version.desc())
+        ).all()
+        latest = {}
+        for row in rows:
+            latest.setdefault(categories[row.file_type], row)
+
+        stamp = tuple(
+            (category, row.id, row.version, row.revision)
+            for category, row in sorted(latest.items())
+        )
+        cacheable = all(row.revision is not None for row in latest.values())
+        if cacheable:
+            cached = cost_preview_cache.get((project_id, stamp))
+            if cached is not None:
+                return cached
+
+        file_ids = {category: row.id for category, row in latest.items()}
+        totals = self.aggregates.get_many(list(file_ids.values()), rebuild_missing=False)
+        preview = CostPreview(
+            project_id=project_id,
+            file_ids=file_ids,
+            file_versions={category: row.version for category, row in latest.items()},
+            costs={category: totals[file_id].calculable_subtotal for category, file_id in file_ids.items()},
+            missing=[category for category in SCENARIO_CATEGORIES if category not in latest],
+            total_cost=from_units(sum(values.calculable_subtotal_units for values in totals.values())),
+        )
+        if cacheable:
+            cost_preview_cache.put((project_id, stamp), preview)
+        return preview
+
     def _assert_file_usable_for_caculation(self, file: FileRecord, project_id: str) -> None:
         '''
         校验指定 FileRecord 是否可用于成本计算
@@ -190,39 +421,22 @@ class CostCalculationService:
         
     def _sum_items(self, model, file_id: str) -> Decimal:
         '''
-        聚合某一file下所有可计算的item的subtotal总和
+        某一file下所有可计算的item的subtotal总和
         Rules:
-        -only itemsfrom the given file_id are considered
+        -only items from the given file_id are considered
         -only items where is_calculable is True are included
         -if no matching rows exist, return Decimal(0)
-        
-        return Decimal(rows or 0)
-        return Decimal(rows or 0)
-        :param model: Item模型类，如MaterialItem, PartItem等
+
+        读取增量维护的 FileCostAggregate 聚合行（O(1)），聚合行缺失时从 items 重建
+        :param model: Item模型类，如MaterialItem, PartItem等（聚合行按 file 维护，保留参数兼容旧调用）
         :type model: Type[MaterialItem | PartItem | LaborItem | LogisticsItem]
         :param file_id:  所属FileRecord ID
         :type file_id: str
         :return: filerecord下所有可计算的subtotal总和，file层面已经校验过了，因此item层面不需要再校验status
         :rtype: Decimal
         '''
-        # Step 1: 查询数据库中，满足条件的 item 小计之和
-        subtotal_sum = (
-            self.db
-            .query(func.sum(model.subtotal))
-            .filter(
-                model.source_file_id == file_id,
-                model.is_calculable.is_(True),
-            )
-            .scalar()
-        )
-
-        # Step 2: 数据库在“没有任何行”时会返回 None，需要兜底为 0
-        if subtotal_sum is None:
-            return Decimal("0")
+        return self.aggregates.get_subtotal(file_id)
 
-        # Step 3: 统一转成 Decimal，保证金额计算安全
-        return Decimal(subtotal_sum)
-    
     def _get_calculable_items(self, model, file_id: str) -> list:
         '''
         fetch all calculable items under a given file
@@ -255,12 +469,11 @@ class CostCalculationService:
         :rtype: int
         '''
         latest = (
-            self.db.query(CostSummary)
+            self.db.query(func.max(CostSummary.calculation_version))
             .filter(CostSummary.project_id == project_id)
-            .order_by(CostSummary.calculation_version.desc())
-            .first()
+            .scalar()
         )
-        return 1 if not latest else latest.calculation_version + 1
+        return 1 if not latest else latest + 1
     def get_latest_cost_summary(self,project_id: str) -> list[CostSummary]:
         '''
         获取某项目下最新的CostSummary记录列表
@@ -282,13 +495,16 @@ class CostCalculationService:
     def _invalidate_old_summaries(self, project_id: str, new_id: str):
         
         old_summaries = self.get_latest_cost_summary(project_id)
+        replaced_ids = []
         for old in old_summaries:
             if old.id == new_id:
                 continue
+            replaced_ids.append(old.id)
 
             old.status = CostSummaryStatus.REPLACED
             old.invalidated_at = datetime.now()
             old.replaces_cost_summary_id = new_id
+            self.rollups.move_summary(old, CostSummaryStatus.ACTIVE)
 
             self.audit_log_service.record_system_update(
                 project_id=project_id,
@@ -298,6 +514,30 @@ class CostCalculationService:
                 before_value="active",
                 after_value="replaced",
             )
+        # 已作废的 summary 不再允许导出，驱逐其渲染缓存
+        report_cache.evict(replaced_ids)
+
+    def _load_files(self, file_ids: List[str]) -> List[FileRecord]:
+        '''
+        一次 IN 查询加载多个 FileRecord，按入参顺序返回，任一缺失则抛异常
+
+        :param file_ids: FileRecord ID 列表
+        :type file_ids: List[str]
+        :return: 与 file_ids 一一对应的 FileRecord
+        :rtype: List[FileRecord]
+        '''
+        if not all(file_ids):
+            raise ValueError("file_id is required")
+
+        found = {
+            f.id: f
+            for f in self.db.query(FileRecord).filter(FileRecord.id.in_(set(file_ids))).all()
+        }
+        for file_id in file_ids:
+            if file_id not in found:
+                raise ValueError(f"FileRecord not found: {file_id}")
+        return [found[file_id] for file_id in file_ids]
+
     def _load_file(self, file_id: str) -> FileRecord:
         '''下载并返回指定ID的FileRecord实例，找不到则抛异常'''
         if not file_id:
@@ -319,21 +559,88 @@ class CostCalculationService:
         based on an active CostSummary.
 
         This function does NOT persist data.
+        Large reports should use iter_report_rows + write_report_xlsx instead,
+        which never hold all rows in memory.
+        """
+        return pd.DataFrame(list(self.iter_report_rows(cost_summary, operator_id)))
+
+    def iter_report_rows(
+        self,
+        cost_summary: CostSummary,
+        operator_id: str,
+    ) -> Iterator[list]:
+        """
+        Yield the rows of the cost report section by section.
+
+        Project / FileRecord / User data is loaded with one batched query each
+        and checked immediately (errors are raised here, not on first
+        iteration); the four item sets are then read with a single UNION ALL
+        in batches of REPORT_FETCH_SIZE while rows are consumed.
+
+        :param cost_summary: active CostSummary
+        :param operator_id: fallback for the "统计人" cell when the summary has no
+            creation audit record (normally the calculating operator is used)
+        :return: iterator of report rows (at most REPORT_COLUMN_COUNT cells each)
         """
+        return self._report_rows(self._load_report_data(cost_summary, operator_id))
 
+    def _load_report_data(self, cost_summary: CostSummary, operator_id: Optional[str]) -> ReportData:
+        '''
+        加载报告数据（不含 item）并校验 summary / 项目 / 文件状态
+        '''
         if cost_summary.status != CostSummaryStatus.ACTIVE:
             raise ValueError("Only active CostSummary is able to generate a report")
-        # 1️，加载相关 project和FileRecords 
-        project = self.db.query(Project).get(cost_summary.project_id)
-        material_file = self._load_file(cost_summary.material_file_id)
-        part_file = self._load_file(cost_summary.part_file_id)
-        labor_file = self._load_file(cost_summary.labor_file_id)
-        logistics_file = self._load_file(cost_summary.logistics_file_id)
+        # 1️，批量加载 project、FileRecords、上传人和统计人（每类一次查询）
+        data = self.report_loader.load(cost_summary, operator_id)
         # 2，校验状态     
-        if project is None:
+        if data.project is None:
             raise ValueError("Project not found")                        
-        for f in [material_file, part_file, labor_file, logistics_file]:
+        for f in data.files:
             self._assert_file_usable_for_report(f, cost_summary.project_id)
+        return data
+
+    def render_report_file(
+        self,
+        cost_summary: CostSummary,
+        operator_id: str,
+    ) -> str:
+        '''
+        返回成本报告 xlsx 的本地路径：命中 report_cache 直接返回，否则流式渲染后写入缓存
+
+        只有 ACTIVE 的 summary 可以导出；缓存命中前同样校验状态，
+        避免其它进程尚未驱逐的 REPLACED 报告被返回。
+        缓存键包含 _report_header（项目信息、人名），每次都会加载这部分数据，但不读取 item
+
+        :param cost_summary: active CostSummary
+        :type cost_summary: CostSummary
+        :param operator_id: 见 iter_report_rows
+        :type operator_id: str
+        :return: 缓存文件路径（只读，调用方不要删除或修改）；report_cache.etag(path) 即其 ETag
+        :rtype: str
+        '''
+        data = self._load_report_data(cost_summary, operator_id)
+        return report_cache.get_or_render(
+            report_cache.key(cost_summary.id, self._report_header(data)),
+            lambda output: write_report_xlsx(self._report_rows(data), output, column_count=REPORT_COLUMN_COUNT),
+        )
+
+    @staticmethod
+    def _report_header(data: ReportData) -> tuple:
+        '''
+        报告中不属于 CostSummary 快照的单元格（项目信息、上传人 / 统计人等），与 _report_rows 保持一致
+        '''
+        project = data.project
+        return (
+            project.business_code, project.normalized_name, tuple(project.spec_tags or ()), project.contract_code,
+            data.operator_name,
+            *((data.user_name(f.uploader_id), f.original_name, f.updated_at, f.version) for f in data.files),
+        )
+
+    def _report_rows(self, data: ReportData) -> Iterator[list]:
+        cost_summary, project = data.cost_summary, data.project
+        material_file, part_file = data.material_file, data.part_file
+        labor_file, logistics_file = data.labor_file, data.logistics_file
+
         #置信级别工具
         def confidence_label(item_status: CostItemStatus) -> str:
             if item_status == CostItemStatus.ok:
@@ -341,34 +648,39 @@ class CostCalculationService:
             if item_status == CostItemStatus.confirmed:
                 return "人工确认"
             return ""
-        #累加行构造DataFrame
-        rows = []
+
+        def uploader_row(file_record: FileRecord) -> list:
+            return [
+                "表上传人", data.user_name(file_record.uploader_id),
+                "表名", file_record.original_name,
+                "修改时间", file_record.updated_at,
+                "版本", file_record.version,
+            ]
+
+        # 四类 item 一条 UNION ALL 按章节顺序读出，逐章节消费同一个游标
+        items = iter(self.report_loader.iter_items(data))
+        pending = next(items, None)
+
+        def section(name: str) -> Iterator:
+            nonlocal pending
+            while pending is not None and pending.section == name:
+                row, pending = pending, next(items, None)
+                yield row
 
         #项目信息
-        rows.append(['产品直接生产成本统计'])
-        rows.append(['产品编号',project.business_code])
-        rows.append(["产品名称", project.normalized_name])
-        rows.append(["产品标签", project.spec_tags])
-        rows.append(["合同编号", project.contract_code])
-        rows.append(["", ""])
+        yield ['产品直接生产成本统计']
+        yield ['产品编号',project.business_code]
+        yield ["产品名称", project.normalized_name]
+        yield ["产品标签", project.spec_tags]
+        yield ["合同编号", project.contract_code]
+        yield ["", ""]
         
         #材料明细
-        rows.append(["一．材料（采购部填）"])
-        rows.append(["名称", "规格型号", "数量", "单位", "材质", "参考重量", "单价", "小计", "置信级别"])
-        #fetch all material items
-        materials = (
-            self.db.query(MaterialItem)
-            .filter(MaterialItem.source_file_id == material_file.id,
-                    MaterialItem.status.in_([CostItemStatus.ok, CostItemStatus.confirmed])
-            )                           
-            .all()
-        )
-
-        #write material rows
-        uploader = self.db.query(User).get(material_file.uploader_id)
-        for m in materials:
-            rows.append([
-                m.normalized_name,
+        yield ["一．材料（采购部填）"]
+        yield ["名称", "规格型号", "数量", "单位", "材质", "参考重量", "单价", "小计", "置信级别"]
+        for m in section("material"):
+            yield [
+                m.name,
                 m.spec,
                 m.quantity,
                 m.unit,
@@ -377,34 +689,18 @@ class CostCalculationService:
                 m.unit_price,
                 m.subtotal,
                 confidence_label(m.status),
-            ])
+            ]
         #write material summary row
-        rows.append(["合计", "", "", "", "", "", "", cost_summary.material_cost, ""])
-        rows.append([
-            "表上传人", uploader.display_name if uploader is not None else "未知用户",
-            "表名", material_file.original_name,
-            "修改时间", material_file.updated_at,
-            "版本", material_file.version,
-        ])
-        rows.append(["", ""])
+        yield ["合计", "", "", "", "", "", "", cost_summary.material_cost, ""]
+        yield uploader_row(material_file)
+        yield ["", ""]
         
         #配件明细
-        rows.append(["二．配件（采购部填）"])
-        rows.append(["名称", "规格型号", "数量", "单位", "", "", "单价", "小计", "置信级别"])
-        #fetch all part items
-        parts = (
-            self.db.query(PartItem)
-            .filter(PartItem.source_file_id == part_file.id,
-                    PartItem.status.in_([CostItemStatus.ok, CostItemStatus.confirmed]),
-            )
-            .all()
-        )
-
-        #write part rows
-        uploader = self.db.query(User).get(part_file.uploader_id)
-        for p in parts:
-            rows.append([
-                p.normalized_name,
+        yield ["二．配件（采购部填）"]
+        yield ["名称", "规格型号", "数量", "单位", "", "", "单价", "小计", "置信级别"]
+        for p in section("part"):
+            yield [
+                p.name,
                 p.spec,
                 p.quantity,
                 p.unit,
@@ -413,91 +709,52 @@ class CostCalculationService:
                 p.unit_price,
                 p.subtotal,
                 confidence_label(p.status),
-            ])
+            ]
         #write part summary row
-        rows.append(["合计", "", "", "", "", "", "", cost_summary.part_cost, ""])
-        rows.append([
-            "表上传人", uploader.display_name if uploader is not None else "未知用户",
-            "表名", part_file.original_name,
-            "修改时间", part_file.updated_at,
-            "版本", part_file.version,
-        ])
-        rows.append(["", ""])
+        yield ["合计", "", "", "", "", "", "", cost_summary.part_cost, ""]
+        yield uploader_row(part_file)
+        yield ["", ""]
         #运费/安装费明细
-        rows.append(["三．运费 / 安装费（采购部填）"])
-        rows.append(["类型", "备注", "小计"])
-
-        logistics = (
-            self.db.query(LogisticsItem)
-            .filter(LogisticsItem.source_file_id == logistics_file.id,
-                    LogisticsItem.status.in_([CostItemStatus.ok, CostItemStatus.confirmed]),
-                    LogisticsItem.is_calculable.is_(True)
-            )
-            .all()
-        )
+        yield ["三．运费 / 安装费（采购部填）"]
+        yield ["类型", "备注", "小计"]
+        for l in section("logistics"):
+            yield [l.logistics_type.value, l.description, l.subtotal]
 
-        
-        uploader = self.db.query(User).get(logistics_file.uploader_id)
-        for l in logistics:
-            rows.append([l.type.value, l.description, l.subtotal])
-
-        rows.append([
-            "表上传人", uploader.display_name if uploader is not None else "未知用户",
-            "表名", logistics_file.original_name,
-            "修改时间", logistics_file.updated_at, 
-            "版本", logistics_file.version,
-        ])
-        rows.append(["", ""])
+        yield uploader_row(logistics_file)
+        yield ["", ""]
         #人工明细
-        rows.append(["四．加工费（生产部填）"])
-        rows.append([
+        yield ["四．加工费（生产部填）"]
+        yield [
             "班组（外协单位）", "数量", "单位", "单价",
             "箱梁攻丝费、行走、液压站组装费、溜槽补助", "加工费", "吨位奖金", "小计", "置信级别"
-        ])
-
-        labors = (
-            self.db.query(LaborItem)
-            .filter(LaborItem.source_file_id == labor_file.id,
-                    LaborItem.status.in_([CostItemStatus.ok, CostItemStatus.confirmed]),
+        ]
+        # 加工费 / 吨位奖金按批（与游标批大小相同）以整数单位按列计算，与 labor_fees 逐行一致
+        labors = section("labor")
+        while chunk := list(islice(labors, REPORT_FETCH_SIZE)):
+            fees = labor_fee_columns(
+                [l.quantity for l in chunk], [l.unit for l in chunk], [l.unit_price for l in chunk]
             )
-            .all()
-        )
-
-
-        uploader = self.db.query(User).get(labor_file.uploader_id)
-        for l in labors:
-            processing_fee = (l.work_quantity or 0) * (l.unit_price or 0) if (l.unit == "吨") else (l.work_quantity or 0) * (l.unit_price or 0) * Decimal("0.001")
-            ton_bonus = (l.work_quantity or 0) * 5 if (l.unit == "吨") else (l.work_quantity or 0) * Decimal("0.005")
-
-            rows.append([
-                l.normalized_group,
-                l.work_quantity,
-                l.unit,
-                l.unit_price,
-                l.extra_subsidies,
-                processing_fee,
-                ton_bonus,
-                l.subtotal,
-                confidence_label(l.status),
-            ])
-
-        rows.append(["合计", "", "", "", "", "", "", cost_summary.labor_cost, ""])
-        rows.append([
-            "表上传人", uploader.display_name if uploader is not None else "未知用户",
-            "表名", labor_file.original_name,
-            "修改时间", labor_file.updated_at,
-            "版本", labor_file.version,
-        ])
-        #表位信息
-        operator = self.db.query(User).get(operator_id)
-        rows.append(["", ""])
-        rows.append([
-            "统计日期", datetime.now().strftime("%Y.%m.%d"),
-            "统计人", operator.display_name if operator is not None else "未知用户",
+            for l, processing_fee, ton_bonus in zip(
+                chunk, money_values(fees.processing_fee), money_values(fees.ton_bonus)
+            ):
+                yield [
+                    l.name,
+                    l.quantity,
+                    l.unit,
+                    l.unit_price,
+                    l.extra_subsidies,
+                    processing_fee,
+                    ton_bonus,
+                    l.subtotal,
+                    confidence_label(l.status),
+                ]
+
+        yield ["合计", "", "", "", "", "", "", cost_summary.labor_cost, ""]
+        yield uploader_row(labor_file)
+        #表位信息：统计日期取自快照（核价时间），统计人为核价人；人名等可变内容计入 _report_header，作为 report_cache 键的一部分
+        yield ["", ""]
+        yield [
+            "统计日期", cost_summary.calculated_at.strftime("%Y.%m.%d"),
+            "统计人", data.operator_name,
             "直接生产成本", cost_summary.total_cost,
-        ])
-        #构造DataFrame返回
-        df = pd.DataFrame(rows)
-        return df
-
-
+        ]
@@ -0,0 +1,51 @@
+# app/services/cost_preview_cache.py
+"""
+成本预览（CostCalculationService.preview_cost）的进程内缓存。
+
+键为参与预览的文件戳：每个类别的 (category, file_id, version, FileCostAggregate.revision)。
+- 上传新版本 / 校验状态变化：最新可用文件变了，键随之变化
+- 编辑 / 确认 item、重新校验：聚合行的 revision +1，键随之变化
+因此不需要主动驱逐，旧键由 LRU 淘汰。
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+# 最多缓存的预览数
+DEFAULT_PREVIEW_CACHE_SIZE = 1024
+
+
+class CostPreviewCache:
+    '''线程安全的 LRU（多个请求线程共享）'''
+
+    def __init__(self, maxsize: int = DEFAULT_PREVIEW_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        '''
+        :return: 缓存值，未命中返回 None
+        '''
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+cost_preview_cache = CostPreviewCache()
@@ -0,0 +1,444 @@
+# app/services/cost_rollup_service.py
+import re
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.db.enums import CostSummaryStatus
+from app.models.cost_rollup import CostRollup, ProjectCostRollup
+from app.models.cost_summary import CostSummary
+from app.models.project import Project
+from app.services.money import from_units, to_units, units_sql
+
+# 汇总表的度量列 <- CostSummary 的金额列
+ROLLUP_MEASURES = {
+    "material_units": "material_cost",
+    "part_units": "part_cost",
+    "labor_units": "labor_cost",
+    "logistics_units": "logistics_cost",
+    "total_units": "total_cost",
+}
+
+# 可用的分组维度
+ROLLUP_GROUP_BY = ("tag", "month", "status", "project")
+
+# CostRollup.spec_tag 的保留值：全部项目（每个 CostSummary 只计一次）/ 没有 spec_tags 的项目
+ALL_TAGS = "*"
+UNTAGGED = ""
+
+# 汇总表 -> 其第一个维度列
+_ROLLUP_TABLES = ((CostRollup, "spec_tag"), (ProjectCostRollup, "project_id"))
+
+_MONTH_RE = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+# 重建时每批读取的 CostSummary 行数
+_REBUILD_FETCH_SIZE = 2000
+
+
+def rollup_month(calculated_at: datetime) -> str:
+    '''CostSummary.calculated_at -> 汇总月份（YYYY-MM）'''
+    return calculated_at.strftime("%Y-%m")
+
+
+def parse_month(value: Optional[str]) -> Optional[str]:
+    '''
+    校验月份参数（YYYY-MM），空值返回 None
+
+    :raises ValueError: 格式不正确
+    '''
+    if not value:
+        return None
+    value = value.strip()
+    if not _MONTH_RE.match(value):
+        raise ValueError(f"Invalid month: {value}, expected YYYY-MM")
+    return value
+
+
+def rollup_tags(spec_tags: Optional[Sequence[str]]) -> List[str]:
+    '''一个项目的 CostSummary 计入的 CostRollup.spec_tag：各个标签（没有则 UNTAGGED），以及 ALL_TAGS'''
+    tags = [t for t in dict.fromkeys(spec_tags or []) if t and t != ALL_TAGS]
+    return (tags or [UNTAGGED]) + [ALL_TAGS]
+
+
+@dataclass
+class RollupValues:
+    '''一组 CostSummary 的汇总值（汇总表度量的纯数据形式），金额为整数单位'''
+    summary_count: int = 0
+    material_units: int = 0
+    part_units: int = 0
+    labor_units: int = 0
+    logistics_units: int = 0
+    total_units: int = 0
+
+    @classmethod
+    def of_summary(cls, summary: CostSummary) -> "RollupValues":
+        return cls(1, *(to_units(getattr(summary, column)) for column in ROLLUP_MEASURES.values()))
+
+    def add(self, other: "RollupValues", sign: int = 1) -> None:
+        for f in fields(self):
+            setattr(self, f.name, getattr(self, f.name) + sign * getattr(other, f.name))
+
+    def as_row(self) -> Dict[str, int]:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+    @property
+    def costs(self) -> Dict[str, Decimal]:
+        '''category（material / part / labor / logistics / total）-> 金额'''
+        return {column[:-len("_units")]: from_units(getattr(self, column)) for column in ROLLUP_MEASURES}
+
+
+@dataclass
+class RollupRow:
+    '''汇总查询的一行：维度取值（tag 为 None 表示未分类）+ 汇总值'''
+    key: Dict[str, object]
+    values: RollupValues = field(default_factory=RollupValues)
+
+    def as_dict(self) -> Dict[str, object]:
+        key = {name: (value.value if isinstance(value, CostSummaryStatus) else value) for name, value in self.key.items()}
+        return {
+            **key,
+            "summary_count": self.values.summary_count,
+            **{name: str(value) for name, value in self.values.costs.items()},
+        }
+
+
+@dataclass
+class RollupResult:
+    '''
+    汇总查询结果
+
+    按 tag 分组时，有多个标签的项目会计入每个标签，rows 之和可能大于 total；
+    total 中每个 CostSummary 只计一次
+    '''
+    group_by: Tuple[str, ...]
+    rows: List[RollupRow]
+    total: RollupValues
+    # project_id -> 项目名称（按 project 分组时）
+    project_names: Dict[str, str] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, object]:
+        rows = []
+        for row in self.rows:
+            data = row.as_dict()
+            if "project" in row.key:
+                data["project_name"] = self.project_names.get(row.key["project"])
+            rows.append(data)
+        return {"group_by": list(self.group_by), "total": RollupRow({}, self.total).as_dict(), "rows": rows}
+
+
+@dataclass
+class RollupDrift:
+    '''一致性检查发现的偏差：stored 为汇总表中的值，actual 为从 CostSummary 重新计算的值（缺行按 0）'''
+    table: str
+    # (spec_tag 或 project_id, month, status)
+    key: Tuple[str, str, CostSummaryStatus]
+    stored: RollupValues
+    actual: RollupValues
+
+
+class CostRollupService:
+    """
+    Maintain and query the portfolio rollups (CostRollup / ProjectCostRollup).
+
+    Responsibilities:
+    - Add a new CostSummary / move a replaced one to REPLACED (increments,
+      in the caller's transaction)
+    - Move a project's totals between tags when its spec_tags change
+    - Roll-up / drill-down queries by tag, month, status and project
+    - Recompute from CostSummaries and report / repair drift
+
+    Writes are Core statements in the caller's session, so they commit or
+    roll back together with the CostSummary / Project changes.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # =========
+    # 增量维护
+    # =========
+    def add_summary(self, summary: CostSummary) -> None:
+        '''新建的 CostSummary 计入汇总'''
+        self._apply_summary(summary, summary.status, RollupValues.of_summary(summary))
+
+    def move_summary(self, summary: CostSummary, status_from: CostSummaryStatus) -> None:
+        '''
+        CostSummary 状态变化（ACTIVE -> REPLACED）：从旧状态的汇总行移到新状态的汇总行
+
+        :param summary: 已更新 status 的 CostSummary
+        :param status_from: 旧状态
+        '''
+        if summary.status == status_from:
+            return
+        values = RollupValues.of_summary(summary)
+        self._apply_summary(summary, status_from, values, sign=-1)
+        self._apply_summary(summary, summary.status, values)
+
+    def retag_project(
+        self,
+        project_id: str,
+        old_tags: Optional[Sequence[str]],
+        new_tags: Optional[Sequence[str]],
+    ) -> None:
+        '''
+        项目 spec_tags 变化：把该项目已有的汇总从移除的标签移到新增的标签
+
+        增量取自该项目的 ProjectCostRollup 行（每个 月份 × 状态 一行），不读取 CostSummary
+
+        :param project_id: 项目ID
+        :param old_tags: 修改前的 spec_tags
+        :param new_tags: 修改后的 spec_tags
+        '''
+        old_keys, new_keys = set(rollup_tags(old_tags)), set(rollup_tags(new_tags))
+        removed, added = old_keys - new_keys, new_keys - old_keys
+        if not removed and not added:
+            return
+        columns = [getattr(ProjectCostRollup, f.name) for f in fields(RollupValues)]
+        rows = self.db.execute(
+            select(ProjectCostRollup.month, ProjectCostRollup.status, *columns)
+            .where(ProjectCostRollup.project_id == project_id)
+        ).all()
+        for month, status, *row in rows:
+            values = RollupValues(*row)
+            for tag in removed:
+                self._apply(CostRollup, {"spec_tag": tag, "month": month, "status": status}, values, sign=-1)
+            for tag in added:
+                self._apply(CostRollup, {"spec_tag": tag, "month": month, "status": status}, values)
+
+    def _apply_summary(self, summary: CostSummary, status: CostSummaryStatus, values: RollupValues, sign: int = 1) -> None:
+        month = rollup_month(summary.calculated_at)
+        project = self.db.get(Project, summary.project_id)
+        self._apply(ProjectCostRollup, {"project_id": summary.project_id, "month": month, "status": status}, values, sign)
+        for tag in rollup_tags(project.spec_tags if project is not None else None):
+            self._apply(CostRollup, {"spec_tag": tag, "month": month, "status": status}, values, sign)
+
+    def _apply(self, model, key: Dict[str, object], values: RollupValues, sign: int = 1) -> None:
+        # UPDATE col = col + delta，没有汇总行时插入
+        result = self.db.execute(
+            update(model)
+            .where(*(getattr(model, name) == value for name, value in key.items()))
+            .values(**{name: getattr(model, name) + sign * delta for name, delta in values.as_row().items()})
+        )
+        if result.rowcount == 0:
+            self.db.execute(insert(model).values(**key, **{name: sign * delta for name, delta in values.as_row().items()}))
+
+    # =========
+    # 查询
+    # =========
+    def query(
+        self,
+        *,
+        group_by: Sequence[str] = ("tag",),
+        tags: Optional[Sequence[str]] = None,
+        month_from: Optional[str] = None,
+        month_to: Optional[str] = None,
+        statuses: Optional[Sequence[CostSummaryStatus]] = (CostSummaryStatus.ACTIVE,),
+    ) -> RollupResult:
+        '''
+        按维度汇总 CostSummary 金额，只读汇总表与 Project（不扫描 CostSummary / item 表）
+
+        - 按标签 / 月份 / 状态汇总读 CostRollup（行数 = 标签数 × 月数 × 状态数）
+        - 按项目下钻、或同时筛选多个标签（项目只计一次）时读 ProjectCostRollup
+
+        :param group_by: ROLLUP_GROUP_BY 中的维度，顺序即结果的排序
+        :param tags: 只统计带有其中任一 spec_tag 的项目；按 tag 分组时只列出这些标签
+        :param month_from: 起始月份（含），YYYY-MM
+        :param month_to: 结束月份（含），YYYY-MM
+        :param statuses: 只统计这些状态的 CostSummary，None 表示全部（默认只统计 ACTIVE）
+        :return: RollupResult
+        :raises ValueError: 未知维度 / 月份格式错误
+        '''
+        group_by = tuple(dict.fromkeys(group_by))
+        unknown = set(group_by) - set(ROLLUP_GROUP_BY)
+        if unknown:
+            raise ValueError(f"Unknown rollup dimension: {', '.join(sorted(unknown))}")
+        month_from, month_to = parse_month(month_from), parse_month(month_to)
+        wanted_tags = [t for t in dict.fromkeys(t.strip() for t in tags or ()) if t] or None
+
+        if "project" in group_by or (wanted_tags is not None and len(wanted_tags) > 1):
+            return self._query_projects(group_by, wanted_tags, month_from, month_to, statuses)
+        return self._query_tags(group_by, wanted_tags[0] if wanted_tags else None, month_from, month_to, statuses)
+
+    def _query_tags(self, group_by, tag, month_from, month_to, statuses) -> RollupResult:
+        dims = [CostRollup.spec_tag]
+        if "month" in group_by:
+            dims.append(CostRollup.month)
+        if "status" in group_by:
+            dims.append(CostRollup.status)
+        query = self._measures_query(CostRollup, dims, month_from, month_to, statuses)
+        if tag is not None:
+            query = query.where(CostRollup.spec_tag == tag)
+        elif "tag" not in group_by:
+            query = query.where(CostRollup.spec_tag == ALL_TAGS)
+
+        total = RollupValues()
+        groups: Dict[tuple, RollupRow] = {}
+        for spec_tag, *row in self.db.execute(query):
+            dim_values = {column.key: value for column, value in zip(dims[1:], row)}
+            values = RollupValues(*(int(v or 0) for v in row[len(dims) - 1:]))
+            if not values.summary_count:
+                continue
+            # 不按标签筛选时，ALL_TAGS 行给出每个 CostSummary 只计一次的合计
+            if tag is not None or spec_tag == ALL_TAGS:
+                total.add(values)
+            if spec_tag == ALL_TAGS and "tag" in group_by:
+                continue
+            dim_values["tag"] = None if spec_tag == UNTAGGED else spec_tag
+            self._add_group(groups, group_by, dim_values, values)
+        return RollupResult(group_by, self._sorted(groups, group_by), total)
+
+    def _query_projects(self, group_by, wanted_tags, month_from, month_to, statuses) -> RollupResult:
+        # 项目表很小：一次读出名称和标签，tag 过滤 / 展开在内存中完成
+        projects = {
+            project_id: (name, list(spec_tags or []))
+            for project_id, name, spec_tags in self.db.execute(select(Project.id, Project.raw_name, Project.spec_tags))
+        }
+        dims = [ProjectCostRollup.project_id]
+        if "month" in group_by:
+            dims.append(ProjectCostRollup.month)
+        if "status" in group_by:
+            dims.append(ProjectCostRollup.status)
+        query = self._measures_query(ProjectCostRollup, dims, month_from, month_to, statuses)
+        if wanted_tags is not None:
+            wanted = set(wanted_tags)
+            query = query.where(ProjectCostRollup.project_id.in_(
+                [pid for pid, (_, spec_tags) in projects.items() if wanted.intersection(spec_tags)]
+            ))
+
+        total = RollupValues()
+        groups: Dict[tuple, RollupRow] = {}
+        for project_id, *row in self.db.execute(query):
+            dim_values = {column.key: value for column, value in zip(dims[1:], row)}
+            values = RollupValues(*(int(v or 0) for v in row[len(dims) - 1:]))
+            if not values.summary_count:
+                continue
+            total.add(values)
+            dim_values["project"] = project_id
+            spec_tags = projects.get(project_id, (None, []))[1]
+            if "tag" in group_by:
+                row_tags = [t for t in spec_tags if wanted_tags is None or t in wanted_tags] or [None]
+            else:
+                row_tags = [None]
+            for tag in row_tags:
+                self._add_group(groups, group_by, {**dim_values, "tag": tag}, values)
+
+        rows = self._sorted(groups, group_by)
+        names = {
+            row.key["project"]: projects.get(row.key["project"], (row.key["project"], []))[0]
+            for row in rows if "project" in row.key
+        }
+        return RollupResult(group_by, rows, total, names)
+
+    def _measures_query(self, model, dims, month_from, month_to, statuses):
+        measures = [func.sum(getattr(model, f.name)) for f in fields(RollupValues)]
+        query = select(*dims, *measures).group_by(*dims)
+        if month_from:
+            query = query.where(model.month >= month_from)
+        if month_to:
+            query = query.where(model.month <= month_to)
+        if statuses is not None:
+            query = query.where(model.status.in_(list(statuses)))
+        return query
+
+    @staticmethod
+    def _add_group(groups: Dict[tuple, RollupRow], group_by, dim_values: Dict[str, object], values: RollupValues) -> None:
+        key = {name: dim_values.get(name) for name in group_by}
+        groups.setdefault(tuple(key.values()), RollupRow(key)).values.add(values)
+
+    @staticmethod
+    def _sorted(groups: Dict[tuple, RollupRow], group_by) -> List[RollupRow]:
+        return sorted(groups.values(), key=lambda r: tuple(_sort_key(r.key[name]) for name in group_by))
+
+    def tags(self) -> List[str]:
+        '''所有项目用到的 spec_tag（筛选下拉框用）'''
+        found = set()
+        for (spec_tags,) in self.db.execute(select(Project.spec_tags)):
+            found.update(t for t in spec_tags or [] if t)
+        return sorted(found)
+
+    # =========
+    # 重建 / 一致性检查
+    # =========
+    def recompute(self) -> Dict[str, Dict[tuple, RollupValues]]:
+        '''
+        从 CostSummary 重新计算两张汇总表（流式读取，金额在 SQL 中换算为整数单位）
+
+        :return: 表名 -> {(spec_tag 或 project_id, month, status): 汇总值}
+        '''
+        project_tags = {
+            project_id: rollup_tags(spec_tags)
+            for project_id, spec_tags in self.db.execute(select(Project.id, Project.spec_tags))
+        }
+        columns = [units_sql(getattr(CostSummary, column)) for column in ROLLUP_MEASURES.values()]
+        rows = self.db.execute(
+            select(CostSummary.project_id, CostSummary.calculated_at, CostSummary.status, *columns)
+            .execution_options(yield_per=_REBUILD_FETCH_SIZE)
+        )
+        by_tag: Dict[tuple, RollupValues] = {}
+        by_project: Dict[tuple, RollupValues] = {}
+        for project_id, calculated_at, status, *units in rows:
+            values = RollupValues(1, *units)
+            month = rollup_month(calculated_at)
+            by_project.setdefault((project_id, month, status), RollupValues()).add(values)
+            for tag in project_tags.get(project_id) or rollup_tags(None):
+                by_tag.setdefault((tag, month, status), RollupValues()).add(values)
+        return {CostRollup.__tablename__: by_tag, ProjectCostRollup.__tablename__: by_project}
+
+    def rebuild(self) -> int:
+        '''
+        清空并从 CostSummary 重建两张汇总表（升级 / 修复用）
+
+        :return: 写入的汇总行数
+        '''
+        actual = self.recompute()
+        written = 0
+        for model, key_column in _ROLLUP_TABLES:
+            rows = actual[model.__tablename__]
+            self.db.execute(delete(model))
+            if rows:
+                self.db.execute(insert(model), [
+                    {key_column: key, "month": month, "status": status, **values.as_row()}
+                    for (key, month, status), values in rows.items()
+                ])
+            written += len(rows)
+        return written
+
+    def check_consistency(self, *, repair: bool = False) -> List[RollupDrift]:
+        '''
+        从 CostSummary 重新计算并与已存储的汇总行比较
+
+        :param repair: 有偏差时重建两张汇总表
+        :return: 偏差列表（空表示一致）
+        '''
+        actual = self.recompute()
+        drifts: List[RollupDrift] = []
+        for model, key_column in _ROLLUP_TABLES:
+            columns = [getattr(model, f.name) for f in fields(RollupValues)]
+            stored = {
+                (key, month, status): RollupValues(*row)
+                for key, month, status, *row in self.db.execute(
+                    select(getattr(model, key_column), model.month, model.status, *columns)
+                )
+            }
+            expected = actual[model.__tablename__]
+            for key in sorted(set(stored) | set(expected), key=lambda k: (k[0], k[1], k[2].value)):
+                before, after = stored.get(key, RollupValues()), expected.get(key, RollupValues())
+                if before != after:
+                    drifts.append(RollupDrift(model.__tablename__, key, before, after))
+
+        if repair and drifts:
+            self.rebuild()
+        return drifts
+
+
+def _sort_key(value) -> tuple:
+    # 未分类标签排在最后；状态按枚举值排序
+    if value is None:
+        return (1, "")
+    if isinstance(value, CostSummaryStatus):
+        return (0, value.value)
+    return (0, value)
@@ -0,0 +1,360 @@
+# app/services/cost_summary_diff_service.py
+"""
+两个 CostSummary（同一项目的两个核价版本）的差异：类别成本变化 + 明细 item 的新增 / 删除 / 变化。
+
+- 参与对比的 item 与核价一致：四个源文件中 is_calculable 的行；
+  多行 bundle 只有锚点行可计算，因此配件 bundle 以锚点行代表整个 bundle
+- 键：材料 / 配件为价格历史的键字段（PRICE_KEY_FIELDS，归一化后比较），人工为班组 + 单位，物流为类型 + 备注；
+  同一文件里同键的多行合并为一条（行数、数量、小计相加）
+- 哈希连接：每类每版本一次 GROUP BY 查询（按键字段的原始写法分组，在 SQL 侧合并重复行），
+  基准版本按归一化键建 dict，目标版本逐键探测，O(n)；
+  数量 / 单价 / 小计在 SQL 侧换算为整数单位再求和，比较是精确的整数比较
+"""
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import BigInteger, cast, func, literal, select
+from sqlalchemy.orm import Session
+
+from app.models.cost_summary import CostSummary
+from app.models.labor_item import LaborItem
+from app.models.logistics_item import LogisticsItem
+from app.models.material_item import MaterialItem
+from app.models.part_item import PartItem
+from app.services.money import from_units, units_sql
+from app.services.validation_rules import PRICE_KEY_FIELDS, normalize_text
+
+# 流式读取 item 的批大小
+DIFF_FETCH_SIZE = 5000
+
+# 变化类型
+ADDED = "added"
+REMOVED = "removed"
+CHANGED = "changed"
+
+
+@dataclass(frozen=True)
+class DiffCategory:
+    '''一个成本类别的对比口径'''
+    category: str
+    model: type
+    # 键字段（字符串字段归一化后比较）
+    key_fields: Tuple[str, ...]
+    # 数量字段，None 表示没有数量 / 单价（物流）
+    quantity_field: Optional[str]
+    # CostSummary 上的源文件 / 类别成本字段
+    file_attr: str
+    cost_attr: str
+
+
+DIFF_CATEGORIES: Tuple[DiffCategory, ...] = (
+    DiffCategory("material", MaterialItem, PRICE_KEY_FIELDS[MaterialItem], "weight_kg",
+                 "material_file_id", "material_cost"),
+    DiffCategory("part", PartItem, PRICE_KEY_FIELDS[PartItem], "quantity",
+                 "part_file_id", "part_cost"),
+    DiffCategory("labor", LaborItem, ("normalized_group", "unit"), "work_quantity",
+                 "labor_file_id", "labor_cost"),
+    DiffCategory("logistics", LogisticsItem, ("type", "description"), None,
+                 "logistics_file_id", "logistics_cost"),
+)
+
+# 归一化为空时回退到原始写法的键字段
+_RAW_FALLBACK = {"normalized_name": "raw_name", "normalized_group": "raw_group"}
+
+
+@dataclass
+class ItemTotals:
+    '''一个版本中同一个键的 item 合计（数量、单价、小计为整数单位）'''
+    # 该键第一行的原始写法（展示用）
+    labels: tuple
+    count: int = 0
+    quantity_units: int = 0
+    subtotal_units: int = 0
+    # 各行单价相同时为该单价；没有单价或单价不一致时为 None（mixed_price 区分两者）
+    unit_price_units: Optional[int] = None
+    mixed_price: bool = False
+
+    def add_group(
+        self,
+        count: int,
+        quantity_units: Optional[int],
+        subtotal_units: Optional[int],
+        min_price_units: Optional[int],
+        max_price_units: Optional[int],
+        priced_count: int,
+    ) -> None:
+        '''
+        并入一组原始写法相同的行（SQL GROUP BY 的一行）
+
+        :param priced_count: 组内单价非空的行数；全部为空或全部相同才算单一单价
+        '''
+        uniform = priced_count == 0 or (priced_count == count and min_price_units == max_price_units)
+        if self.count == 0:
+            self.unit_price_units = min_price_units if uniform else None
+            self.mixed_price = not uniform
+        elif not uniform or min_price_units != self.unit_price_units:
+            self.unit_price_units = None
+            self.mixed_price = True
+        self.count += count
+        self.quantity_units += quantity_units or 0
+        self.subtotal_units += subtotal_units or 0
+
+    def changed_fields(self, other: "ItemTotals") -> List[str]:
+        '''与另一版本同键合计相比变化的字段'''
+        return [
+            name for name, a, b in (
+                ("count", self.count, other.count),
+                ("quantity", self.quantity_units, other.quantity_units),
+                ("unit_price", (self.unit_price_units, self.mixed_price), (other.unit_price_units, other.mixed_price)),
+                ("subtotal", self.subtotal_units, other.subtotal_units),
+            )
+            if a != b
+        ]
+
+    @property
+    def quantity(self) -> Decimal:
+        return from_units(self.quantity_units)
+
+    @property
+    def unit_price(self) -> Optional[Decimal]:
+        return None if self.unit_price_units is None else from_units(self.unit_price_units)
+
+    @property
+    def subtotal(self) -> Decimal:
+        return from_units(self.subtotal_units)
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "quantity": str(self.quantity),
+            "unit_price": None if self.unit_price is None else str(self.unit_price),
+            "mixed_price": self.mixed_price,
+            "subtotal": str(self.subtotal),
+        }
+
+
+@dataclass
+class ItemChange:
+    '''一个键的变化；新增时 before 为 None，删除时 after 为 None'''
+    category: str
+    change: str
+    labels: tuple
+    before: Optional[ItemTotals]
+    after: Optional[ItemTotals]
+    # 变化的字段（仅 changed）
+    fields: List[str] = field(default_factory=list)
+
+    @property
+    def subtotal_delta(self) -> Decimal:
+        before = self.before.subtotal_units if self.before is not None else 0
+        after = self.after.subtotal_units if self.after is not None else 0
+        return from_units(after - before)
+
+    def as_dict(self) -> dict:
+        return {
+            "category": self.category,
+            "change": self.change,
+            # 物流类型是枚举，取其值
+            "labels": [None if v is None else str(getattr(v, "value", v)) for v in self.labels],
+            "fields": self.fields,
+            "before": self.before.as_dict() if self.before is not None else None,
+            "after": self.after.as_dict() if self.after is not None else None,
+            "subtotal_delta": str(self.subtotal_delta),
+        }
+
+
+@dataclass
+class CategoryDiff:
+    '''一个成本类别的差异统计（成本取自 CostSummary 快照）'''
+    category: str
+    base_file_id: str
+    target_file_id: str
+    base_cost: Decimal
+    target_cost: Decimal
+    added: int = 0
+    removed: int = 0
+    changed: int = 0
+    unchanged: int = 0
+
+    @property
+    def delta(self) -> Decimal:
+        return self.target_cost - self.base_cost
+
+    def as_dict(self) -> dict:
+        return {
+            "category": self.category,
+            "base_file_id": self.base_file_id,
+            "target_file_id": self.target_file_id,
+            "base_cost": str(self.base_cost),
+            "target_cost": str(self.target_cost),
+            "delta": str(self.delta),
+            "added": self.added,
+            "removed": self.removed,
+            "changed": self.changed,
+            "unchanged": self.unchanged,
+        }
+
+
+@dataclass
+class CostSummaryDiff:
+    base: CostSummary
+    target: CostSummary
+    categories: List[CategoryDiff]
+    # 按 DIFF_CATEGORIES 顺序；同一类别内先是目标版本的新增 / 变化，再是删除
+    changes: List[ItemChange]
+
+    @property
+    def total_delta(self) -> Decimal:
+        return self.target.total_cost - self.base.total_cost
+
+    def as_dict(self, limit: Optional[int] = None) -> dict:
+        '''
+        JSON 形式
+
+        :param limit: 最多返回的 changes 条数，None 为全部
+        '''
+        changes = self.changes if limit is None else self.changes[:limit]
+        return {
+            "base": {"id": self.base.id, "calculation_version": self.base.calculation_version,
+                     "total_cost": str(self.base.total_cost)},
+            "target": {"id": self.target.id, "calculation_version": self.target.calculation_version,
+                       "total_cost": str(self.target.total_cost)},
+            "total_delta": str(self.total_delta),
+            "categories": [c.as_dict() for c in self.categories],
+            "change_count": len(self.changes),
+            "changes": [c.as_dict() for c in changes],
+        }
+
+
+class CostSummaryDiffService:
+    """
+    Compare two CostSummaries of the same project (read only).
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def resolve(self, project_id: str, target_id: str, base_id: Optional[str] = None) -> Tuple[CostSummary, CostSummary]:
+        '''
+        加载要对比的两个 CostSummary
+
+        :param project_id: 项目ID，两个 summary 都必须属于该项目
+        :param target_id: 目标（新）版本
+        :param base_id: 基准（旧）版本，None 时取目标之前的最近一个 calculation_version
+        :return: (base, target)；不存在或不属于该项目时抛 ValueError
+        '''
+        target = self.db.get(CostSummary, target_id) if target_id else None
+        if target is None or target.project_id != project_id:
+            raise ValueError("成本报告不存在")
+
+        if base_id:
+            base = self.db.get(CostSummary, base_id)
+            if base is None or base.project_id != project_id:
+                raise ValueError("对比的成本报告不存在")
+        else:
+            base = self.db.scalars(
+                select(CostSummary)
+                .where(
+                    CostSummary.project_id == project_id,
+                    CostSummary.calculation_version < target.calculation_version,
+                )
+                .order_by(CostSummary.calculation_version.desc())
+                .limit(1)
+            ).first()
+            if base is None:
+                raise ValueError("没有更早的核价版本可对比")
+        return base, target
+
+    def diff(self, base: CostSummary, target: CostSummary) -> CostSummaryDiff:
+        '''
+        对比两个 CostSummary：每个类别每个版本一次 item 分组查询 + 哈希连接
+
+        :param base: 基准（旧）版本
+        :param target: 目标（新）版本
+        :rtype: CostSummaryDiff
+        '''
+        categories: List[CategoryDiff] = []
+        changes: List[ItemChange] = []
+
+        for spec in DIFF_CATEGORIES:
+            summary = CategoryDiff(
+                category=spec.category,
+                base_file_id=getattr(base, spec.file_attr),
+                target_file_id=getattr(target, spec.file_attr),
+                base_cost=getattr(base, spec.cost_attr),
+                target_cost=getattr(target, spec.cost_attr),
+            )
+            categories.append(summary)
+
+            before = self._load_totals(spec, summary.base_file_id)
+            for key, after in self._load_totals(spec, summary.target_file_id).items():
+                old = before.pop(key, None)
+                if old is None:
+                    summary.added += 1
+                    changes.append(ItemChange(spec.category, ADDED, after.labels, None, after))
+                    continue
+                changed = old.changed_fields(after)
+                if changed:
+                    summary.changed += 1
+                    changes.append(ItemChange(spec.category, CHANGED, after.labels, old, after, changed))
+                else:
+                    summary.unchanged += 1
+            # 目标版本里没有探测到的键即为删除
+            for old in before.values():
+                summary.removed += 1
+                changes.append(ItemChange(spec.category, REMOVED, old.labels, old, None))
+
+        return CostSummaryDiff(base=base, target=target, categories=categories, changes=changes)
+
+    def _load_totals(self, spec: DiffCategory, file_id: str) -> Dict[tuple, ItemTotals]:
+        '''
+        一次 GROUP BY 查询读取文件的可计算 item（按原始写法分组），再按归一化键合并
+
+        :return: 归一化键 -> ItemTotals
+        '''
+        width = len(spec.key_fields)
+        totals: Dict[tuple, ItemTotals] = {}
+        for row in self._iter_groups(spec, file_id):
+            labels = row[:width]
+            key = tuple(normalize_text(v) if isinstance(v, str) else v for v in labels)
+            entry = totals.get(key)
+            if entry is None:
+                entry = totals[key] = ItemTotals(labels=tuple(labels))
+            entry.add_group(*row[width:])
+        return totals
+
+    def _iter_groups(self, spec: DiffCategory, file_id: str) -> Iterator[tuple]:
+        '''
+        按键字段的原始写法分组（同一文件里重复的写法在 SQL 侧合并，减少读取的行数）
+
+        每行为 (*键字段, 行数, 数量合计, 小计合计, 最低单价, 最高单价, 单价非空行数)，金额为整数单位
+        '''
+        model = spec.model
+        key_columns = []
+        for name in spec.key_fields:
+            column = getattr(model, name)
+            if name in _RAW_FALLBACK:
+                column = func.coalesce(column, getattr(model, _RAW_FALLBACK[name]))
+            key_columns.append(column)
+        if spec.quantity_field is None:
+            quantity = price = literal(None, type_=BigInteger)
+        else:
+            quantity = units_sql(getattr(model, spec.quantity_field))
+            price = units_sql(model.unit_price)
+        statement = (
+            select(
+                *key_columns,
+                func.count(),
+                # PostgreSQL 的 SUM(bigint) 返回 numeric，转回整数单位
+                cast(func.sum(quantity), BigInteger),
+                cast(func.sum(units_sql(model.subtotal)), BigInteger),
+                func.min(price),
+                func.max(price),
+                func.count(price),
+            )
+            .where(model.source_file_id == file_id, model.is_calculable.is_(True))
+            .group_by(*key_columns)
+        )
+        for row in self.db.execute(statement.execution_options(yield_per=DIFF_FETCH_SIZE)):
+            yield tuple(row)
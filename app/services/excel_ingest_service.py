@@ -2,6 +2,7 @@
 from typing import List, Type
 import pandas as pd
 from uuid import uuid4
+from sqlalchemy import insert, inspect
 from sqlalchemy.orm import Session
 import math
 import pandas as pd
@@ -19,6 +20,7 @@ from app.db.enums import CostItemStatus, LogisticsType, NameDomain
 from app.services.audit_log_service import AuditLogService
 from app.services.name_normalization_service import NameNormalizationService
 from app.services.file_record_service import FileRecordService
+from app.services.file_aggregate_service import FileAggregateService
 
 class ExcelIngestService:
     """
@@ -29,6 +31,7 @@ class ExcelIngestService:
     - Check column structure
     - Create Item records with raw data
     - Update FileRecord.parse_status
+    - Build the FileCostAggregate row of the parsed file
     """
 
     def __init__(
@@ -42,6 +45,7 @@ class ExcelIngestService:
         self.audit_log_service = audit_log_service
         self.name_normalization_service = name_normalization_service
         self.file_service = file_service
+        self.aggregates = FileAggregateService(db)
 
     def ingest(self, file_record: FileRecord) -> None:
         """
@@ -101,6 +105,9 @@ class ExcelIngestService:
             else:
                 raise ValueError(f"Unsupported file_type: {file_record.file_type}")
 
+            # 同一事务内建立聚合行（items 已 flush）
+            self.aggregates.rebuild([file_record.id])
+
             file_record.parse_status = ParseStatus.parsed
 
             self.audit_log_service.record_system_update(
@@ -154,6 +161,27 @@ class ExcelIngestService:
         if missing:
             raise ValueError(f"Missing required columns: {missing}")
         
+    def _insert_items(self, items: list) -> None:
+        '''
+        写入解析出的 items（替代逐个对象 add_all + flush）
+
+        items 写入后不再通过 ORM 对象使用，不必进入 Session 的 identity map；
+        ORM bulk INSERT 在 PostgreSQL 上合并为多行 INSERT ... VALUES（每批 1000 行），
+        SQLite 上为 executemany。Excel 行顺序记到 row_no，读取时按 file_order() 排序
+        （bundle 锚点、明细页、报告依赖这个顺序，不依赖物理插入顺序）
+
+        :param items: 同一模型的未持久化 item 对象，按 Excel 行顺序
+        '''
+        if not items:
+            return
+        model = type(items[0])
+        columns = {attr.key for attr in inspect(model).column_attrs}
+        rows = [
+            {**{key: value for key, value in vars(item).items() if key in columns}, "row_no": row_no}
+            for row_no, item in enumerate(items)
+        ]
+        self.db.execute(insert(model), rows)
+
     def _parse_material_items(self, file_record: FileRecord, df: pd.DataFrame) -> None:
         '''
         解析材料成本Excel，生成MaterialItem记录
@@ -192,8 +220,7 @@ class ExcelIngestService:
             curmaterial_grade = row.get("材质") if pd.notna(row.get("材质")) else curmaterial_grade
             
         logger.info(f"[material] df rows={len(df)} parsed={len(items)} file_id={file_record.id}")
-        self.db.add_all(items)
-        self.db.flush()
+        self._insert_items(items)
         logger.info("[material] flushed")
         
     def _parse_part_items(self, file_record: FileRecord, df: pd.DataFrame) -> None:
@@ -287,8 +314,7 @@ class ExcelIngestService:
 
             items.append(item)
 
-        self.db.add_all(items)
-        self.db.flush()
+        self._insert_items(items)
 
     def _parse_labor_items(self, file_record: FileRecord, df: pd.DataFrame) -> None:
         '''
@@ -321,8 +347,7 @@ class ExcelIngestService:
             )
             items.append(item)
             cur_name = row.get("班组（外协单位）") if pd.notna(row.get("班组（外协单位）")) else cur_name
-        self.db.add_all(items)
-        self.db.flush()
+        self._insert_items(items)
         
     def _parse_logistics_items(self, file_record: FileRecord, df: pd.DataFrame) -> None:
         '''
@@ -363,8 +388,7 @@ class ExcelIngestService:
             )
             items.append(item)
 
-        self.db.add_all(items)
-        self.db.flush()
+        self._insert_items(items)
 
 
     def parse_manual_logistics_item(self,
@@ -0,0 +1,298 @@
+# app/services/file_aggregate_service.py
+from dataclasses import dataclass, fields
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, insert, select, union_all, update
+from sqlalchemy.orm import Session
+
+from app.db.enums import CostItemStatus
+from app.models.file_cost_aggregate import FileCostAggregate
+from app.models.file_record import FileRecord
+from app.models.material_item import MaterialItem
+from app.models.part_item import PartItem
+from app.models.labor_item import LaborItem
+from app.models.logistics_item import LogisticsItem
+from app.services.money import from_units, to_units, units_sql
+
+# 一个 FileRecord 的 items 只会落在其中一张表里（manual 文件可能是任意一张）
+ITEM_MODELS = (MaterialItem, PartItem, LaborItem, LogisticsItem)
+
+# CostItemStatus -> FileCostAggregate 计数列
+STATUS_COUNT_COLUMNS = {
+    CostItemStatus.ok: "ok_count",
+    CostItemStatus.warning: "warning_count",
+    CostItemStatus.confirmed: "confirmed_count",
+    CostItemStatus.blocked: "blocked_count",
+}
+
+# IN 查询每批的 file_id 数量上限（SQLite 绑定变量限制）
+_ID_CHUNK = 500
+
+
+@dataclass
+class FileAggregateValues:
+    '''一个 FileRecord 的聚合值（FileCostAggregate 的纯数据形式），金额为整数单位'''
+    calculable_subtotal_units: int = 0
+    calculable_count: int = 0
+    item_count: int = 0
+    ok_count: int = 0
+    warning_count: int = 0
+    confirmed_count: int = 0
+    blocked_count: int = 0
+
+    def as_row(self) -> Dict[str, object]:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+    @property
+    def calculable_subtotal(self) -> Decimal:
+        '''可计算小计（Decimal，5 位小数）'''
+        return from_units(self.calculable_subtotal_units)
+
+
+@dataclass
+class AggregateDrift:
+    '''一致性检查发现的偏差：stored 为 FileCostAggregate 中的值，actual 为从 items 重新计算的值'''
+    file_id: str
+    project_id: str
+    stored: FileAggregateValues
+    actual: FileAggregateValues
+    # 不一致的字段名
+    fields: List[str]
+
+
+def calculable_totals(items: Iterable, non_calculable: Iterable[str] = ()) -> Tuple[int, int]:
+    '''
+    从内存中的 items 计算可计算小计之和与可计算条数
+
+    :param items: 同一 FileRecord 下的 items
+    :param non_calculable: 即将被置为 is_calculable=False 的 item id（尚未写回）
+    :return: (subtotal 总和（整数单位）, 可计算条数)
+    '''
+    excluded = set(non_calculable)
+    subtotal_units = 0
+    count = 0
+    for item in items:
+        if not item.is_calculable or item.id in excluded:
+            continue
+        count += 1
+        subtotal_units += to_units(item.subtotal)
+    return subtotal_units, count
+
+
+class FileAggregateService:
+    """
+    Maintain FileCostAggregate rows.
+
+    Responsibilities:
+    - Store absolute values after ingest / validation (full pass over the items)
+    - Apply deltas for single item edits / confirmations
+    - O(1) lookup for cost calculation, rebuilding missing rows on demand
+    - Recompute from scratch and report drift (consistency check)
+
+    All writes use Core statements in the caller's session, so they commit
+    or roll back together with the item changes.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # =========
+    # 写入
+    # =========
+    def store(self, file_id: str, project_id: str, values: FileAggregateValues) -> None:
+        '''
+        用绝对值覆盖（或新建）一个文件的聚合行，revision +1
+
+        :param file_id: FileRecord ID
+        :param project_id: 项目ID
+        :param values: 聚合值
+        '''
+        row = values.as_row()
+        result = self.db.execute(
+            update(FileCostAggregate)
+            .where(FileCostAggregate.file_id == file_id)
+            .values(project_id=project_id, revision=FileCostAggregate.revision + 1, **row)
+        )
+        if result.rowcount == 0:
+            self.db.execute(insert(FileCostAggregate).values(file_id=file_id, project_id=project_id, **row))
+
+    def apply_delta(
+        self,
+        file_id: str,
+        *,
+        subtotal_units: int = 0,
+        status_from: Optional[CostItemStatus] = None,
+        status_to: Optional[CostItemStatus] = None,
+    ) -> None:
+        '''
+        增量更新一个文件的聚合行（UPDATE col = col + delta），有变化时 revision +1
+
+        没有聚合行时什么也不做：下次读取时会从 items 重建，结果同样正确
+
+        :param file_id: FileRecord ID
+        :param subtotal_units: 可计算小计的变化量（整数单位，见 money.to_units）
+        :param status_from: 单个 item 的旧状态
+        :param status_to: 单个 item 的新状态
+        '''
+        changes = {}
+        if subtotal_units:
+            changes["calculable_subtotal_units"] = FileCostAggregate.calculable_subtotal_units + subtotal_units
+        if status_from != status_to:
+            if status_from is not None:
+                column = STATUS_COUNT_COLUMNS[status_from]
+                changes[column] = getattr(FileCostAggregate, column) - 1
+            if status_to is not None:
+                column = STATUS_COUNT_COLUMNS[status_to]
+                changes[column] = getattr(FileCostAggregate, column) + 1
+        if not changes:
+            return
+        changes["revision"] = FileCostAggregate.revision + 1
+        self.db.execute(
+            update(FileCostAggregate)
+            .where(FileCostAggregate.file_id == file_id)
+            .values(**changes)
+        )
+
+    def rebuild(self, file_ids: Sequence[str]) -> Dict[str, FileAggregateValues]:
+        '''
+        从 items 重新计算并写入聚合行（ingest 之后、或聚合行缺失时）
+
+        :param file_ids: FileRecord ID 列表
+        :return: file_id -> 重新计算的聚合值
+        '''
+        actual = self.recompute(file_ids)
+        projects = self._project_ids(file_ids)
+        for file_id, values in actual.items():
+            if file_id in projects:
+                self.store(file_id, projects[file_id], values)
+        return actual
+
+    # =========
+    # 读取
+    # =========
+    def get_many(self, file_ids: Sequence[str], rebuild_missing: bool = True) -> Dict[str, FileAggregateValues]:
+        '''
+        一次查询读取多个文件的聚合值，缺失的聚合行从 items 重建
+
+        :param file_ids: FileRecord ID 列表
+        :param rebuild_missing: 是否把重建的聚合行写回；只读场景传 False，只计算不写库
+        :return: file_id -> FileAggregateValues
+        '''
+        stored = self._load_stored(file_ids)
+        missing = [file_id for file_id in dict.fromkeys(file_ids) if file_id not in stored]
+        if missing:
+            stored.update(self.rebuild(missing) if rebuild_missing else self.recompute(missing))
+        return {file_id: stored[file_id] for file_id in file_ids}
+
+    def get_subtotal(self, file_id: str) -> Decimal:
+        '''
+        某文件可计算 item 的 subtotal 总和（读聚合行）
+
+        :param file_id: FileRecord ID
+        '''
+        return self.get_many([file_id])[file_id].calculable_subtotal
+
+    # =========
+    # 一致性检查
+    # =========
+    def recompute(self, file_ids: Sequence[str]) -> Dict[str, FileAggregateValues]:
+        '''
+        从 items 重新计算聚合值（不写库）。四张 item 表按
+        (source_file_id, status, is_calculable) 分组，一条 UNION ALL 语句完成；
+        小计逐行换算为整数单位后再 SUM，结果精确（不经过浮点累加）
+
+        :param file_ids: FileRecord ID 列表
+        :return: file_id -> FileAggregateValues（没有 item 的文件为全 0）
+        '''
+        # 读取尚未 flush 的 item 修改（session autoflush=False）
+        self.db.flush()
+        ids = list(dict.fromkeys(file_ids))
+        values = {file_id: FileAggregateValues() for file_id in ids}
+        for i in range(0, len(ids), _ID_CHUNK):
+            chunk = ids[i:i + _ID_CHUNK]
+            branches = [
+                select(
+                    model.source_file_id,
+                    model.status,
+                    model.is_calculable,
+                    func.count().label("n"),
+                    func.sum(units_sql(model.subtotal)).label("subtotal_units"),
+                )
+                .where(model.source_file_id.in_(chunk))
+                .group_by(model.source_file_id, model.status, model.is_calculable)
+                for model in ITEM_MODELS
+            ]
+            for file_id, status, is_calculable, n, subtotal_units in self.db.execute(union_all(*branches)):
+                v = values[file_id]
+                status = status if isinstance(status, CostItemStatus) else CostItemStatus[status]
+                v.item_count += n
+                column = STATUS_COUNT_COLUMNS[status]
+                setattr(v, column, getattr(v, column) + n)
+                if is_calculable:
+                    v.calculable_count += n
+                    if subtotal_units is not None:
+                        # PostgreSQL 的 SUM(bigint) 返回 numeric
+                        v.calculable_subtotal_units += int(subtotal_units)
+        return values
+
+    def check_consistency(
+        self,
+        *,
+        project_id: Optional[str] = None,
+        repair: bool = False,
+    ) -> List[AggregateDrift]:
+        '''
+        从头重新计算已存储的聚合行并报告偏差
+
+        :param project_id: 只检查该项目，None 检查全部
+        :param repair: 是否用重新计算的值覆盖有偏差的聚合行
+        :return: 偏差列表（空表示一致）
+        '''
+        columns = [getattr(FileCostAggregate, f.name) for f in fields(FileAggregateValues)]
+        query = select(FileCostAggregate.file_id, FileCostAggregate.project_id, *columns)
+        if project_id is not None:
+            query = query.where(FileCostAggregate.project_id == project_id)
+        rows = self.db.execute(query.order_by(FileCostAggregate.file_id)).all()
+
+        drifts: List[AggregateDrift] = []
+        for i in range(0, len(rows), _ID_CHUNK):
+            chunk = rows[i:i + _ID_CHUNK]
+            actual = self.recompute([row[0] for row in chunk])
+            for file_id, row_project_id, *row in chunk:
+                stored = FileAggregateValues(*row)
+                expected = actual[file_id]
+                diff = [f.name for f in fields(FileAggregateValues) if getattr(stored, f.name) != getattr(expected, f.name)]
+                if diff:
+                    drifts.append(AggregateDrift(file_id, row_project_id, stored, expected, diff))
+
+        if repair:
+            for drift in drifts:
+                self.store(drift.file_id, drift.project_id, drift.actual)
+        return drifts
+
+    # =========
+    # 内部工具
+    # =========
+    def _load_stored(self, file_ids: Sequence[str]) -> Dict[str, FileAggregateValues]:
+        # 用列查询而不是 ORM 实体：Core UPDATE 之后 identity map 里的实体可能是旧值
+        columns = [getattr(FileCostAggregate, f.name) for f in fields(FileAggregateValues)]
+        ids = list(dict.fromkeys(file_ids))
+        stored: Dict[str, FileAggregateValues] = {}
+        for i in range(0, len(ids), _ID_CHUNK):
+            rows = self.db.execute(
+                select(FileCostAggregate.file_id, *columns)
+                .where(FileCostAggregate.file_id.in_(ids[i:i + _ID_CHUNK]))
+            )
+            for file_id, *row in rows:
+                stored[file_id] = FileAggregateValues(*row)
+        return stored
+
+    def _project_ids(self, file_ids: Sequence[str]) -> Dict[str, str]:
+        ids = list(dict.fromkeys(file_ids))
+        projects: Dict[str, str] = {}
+        for i in range(0, len(ids), _ID_CHUNK):
+            projects.update(self.db.execute(
+                select(FileRecord.id, FileRecord.project_id).where(FileRecord.id.in_(ids[i:i + _ID_CHUNK]))
+            ).all())
+        return projects
@@ -8,6 +8,8 @@ from app.models.labor_item import LaborItem
 from app.models.logistics_item import LogisticsItem
 from app.db.enums import CostItemStatus,FileType
 from app.services.audit_log_service import AuditLogService
+from app.services.file_aggregate_service import FileAggregateService
+from app.services.money import to_units
 from app.services.validation_service import ValidationReport, ValidationService
 class ItemEditService:
     """
@@ -18,6 +20,7 @@ class ItemEditService:
     - Record audit logs
     - Trigger re-validation
     - Perform warning -> confirmed transitions (human only)
+    - Keep FileCostAggregate in step with subtotal / status changes
     """
     def __init__(
         self,
@@ -28,6 +31,7 @@ class ItemEditService:
         self.db = db
         self.audit_log_service = audit_log_service
         self.validation_service = validation_service
+        self.aggregates = FileAggregateService(db)
         
     def _load_item(self, item_type: str, item_id: str) -> MaterialItem | PartItem | LaborItem | LogisticsItem:
         model_map = {
@@ -81,6 +85,7 @@ class ItemEditService:
         allowed_fields,validation_trigger_fields= self._allowed_edit_fields(item)
         
         need_validate = False#是否有任何修改，是否需要重新校验
+        subtotal_delta = 0#可计算item的小计变化量（整数单位），增量更新FileCostAggregate
 
         for field, new_value in updates.items():
             if field not in allowed_fields:
@@ -92,6 +97,8 @@ class ItemEditService:
                 continue
             if field in validation_trigger_fields:
                 need_validate = True
+            if field == "subtotal" and item.is_calculable:
+                subtotal_delta += to_units(new_value) - to_units(old_value)
             #赋新值
             setattr(item, field, new_value)
             self.audit_log_service.record_update(
@@ -105,6 +112,7 @@ class ItemEditService:
             )
         #保存修改
         self.db.flush() 
+        self.aggregates.apply_delta(file_record.id, subtotal_units=subtotal_delta)
         
         if auto_validate and need_validate:
             self.validation_service.validate_file(file_record)
@@ -201,6 +209,7 @@ class ItemEditService:
             operator_id=operator_id,
         )
         self.db.flush()
+        self.aggregates.apply_delta(file_record.id, status_from=old_status, status_to=item.status)
 
         # 确认后，重新聚合 FileRecord 状态
         if auto_validate:
@@ -252,7 +261,7 @@ class ItemEditService:
         self.db.flush()
         return validation_report
  
-        
+
     def _allowed_edit_fields(self, item) -> tuple[set[str], set[str]]:
         '''
         获取指定item类型允许编辑的字段列表和触发校验的字段列表
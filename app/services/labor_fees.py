@@ -0,0 +1,105 @@
+# app/services/labor_fees.py
+"""
+人工（加工费）派生金额的统一计算：加工费、吨位奖金。
+
+单价按"每吨"计价：单位为"吨"时数量即吨数；其它单位按 kg 计，先乘 0.001 折算为吨。
+- 加工费   = 数量 × 单价 × 折算系数
+- 吨位奖金 = 数量 × TON_BONUS_PER_TON × 折算系数
+
+两种形式共用同一张系数表，结果一致：
+- labor_fee_columns：整数单位列（app.services.money），报告等批量场景按列计算；
+  数量、单价按 MONEY_SCALE 位小数（与列精度一致）换算为整数后精确相乘，只在最后四舍五入一次，
+  与 labor_fees 的结果经 to_units 量化后逐行相同；money_values 转为 Decimal 写出
+- labor_fees：单行 Decimal（精确），校验规则 / 单条编辑等场景
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.money import MONEY_FACTOR, from_units, to_units
+
+TON_UNIT = "吨"
+
+# 每吨吨位奖金
+TON_BONUS_PER_TON = Decimal("5")
+
+# 单位 -> 折算为吨的系数；未列出的单位按 kg 处理
+UNIT_TON_FACTOR = {TON_UNIT: Decimal("1")}
+DEFAULT_TON_FACTOR = Decimal("0.001")
+
+
+@dataclass
+class LaborFeeColumns:
+    '''按行对齐的派生金额列（整数单位，object 数组：Python int 不会溢出）'''
+    processing_fee: np.ndarray
+    ton_bonus: np.ndarray
+
+
+def ton_factor(unit: Optional[str]) -> Decimal:
+    return UNIT_TON_FACTOR.get(unit, DEFAULT_TON_FACTOR)
+
+
+def labor_fees(work_quantity: Any, unit: Optional[str], unit_price: Any) -> Tuple[Decimal, Decimal]:
+    '''
+    单行的加工费和吨位奖金（Decimal，缺失值按 0）
+
+    :return: (processing_fee, ton_bonus)
+    '''
+    factor = ton_factor(unit)
+    quantity = _to_decimal(work_quantity) * factor
+    return quantity * _to_decimal(unit_price), quantity * TON_BONUS_PER_TON
+
+
+def labor_fee_columns(
+    work_quantity: Sequence[Any],
+    unit: Sequence[Optional[str]],
+    unit_price: Sequence[Any],
+) -> LaborFeeColumns:
+    '''
+    一批行的加工费和吨位奖金（整数单位列，缺失值按 0）
+
+    加工费（单位）= 数量单位 × 单价单位 × 系数分子 / (MONEY_FACTOR × 系数分母)，四舍五入（ROUND_HALF_UP）
+
+    :param work_quantity: 数量列
+    :param unit: 单位列
+    :param unit_price: 单价列
+    '''
+    quantity = _to_units_array(work_quantity)
+    price = _to_units_array(unit_price)
+    units = np.asarray(unit, dtype=object)
+    numerator, denominator = DEFAULT_TON_FACTOR.as_integer_ratio()
+    numerators = np.full(len(units), numerator, dtype=object)
+    denominators = np.full(len(units), denominator, dtype=object)
+    for name, value in UNIT_TON_FACTOR.items():
+        numerators[units == name], denominators[units == name] = value.as_integer_ratio()
+    tons = quantity * numerators
+    divisor = denominators * MONEY_FACTOR
+    return LaborFeeColumns(
+        processing_fee=_divide_half_up(tons * price, divisor),
+        ton_bonus=_divide_half_up(tons * to_units(TON_BONUS_PER_TON), divisor),
+    )
+
+
+def money_values(column: np.ndarray) -> List[Decimal]:
+    '''整数单位列 -> Decimal 列表（固定 MONEY_SCALE 位小数）'''
+    return [from_units(units) for units in column.tolist()]
+
+
+def _div_half_up(n: int, d: int) -> int:
+    # 与 to_units 相同的 ROUND_HALF_UP：.5 远离 0
+    q, r = divmod(abs(n), d)
+    q += 2 * r >= d
+    return q if n >= 0 else -q
+
+
+_divide_half_up = np.frompyfunc(_div_half_up, 2, 1)
+
+
+def _to_decimal(v) -> Decimal:
+    return v if isinstance(v, Decimal) else Decimal(str(v)) if v is not None else Decimal(0)
+
+
+def _to_units_array(values: Sequence[Any]) -> np.ndarray:
+    return np.fromiter((to_units(v) for v in values), dtype=object, count=len(values))
@@ -0,0 +1,49 @@
+# app/services/money.py
+"""
+金额的定点整数表示：按金额列的精度（Numeric(*, 5)）放大为 64 位整数"单位"。
+
+- 1 元 = 10^MONEY_SCALE 个单位，单位之间的加减、比较都是精确的整数运算
+- SQL 侧先把每行换算为整数再 SUM（units_sql），避免 SQLite 用浮点累加 REAL 列
+- 只在边界上与 Decimal 互转：to_units（读入）/ from_units（写出、展示）
+"""
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any
+
+from sqlalchemy import BigInteger, cast, func
+from sqlalchemy.sql.elements import ColumnElement
+
+# 与金额列 Numeric(14, 5) / Numeric(18, 5) 的小数位一致
+MONEY_SCALE = 5
+MONEY_FACTOR = 10 ** MONEY_SCALE
+
+_QUANT = Decimal(1)
+
+
+def to_units(value: Any) -> int:
+    '''
+    金额 -> 整数单位（超出列精度的部分四舍五入；None / "" 按 0）
+
+    :param value: Decimal / int / float / str
+    '''
+    if value is None or value == "":
+        return 0
+    if isinstance(value, int):
+        return value * MONEY_FACTOR
+    if not isinstance(value, Decimal):
+        # float 先转成 str，取其最短十进制表示，与 Decimal(str(v)) 的旧写法一致
+        value = Decimal(str(value))
+    return int(value.scaleb(MONEY_SCALE).quantize(_QUANT, rounding=ROUND_HALF_UP))
+
+
+def from_units(units: int) -> Decimal:
+    '''整数单位 -> Decimal（固定 MONEY_SCALE 位小数）'''
+    return Decimal(int(units)).scaleb(-MONEY_SCALE)
+
+
+def units_sql(column) -> ColumnElement:
+    '''
+    SQL 表达式：金额列换算为整数单位，可直接 SUM
+
+    SQLite 中 Numeric 列按 REAL 存储，ROUND 消去 x * 10^5 的浮点误差后再转整数
+    '''
+    return cast(func.round(column * MONEY_FACTOR), BigInteger)
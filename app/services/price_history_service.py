@@ -0,0 +1,364 @@
+# app/services/price_history_service.py
+"""
+跨项目单价历史索引（PriceSeries）。
+
+- 键：item 类型 + 归一化的 (normalized_name, spec, material_grade)；配件没有材质，为 (normalized_name, spec)
+- 值：按时间排序的 (observed_at, unit_price) 点序列，打包为 int64 数组存一行
+  （observed_at 为文件上传时间，unit_price 为 money 整数单位）
+- 数据来源：已锁定（参与过核价）文件中状态为 ok / confirmed 的 item
+- 增量：文件被锁定时（generate_cost_summary）调用 index_files，只追加新文件的点；
+  已索引的文件记录在 PriceIndexedFile 中，重复调用不会重复计入
+- 查询：stats 读取一行并在内存中切片求分位数，不扫描 item 表
+- 价格区间（PriceBand）：每次追加点时按该键最近 BAND_MAX_POINTS 个点重新计算
+  中位数 ± k·MAD，供 PRICE_OUT_OF_BAND 校验规则按键查找
+"""
+import calendar
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.db.enums import CostItemStatus
+from app.models.file_record import FileRecord
+from app.models.material_item import MaterialItem
+from app.models.price_series import PriceBand, PriceIndexedFile, PriceSeries
+from app.services.money import from_units, to_units
+from app.services.validation_rules import PRICE_KEY_FIELDS, normalize_text
+
+# 参与索引的 item 模型 -> 键字段（缺少的字段按空处理），与价格区间规则共用
+INDEXED_MODELS = PRICE_KEY_FIELDS
+
+# 只有这些状态的 item 进入价格历史
+INDEXED_STATUSES = (CostItemStatus.ok, CostItemStatus.confirmed)
+
+# 一个点：(observed_at 秒, unit_price 整数单位)，小端 int64
+POINT_DTYPE = np.dtype([("t", "<i8"), ("price", "<i8")])
+
+DEFAULT_MONTHS = 12
+
+# =========
+# 价格区间：median ± max(PRICE_BAND_K · MAD_SCALE · MAD, BAND_MIN_RELATIVE_WIDTH · median)
+# =========
+# 稳健 z 分数阈值
+PRICE_BAND_K = 3.5
+# MAD -> 正态分布标准差的一致性系数
+MAD_SCALE = 1.4826
+# 区间半宽的下限（相对中位数），历史价格完全相同时 MAD 为 0
+BAND_MIN_RELATIVE_WIDTH = 0.05
+# 少于这么多点不建立区间
+BAND_MIN_POINTS = 5
+# 只用最近的这么多点（序列按时间排序，取末尾），使区间跟随价格变化
+BAND_MAX_POINTS = 200
+
+_KEY_SEP = "\x1f"
+
+# IN 查询每批的数量上限（SQLite 绑定变量限制）
+_ID_CHUNK = 500
+
+
+@dataclass
+class PriceStats:
+    '''一个键在时间窗口内的单价统计'''
+    count: int
+    median: Decimal
+    p90: Decimal
+    min: Decimal
+    max: Decimal
+    first_observed_at: datetime
+    last_observed_at: datetime
+
+
+@dataclass
+class PriceBandBounds:
+    '''一个键的价格区间（Decimal，供校验规则直接与 unit_price 比较）'''
+    lower: Decimal
+    upper: Decimal
+    median: Decimal
+    point_count: int
+
+
+def price_key(name: Optional[str], spec: Optional[str] = None, material_grade: Optional[str] = None) -> str:
+    '''
+    归一化的价格键：NFKC、折叠空白、忽略大小写（与重复行指纹相同的规则）
+
+    :param name: normalized_name
+    :param spec: 规格
+    :param material_grade: 材质
+    '''
+    return _KEY_SEP.join(normalize_text(v) or "" if v else "" for v in (name, spec, material_grade))
+
+
+def encode_points(points: np.ndarray) -> bytes:
+    return np.ascontiguousarray(points, dtype=POINT_DTYPE).tobytes()
+
+
+def decode_points(blob: Optional[bytes]) -> np.ndarray:
+    return np.frombuffer(blob or b"", dtype=POINT_DTYPE)
+
+
+def compute_band(points: np.ndarray) -> Optional[Dict[str, int]]:
+    '''
+    由价格序列计算区间（整数单位）；点数不足 BAND_MIN_POINTS 时为 None
+
+    :return: PriceBand 的列值
+    '''
+    prices = points["price"][-BAND_MAX_POINTS:]
+    if len(prices) < BAND_MIN_POINTS:
+        return None
+    median = float(np.median(prices))
+    mad = float(np.median(np.abs(prices - median)))
+    half_width = max(PRICE_BAND_K * MAD_SCALE * mad, BAND_MIN_RELATIVE_WIDTH * abs(median))
+    return {
+        "point_count": len(prices),
+        "median_units": round(median),
+        "mad_units": round(mad),
+        "lower_units": round(median - half_width),
+        "upper_units": round(median + half_width),
+    }
+
+
+def _epoch(dt: datetime) -> int:
+    # SQLite 的 func.now() 返回不带时区的 UTC 时间
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def _months_ago(now: datetime, months: int) -> datetime:
+    '''日历意义上的 N 个月前（月末对齐：3/31 的 1 个月前是 2/28 或 2/29）'''
+    index = now.year * 12 + now.month - 1 - months
+    year, month = divmod(index, 12)
+    month += 1
+    return now.replace(year=year, month=month, day=min(now.day, calendar.monthrange(year, month)[1]))
+
+
+class PriceHistoryService:
+    """
+    Maintain and query PriceSeries.
+
+    Writes use the caller's session and commit together with the change that
+    locked the files.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # =========
+    # 写入
+    # =========
+    def index_files(self, file_ids: Sequence[str]) -> int:
+        '''
+        把已锁定文件的 ok / confirmed item 单价追加到价格历史（增量，幂等）
+
+        未锁定、已索引过的文件会被跳过
+
+        :param file_ids: FileRecord ID 列表
+        :return: 新增的点数
+        '''
+        # 读取调用方尚未 flush 的 locked 标记（session autoflush=False）
+        self.db.flush()
+        ids = list(dict.fromkeys(file_ids))
+        indexed = set()
+        files: Dict[str, datetime] = {}
+        for i in range(0, len(ids), _ID_CHUNK):
+            chunk = ids[i:i + _ID_CHUNK]
+            indexed.update(self.db.scalars(select(PriceIndexedFile.file_id).where(PriceIndexedFile.file_id.in_(chunk))))
+            files.update(self.db.execute(
+                select(FileRecord.id, FileRecord.created_at)
+                .where(FileRecord.id.in_(chunk), FileRecord.locked.is_(True))
+            ).all())
+        pending = [file_id for file_id in ids if file_id in files and file_id not in indexed]
+        if not pending:
+            return 0
+
+        # (item_type, price_key) -> 新点；同时记录首次出现的原始写法和每个文件贡献的点数
+        new_points: Dict[Tuple[str, str], List[Tuple[int, int]]] = defaultdict(list)
+        labels: Dict[Tuple[str, str], Tuple[Optional[str], ...]] = {}
+        per_file: Dict[str, int] = dict.fromkeys(pending, 0)
+        for model, key_fields in INDEXED_MODELS.items():
+            columns = [getattr(model, name) for name in key_fields]
+            for i in range(0, len(pending), _ID_CHUNK):
+                rows = self.db.execute(
+                    select(model.source_file_id, model.unit_price, *columns)
+                    .where(
+                        model.source_file_id.in_(pending[i:i + _ID_CHUNK]),
+                        model.status.in_(INDEXED_STATUSES),
+                        model.unit_price.is_not(None),
+                    )
+                )
+                for file_id, unit_price, *label in rows:
+                    key = (model.__name__, price_key(*label))
+                    new_points[key].append((_epoch(files[file_id]), to_units(unit_price)))
+                    labels.setdefault(key, tuple(label))
+                    per_file[file_id] += 1
+
+        added = self._merge(new_points, labels)
+        self.db.add_all(PriceIndexedFile(file_id=file_id, point_count=n) for file_id, n in per_file.items())
+        self.db.flush()
+        return added
+
+    def rebuild(self) -> int:
+        '''
+        清空并从全部已锁定文件重新建立价格历史
+
+        :return: 点数
+        '''
+        self.db.execute(delete(PriceSeries))
+        self.db.execute(delete(PriceBand))
+        self.db.execute(delete(PriceIndexedFile))
+        file_ids = self.db.scalars(
+            select(FileRecord.id).where(FileRecord.locked.is_(True)).order_by(FileRecord.created_at)
+        ).all()
+        return self.index_files(file_ids)
+
+    # =========
+    # 查询
+    # =========
+    def series(
+        self,
+        name: Optional[str],
+        spec: Optional[str] = None,
+        material_grade: Optional[str] = None,
+        *,
+        item_type: str = MaterialItem.__name__,
+    ) -> np.ndarray:
+        '''
+        一个键的完整价格序列（POINT_DTYPE 数组，按时间排序；没有历史时为空数组）
+        '''
+        blob = self.db.scalar(
+            select(PriceSeries.points)
+            .where(PriceSeries.item_type == item_type, PriceSeries.price_key == price_key(name, spec, material_grade))
+        )
+        return decode_points(blob)
+
+    def stats(
+        self,
+        name: Optional[str],
+        spec: Optional[str] = None,
+        material_grade: Optional[str] = None,
+        *,
+        months: Optional[int] = DEFAULT_MONTHS,
+        now: Optional[datetime] = None,
+        item_type: str = MaterialItem.__name__,
+    ) -> Optional[PriceStats]:
+        '''
+        最近 N 个月的单价中位数 / p90 / 最小 / 最大
+
+        :param name: normalized_name
+        :param spec: 规格
+        :param material_grade: 材质
+        :param months: 时间窗口（月），None 表示全部历史
+        :param now: 窗口终点，默认当前时间
+        :param item_type: item 模型类名
+        :return: PriceStats；窗口内没有数据时为 None
+        '''
+        points = self.series(name, spec, material_grade, item_type=item_type)
+        now = now or datetime.now(timezone.utc)
+        start = 0
+        if months is not None:
+            start = np.searchsorted(points["t"], _epoch(_months_ago(now, months)), side="left")
+        end = np.searchsorted(points["t"], _epoch(now), side="right")
+        return summarize(points[start:end])
+
+    def bands(self, model: type, labels: Iterable[tuple]) -> Dict[tuple, PriceBandBounds]:
+        '''
+        一批 item 键的价格区间（每 _ID_CHUNK 个不同的键一次 IN 查询）
+
+        :param model: item model（MaterialItem / PartItem）
+        :param labels: 键字段元组（按 PRICE_KEY_FIELDS[model] 排列），可重复
+        :return: 键字段元组 -> PriceBandBounds；没有区间的键不在结果中
+        '''
+        keys: Dict[str, List[tuple]] = defaultdict(list)
+        for label in set(labels):
+            keys[price_key(*label)].append(label)
+        found: Dict[tuple, PriceBandBounds] = {}
+        distinct = list(keys)
+        for i in range(0, len(distinct), _ID_CHUNK):
+            rows = self.db.execute(
+                select(PriceBand.price_key, PriceBand.point_count, PriceBand.median_units,
+                       PriceBand.lower_units, PriceBand.upper_units)
+                .where(PriceBand.item_type == model.__name__, PriceBand.price_key.in_(distinct[i:i + _ID_CHUNK]))
+            )
+            for key, point_count, median, lower, upper in rows:
+                bounds = PriceBandBounds(from_units(lower), from_units(upper), from_units(median), point_count)
+                for label in keys[key]:
+                    found[label] = bounds
+        return found
+
+    # =========
+    # 内部工具
+    # =========
+    def _merge(
+        self,
+        new_points: Dict[Tuple[str, str], List[Tuple[int, int]]],
+        labels: Dict[Tuple[str, str], Tuple[Optional[str], ...]],
+    ) -> int:
+        existing: Dict[Tuple[str, str], PriceSeries] = {}
+        bands: Dict[Tuple[str, str], PriceBand] = {}
+        for item_type in {item_type for item_type, _ in new_points}:
+            keys = [key for t, key in new_points if t == item_type]
+            for i in range(0, len(keys), _ID_CHUNK):
+                # PostgreSQL 下行锁，避免并发追加互相覆盖
+                rows = self.db.scalars(
+                    select(PriceSeries)
+                    .where(PriceSeries.item_type == item_type, PriceSeries.price_key.in_(keys[i:i + _ID_CHUNK]))
+                    .with_for_update()
+                )
+                existing.update({(row.item_type, row.price_key): row for row in rows})
+                rows = self.db.scalars(
+                    select(PriceBand)
+                    .where(PriceBand.item_type == item_type, PriceBand.price_key.in_(keys[i:i + _ID_CHUNK]))
+                )
+                bands.update({(row.item_type, row.price_key): row for row in rows})
+
+        added = 0
+        for key, points in new_points.items():
+            incoming = np.array(points, dtype=POINT_DTYPE)
+            row = existing.get(key)
+            if row is None:
+                name, spec, material_grade = (tuple(labels[key]) + (None, None, None))[:3]
+                row = PriceSeries(item_type=key[0], price_key=key[1], name=name, spec=spec,
+                                  material_grade=material_grade, points=b"", point_count=0)
+                self.db.add(row)
+                merged = incoming
+            else:
+                merged = np.concatenate([decode_points(row.points), incoming])
+            # 稳定排序：同一时间点保持追加顺序
+            merged = merged[np.argsort(merged["t"], kind="stable")]
+            row.points = encode_points(merged)
+            row.point_count = len(merged)
+            added += len(incoming)
+            self._refresh_band(key, merged, bands.get(key))
+        return added
+
+    def _refresh_band(self, key: Tuple[str, str], points: np.ndarray, band: Optional[PriceBand]) -> None:
+        values = compute_band(points)
+        if values is None:
+            return
+        if band is None:
+            band = PriceBand(item_type=key[0], price_key=key[1])
+            self.db.add(band)
+        for name, value in values.items():
+            setattr(band, name, value)
+
+
+def summarize(points: np.ndarray) -> Optional[PriceStats]:
+    '''一段价格序列的统计（空序列为 None）'''
+    if len(points) == 0:
+        return None
+    prices = points["price"]
+    median, p90 = np.percentile(prices, [50, 90])
+    return PriceStats(
+        count=len(points),
+        median=from_units(round(median)),
+        p90=from_units(round(p90)),
+        min=from_units(prices.min()),
+        max=from_units(prices.max()),
+        first_observed_at=datetime.fromtimestamp(int(points["t"][0]), timezone.utc),
+        last_observed_at=datetime.fromtimestamp(int(points["t"][-1]), timezone.utc),
+    )
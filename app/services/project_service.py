@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 
 from app.models.project import Project
 from app.services.audit_log_service import AuditLogService
+from app.services.cost_rollup_service import CostRollupService
 from app.services.name_normalization_service import NameNormalizationService
 from app.db.enums import ProjectIdentifierStatus,ProjectNameStatus
 
@@ -27,6 +28,7 @@ class ProjectService:
         self.db = db
         self.audit_log_service = audit_log_service
         self.name_normalization_service = name_normalization_service
+        self.rollups = CostRollupService(db)
     def create_project(
         self,
         *,
@@ -168,6 +170,8 @@ class ProjectService:
                     after_value=spec_tags,
                     operator_id=operator_id,
                 )
+                # 跨项目成本汇总按标签统计，已有核价结果随标签移动
+                self.rollups.retag_project(project.id, project.spec_tags, spec_tags)
                 project.spec_tags = spec_tags
 
         # 4. 重新计算 identifier_status（系统行为）
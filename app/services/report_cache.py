@@ -0,0 +1,133 @@
+# app/services/report_cache.py
+"""
+已渲染成本报告的本地磁盘缓存，键为 (cost_summary_id, REPORT_TEMPLATE_VERSION, 表头摘要)。
+
+CostSummary 是不可变快照，其引用的 FileRecord 已锁定，item 明细与金额不会再变；
+但表头中的项目信息、上传人 / 统计人姓名取自可修改的 Project / User（没有核价审计记录时
+统计人是导出人），不属于快照，因此把这些单元格的摘要也放进键里：
+- 第一次下载时渲染并原子写入（临时文件 + os.replace），之后直接从磁盘返回
+- 键相同则报告字节相同，ETag 即键，浏览器带 If-None-Match 时可直接 304；
+  改名 / 改项目信息后键随之变化，重新渲染
+- summary 被 REPLACED 时由 CostCalculationService 驱逐（所有表头版本）
+- 报告版式变化时提升 REPORT_TEMPLATE_VERSION，旧版本文件不再命中（由 evict 一并清理）
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from typing import IO, Callable, Iterable, Sequence
+
+# 报告版式版本：修改 _report_rows / write_report_xlsx 的输出时 +1
+REPORT_TEMPLATE_VERSION = 1
+
+# 缓存目录：环境变量 REPORT_CACHE_DIR，默认 <项目根目录>/report_cache
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_REPORT_CACHE_DIR = os.path.join(_BASE_DIR, "report_cache")
+
+
+class ReportCache:
+    '''
+    按 key（见 key()）缓存渲染好的 xlsx 文件
+
+    同一个键的并发首次下载只渲染一次（按键加锁）；
+    不同键之间互不阻塞。
+    '''
+
+    def __init__(self, root: str, template_version: int = REPORT_TEMPLATE_VERSION):
+        self.root = root
+        self.template_version = template_version
+        self._locks: dict = {}
+        self._locks_guard = threading.Lock()
+
+    # =========
+    # 键 / 路径
+    # =========
+    def key(self, cost_summary_id: str, header: Sequence[object]) -> str:
+        '''
+        缓存键：summary ID + 版式版本 + 报告中快照以外内容的摘要
+
+        :param cost_summary_id: CostSummary ID
+        :param header: 报告中取自 Project / User 等可变数据的单元格
+        '''
+        digest = hashlib.sha1(repr(tuple(header)).encode("utf-8")).hexdigest()[:12]
+        return f"{cost_summary_id}.v{self.template_version}.{digest}"
+
+    def path(self, key: str) -> str:
+        '''缓存文件路径'''
+        return os.path.join(self.root, f"{key}.xlsx")
+
+    def etag(self, path: str) -> str:
+        '''强 ETag：缓存文件名即键，内容由键唯一决定，不需要读文件计算摘要'''
+        return os.path.splitext(os.path.basename(path))[0]
+
+    # =========
+    # 读 / 写
+    # =========
+    def get(self, key: str):
+        '''
+        :return: 已缓存文件路径，未命中返回 None
+        '''
+        path = self.path(key)
+        return path if os.path.isfile(path) else None
+
+    def get_or_render(self, key: str, render: Callable[[IO[bytes]], object]) -> str:
+        '''
+        命中则返回缓存路径，否则调用 render(fileobj) 渲染并原子写入
+
+        :param key: 见 key()
+        :param render: 把报告写入给定二进制文件对象的函数
+        :return: 缓存文件路径
+        '''
+        path = self.get(key)
+        if path is not None:
+            return path
+
+        with self._lock_for(key):
+            # 等锁期间可能已由其它请求写好
+            path = self.get(key)
+            if path is not None:
+                return path
+
+            os.makedirs(self.root, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as output:
+                    render(output)
+                os.replace(tmp_path, self.path(key))
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            finally:
+                with self._locks_guard:
+                    self._locks.pop(key, None)
+        return self.path(key)
+
+    def evict(self, cost_summary_ids: Iterable[str]) -> int:
+        '''
+        删除给定 summary 的所有版式版本 / 表头版本的缓存文件
+
+        :return: 删除的文件数
+        '''
+        if not os.path.isdir(self.root):
+            return 0
+        prefixes = tuple(f"{sid}.v" for sid in cost_summary_ids)
+        if not prefixes:
+            return 0
+        removed = 0
+        for name in os.listdir(self.root):
+            if name.startswith(prefixes) and name.endswith(".xlsx"):
+                try:
+                    os.remove(os.path.join(self.root, name))
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+
+# 进程内共享实例（与 revalidation_scheduler 一样由路由直接引用）
+report_cache = ReportCache(os.getenv("REPORT_CACHE_DIR", DEFAULT_REPORT_CACHE_DIR))
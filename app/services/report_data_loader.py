@@ -0,0 +1,200 @@
+# app/services/report_data_loader.py
+"""
+成本报告的数据加载：每类数据一次批量查询，报告组装时不再逐个实体查询。
+
+- Project：一次主键查询
+- 四个 FileRecord：一次 IN 查询
+- 上传人 + 统计人：一次 User IN 查询（统计人取自 CostSummary 的创建审计记录）
+- 四类 item：一条 UNION ALL，按报告章节顺序排序，游标分批读取（内存与 item 数无关）
+
+Excel 报告（CostCalculationService.iter_report_rows）与报告页（report.view_report）共用。
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import literal, select, union_all
+from sqlalchemy.orm import Session
+
+from app.db.enums import AuditAction, AuditEntityType, CostItemStatus
+from app.models.audit_log import AuditLog
+from app.models.cost_summary import CostSummary
+from app.models.file_record import FileRecord
+from app.models.labor_item import LaborItem
+from app.models.logistics_item import LogisticsItem
+from app.models.material_item import MaterialItem
+from app.models.part_item import PartItem
+from app.models.project import Project
+from app.models.user import User
+
+# 流式读取 item 的批大小
+REPORT_FETCH_SIZE = 1000
+
+# 进入报告的 item 状态
+REPORT_ITEM_STATUSES = (CostItemStatus.ok, CostItemStatus.confirmed)
+
+# 报告章节（即 UNION ALL 的排序键），顺序与 Excel 报告一致
+REPORT_SECTIONS = ("material", "part", "logistics", "labor")
+
+UNKNOWN_USER = "未知用户"
+
+
+@dataclass
+class ReportData:
+    '''一份成本报告除 item 之外的全部数据'''
+    cost_summary: CostSummary
+    project: Optional[Project]
+    material_file: FileRecord
+    part_file: FileRecord
+    labor_file: FileRecord
+    logistics_file: FileRecord
+    # 核价人（CostSummary 创建审计记录），没有记录时为导出人
+    operator_id: Optional[str]
+    # user_id -> User，包含四个上传人和统计人
+    users: Dict[str, User] = field(default_factory=dict)
+
+    @property
+    def files(self) -> List[FileRecord]:
+        return [self.material_file, self.part_file, self.labor_file, self.logistics_file]
+
+    def user_name(self, user_id: Optional[str]) -> str:
+        user = self.users.get(user_id)
+        return user.display_name if user is not None else UNKNOWN_USER
+
+    @property
+    def operator_name(self) -> str:
+        return self.user_name(self.operator_id)
+
+
+class ReportDataLoader:
+    '''按 CostSummary 批量加载报告数据，不做业务校验（由调用方负责）'''
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def load(self, cost_summary: CostSummary, operator_id: Optional[str] = None) -> ReportData:
+        '''
+        加载项目、文件、上传人和统计人（共 4 条查询）
+
+        :param cost_summary: CostSummary
+        :type cost_summary: CostSummary
+        :param operator_id: 没有核价审计记录时作为统计人的用户ID
+        :type operator_id: Optional[str]
+        :return: ReportData；文件缺失时抛 ValueError
+        :rtype: ReportData
+        '''
+        file_ids = [
+            cost_summary.material_file_id,
+            cost_summary.part_file_id,
+            cost_summary.labor_file_id,
+            cost_summary.logistics_file_id,
+        ]
+        if not all(file_ids):
+            raise ValueError("file_id is required")
+
+        project = self.db.get(Project, cost_summary.project_id)
+        found = {
+            f.id: f
+            for f in self.db.execute(select(FileRecord).where(FileRecord.id.in_(set(file_ids)))).scalars()
+        }
+        for file_id in file_ids:
+            if file_id not in found:
+                raise ValueError(f"FileRecord not found: {file_id}")
+
+        calculated_by = self.db.execute(
+            select(AuditLog.operator_id)
+            .where(
+                AuditLog.entity_type == AuditEntityType.CostSummary,
+                AuditLog.entity_id == cost_summary.id,
+                AuditLog.action == AuditAction.create,
+            )
+            .limit(1)
+        ).scalar()
+
+        data = ReportData(
+            cost_summary=cost_summary,
+            project=project,
+            material_file=found[file_ids[0]],
+            part_file=found[file_ids[1]],
+            labor_file=found[file_ids[2]],
+            logistics_file=found[file_ids[3]],
+            operator_id=calculated_by or operator_id,
+        )
+        user_ids = {f.uploader_id for f in data.files} | {data.operator_id}
+        user_ids.discard(None)
+        if user_ids:
+            data.users = {
+                u.id: u for u in self.db.execute(select(User).where(User.id.in_(user_ids))).scalars()
+            }
+        return data
+
+    def iter_items(self, data: ReportData) -> Iterator:
+        '''
+        一条 UNION ALL 读取四类 item，按 REPORT_SECTIONS 顺序、游标分批返回
+
+        每行是带统一列名的 Row：section, name, raw_name, spec, quantity, unit,
+        material_grade, weight_kg, unit_price, extra_subsidies, subtotal, status,
+        logistics_type, description（该章节没有的列为 None）
+        '''
+        return self.db.execute(
+            self._items_statement(data).execution_options(yield_per=REPORT_FETCH_SIZE)
+        )
+
+    def items_by_section(self, data: ReportData) -> Dict[str, list]:
+        '''一次查询读取全部 item，按章节分组（报告页用）'''
+        grouped: Dict[str, list] = {section: [] for section in REPORT_SECTIONS}
+        for row in self.db.execute(self._items_statement(data)):
+            grouped[row.section].append(row)
+        return grouped
+
+    def _items_statement(self, data: ReportData):
+        m, p, lg, lb = MaterialItem, PartItem, LogisticsItem, LaborItem
+
+        def none(column):
+            # 该章节没有的列：带类型的 NULL，UNION 结果按第一段（材料）的列类型解析
+            return literal(None, type_=column.type)
+
+        def branch(order, section, model, file_id, *columns, extra_criteria=()):
+            return select(
+                literal(order).label("section_order"),
+                model.row_no.label("row_no"),
+                model.id.label("item_id"),
+                literal(section).label("section"),
+                *columns,
+            ).where(
+                model.source_file_id == file_id,
+                model.status.in_(REPORT_ITEM_STATUSES),
+                *extra_criteria,
+            )
+
+        material = branch(
+            0, "material", m, data.material_file.id,
+            m.normalized_name.label("name"), m.raw_name.label("raw_name"), m.spec.label("spec"),
+            m.quantity.label("quantity"), m.unit.label("unit"), m.material_grade.label("material_grade"),
+            m.weight_kg.label("weight_kg"), m.unit_price.label("unit_price"),
+            none(lb.extra_subsidies).label("extra_subsidies"), m.subtotal.label("subtotal"),
+            m.status.label("status"), none(lg.type).label("logistics_type"), none(lg.description).label("description"),
+        )
+        part = branch(
+            1, "part", p, data.part_file.id,
+            p.normalized_name, p.raw_name, p.spec, p.quantity, p.unit, none(m.material_grade),
+            none(m.weight_kg), p.unit_price, none(lb.extra_subsidies), p.subtotal, p.status,
+            none(lg.type), none(lg.description),
+        )
+        logistics = branch(
+            2, "logistics", lg, data.logistics_file.id,
+            none(m.normalized_name), none(m.raw_name), none(m.spec), none(m.quantity), none(m.unit),
+            none(m.material_grade), none(m.weight_kg), none(m.unit_price), none(lb.extra_subsidies),
+            lg.subtotal, lg.status, lg.type, lg.description,
+            extra_criteria=(lg.is_calculable.is_(True),),
+        )
+        labor = branch(
+            3, "labor", lb, data.labor_file.id,
+            lb.normalized_group, lb.raw_group, none(m.spec), lb.work_quantity, lb.unit, none(m.material_grade),
+            none(m.weight_kg), lb.unit_price, lb.extra_subsidies, lb.subtotal, lb.status,
+            none(lg.type), none(lg.description),
+        )
+        # UNION ALL 的结果没有确定顺序：章节内按 Excel 行号排序（手工添加的 item 行号相同，再按 id）
+        combined = union_all(material, part, logistics, labor).subquery("report_items")
+        return select(
+            *[c for c in combined.c if c.name not in ("section_order", "row_no", "item_id")]
+        ).order_by(combined.c.section_order, combined.c.row_no, combined.c.item_id)
@@ -0,0 +1,68 @@
+# app/services/report_writer.py
+"""
+流式 xlsx 写入：逐行写入 openpyxl write-only 工作簿，内存占用与行数无关。
+
+单元格取值规则与 pd.DataFrame.to_excel(index=False) 一致，
+生成的文件与原先 generate_df_report + pd.ExcelWriter 的版式相同：
+- 第一行是列序号 0..column_count-1（DataFrame 的列名）
+- Decimal / int / float / bool / str 原样写入，None 为空单元格
+- datetime / date 带日期格式，其它类型（如 spec_tags 列表）写为 str()
+"""
+import datetime
+from decimal import Decimal
+from typing import IO, Iterable, Sequence
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+
+REPORT_SHEET_NAME = "成本报告"
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# 与 pandas ExcelWriter 默认格式一致
+_DATETIME_FORMAT = "YYYY-MM-DD HH:MM:SS"
+_DATE_FORMAT = "YYYY-MM-DD"
+
+_PLAIN_TYPES = (str, int, float, bool, Decimal)
+
+
+def write_report_xlsx(
+    rows: Iterable[Sequence],
+    fileobj: IO[bytes],
+    *,
+    column_count: int,
+    sheet_name: str = REPORT_SHEET_NAME,
+) -> int:
+    '''
+    把 rows 逐行写入 write-only 工作簿并保存到 fileobj
+
+    :param rows: 行迭代器（可以是生成器，边读边写）
+    :param fileobj: 可写的二进制文件对象
+    :param column_count: 列数（最长一行的长度），用于写入列序号表头
+    :param sheet_name: 工作表名
+    :return: 写入的数据行数（不含表头）
+    '''
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.append(list(range(column_count)))
+
+    count = 0
+    for row in rows:
+        if len(row) > column_count:
+            raise ValueError(f"Report row has {len(row)} cells, more than column_count={column_count}")
+        sheet.append([_to_cell(sheet, value) for value in row])
+        count += 1
+
+    workbook.save(fileobj)
+    return count
+
+
+def _to_cell(sheet, value):
+    '''按 pandas ExcelWriter 的规则转换单元格值'''
+    if value is None or isinstance(value, _PLAIN_TYPES):
+        return value
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        cell = WriteOnlyCell(sheet, value=value)
+        cell.number_format = _DATETIME_FORMAT if isinstance(value, datetime.datetime) else _DATE_FORMAT
+        return cell
+    return str(value)
@@ -0,0 +1,204 @@
+# app/services/revalidation_scheduler.py
+"""
+按 source_file_id 合并的延迟重校验调度器。
+
+页面上逐条编辑 / 确认数据项时不再每次同步跑 validate_file：
+- 编辑提交后 mark_dirty(file_id)，安静期内重复标记只会推迟执行时间
+- 后台线程在文件安静 quiet_seconds 之后执行一次校验并提交
+- 页面需要最新状态（或计算成本前）调用 run_now 同步执行，不再等待
+- is_stale(file_id) 表示还有编辑未反映到校验结果，页面据此提示"状态已过期"
+
+N 次连续编辑只触发一次校验。调度状态（排队 / 正在校验的文件）只保存在进程内，
+进程正常退出前（atexit）会把未执行的文件全部校验一遍。
+
+只适用于单进程部署（run.py 的 app.run 即单进程多线程）：
+- is_stale 只知道本进程排队的文件，其它进程里的编辑不会被提示
+- run_pending 只能执行本进程的排队，计算成本前无法补上其它进程尚未校验的编辑
+- 进程被强制终止时排队中的文件不会被校验，直到再次编辑或手动"开始校验"
+多进程部署（多个 worker 进程）需要把脏标记持久化到数据库后再使用本调度器。
+"""
+import atexit
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.db.enums import ParseStatus
+from app.db.session import get_session
+from app.logger import get_logger
+from app.models.file_record import FileRecord
+from app.services.audit_log_service import AuditLogService
+from app.services.validation_service import ValidationService, ValidationSummary
+
+logger = get_logger(__name__)
+
+
+class RevalidationScheduler:
+    """
+    Coalescing, deferred re-validation keyed by source_file_id.
+
+    :param quiet_seconds: 文件最后一次被标记后需要安静的秒数
+    :param session_factory: 创建独立 session 的函数，每次校验一个 session
+    :param clock: 单调时钟，测试时可替换
+    """
+
+    def __init__(
+        self,
+        quiet_seconds: float = 2.0,
+        session_factory: Callable[[], Session] = get_session,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.quiet_seconds = quiet_seconds
+        self._session_factory = session_factory
+        self._clock = clock
+        self._cond = threading.Condition()
+        # file_id -> 最早可执行时间
+        self._due: Dict[str, float] = {}
+        # 正在校验的文件，同一文件不会并发校验
+        self._running: Set[str] = set()
+        self._thread: Optional[threading.Thread] = None
+        # atexit 只注册一次（后台线程可能多次重启）
+        self._atexit_registered = False
+        # 已执行的校验次数（监控 / 测试用）
+        self.runs = 0
+
+    # =========
+    # 对外接口
+    # =========
+    def mark_dirty(self, file_id: str) -> None:
+        '''
+        标记文件需要重新校验；安静期内的重复标记会合并为一次
+
+        :param file_id: FileRecord ID
+        '''
+        with self._cond:
+            self._due[file_id] = self._clock() + self.quiet_seconds
+            self._ensure_worker()
+            self._cond.notify_all()
+
+    def is_stale(self, file_id: str) -> bool:
+        '''
+        文件是否还有未反映到校验结果的编辑（排队中或正在校验）
+
+        只反映本进程内的排队（见模块说明，仅支持单进程部署）
+
+        :param file_id: FileRecord ID
+        '''
+        with self._cond:
+            return file_id in self._due or file_id in self._running
+
+    def run_now(self, file_id: str, force: bool = False) -> Optional[ValidationSummary]:
+        '''
+        立即同步校验（跳过安静期）。若后台正在校验该文件，先等待其完成
+
+        :param file_id: FileRecord ID
+        :param force: 即使没有被标记也执行校验（用于手动"开始校验"）
+        :return: 执行了校验时返回 ValidationSummary，否则 None
+        '''
+        with self._cond:
+            while file_id in self._running:
+                self._cond.wait()
+            if file_id not in self._due and not force:
+                return None
+            self._due.pop(file_id, None)
+            self._running.add(file_id)
+        try:
+            return self._validate(file_id)
+        finally:
+            with self._cond:
+                self._running.discard(file_id)
+                self._cond.notify_all()
+
+    def run_pending(self, file_ids: Iterable[str]) -> None:
+        '''
+        对给定文件中仍在排队的逐个立即校验（例如计算成本前）
+
+        只执行本进程内的排队（见模块说明，仅支持单进程部署）
+
+        :param file_ids: FileRecord ID 列表
+        '''
+        for file_id in file_ids:
+            if file_id:
+                self.run_now(file_id)
+
+    def flush_all(self) -> None:
+        '''立即校验所有排队中的文件（进程退出前调用）'''
+        with self._cond:
+            pending = list(self._due)
+        self.run_pending(pending)
+
+    # =========
+    # 后台线程
+    # =========
+    def _ensure_worker(self) -> None:
+        # 调用方已持有 self._cond
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(
+            target=self._worker,
+            name="revalidation-scheduler",
+            daemon=True,
+        )
+        self._thread.start()
+        if not self._atexit_registered:
+            atexit.register(self.flush_all)
+            self._atexit_registered = True
+
+    def _next_ready(self) -> str:
+        '''阻塞直到有文件过了安静期，返回该文件并把它移入 running（持锁调用）'''
+        while True:
+            now = self._clock()
+            waiting = {f: due for f, due in self._due.items() if f not in self._running}
+            if waiting:
+                file_id = min(waiting, key=waiting.get)
+                if waiting[file_id] <= now:
+                    del self._due[file_id]
+                    self._running.add(file_id)
+                    return file_id
+                self._cond.wait(waiting[file_id] - now)
+            else:
+                self._cond.wait()
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                file_id = self._next_ready()
+            try:
+                self._validate(file_id)
+            except Exception:
+                # 已记录日志；文件保持旧的校验结果，下次编辑或 run_now 时再校验
+                pass
+            finally:
+                with self._cond:
+                    self._running.discard(file_id)
+                    self._cond.notify_all()
+
+    def _validate(self, file_id: str) -> Optional[ValidationSummary]:
+        '''在独立 session 中校验一个文件并提交'''
+        db = self._session_factory()
+        try:
+            file_record = db.get(FileRecord, file_id)
+            if file_record is None or file_record.parse_status != ParseStatus.parsed:
+                return None
+            if file_record.locked:
+                # 已被成本报告快照的文件不再改写 item 状态 / 校验明细 / 聚合（排队标记已移除）
+                return None
+            summary = ValidationService(db, AuditLogService(db)).validate_file_summary(file_record)
+            db.commit()
+            with self._cond:
+                self.runs += 1
+            return summary
+        except Exception:
+            db.rollback()
+            logger.exception("Deferred validation failed for file %s", file_id)
+            raise
+        finally:
+            db.close()
+
+
+# 进程级单例，路由与 agent 工具共用
+revalidation_scheduler = RevalidationScheduler(
+    quiet_seconds=float(os.getenv("REVALIDATION_QUIET_SECONDS", "2")),
+)
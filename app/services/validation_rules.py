@@ -0,0 +1,756 @@
+# app/services/validation_rules.py
+"""
+Declarative validation rule registry.
+
+每条规则只声明一次（code, fields, predicate, severity, message），
+模块加载时按 item 类型编译为扁平的 ValidationPlan：
+- 所有规则读取的字段合并为一个有序字段元组，一次 attrgetter 取完整行
+- 每条规则预先绑定 itemgetter，运行期不再构造 dict / attribute_map
+- 同一份 plan 既可以跑 ORM item，也可以跑列批（Dict[field, Sequence]）
+
+跨行规则（DuplicateRule）对同一文件的所有行计算归一化指纹，
+一次遍历按指纹分组，组内多于一行即视为重复录入。
+
+价格区间规则（PriceBandRule）把 unit_price 与跨项目历史单价的稳健区间
+（中位数 ± k·MAD，见 price_history_service）比较；区间由调用方按文件一次加载，
+规则本身只做按键的字典查找，不访问数据库。
+
+项目级开关由 ValidationRuleSetting 表维护，按 rule code 禁用，
+ValidationPlan.without() 派生出过滤后的 plan（按禁用集合缓存）。
+"""
+from dataclasses import dataclass, field
+from decimal import Decimal
+import hashlib
+import unicodedata
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from app.models.material_item import MaterialItem
+from app.models.part_item import PartItem
+from app.models.labor_item import LaborItem
+from app.models.logistics_item import LogisticsItem
+from app.services.labor_fees import labor_fees
+from app.services.money import MONEY_FACTOR, from_units, to_units
+
+# severity 排序：blocked > warning > ok，规则命中后只升级不降级
+SEVERITY_RANK = {"ok": 0, "confirmed": 0, "warning": 1, "blocked": 2}
+
+# 规则谓词的语义发生变化（代码层面，声明不变）时手动递增，使 plan.version 随之变化
+# 2：人工 RULE_INCONSISTENT 的加工费按单位折算（labor_fees）
+# 3：RULE_INCONSISTENT 在整数金额单位上比较（money.to_units）
+RULES_REVISION = 3
+
+# RULE_INCONSISTENT 的容差：|期望小计 - 小计| 超过 1 元（整数单位）
+CONSISTENCY_TOLERANCE_UNITS = 1 * MONEY_FACTOR
+
+
+def to_decimal(v) -> Decimal:
+    return v if isinstance(v, Decimal) else Decimal(v or 0)
+
+
+@dataclass
+class ItemValidationResult:
+    item_id: str
+    status: str
+    error_codes: List[str] = field(default_factory=list)
+    messages: List[str] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class ValidationRule:
+    """
+    A single declarative validation rule.
+
+    :param code: error code written into ItemValidationResult.error_codes
+    :param fields: item attributes read by the predicate, passed positionally
+    :param predicate: returns True when the rule is violated
+    :param severity: "blocked" | "warning"
+    :param message: message appended when the rule is violated
+    :param terminal: stop evaluating further rules once violated
+    :param requires_ok: only evaluated while the item is still "ok"
+    """
+    code: str
+    fields: Tuple[str, ...]
+    predicate: Callable[..., bool]
+    severity: str
+    message: str
+    terminal: bool = False
+    requires_ok: bool = False
+
+
+@dataclass(frozen=True)
+class DuplicateRule:
+    """
+    Cross-row rule: items of one file with the same normalized fingerprint are flagged.
+
+    :param code: error code written into ItemValidationResult.error_codes
+    :param fields: business fields forming the fingerprint; a tuple entry means
+        "first non-empty of these attributes", e.g. ("normalized_name", "raw_name")
+    :param severity: "blocked" | "warning"
+    :param message: message appended to every row of a group, may use {others}
+        (number of other rows in the same group)
+    """
+    code: str
+    fields: Tuple[Any, ...]
+    severity: str
+    message: str
+
+
+@dataclass(frozen=True)
+class CompiledDuplicateRule:
+    code: str
+    fingerprint: Callable[[Any], Optional[tuple]]
+    severity: str
+    rank: int
+    message: str
+
+
+@dataclass(frozen=True)
+class PriceBandRule:
+    """
+    Reference rule: unit_price outside the cross-project price band of the item's key.
+
+    :param code: error code written into ItemValidationResult.error_codes
+    :param key_fields: attributes forming the price-history key (PRICE_KEY_FIELDS)
+    :param price_field: attribute compared with the band
+    :param severity: "blocked" | "warning"
+    :param message: message appended when the price is outside the band, may use
+        {price} {lower} {upper} {median} {count}
+    """
+    code: str
+    key_fields: Tuple[str, ...]
+    price_field: str
+    severity: str
+    message: str
+
+
+@dataclass(frozen=True)
+class CompiledPriceBandRule:
+    code: str
+    key_of: Callable[[Any], tuple]
+    price_of: Callable[[Any], Any]
+    severity: str
+    rank: int
+    message: str
+
+
+@lru_cache(maxsize=65536)
+def normalize_text(v: str) -> Optional[str]:
+    # 同一文件里规格/材质/供应商/单位高度重复，缓存避免逐行做 NFKC
+    v = " ".join(unicodedata.normalize("NFKC", v).split()).casefold()
+    return v or None
+
+
+# 指纹归一化：字符串做 NFKC（全角转半角）、折叠空白、忽略大小写；数值统一为 Decimal
+# （Decimal 本身 1.0 == 1.00 且 hash 相同，无需再处理）
+_KEY_NORMALIZERS: Dict[type, Callable[[Any], Any]] = {
+    str: normalize_text,
+    float: lambda v: Decimal(str(v)),
+    int: Decimal,
+}
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    code: str
+    check: Callable[[tuple], bool]
+    severity: str
+    rank: int
+    message: str
+    terminal: bool
+    requires_ok: bool
+
+
+class ValidationPlan:
+    """
+    Flat evaluation plan for one item type.
+
+    Rows are plain tuples ordered by self.fields, so the same plan runs over
+    ORM items (evaluate_item) and column batches (evaluate_columns).
+    """
+
+    def __init__(
+        self,
+        item_type: str,
+        fields: Tuple[str, ...],
+        rules: Tuple[CompiledRule, ...],
+        confirmed_message: str,
+        cross_row_rules: Tuple[CompiledDuplicateRule, ...] = (),
+        band_rules: Tuple[CompiledPriceBandRule, ...] = (),
+    ):
+        self.item_type = item_type
+        self.fields = fields
+        self.rules = rules
+        self.confirmed_message = confirmed_message
+        self.cross_row_rules = cross_row_rules
+        self.band_rules = band_rules
+        self.rule_codes: FrozenSet[str] = frozenset(
+            [r.code for r in rules] + [r.code for r in cross_row_rules] + [r.code for r in band_rules]
+        )
+        self.version = self._fingerprint()
+
+        getter = attrgetter(*fields)
+        self.row_of = getter if len(fields) > 1 else (lambda item, g=getter: (g(item),))
+        self._derived: Dict[FrozenSet[str], "ValidationPlan"] = {}
+
+    def _fingerprint(self) -> str:
+        '''
+        规则集版本：RULES_REVISION + 规则声明（含禁用后的结果）的摘要，
+        随校验结果一起持久化，用于判断结果是否由当前规则产生
+        '''
+        digest = hashlib.sha1(repr((
+            self.item_type,
+            self.fields,
+            tuple(
+                (r.code, r.severity, r.message, r.terminal, r.requires_ok)
+                for r in self.rules
+            ),
+            tuple((r.code, r.severity, r.message) for r in self.cross_row_rules),
+            tuple((r.code, r.severity, r.message) for r in self.band_rules),
+        )).encode("utf-8")).hexdigest()
+        return f"{RULES_REVISION}.{digest[:12]}"
+
+    def without(self, disabled_codes: Iterable[str]) -> "ValidationPlan":
+        '''
+        派生一个禁用了指定 rule code 的 plan，结果按禁用集合缓存
+
+        :param disabled_codes: 需要禁用的 rule code
+        :return: 过滤后的 ValidationPlan（无禁用项时返回自身）
+        '''
+        key = frozenset(disabled_codes) & self.rule_codes
+        if not key:
+            return self
+        plan = self._derived.get(key)
+        if plan is None:
+            plan = ValidationPlan(
+                self.item_type,
+                self.fields,
+                tuple(r for r in self.rules if r.code not in key),
+                self.confirmed_message,
+                tuple(r for r in self.cross_row_rules if r.code not in key),
+                tuple(r for r in self.band_rules if r.code not in key),
+            )
+            self._derived[key] = plan
+        return plan
+
+    def evaluate_row(self, item_id: str, confirmed: bool, row: tuple) -> ItemValidationResult:
+        '''
+        对一行执行 plan，返回 ItemValidationResult
+
+        :param item_id: item ID
+        :param confirmed: item 是否已被人工确认（确认项直接跳过规则）
+        :param row: 按 self.fields 排序的字段值元组
+        '''
+        if confirmed:
+            return ItemValidationResult(
+                item_id=item_id,
+                status="confirmed",
+                messages=[self.confirmed_message],
+            )
+        status = "ok"
+        rank = 0
+        error_codes: List[str] = []
+        messages: List[str] = []
+        for rule in self.rules:
+            if rule.requires_ok and rank:
+                continue
+            if not rule.check(row):
+                continue
+            error_codes.append(rule.code)
+            messages.append(rule.message)
+            if rule.rank > rank:
+                rank = rule.rank
+                status = rule.severity
+            if rule.terminal:
+                break
+        return ItemValidationResult(
+            item_id=item_id,
+            status=status,
+            error_codes=error_codes,
+            messages=messages,
+        )
+
+    def evaluate_item(self, item, confirmed: bool) -> ItemValidationResult:
+        return self.evaluate_row(item.id, confirmed, self.row_of(item))
+
+    def evaluate_columns(
+        self,
+        item_ids: Sequence[str],
+        confirmed: Sequence[bool],
+        columns: Dict[str, Sequence[Any]],
+    ) -> Iterator[ItemValidationResult]:
+        '''
+        对列批执行 plan（例如 DataFrame 列或 query 返回的列），逐行产出结果
+
+        :param item_ids: item ID 列
+        :param confirmed: 是否已人工确认列
+        :param columns: 字段名 -> 值序列，至少包含 self.fields
+        '''
+        rows = zip(*(columns[f] for f in self.fields))
+        for item_id, is_confirmed, row in zip(item_ids, confirmed, rows):
+            yield self.evaluate_row(item_id, is_confirmed, row)
+
+    def apply_cross_row_rules(
+        self,
+        items: Sequence[Any],
+        results: Dict[str, ItemValidationResult],
+    ) -> None:
+        '''
+        在逐行结果之上执行跨行规则（原地追加 error code / message，只升级 status）
+
+        每条规则一次遍历：指纹 -> item_id 列表，组内多于一行即命中，
+        不做两两比较；人工确认过的行参与分组但不再被标记
+
+        :param items: 同一文件的 items
+        :param results: item_id -> 逐行校验结果
+        '''
+        for rule in self.cross_row_rules:
+            groups: Dict[tuple, List[str]] = {}
+            for item in items:
+                key = rule.fingerprint(item)
+                if key is not None:
+                    groups.setdefault(key, []).append(item.id)
+
+            for ids in groups.values():
+                if len(ids) < 2:
+                    continue
+                message = rule.message.format(others=len(ids) - 1)
+                for item_id in ids:
+                    result = results[item_id]
+                    if result.status == "confirmed":
+                        continue
+                    result.error_codes.append(rule.code)
+                    result.messages.append(message)
+                    if rule.rank > SEVERITY_RANK[result.status]:
+                        result.status = rule.severity
+
+    def apply_band_rules(
+        self,
+        items: Sequence[Any],
+        results: Dict[str, ItemValidationResult],
+        load_bands: Callable[[Set[tuple]], Dict[tuple, Any]],
+        skip: Iterable[str] = (),
+    ) -> None:
+        '''
+        在逐行结果之上执行价格区间规则（原地追加 error code / message，只升级 status）
+
+        每条规则先收集需要比较的行的键，调用一次 load_bands，再逐行按键查找；
+        没有历史区间的键、没有单价的行、人工确认过的行不标记
+
+        :param items: 同一文件的 items
+        :param results: item_id -> 逐行校验结果
+        :param load_bands: 键字段元组集合 -> {键字段元组: 区间}，区间有 lower / upper / median（Decimal）
+            和 point_count；没有区间的键不在结果中
+        :param skip: 不参与的 item id（如 bundle 非锚点行）
+        '''
+        skipped = set(skip)
+        for rule in self.band_rules:
+            candidates = []
+            for item in items:
+                if item.id in skipped:
+                    continue
+                result = results[item.id]
+                if result.status == "confirmed":
+                    continue
+                price = rule.price_of(item)
+                if price is not None:
+                    candidates.append((result, price, rule.key_of(item)))
+            if not candidates:
+                continue
+
+            bands = load_bands({key for _, _, key in candidates})
+            for result, price, key in candidates:
+                band = bands.get(key)
+                if band is None or band.lower <= price <= band.upper:
+                    continue
+                result.error_codes.append(rule.code)
+                result.messages.append(rule.message.format(
+                    price=from_units(to_units(price)),
+                    lower=band.lower,
+                    upper=band.upper,
+                    median=band.median,
+                    count=band.point_count,
+                ))
+                if rule.rank > SEVERITY_RANK[result.status]:
+                    result.status = rule.severity
+
+
+def _compile_fingerprint(fields: Tuple[Any, ...]) -> Callable[[Any], Optional[tuple]]:
+    '''把 DuplicateRule.fields 编译为 item -> 归一化指纹（全部为空时返回 None）'''
+    # 所有属性（含备选）合并为一个 attrgetter，一次取完整行
+    flat: List[str] = []
+    slots: List[Tuple[int, ...]] = []
+    for f in fields:
+        names = f if isinstance(f, tuple) else (f,)
+        slots.append(tuple(range(len(flat), len(flat) + len(names))))
+        flat.extend(names)
+    getter = attrgetter(*flat)
+    single = len(flat) == 1
+    normalizers = _KEY_NORMALIZERS
+    simple = all(len(idx) == 1 for idx in slots)
+
+    def fingerprint(item) -> Optional[tuple]:
+        raw = getter(item)
+        values = [
+            v if (n := normalizers.get(type(v))) is None else n(v)
+            for v in ((raw,) if single else raw)
+        ]
+        if simple:
+            key = tuple(values)
+        else:
+            key = tuple(
+                values[idx[0]] if len(idx) == 1
+                else next((values[i] for i in idx if values[i] is not None), None)
+                for idx in slots
+            )
+        return None if all(v is None for v in key) else key
+
+    return fingerprint
+
+
+def compile_plan(
+    item_type: str,
+    rules: Sequence[ValidationRule],
+    confirmed_message: str,
+    cross_row_rules: Sequence[DuplicateRule] = (),
+    band_rules: Sequence[PriceBandRule] = (),
+) -> ValidationPlan:
+    '''
+    把声明式规则编译为扁平 plan：合并字段、预绑定 itemgetter
+
+    :param item_type: item 类型名（material / part / labor / logistics）
+    :param rules: 该类型的规则声明，按声明顺序执行
+    :param confirmed_message: 人工确认项的提示语
+    :param cross_row_rules: 该类型的跨行规则，在逐行规则之后执行
+    :param band_rules: 该类型的价格区间规则，在跨行规则之后执行
+    '''
+    fields: List[str] = []
+    for rule in rules:
+        for f in rule.fields:
+            if f not in fields:
+                fields.append(f)
+    index = {f: i for i, f in enumerate(fields)}
+
+    compiled = []
+    for rule in rules:
+        if rule.severity not in ("blocked", "warning"):
+            raise ValueError(f"Unsupported severity for rule {rule.code}: {rule.severity}")
+        getter = itemgetter(*(index[f] for f in rule.fields))
+        predicate = rule.predicate
+        if len(rule.fields) == 1:
+            check = lambda row, g=getter, p=predicate: p(g(row))
+        else:
+            check = lambda row, g=getter, p=predicate: p(*g(row))
+        compiled.append(CompiledRule(
+            code=rule.code,
+            check=check,
+            severity=rule.severity,
+            rank=SEVERITY_RANK[rule.severity],
+            message=rule.message,
+            terminal=rule.terminal,
+            requires_ok=rule.requires_ok,
+        ))
+    compiled_cross = []
+    for rule in cross_row_rules:
+        if rule.severity not in ("blocked", "warning"):
+            raise ValueError(f"Unsupported severity for rule {rule.code}: {rule.severity}")
+        compiled_cross.append(CompiledDuplicateRule(
+            code=rule.code,
+            fingerprint=_compile_fingerprint(rule.fields),
+            severity=rule.severity,
+            rank=SEVERITY_RANK[rule.severity],
+            message=rule.message,
+        ))
+    compiled_band = []
+    for rule in band_rules:
+        if rule.severity not in ("blocked", "warning"):
+            raise ValueError(f"Unsupported severity for rule {rule.code}: {rule.severity}")
+        key_getter = attrgetter(*rule.key_fields)
+        compiled_band.append(CompiledPriceBandRule(
+            code=rule.code,
+            key_of=key_getter if len(rule.key_fields) > 1 else (lambda item, g=key_getter: (g(item),)),
+            price_of=attrgetter(rule.price_field),
+            severity=rule.severity,
+            rank=SEVERITY_RANK[rule.severity],
+            message=rule.message,
+        ))
+    return ValidationPlan(
+        item_type,
+        tuple(fields),
+        tuple(compiled),
+        confirmed_message,
+        tuple(compiled_cross),
+        tuple(compiled_band),
+    )
+
+
+# =========
+# Rule declarations
+# =========
+def _is_negative(v) -> bool:
+    return v is not None and to_decimal(v) < Decimal("0")
+
+
+def _negative_rules(labels: Sequence[Tuple[str, str]], template: str) -> List[ValidationRule]:
+    return [
+        ValidationRule(
+            code="NEGATIVE_VALUE",
+            fields=(name,),
+            predicate=_is_negative,
+            severity="blocked",
+            message=template.format(label=label),
+            terminal=True,
+        )
+        for name, label in labels
+    ]
+
+
+def _missing_all(*values) -> bool:
+    *system, manual = values
+    return manual is None and any(v is None for v in system)
+
+
+def _missing_system(*values) -> bool:
+    *system, manual = values
+    return manual is not None and any(v is None for v in system)
+
+
+def _exceeds_tolerance(expected: int, divisor: int, subtotal) -> bool:
+    '''
+    |expected / divisor - subtotal| > 容差，全部为整数运算（不舍入）
+
+    :param expected: 期望小计，单位为 1 / (MONEY_FACTOR * divisor) 元
+    :param divisor: expected 相对整数金额单位的放大倍数
+    '''
+    return abs(expected - to_units(subtotal) * divisor) > CONSISTENCY_TOLERANCE_UNITS * divisor
+
+
+def _material_inconsistent(weight_kg, unit_price, subtotal) -> bool:
+    if weight_kg is None or unit_price is None or subtotal is None:
+        return False
+    # 重量(kg) × 单价(每吨) × 0.001：两个整数单位相乘放大了 MONEY_FACTOR，再除 1000 折算为吨
+    expected = to_units(weight_kg) * to_units(unit_price)
+    return _exceeds_tolerance(expected, MONEY_FACTOR * 1000, subtotal)
+
+
+def _part_inconsistent(quantity, unit_price, subtotal) -> bool:
+    if quantity is None or unit_price is None or subtotal is None:
+        return False
+    expected = to_units(quantity) * to_units(unit_price)
+    return _exceeds_tolerance(expected, MONEY_FACTOR, subtotal)
+
+
+def _labor_inconsistent(work_quantity, unit, unit_price, extra_subsidies, ton_bonus, subtotal) -> bool:
+    if None in (work_quantity, unit, unit_price, extra_subsidies, ton_bonus, subtotal):
+        return False
+    # 加工费与报告同一口径：单价按每吨，非"吨"单位按 kg 折算
+    processing_fee, _ = labor_fees(work_quantity, unit, unit_price)
+    expected_total = (
+        to_units(processing_fee)
+        + to_units(extra_subsidies)
+        + to_units(ton_bonus)
+    )
+    return _exceeds_tolerance(expected_total, 1, subtotal)
+
+
+MATERIAL_RULES: List[ValidationRule] = [
+    ValidationRule(
+        code="MISSING_ALL",
+        fields=("weight_kg", "unit_price", "subtotal"),
+        predicate=_missing_all,
+        severity="blocked",
+        message="【参考重量（kg），单价，小计】部分缺失，请补全。",
+        terminal=True,
+    ),
+    ValidationRule(
+        code="MISSING_SYSTEM",
+        fields=("weight_kg", "unit_price", "subtotal"),
+        predicate=_missing_system,
+        severity="warning",
+        message="【参考重量（kg），单价】部分缺失，请补全。",
+    ),
+    *_negative_rules(
+        [("quantity", "数量"), ("weight_kg", "参考重量（kg）"), ("unit_price", "单价"), ("subtotal", "小计")],
+        "{label} 为负数，请修改。",
+    ),
+    ValidationRule(
+        code="RULE_INCONSISTENT",
+        fields=("weight_kg", "unit_price", "subtotal"),
+        predicate=_material_inconsistent,
+        severity="blocked",
+        message="数量关系异常，单价默认每吨，请确保【小计=参考重量（kg）*单价*0.001】。",
+        requires_ok=True,
+    ),
+]
+
+PART_RULES: List[ValidationRule] = [
+    ValidationRule(
+        code="MISSING_ALL",
+        fields=("quantity", "unit_price", "subtotal"),
+        predicate=_missing_all,
+        severity="blocked",
+        message="【数量，单价，小计】存在部分缺失，请补全。",
+        terminal=True,
+    ),
+    ValidationRule(
+        code="MISSING_SYSTEM",
+        fields=("quantity", "unit_price", "subtotal"),
+        predicate=_missing_system,
+        severity="warning",
+        message="【数量，单价】存在部分缺失，请补全。",
+    ),
+    *_negative_rules(
+        [("quantity", "数量"), ("unit_price", "单价"), ("subtotal", "小计")],
+        "【{label}】 为负数，请修改。",
+    ),
+    ValidationRule(
+        code="RULE_INCONSISTENT",
+        fields=("quantity", "unit_price", "subtotal"),
+        predicate=_part_inconsistent,
+        severity="blocked",
+        message="数量关系异常，请确保【小计 = 数量*单价】。",
+        requires_ok=True,
+    ),
+]
+
+_LABOR_FIELDS = ("work_quantity", "unit", "unit_price", "extra_subsidies", "ton_bonus", "subtotal")
+
+LABOR_RULES: List[ValidationRule] = [
+    ValidationRule(
+        code="MISSING_ALL",
+        fields=_LABOR_FIELDS,
+        predicate=_missing_all,
+        severity="blocked",
+        message="【数量，单位，单价，补助，吨位奖金，小计】中部分属性存在缺失，请补全。",
+        terminal=True,
+    ),
+    ValidationRule(
+        code="MISSING_SYSTEM",
+        fields=_LABOR_FIELDS,
+        predicate=_missing_system,
+        severity="warning",
+        message="【数量，单位，单价，补助，吨位奖金】中部分属性存在缺失，请补全。",
+    ),
+    *_negative_rules(
+        [
+            ("work_quantity", "数量"),
+            ("unit_price", "单价"),
+            ("extra_subsidies", "补助"),
+            ("ton_bonus", "吨位奖金"),
+            ("subtotal", "小计"),
+        ],
+        "【{label}】为负数，请修改。",
+    ),
+    ValidationRule(
+        code="RULE_INCONSISTENT",
+        fields=_LABOR_FIELDS,
+        predicate=_labor_inconsistent,
+        severity="blocked",
+        message="数量关系异常，单价默认每吨，请确保：【小计 = 加工费 + 补助 + 吨位奖金】，单位为吨时【加工费 = 数量*单价】，否则按 kg【加工费 = 数量*单价*0.001】。",
+        requires_ok=True,
+    ),
+]
+
+LOGISTICS_RULES: List[ValidationRule] = [
+    ValidationRule(
+        code="MISSING_SUBTOTAL",
+        fields=("subtotal",),
+        predicate=lambda subtotal: subtotal is None,
+        severity="blocked",
+        message="【小计】缺失，请填补。",
+        terminal=True,
+    ),
+    *_negative_rules([("subtotal", "小计")], "【{label}】为负数，请修改。"),
+]
+
+MATERIAL_CROSS_ROW_RULES: List[DuplicateRule] = [
+    DuplicateRule(
+        code="DUPLICATE_ROW",
+        fields=(
+            ("normalized_name", "raw_name"),
+            "spec",
+            "material_grade",
+            "supplier",
+            "quantity",
+            "unit",
+            "weight_kg",
+            "unit_price",
+        ),
+        severity="warning",
+        message="与本文件另外 {others} 行的【名称，规格，材质，供应商，数量，单位，参考重量（kg），单价】完全相同，疑似重复录入，请核对。",
+    ),
+]
+
+# 跨项目单价历史（PriceSeries / PriceBand）的键字段：item model -> 字段
+PRICE_KEY_FIELDS: Dict[type, Tuple[str, ...]] = {
+    MaterialItem: ("normalized_name", "spec", "material_grade"),
+    PartItem: ("normalized_name", "spec"),
+}
+
+_PRICE_BAND_MESSAGE = "单价 {price} 超出历史单价区间 [{lower}, {upper}]（中位数 {median}，{count} 个历史单价），请核对。"
+
+# 价格区间规则：item 类型 -> PriceBandRule 列表
+PRICE_BAND_RULES: Dict[str, List[PriceBandRule]] = {
+    "material": [PriceBandRule(
+        code="PRICE_OUT_OF_BAND",
+        key_fields=PRICE_KEY_FIELDS[MaterialItem],
+        price_field="unit_price",
+        severity="warning",
+        message=_PRICE_BAND_MESSAGE,
+    )],
+    "part": [PriceBandRule(
+        code="PRICE_OUT_OF_BAND",
+        key_fields=PRICE_KEY_FIELDS[PartItem],
+        price_field="unit_price",
+        severity="warning",
+        message=_PRICE_BAND_MESSAGE,
+    )],
+}
+
+# 声明表：item 类型 -> (ORM model, 规则, 人工确认提示)
+RULE_REGISTRY: Dict[str, Tuple[type, List[ValidationRule], str]] = {
+    "material": (MaterialItem, MATERIAL_RULES, "异常已由人工确认。"),
+    "part": (PartItem, PART_RULES, "异常已由人工确认。"),
+    "labor": (LaborItem, LABOR_RULES, "异常已由人工确认。"),
+    "logistics": (LogisticsItem, LOGISTICS_RULES, "异常已由人工确认"),
+}
+
+# 跨行规则：item 类型 -> DuplicateRule 列表
+CROSS_ROW_RULES: Dict[str, List[DuplicateRule]] = {
+    "material": MATERIAL_CROSS_ROW_RULES,
+}
+
+# 启动时编译：ORM model -> ValidationPlan
+VALIDATION_PLANS: Dict[type, ValidationPlan] = {
+    model: compile_plan(
+        item_type, rules, confirmed_message,
+        CROSS_ROW_RULES.get(item_type, ()), PRICE_BAND_RULES.get(item_type, ()),
+    )
+    for item_type, (model, rules, confirmed_message) in RULE_REGISTRY.items()
+}
+
+
+def get_plan(model: type, disabled_codes: Optional[Iterable[str]] = None) -> Optional[ValidationPlan]:
+    '''
+    获取某 item model 的编译后 plan，可选按禁用的 rule code 过滤
+
+    :param model: MaterialItem / PartItem / LaborItem / LogisticsItem
+    :param disabled_codes: 项目级禁用的 rule code
+    '''
+    plan = VALIDATION_PLANS.get(model)
+    if plan is None or not disabled_codes:
+        return plan
+    return plan.without(disabled_codes)
+
+
+def all_rule_codes() -> Dict[str, List[str]]:
+    '''列出每种 item 类型可配置的 rule code（去重，保持声明顺序）'''
+    result: Dict[str, List[str]] = {}
+    for item_type, (_, rules, _) in RULE_REGISTRY.items():
+        codes: List[str] = []
+        for rule in [*rules, *CROSS_ROW_RULES.get(item_type, ()), *PRICE_BAND_RULES.get(item_type, ())]:
+            if rule.code not in codes:
+                codes.append(rule.code)
+        result[item_type] = codes
+    return result
@@ -1,14 +1,31 @@
 # app/services/validation_service.py
 from dataclasses import dataclass, field
-from typing import Dict, List, Any
-from unittest import result
+from typing import Dict, Iterator, List, Any, Optional, Set, Tuple
 from decimal import Decimal
-@dataclass
-class ItemValidationResult:
-    item_id: str
-    status: str
-    error_codes: List[str] = field(default_factory=list)
-    messages: List[str] = field(default_factory=list)
+from uuid import uuid4
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+from sqlalchemy import update, desc, delete, insert, func, and_
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import SingletonThreadPool, StaticPool
+
+from app.models.file_record import FileRecord, ValidationStatus
+from app.db.enums import FileType, ParseStatus
+from app.models.material_item import MaterialItem
+from app.models.part_item import PartItem
+from app.models.labor_item import LaborItem
+from app.models.logistics_item import LogisticsItem
+from app.models.validation_rule_setting import ValidationRuleSetting
+from app.models.item_validation_record import ItemValidationRecord, ItemValidationErrorCode
+from app.db.enums import CostItemStatus
+from app.services.audit_log_service import AuditLogService
+from app.services.file_aggregate_service import FileAggregateService, FileAggregateValues, calculable_totals
+from app.services.price_history_service import PriceHistoryService
+from app.services.validation_rules import ItemValidationResult, ValidationPlan, get_plan, all_rule_codes
+
+
 @dataclass
 class ValidationReport:
     id:str
@@ -26,16 +43,81 @@ class ValidationReport:
     # 便于 API 层直接使用 item_id -> validation result
     item_results: Dict[str, ItemValidationResult]
 
-from typing import List, Dict
-from sqlalchemy.orm import Session
 
-from app.models.file_record import FileRecord, ValidationStatus
-from app.models.material_item import MaterialItem
-from app.models.part_item import PartItem
-from app.models.labor_item import LaborItem
-from app.models.logistics_item import LogisticsItem
-from app.db.enums import CostItemStatus
-from app.services.audit_log_service import AuditLogService
+@dataclass
+class ValidationSummary:
+    '''只有计数的轻量报告，明细通过 ValidationResultPage 分页读取'''
+    id: str
+    file_type: str
+    validation_status: str
+    total_items: int
+    ok_count: int
+    warning_count: int
+    confirmed_count: int
+    blocked_count: int
+
+
+@dataclass
+class ValidationResultPage:
+    items: List[ItemValidationResult]
+    # 下一页游标（本页最后一条的 seq），None 表示没有更多
+    next_cursor: Optional[int]
+
+
+@dataclass
+class PagedValidationReport:
+    summary: ValidationSummary
+    blocked_page: ValidationResultPage
+    warning_page: ValidationResultPage
+    # error_code -> 命中的 item 数（全部明细，不受分页影响）
+    error_code_counts: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class ProjectValidationReport:
+    project_id: str
+    validation_status: str
+    total_items: int
+    ok_count: int
+    warning_count: int
+    confirmed_count: int
+    blocked_count: int
+
+    # file_type -> 该类型最新文件的 ValidationSummary
+    file_reports: Dict[str, ValidationSummary]
+    # 没有可校验文件的成本类型
+    missing_file_types: List[str]
+
+
+@dataclass
+class _FileEvaluation:
+    """Worker 侧的只读校验结果，由主 session 统一写回"""
+    file_id: str
+    model: Optional[type]
+    total_items: int
+    old_statuses: Dict[str, CostItemStatus]
+    results: Dict[str, ItemValidationResult]
+    non_calculable: Set[str]
+    # 写回 non_calculable 之后的可计算小计之和（整数单位）与条数
+    calculable_subtotal_units: int = 0
+    calculable_count: int = 0
+
+
+# 参与项目级校验的成本文件类型
+PROJECT_COST_FILE_TYPES = (
+    FileType.material_cost,
+    FileType.part_cost,
+    FileType.labor_cost,
+    FileType.logistics_cost,
+)
+
+# 批量 UPDATE 时每条语句的 id 数量上限（SQLite 绑定变量限制）
+_UPDATE_CHUNK = 500
+
+# 持久化到 item_validation_results 的状态；ok / confirmed 由 Item.status 即可表达
+PERSISTED_RESULT_STATUSES = ("blocked", "warning")
+
+DEFAULT_PAGE_SIZE = 50
 
 class ValidationService:
     """
@@ -54,6 +136,8 @@ class ValidationService:
     ):
         self.db = db
         self.audit_log_service = audit_log_service
+        self.aggregates = FileAggregateService(db)
+        self.price_history = PriceHistoryService(db)
     def _to_decimal(self,v) -> Decimal:
         return v if isinstance(v, Decimal) else Decimal(v or 0)
 
@@ -68,54 +152,59 @@ class ValidationService:
         :return: ValidationReport summarizing the results
         :rtype: ValidationReport
         """
-        # 1. 拉取所有 items（按 file_type）
+        summary, results = self._run_file_validation(file_record)
+        blocked_items = [r for r in results.values() if r.status == "blocked"]
+        warning_items = [r for r in results.values() if r.status == "warning"]
+        return ValidationReport(
+            id=summary.id,
+            file_type=summary.file_type,
+            validation_status=summary.validation_status,
+            total_items=summary.total_items,
+            ok_count=summary.ok_count,
+            confirmed_count=summary.confirmed_count,
+            warning_count=summary.warning_count,
+            blocked_count=summary.blocked_count,
+            blocked_items=blocked_items,
+            warning_items=warning_items,
+            item_results=results,
+        )
+
+    def validate_file_summary(self, file_record: FileRecord) -> ValidationSummary:
+        """
+        Same as validate_file, but only returns the counts.
+        Blocked / warning details are persisted and read page by page
+        via list_item_results / iter_item_results.
+
+        :param file_record: FileRecord to validate
+        :type file_record: FileRecord
+        :return: ValidationSummary
+        :rtype: ValidationSummary
+        """
+        summary, _ = self._run_file_validation(file_record)
+        return summary
+
+    def _run_file_validation(
+        self,
+        file_record: FileRecord,
+    ) -> Tuple[ValidationSummary, Dict[str, ItemValidationResult]]:
+        '''
+        validate_file / validate_file_summary 的公共流程：校验、写回状态、持久化明细
+
+        :param file_record: FileRecord to validate
+        :return: (ValidationSummary, item_id -> ItemValidationResult)
+        '''
+        # 1. 拉取所有 items（按 file_type），并解析本项目生效的规则 plan
         items = self._load_items(file_record)
-        # 为了处理bundle的情况，分开处理partitem 和 others
-        part_items = [i for i in items if isinstance(i, PartItem)]
-        other_items = [i for i in items if not isinstance(i, PartItem)]
-        
-        results: Dict[str, ItemValidationResult] = {}
-        ok_count = warning_count = confirmed_count = blocked_count = 0
+        plans = self._resolve_plans(file_record.project_id)
 
-        # 2. Item 级校验
-        # 2.1 先处理 other_items
-        for item in other_items:
-            result = self._validate_item(item)
-            results[item.id] = result#self._validate_item(item)返回的是item的ItemValidationResult对象
+        # 2. Item 级校验（纯计算，不写库）
+        results, non_calculable = self._evaluate_items(items, plans)
 
-            # 写入 Item.status（系统行为）
-            old_status = item.status
-            if result.status != old_status.value:
-                item.status = CostItemStatus[result.status]#根据ItemValidationResult的status更新item.status，用CostItemStatus[]转换
-                # 记录审计日志
-                self.audit_log_service.record_system_update(
-                    project_id=file_record.project_id,
-                    entity_type=item.__class__.__name__,
-                    entity_id=item.id,
-                    changed_attribute="status",
-                    before_value=old_status.value if old_status else None,#注意一下这里的赋值
-                    after_value=result.status,#注意一下这里的赋值
-                )
-            # 统计结果
-            if result.status == "ok":
-                ok_count += 1
-            elif result.status == "warning":
-                warning_count += 1
-            elif result.status == 'confirmed':
-                confirmed_count += 1    
-            else:
-                blocked_count += 1
-            
-        # 2.2 再处理 part_items（bundle 特例）
-        part_results = self._validate_part_items_with_bundle(part_items)
-        #将结果写入results                                                 
-        for item_id, result in part_results.items():
-            results[item_id] = result
-        #遍历part_items,更新status
-        for item in part_items:
-            #获取从属于该item的校验结果
+        # 3. 写入 Item.status / is_calculable（系统行为）
+        for item in items:
+            if item.id in non_calculable:
+                item.is_calculable = False
             result = results[item.id]
-            # 写入 Item.status（系统行为）
             old_status = item.status
             if result.status != old_status.value:
                 item.status = CostItemStatus[result.status]#根据ItemValidationResult的status更新item.status，用CostItemStatus[]转换
@@ -128,7 +217,97 @@ class ValidationService:
                     before_value=old_status.value if old_status else None,#注意一下这里的赋值
                     after_value=result.status,#注意一下这里的赋值
                 )
-            # 统计结果
+
+        # 4. 聚合 FileRecord.validation_status，持久化明细、更新 FileCostAggregate 并生成摘要
+        model = self._item_model(file_record)
+        summary = self._finalize_file(
+            file_record,
+            results,
+            total_items=len(items),
+            rule_version=plans[model].version if model is not None else None,
+            calculable=calculable_totals(items),
+        )
+        return summary, results
+
+    def _evaluate_items(
+        self,
+        items: List[Any],
+        plans: Dict[type, ValidationPlan],
+    ) -> Tuple[Dict[str, ItemValidationResult], Set[str]]:
+        '''
+        对一个文件的所有 items 执行校验（纯计算，不修改 item）
+
+        :param items: 同一 FileRecord 下的 items
+        :type items: List[Any]
+        :param plans: item model -> ValidationPlan
+        :return: (item_id -> ItemValidationResult, 需要置为 is_calculable=False 的 bundle 非锚点行 id)
+        '''
+        # 为了处理bundle的情况，分开处理partitem 和 others
+        part_items = [i for i in items if isinstance(i, PartItem)]
+        other_items = [i for i in items if not isinstance(i, PartItem)]
+
+        results: Dict[str, ItemValidationResult] = {}
+        non_calculable: Set[str] = set()
+        # 先处理 other_items
+        for item in other_items:
+            results[item.id] = self._validate_item(item, plans)
+        # 再处理 part_items（bundle 特例）
+        if part_items:
+            results.update(
+                self._validate_part_items_with_bundle(part_items, plans[PartItem], non_calculable)
+            )
+        # 最后执行跨行规则（重复行检测等）和价格区间规则，一个文件只有一种 item 类型
+        if items:
+            plan = plans.get(type(items[0]))
+            if plan is not None:
+                plan.apply_cross_row_rules(items, results)
+                if plan.band_rules:
+                    self._apply_price_bands(plan, items, results, non_calculable)
+        return results, non_calculable
+
+    def _apply_price_bands(
+        self,
+        plan: ValidationPlan,
+        items: List[Any],
+        results: Dict[str, ItemValidationResult],
+        non_calculable: Set[str],
+    ) -> None:
+        '''
+        按本文件出现的键一次加载价格区间（PriceBand），再逐行按键查找
+
+        :param plan: 本文件 item 类型的 plan
+        :param items: 同一 FileRecord 下的 items
+        :param results: item_id -> 逐行校验结果（原地更新）
+        :param non_calculable: bundle 非锚点行，不参与比较
+        '''
+        model = type(items[0])
+        plan.apply_band_rules(
+            items,
+            results,
+            lambda labels: self.price_history.bands(model, labels),
+            skip=non_calculable,
+        )
+
+    def _finalize_file(
+        self,
+        file_record: FileRecord,
+        results: Dict[str, ItemValidationResult],
+        total_items: int,
+        rule_version: Optional[str] = None,
+        calculable: Tuple[int, int] = (0, 0),
+    ) -> ValidationSummary:
+        '''
+        聚合 FileRecord.validation_status（含审计），持久化 blocked / warning 明细，
+        更新 FileCostAggregate 并生成 ValidationSummary
+
+        :param file_record: 被校验的 FileRecord
+        :param results: item_id -> ItemValidationResult
+        :param total_items: item 总数
+        :param rule_version: 产生这批结果的 ValidationPlan.version
+        :param calculable: 写回 is_calculable 之后的 (可计算小计之和（整数单位）, 可计算条数)
+        '''
+        ok_count = warning_count = confirmed_count = blocked_count = 0
+        for result in results.values():
             if result.status == "ok":
                 ok_count += 1
             elif result.status == "warning":
@@ -137,9 +316,7 @@ class ValidationService:
                 confirmed_count += 1
             else:
                 blocked_count += 1
-                    #self._validate_item(item)返回的是item的ItemValidationResult对象
 
-        # 3. 聚合 FileRecord.validation_status
         old_file_status = file_record.validation_status
         new_file_status = self._aggregate_file_status(list(results.values()))#聚合file_record下所有item的校验结果，得到新的file_record.validation_status
         #写入 FileRecord.validation_status（系统行为）
@@ -155,30 +332,231 @@ class ValidationService:
                 after_value=new_file_status.value,
             )
 
-        # 4. 生成报告
-        blocked_items = [
-            r for r in results.values() if r.status == "blocked"
-        ]
-        warning_items = [
-            r for r in results.values() if r.status == "warning"
-        ]
+        self._persist_results(file_record.id, results, rule_version)
+        # 本次校验已完整遍历 items，直接用绝对值覆盖聚合行
+        self.aggregates.store(
+            file_record.id,
+            file_record.project_id,
+            FileAggregateValues(
+                calculable_subtotal_units=calculable[0],
+                calculable_count=calculable[1],
+                item_count=total_items,
+                ok_count=ok_count,
+                warning_count=warning_count,
+                confirmed_count=confirmed_count,
+                blocked_count=blocked_count,
+            ),
+        )
 
-        #5. 保存变动
+        #保存变动
         self.db.flush()
-        
-        return ValidationReport(
+
+        return ValidationSummary(
             id=file_record.id,
             file_type=file_record.file_type.value,
             validation_status=file_record.validation_status.value,
-            total_items=len(items),
+            total_items=total_items,
             ok_count=ok_count,
             confirmed_count=confirmed_count,
             warning_count=warning_count,
             blocked_count=blocked_count,
-            blocked_items=blocked_items,
-            warning_items=warning_items,
-            item_results=results,
         )
+
+    def _persist_results(
+        self,
+        file_id: str,
+        results: Dict[str, ItemValidationResult],
+        rule_version: Optional[str],
+    ) -> None:
+        '''
+        用本次结果整体替换文件的 item_validation_results / item_validation_error_codes
+        （只存 blocked / warning）
+
+        seq 取结果在本次校验中的顺序，作为分页游标
+
+        :param file_id: FileRecord ID
+        :param results: item_id -> ItemValidationResult
+        :param rule_version: 产生这批结果的 ValidationPlan.version
+        '''
+        for table in (ItemValidationRecord, ItemValidationErrorCode):
+            self.db.execute(delete(table).where(table.file_id == file_id))
+
+        rows: List[Dict[str, Any]] = []
+        code_rows: List[Dict[str, Any]] = []
+        for seq, result in enumerate(results.values()):
+            if result.status not in PERSISTED_RESULT_STATUSES:
+                continue
+            rows.append({
+                "file_id": file_id,
+                "item_id": result.item_id,
+                "seq": seq,
+                "status": result.status,
+                "error_codes": list(result.error_codes),
+                "messages": list(result.messages),
+                "rule_version": rule_version,
+            })
+            # 同一规则码可能因多个字段重复命中（如 NEGATIVE_VALUE），索引表只记一次
+            for code in dict.fromkeys(result.error_codes):
+                code_rows.append({
+                    "file_id": file_id,
+                    "error_code": code,
+                    "item_id": result.item_id,
+                    "seq": seq,
+                })
+
+        for table, table_rows in ((ItemValidationRecord, rows), (ItemValidationErrorCode, code_rows)):
+            for i in range(0, len(table_rows), _UPDATE_CHUNK):
+                self.db.execute(insert(table), table_rows[i:i + _UPDATE_CHUNK])
+
+    def validate_project(
+        self,
+        project_id: str,
+        max_workers: Optional[int] = None,
+    ) -> ProjectValidationReport:
+        '''
+        并行校验某项目下每种成本类型的最新文件（parsed 且未 locked）
+
+        - 每个文件在线程池中用独立 session（独立连接）只读加载并执行规则；
+          worker 看不到未提交的数据，分派前先提交调用方 session 中已有的改动
+        - 调用方 session 绑定的不是连接池 Engine（Connection、内存 SQLite 等单连接的池）时，
+          不能给每个线程一个连接，改为在调用方 session 中逐个文件顺序执行（不提交）
+        - 所有 Item.status / is_calculable / FileRecord.validation_status 的写入
+          在调用方 session 中合并，由调用方统一 commit
+
+        :param project_id: 项目ID
+        :type project_id: str
+        :param max_workers: 线程池大小，默认 min(文件数, CPU 数)；1 表示顺序执行
+        :type max_workers: Optional[int]
+        :return: 合并后的 ProjectValidationReport
+        :rtype: ProjectValidationReport
+        '''
+        # 读取调用方尚未 flush 的改动（session autoflush=False）
+        self.db.flush()
+        files = self._latest_cost_files(project_id)
+        plans = self._resolve_plans(project_id)
+        missing = [ft.value for ft in PROJECT_COST_FILE_TYPES if ft not in files]
+
+        evaluations: Dict[str, _FileEvaluation] = {}
+        workers = max_workers or min(len(files), os.cpu_count() or 1)
+        engine = _worker_engine(self.db)
+        if engine is not None and workers > 1:
+            # worker 用独立连接读取：先让调用方的改动对它们可见
+            self.db.commit()
+            worker_session = sessionmaker(bind=engine, autoflush=False)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    f.id: pool.submit(_evaluate_file_in_worker, worker_session, f.id, plans)
+                    for f in files.values()
+                }
+                for file_id, future in futures.items():
+                    evaluations[file_id] = future.result()
+        else:
+            for f in files.values():
+                evaluations[f.id] = _evaluate_file(self.db, f.id, plans)
+
+        # 主 session 合并写入
+        file_reports: Dict[str, ValidationSummary] = {}
+        for file_type, file_record in files.items():
+            evaluation = evaluations[file_record.id]
+            self._apply_evaluation(file_record, evaluation)
+            file_reports[file_type.value] = self._finalize_file(
+                file_record,
+                evaluation.results,
+                total_items=evaluation.total_items,
+                rule_version=plans[evaluation.model].version if evaluation.model else None,
+                calculable=(evaluation.calculable_subtotal_units, evaluation.calculable_count),
+            )
+
+        reports = list(file_reports.values())
+        statuses = {r.validation_status for r in reports}
+        if ValidationStatus.blocked.value in statuses:
+            project_status = ValidationStatus.blocked.value
+        elif ValidationStatus.warning.value in statuses:
+            project_status = ValidationStatus.warning.value
+        elif missing or not reports:
+            project_status = ValidationStatus.pending.value
+        elif ValidationStatus.confirmed.value in statuses:
+            project_status = ValidationStatus.confirmed.value
+        else:
+            project_status = ValidationStatus.ok.value
+
+        return ProjectValidationReport(
+            project_id=project_id,
+            validation_status=project_status,
+            total_items=sum(r.total_items for r in reports),
+            ok_count=sum(r.ok_count for r in reports),
+            warning_count=sum(r.warning_count for r in reports),
+            confirmed_count=sum(r.confirmed_count for r in reports),
+            blocked_count=sum(r.blocked_count for r in reports),
+            file_reports=file_reports,
+            missing_file_types=missing,
+        )
+
+    def _latest_cost_files(self, project_id: str) -> Dict[FileType, FileRecord]:
+        '''
+        一次查询取出项目下每种成本类型最新的 parsed、未 locked 的 FileRecord
+
+        :param project_id: 项目ID
+        :return: FileType -> FileRecord
+        '''
+        candidates = (
+            self.db.query(FileRecord)
+            .filter(
+                FileRecord.project_id == project_id,
+                FileRecord.file_type.in_(PROJECT_COST_FILE_TYPES),
+                FileRecord.parse_status == ParseStatus.parsed,
+                FileRecord.locked.is_(False),
+            )
+            .order_by(desc(FileRecord.version))
+            .all()
+        )
+        latest: Dict[FileType, FileRecord] = {}
+        for f in candidates:
+            latest.setdefault(f.file_type, f)
+        return latest
+
+    def _apply_evaluation(self, file_record: FileRecord, evaluation: _FileEvaluation) -> None:
+        '''
+        把 worker 的校验结果以批量 UPDATE 写回当前 session（含审计）
+
+        :param file_record: 当前 session 中的 FileRecord
+        :param evaluation: worker 返回的 _FileEvaluation
+        '''
+        model = evaluation.model
+        if model is None:
+            return
+
+        changed: Dict[str, List[str]] = {}
+        for item_id, result in evaluation.results.items():
+            old_status = evaluation.old_statuses[item_id]
+            if result.status == old_status.value:
+                continue
+            changed.setdefault(result.status, []).append(item_id)
+            self.audit_log_service.record_system_update(
+                project_id=file_record.project_id,
+                entity_type=model.__name__,
+                entity_id=item_id,
+                changed_attribute="status",
+                before_value=old_status.value,
+                after_value=result.status,
+            )
+
+        for new_status, ids in changed.items():
+            for i in range(0, len(ids), _UPDATE_CHUNK):
+                self.db.execute(
+                    update(model)
+                    .where(model.id.in_(ids[i:i + _UPDATE_CHUNK]))
+                    .values(status=CostItemStatus[new_status])
+                )
+
+        non_calculable = list(evaluation.non_calculable)
+        for i in range(0, len(non_calculable), _UPDATE_CHUNK):
+            self.db.execute(
+                update(model)
+                .where(model.id.in_(non_calculable[i:i + _UPDATE_CHUNK]))
+                .values(is_calculable=False)
+            )
+
     def _load_items(self, file_record: FileRecord) -> List[Any]:
         """
         Load items belonging to a file_record.
@@ -186,61 +564,63 @@ class ValidationService:
         :type file_record: FileRecord
         :return: List of items (MaterialItem, PartItem, LaborItem, LogisticsItem
         """
-        file_type = file_record.file_type.name
-
+        model = self._item_model(file_record)
         # 不生成item,不参与 validate
-        if file_type.endswith("_plan"):
+        if model is None:
             return []
-        
+        # 按 Excel 行顺序：bundle 锚点取组内第一个合格行，明细 seq 也按这个顺序
+        return (
+            self.db.query(model)
+            .filter(model.source_file_id == file_record.id)
+            .order_by(*model.file_order())
+            .all()
+        )
+
+    def _item_model(self, file_record: FileRecord) -> Optional[type]:
+        '''
+        FileRecord.file_type -> item model；*_plan 等不生成 item 的类型返回 None
+
+        :param file_record: FileRecord
+        '''
+        file_type = file_record.file_type.name
+        if file_type.endswith("_plan"):
+            return None
         if file_type.startswith("material"):
-            return (
-                self.db.query(MaterialItem)
-                .filter(MaterialItem.source_file_id == file_record.id)
-                .all()
-            )
+            return MaterialItem
         if file_type.startswith("part"):
-            return (
-                self.db.query(PartItem)
-                .filter(PartItem.source_file_id == file_record.id)
-                .all()
-            )
+            return PartItem
         if file_type.startswith("labor"):
-            return (
-                self.db.query(LaborItem)
-                .filter(LaborItem.source_file_id == file_record.id)
-                .all()
-            )
-        if file_type.startswith("logistics"):
-            return (
-                self.db.query(LogisticsItem)
-                .filter(LogisticsItem.source_file_id == file_record.id)
-                .all()
-            )
-        if file_type.startswith("manual"):
-            return (
-                self.db.query(LogisticsItem)
-                .filter(LogisticsItem.source_file_id == file_record.id)
-                .all()
-            )
-        return []
-    
-    def _validate_item(self, item) -> ItemValidationResult:
+            return LaborItem
+        if file_type.startswith("logistics") or file_type.startswith("manual"):
+            return LogisticsItem
+        return None
+
+    def _resolve_plans(self, project_id: str) -> Dict[type, ValidationPlan]:
+        '''
+        解析某项目生效的规则 plan（已按项目级禁用规则过滤）
+
+        :param project_id: 项目ID
+        :return: item model -> ValidationPlan
+        '''
+        disabled = self.get_disabled_rule_codes(project_id)
+        return {
+            model: get_plan(model, disabled)
+            for model in (MaterialItem, PartItem, LaborItem, LogisticsItem)
+        }
+
+    def _validate_item(self, item, plans: Dict[type, ValidationPlan]) -> ItemValidationResult:
         '''
         Validate a single item and return ItemValidationResult.
         
         :param item: Item to validate (MaterialItem, PartItem, LaborItem, LogisticsItem)
         :type item: Any
+        :param plans: item model -> compiled ValidationPlan
         :return:  ItemValidationResult
         :rtype: ItemValidationResult
         '''
-        if isinstance(item, MaterialItem):
-            return self._validate_material_item(item)
-        if isinstance(item, PartItem):
-            return self._validate_single_part_item(item)
-        if isinstance(item, LaborItem):
-            return self._validate_labor_item(item)
-        if isinstance(item, LogisticsItem):
-            return self._validate_logistics_item(item)
+        plan = plans.get(type(item))
+        if plan is not None:
+            return plan.evaluate_item(item, item.status == CostItemStatus.confirmed)
 
         # 未知类型，标记为 blocked
         return ItemValidationResult(
@@ -249,127 +629,12 @@ class ValidationService:
             error_codes=["UNKNOWN_ITEM"],
             messages=["Unknown item type"],
         )
-        
-    def _validate_material_item(self, item: MaterialItem) -> ItemValidationResult:
-        '''
-        Validate a MaterialItem and return ItemValidationResult.
-        
-        :param item:  MaterialItem to validate
-        :type item: MaterialItem
-        :return:  ItemValidationResult
-        :rtype: ItemValidationResult
-        '''
-        attribute_map = {"weight_kg":"参考重量（kg）", "unit_price":"单价", "subtotal":"小计"}
-        if item.status == CostItemStatus.confirmed:
-            return ItemValidationResult(
-                item_id=item.id,
-                status="confirmed",
-                messages=["异常已由人工确认。"],
-            )
-        result = ItemValidationResult(item_id=item.id, status="ok")#默认状态为 ok
-
-        # 1. 完整性（兜底路径）
-        has_system = item.weight_kg is not None and item.unit_price is not None
-        has_manual = item.subtotal is not None
-
-        if not has_system and not has_manual:
-            result.status = "blocked"
-            result.error_codes.append("MISSING_ALL")
-            result.messages.append("【参考重量（kg），单价，小计】部分缺失，请补全。")
-            return result
-
-        if not has_system and has_manual:
-            result.status = "warning"
-            result.error_codes.append("MISSING_SYSTEM")
-            result.messages.append("【参考重量（kg），单价】部分缺失，请补全。")
-
-        # 2. 非负性
-        for name in ["quantity","weight_kg", "unit_price", "subtotal"]:
-            val = getattr(item, name, None)
-            #先判存在性
-            if val is None:
-                continue
-            val = self._to_decimal(val)
-            if val < Decimal('0'):
-                result.status = "blocked"#存在负数-> blocked
-                result.error_codes.append("NEGATIVE_VALUE")
-                result.messages.append(f"{attribute_map[name]} 为负数，请修改。")
-                return result
-
-        # 3. 数量关系（只对 ok）
-        if result.status == "ok" and has_system and has_manual:
-            weight_kg = self._to_decimal(item.weight_kg)
-            unit_price = self._to_decimal(item.unit_price)
-            subtotal = self._to_decimal(item.subtotal)
-            expected = weight_kg * unit_price * Decimal("0.001")
-            if abs(expected - subtotal) > 1:
-                result.status = "blocked"
-                result.error_codes.append("RULE_INCONSISTENT")
-                result.messages.append(
-                    "数量关系异常，单价默认每吨，请确保【小计=参考重量（kg）*单价*0.001】。"
-                )
 
-        return result
-    
-    def _validate_single_part_item(self, item: PartItem) -> ItemValidationResult:
-        '''
-        Validate a PartItem and return ItemValidationResult.
-    
-        :param item: PartItem to validate
-        :type item: PartItem
-        :return: ItemValidationResult
-        :rtype: ItemValidationResult
-        '''
-        attribute_map = {"quantity":"数量", "unit_price":"单价", "subtotal":"小计"}
-        if item.status == CostItemStatus.confirmed:
-            return ItemValidationResult(
-                item_id=item.id,
-                status="confirmed",
-                messages=["异常已由人工确认。"],
-            )
-        result = ItemValidationResult(item_id=item.id, status="ok")#先默认为ok
-
-        has_system = item.quantity is not None and item.unit_price is not None
-        has_manual = item.subtotal is not None
-        #完整性校验
-        if not has_system and not has_manual:
-            result.status = "blocked"
-            result.error_codes.append("MISSING_ALL")
-            result.messages.append("【数量，单价，小计】存在部分缺失，请补全。")
-            return result
-
-        if not has_system and has_manual:
-            result.status = "warning"
-            result.error_codes.append("MISSING_SYSTEM")
-            result.messages.append("【数量，单价】存在部分缺失，请补全。")
-        #非负性校验
-        for name in ["quantity", "unit_price", "subtotal"]:
-            val = getattr(item, name, None)
-            #先判存在性
-            if val is None:
-                continue
-            #再判非负性
-            val = self._to_decimal(val)
-            if  val < Decimal('0'):
-                result.status = "blocked"#存在负数-> blocked
-                result.error_codes.append("NEGATIVE_VALUE")
-                result.messages.append(f"【{attribute_map[name]}】 为负数，请修改。")
-                return result
-        #数量关系校验（只对 ok）
-        if result.status == "ok" and has_system and has_manual:
-            quantity = self._to_decimal(item.quantity)
-            unit_price = self._to_decimal(item.unit_price)
-            subtotal = self._to_decimal(item.subtotal)
-            expected = quantity * unit_price
-            if abs(expected - subtotal) > 1:
-                result.status = "blocked"
-                result.error_codes.append("RULE_INCONSISTENT")
-                result.messages.append("数量关系异常，请确保【小计 = 数量*单价】。")
-
-        return result
     def _validate_part_bundle(
         self,
         bundle_items: list[PartItem],
+        plan: ValidationPlan,
+        non_calculable: Set[str],
     ) -> dict[str, ItemValidationResult]:
         """
         Bundle validation rules (final version):
@@ -381,6 +646,8 @@ class ValidationService:
         - Non-anchor items if have subtotal == 0, status = warning
         :param bundle_items: List of PartItems in the same bundle
         :type bundle_items: list[PartItem]
+        :param plan: compiled PartItem ValidationPlan (used for the anchor)
+        :param non_calculable: collects ids of non-anchor rows to be marked is_calculable=False
         return dict[str, ItemValidationResult] which maps item_id to validation result of each item in the bundle
         """
         attribute_map = {"quantity":"数量", "unit_price":"单位", "subtotal":"小计"}
@@ -459,7 +726,7 @@ class ValidationService:
                     )
                 else:
                     #等于0或None，is_calculable= False，status = ok. 不纳入cost计算，但保留在系统中
-                    item.is_calculable = False
+                    non_calculable.add(item.id)
                     results[item.id] = ItemValidationResult(
                         item_id=item.id,
                         status="ok",
@@ -469,7 +736,7 @@ class ValidationService:
 
 
         # 5️⃣ 校验 anchor 本身（复用单行逻辑）
-        anchor_result = self._validate_single_part_item(anchor)
+        anchor_result = plan.evaluate_item(anchor, anchor.status == CostItemStatus.confirmed)
 
         results[anchor.id] = anchor_result
         return results
@@ -478,11 +745,15 @@ class ValidationService:
     def _validate_part_items_with_bundle(
         self,
         items: list[PartItem],
+        plan: ValidationPlan,
+        non_calculable: Set[str],
     ) -> dict[str, ItemValidationResult]:
         """
         Validate PartItems with bundle awareness.
         :param items: List of PartItems to validate
         :type items: list[PartItem]
+        :param plan: compiled PartItem ValidationPlan
+        :param non_calculable: collects ids of bundle non-anchor rows
         """
         results: dict[str, ItemValidationResult] = {}
 
@@ -495,137 +766,15 @@ class ValidationService:
             # bundle_key== None, 单行 bundle，直接走普通校验
             if bundle_key is None or len(bundle_items) == 1:
                 for item in bundle_items:
-                    results[item.id] = self._validate_single_part_item(item)
+                    results[item.id] = plan.evaluate_item(item, item.status == CostItemStatus.confirmed)
                 continue
             else:
                 # 多行 bundle,走bundle校验,直接把同一个bundle的items传进去
-                bundle_results = self._validate_part_bundle(bundle_items)
+                bundle_results = self._validate_part_bundle(bundle_items, plan, non_calculable)
                 results.update(bundle_results)
 
         return results
     
-    def _validate_labor_item(self, item: LaborItem) -> ItemValidationResult:
-        '''
-        validate a LaborItem and return ItemValidationResult.
-
-        :param item: LaborItem to validate
-        :type item: LaborItem
-        :return:  ItemValidationResult
-        :rtype: ItemValidationResult
-        '''
-        attribute_map = {
-            "work_quantity":"数量",
-            "unit_price":"单价",
-            "extra_subsidies":"补助",
-            "ton_bonus":"吨位奖金",
-            "subtotal":"小计"
-            }
-        if item.status == CostItemStatus.confirmed:
-            return ItemValidationResult(
-                item_id=item.id,
-                status="confirmed",
-                messages=["异常已由人工确认。"],
-            )
-        result = ItemValidationResult(item_id=item.id, status="ok")
-
-        has_system = (
-            item.work_quantity is not None
-            and item.unit is not None
-            and item.unit_price is not None
-            and item.extra_subsidies is not None
-            and item.ton_bonus is not None
-        )
-        has_manual = item.subtotal is not None
-
-        # 完整性
-        if not has_system and not has_manual:
-            result.status = "blocked"
-            result.error_codes.append("MISSING_ALL")
-            result.messages.append("【数量，单位，单价，补助，吨位奖金，小计】中部分属性存在缺失，请补全。")
-            return result
-
-        if not has_system and has_manual:
-            result.status = "warning"
-            result.error_codes.append("MISSING_SYSTEM")
-            result.messages.append("【数量，单位，单价，补助，吨位奖金】中部分属性存在缺失，请补全。")
-
-        # 非负性
-        for name in [
-            "work_quantity",
-            "unit_price",
-            "extra_subsidies",
-            "ton_bonus",
-            "subtotal",
-        ]:
-            val = getattr(item, name, None)
-            if val is None:
-                continue
-            val = self._to_decimal(val)
-            if val < Decimal("0"):
-                result.status = "blocked"
-                result.error_codes.append("NEGATIVE_VALUE")
-                result.messages.append(f"【{attribute_map[name]}】为负数，请修改。")
-                return result
-
-        # 数量关系（仅 ok）
-        if result.status == "ok" and has_system and has_manual:
-            work_quantity = self._to_decimal(item.work_quantity)
-            unit_price = self._to_decimal(item.unit_price)
-            subtotal = self._to_decimal(item.subtotal)
-            extra_subsidies = self._to_decimal(item.extra_subsidies)
-            ton_bonus = self._to_decimal(item.ton_bonus)
-            expected_processing = work_quantity * unit_price
-            #ton_bonus = (
-            #    Decimal(item.work_quantity) * Decimal("5")
-            #    if item.unit == "吨"
-            #    else Decimal(item.work_quantity) * Decimal("0.005"))
-            expected_total = (
-                expected_processing
-                + extra_subsidies
-                + ton_bonus
-            )
-
-            if abs(expected_total - subtotal) > 1:
-                result.status = "blocked"
-                result.error_codes.append("RULE_INCONSISTENT")
-                result.messages.append(
-                    "数量关系异常，请确保：【小计 = 数量 * 单价 + 补助 + 吨位奖金】。"
-                )
-
-        return result
-
-    def _validate_logistics_item(self, item: LogisticsItem) -> ItemValidationResult:
-        '''
-        Validate a LogisticsItem and return ItemValidationResult.
-        
-        :param item: LogisticsItem to validate
-        :type item: LogisticsItem
-        :return:  ItemValidationResult
-        :rtype: ItemValidationResult
-        '''
-        if item.status == CostItemStatus.confirmed:
-            return ItemValidationResult(
-                item_id=item.id,
-                status="confirmed",
-                messages=["异常已由人工确认"],
-            )
-        result = ItemValidationResult(item_id=item.id, status="ok")
-
-        # 完整性
-        if item.subtotal is None:
-            result.status = 'blocked'
-            result.error_codes.append("MISSING_SUBTOTAL")
-            result.messages.append("【小计】缺失，请填补。")
-            return result
-
-        # 非负性
-        if self._to_decimal(item.subtotal) < Decimal("0"):
-            result.status = 'blocked'
-            result.error_codes.append("NEGATIVE_VALUE")
-            result.messages.append("【小计】为负数，请修改。")
-            return result
-        return result
-
     def _aggregate_file_status(
         self, results: List[ItemValidationResult]
     ) -> ValidationStatus:
@@ -648,3 +797,459 @@ class ValidationService:
         return ValidationStatus.ok
 
 
+
+    # =========
+    # 校验明细查询（基于 item_validation_results，分页读取）
+    # =========
+    def get_validation_summary(self, file_record: FileRecord) -> ValidationSummary:
+        '''
+        不重新校验，直接按 Item.status 聚合出当前的计数
+
+        :param file_record: FileRecord
+        :type file_record: FileRecord
+        :return: ValidationSummary
+        :rtype: ValidationSummary
+        '''
+        counts = {status: 0 for status in CostItemStatus}
+        model = self._item_model(file_record)
+        if model is not None:
+            rows = (
+                self.db.query(model.status, func.count())
+                .filter(model.source_file_id == file_record.id)
+                .group_by(model.status)
+                .all()
+            )
+            for status, n in rows:
+                counts[status] = n
+        return ValidationSummary(
+            id=file_record.id,
+            file_type=file_record.file_type.value,
+            validation_status=file_record.validation_status.value,
+            total_items=sum(counts.values()),
+            ok_count=counts[CostItemStatus.ok],
+            confirmed_count=counts[CostItemStatus.confirmed],
+            warning_count=counts[CostItemStatus.warning],
+            blocked_count=counts[CostItemStatus.blocked],
+        )
+
+    def list_item_results(
+        self,
+        file_id: str,
+        *,
+        status: Optional[str] = None,
+        error_code: Optional[str] = None,
+        cursor: Optional[int] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> ValidationResultPage:
+        '''
+        按 seq 游标分页读取最近一次校验持久化的 blocked / warning 明细
+
+        :param file_id: FileRecord ID
+        :type file_id: str
+        :param status: "blocked" | "warning"，None 表示两者都要
+        :type status: Optional[str]
+        :param error_code: 只返回包含该 error code 的项
+        :type error_code: Optional[str]
+        :param cursor: 上一页返回的 next_cursor，None 表示第一页
+        :type cursor: Optional[int]
+        :param limit: 每页条数
+        :type limit: int
+        :return: ValidationResultPage
+        :rtype: ValidationResultPage
+        '''
+        if status is not None and status not in PERSISTED_RESULT_STATUSES:
+            raise ValueError(f"Invalid status: {status}, expected one of {PERSISTED_RESULT_STATUSES}")
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+
+        if error_code is not None:
+            # 走 (file_id, error_code, seq) 索引，再按 (file_id, item_id) 取明细
+            code_index = ItemValidationErrorCode
+            query = (
+                self.db.query(ItemValidationRecord)
+                .join(
+                    code_index,
+                    and_(
+                        code_index.file_id == ItemValidationRecord.file_id,
+                        code_index.item_id == ItemValidationRecord.item_id,
+                    ),
+                )
+                .filter(code_index.file_id == file_id, code_index.error_code == error_code)
+            )
+            seq_col = code_index.seq
+        else:
+            query = self.db.query(ItemValidationRecord).filter(ItemValidationRecord.file_id == file_id)
+            seq_col = ItemValidationRecord.seq
+        if status is not None:
+            query = query.filter(ItemValidationRecord.status == status)
+        if cursor is not None:
+            query = query.filter(seq_col > cursor)
+
+        rows = query.order_by(seq_col).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return ValidationResultPage(
+            items=[
+                ItemValidationResult(
+                    item_id=r.item_id,
+                    status=r.status,
+                    error_codes=list(r.error_codes or []),
+                    messages=list(r.messages or []),
+                )
+                for r in rows
+            ],
+            next_cursor=rows[-1].seq if has_more else None,
+        )
+
+    def iter_item_results(
+        self,
+        file_id: str,
+        *,
+        status: Optional[str] = None,
+        error_code: Optional[str] = None,
+        batch_size: int = 500,
+    ) -> Iterator[ItemValidationResult]:
+        '''
+        逐页流式遍历校验明细，内存中最多只有一页
+
+        :param file_id: FileRecord ID
+        :param status: "blocked" | "warning"，None 表示两者都要
+        :param error_code: 只返回包含该 error code 的项
+        :param batch_size: 每次查询的条数
+        '''
+        cursor = None
+        while True:
+            page = self.list_item_results(
+                file_id,
+                status=status,
+                error_code=error_code,
+                cursor=cursor,
+                limit=batch_size,
+            )
+            yield from page.items
+            if page.next_cursor is None:
+                return
+            cursor = page.next_cursor
+
+    def list_items_with_error(self, file_id: str, error_code: str) -> List[str]:
+        '''
+        某文件中命中指定 error code 的全部 item_id（如 "RULE_INCONSISTENT"），按 seq 排序
+
+        :param file_id: FileRecord ID
+        :type file_id: str
+        :param error_code: rule code
+        :type error_code: str
+        :return: item_id 列表
+        :rtype: List[str]
+        '''
+        rows = (
+            self.db.query(ItemValidationErrorCode.item_id)
+            .filter(
+                ItemValidationErrorCode.file_id == file_id,
+                ItemValidationErrorCode.error_code == error_code,
+            )
+            .order_by(ItemValidationErrorCode.seq)
+            .all()
+        )
+        return [r[0] for r in rows]
+
+    def get_error_code_counts(self, file_id: str) -> Dict[str, int]:
+        '''
+        某文件各 error code 命中的 item 数，用于页面筛选
+
+        :param file_id: FileRecord ID
+        :type file_id: str
+        :return: error_code -> item 数
+        :rtype: Dict[str, int]
+        '''
+        rows = (
+            self.db.query(ItemValidationErrorCode.error_code, func.count())
+            .filter(ItemValidationErrorCode.file_id == file_id)
+            .group_by(ItemValidationErrorCode.error_code)
+            .order_by(ItemValidationErrorCode.error_code)
+            .all()
+        )
+        return {code: n for code, n in rows}
+
+    def results_outdated(self, file_record: FileRecord) -> bool:
+        '''
+        已持久化的明细是否需要重新生成：
+        - 明细不是由当前生效的规则产生（规则升级或项目规则开关变化）
+        - 或者 Item.status 有 blocked / warning，却没有任何明细（持久化之前校验过的文件）
+
+        :param file_record: FileRecord
+        :type file_record: FileRecord
+        :rtype: bool
+        '''
+        model = self._item_model(file_record)
+        if model is None:
+            return False
+        current = self._resolve_plans(file_record.project_id)[model].version
+        stale = (
+            self.db.query(ItemValidationRecord.id)
+            .filter(
+                ItemValidationRecord.file_id == file_record.id,
+                ItemValidationRecord.rule_version.is_distinct_from(current),
+            )
+            .first()
+        )
+        if stale is not None:
+            return True
+        has_records = (
+            self.db.query(ItemValidationRecord.id)
+            .filter(ItemValidationRecord.file_id == file_record.id)
+            .first()
+        ) is not None
+        if has_records:
+            return False
+        has_issues = (
+            self.db.query(model.id)
+            .filter(
+                model.source_file_id == file_record.id,
+                model.status.in_([CostItemStatus.blocked, CostItemStatus.warning]),
+            )
+            .first()
+        ) is not None
+        return has_issues
+
+    def get_paged_report(
+        self,
+        file_record: FileRecord,
+        *,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        blocked_cursor: Optional[int] = None,
+        warning_cursor: Optional[int] = None,
+        error_code: Optional[str] = None,
+    ) -> PagedValidationReport:
+        '''
+        计数 + blocked / warning 各一页明细，供页面和 agent 直接展示
+
+        :param file_record: FileRecord
+        :param page_size: 每类明细的条数
+        :param blocked_cursor: blocked 明细的游标
+        :param warning_cursor: warning 明细的游标
+        :param error_code: 只展示命中该 error code 的明细
+        '''
+        return PagedValidationReport(
+            summary=self.get_validation_summary(file_record),
+            blocked_page=self.list_item_results(
+                file_record.id, status="blocked", error_code=error_code,
+                cursor=blocked_cursor, limit=page_size,
+            ),
+            warning_page=self.list_item_results(
+                file_record.id, status="warning", error_code=error_code,
+                cursor=warning_cursor, limit=page_size,
+            ),
+            error_code_counts=self.get_error_code_counts(file_record.id),
+        )
+
+    def get_item_result(self, item) -> ItemValidationResult:
+        '''
+        单个 item 最近一次的校验结果；ok / confirmed 项未持久化，按 Item.status 还原
+
+        :param item: MaterialItem | PartItem | LaborItem | LogisticsItem
+        :return: ItemValidationResult
+        '''
+        record = (
+            self.db.query(ItemValidationRecord)
+            .filter(
+                ItemValidationRecord.file_id == item.source_file_id,
+                ItemValidationRecord.item_id == item.id,
+            )
+            .first()
+        )
+        if record is not None:
+            return ItemValidationResult(
+                item_id=item.id,
+                status=record.status,
+                error_codes=list(record.error_codes or []),
+                messages=list(record.messages or []),
+            )
+        if item.status == CostItemStatus.confirmed:
+            return ItemValidationResult(
+                item_id=item.id,
+                status="confirmed",
+                messages=[get_plan(type(item)).confirmed_message],
+            )
+        return ItemValidationResult(item_id=item.id, status=item.status.value)
+
+    def get_items_by_id(self, file_record: FileRecord, item_ids: List[str]) -> Dict[str, Any]:
+        '''
+        按 id 批量加载某文件下的 items，用于展示一页明细
+
+        :param file_record: FileRecord
+        :param item_ids: item id 列表
+        :return: item_id -> item
+        '''
+        model = self._item_model(file_record)
+        if model is None or not item_ids:
+            return {}
+        items: Dict[str, Any] = {}
+        for i in range(0, len(item_ids), _UPDATE_CHUNK):
+            for item in (
+                self.db.query(model)
+                .filter(model.id.in_(item_ids[i:i + _UPDATE_CHUNK]))
+                .all()
+            ):
+                items[item.id] = item
+        return items
+
+    # =========
+    # 项目级规则开关
+    # =========
+    def get_disabled_rule_codes(self, project_id: str) -> Set[str]:
+        '''
+        获取某项目下被禁用的 rule code 集合
+
+        :param project_id: 项目ID
+        :type project_id: str
+        :return: 被禁用的 rule code
+        :rtype: Set[str]
+        '''
+        rows = (
+            self.db.query(ValidationRuleSetting.rule_code)
+            .filter(
+                ValidationRuleSetting.project_id == project_id,
+                ValidationRuleSetting.enabled.is_(False),
+            )
+            .all()
+        )
+        return {code for (code,) in rows}
+
+    def list_rule_settings(self, project_id: str) -> Dict[str, Dict[str, bool]]:
+        '''
+        列出某项目下每种 item 类型的规则及其开关状态
+
+        :param project_id: 项目ID
+        :type project_id: str
+        :return: item_type -> {rule_code: enabled}
+        :rtype: Dict[str, Dict[str, bool]]
+        '''
+        disabled = self.get_disabled_rule_codes(project_id)
+        return {
+            item_type: {code: code not in disabled for code in codes}
+            for item_type, codes in all_rule_codes().items()
+        }
+
+    def set_rule_enabled(
+        self,
+        *,
+        project_id: str,
+        rule_code: str,
+        enabled: bool,
+        operator_id: str,
+    ) -> ValidationRuleSetting:
+        '''
+        开启/关闭某项目下的一条校验规则（按 rule code，作用于所有 item 类型）
+        修改后需要重新 validate_file 才会反映到 item 状态
+
+        :param project_id: 项目ID
+        :type project_id: str
+        :param rule_code: 规则 code，如 RULE_INCONSISTENT
+        :type rule_code: str
+        :param enabled: 是否启用
+        :type enabled: bool
+        :param operator_id: 操作用户ID
+        :type operator_id: str
+        '''
+        known = {code for codes in all_rule_codes().values() for code in codes}
+        if rule_code not in known:
+            raise ValueError(f"Unknown validation rule: {rule_code}")
+
+        setting = (
+            self.db.query(ValidationRuleSetting)
+            .filter(
+                ValidationRuleSetting.project_id == project_id,
+                ValidationRuleSetting.rule_code == rule_code,
+            )
+            .first()
+        )
+        if setting is None:
+            setting = ValidationRuleSetting(
+                id=str(uuid4()),
+                project_id=project_id,
+                rule_code=rule_code,
+                enabled=True,
+            )
+            self.db.add(setting)
+
+        old_enabled = setting.enabled
+        if old_enabled == enabled:
+            return setting
+
+        setting.enabled = enabled
+        setting.updated_by = operator_id
+        self.db.flush()
+
+        self.audit_log_service.record_update(
+            project_id=project_id,
+            entity_type="ValidationRuleSetting",
+            entity_id=setting.id,
+            changed_attribute=f"enabled:{rule_code}",
+            before_value=old_enabled,
+            after_value=enabled,
+            operator_id=operator_id,
+        )
+        return setting
+
+
+def _worker_engine(db: Session) -> Optional[Engine]:
+    '''
+    可以给每个 worker 线程一个独立连接的 Engine；不能时返回 None（顺序执行）
+
+    Connection 不能跨线程共享；SingletonThreadPool（内存 SQLite 的默认池，每个线程各自一个空库）
+    和 StaticPool（所有线程共用一个连接）也不行
+    '''
+    bind = db.get_bind()
+    if not isinstance(bind, Engine):
+        return None
+    if isinstance(bind.pool, (SingletonThreadPool, StaticPool)):
+        return None
+    return bind
+
+
+def _evaluate_file_in_worker(
+    session_factory: sessionmaker,
+    file_id: str,
+    plans: Dict[type, ValidationPlan],
+) -> _FileEvaluation:
+    '''
+    线程池 worker：用独立 session 只读加载一个文件的 items 并执行校验，结束时回滚
+
+    :param session_factory: 绑定连接池 Engine 的 sessionmaker
+    :param file_id: FileRecord ID
+    :param plans: 调用方解析好的 ValidationPlan（不可变，可跨线程共享）
+    '''
+    db = session_factory()
+    try:
+        return _evaluate_file(db, file_id, plans)
+    finally:
+        db.rollback()
+        db.close()
+
+
+def _evaluate_file(db: Session, file_id: str, plans: Dict[type, ValidationPlan]) -> _FileEvaluation:
+    '''
+    加载一个文件的 items 并执行校验（纯计算，不修改 item、不写库）
+
+    :param db: 读取用的 session
+    :param file_id: FileRecord ID
+    :param plans: item model -> ValidationPlan
+    '''
+    file_record = db.get(FileRecord, file_id)
+    if file_record is None:
+        raise ValueError(f"FileRecord not found: {file_id}")
+    service = ValidationService(db, AuditLogService(db))
+    items = service._load_items(file_record)
+    results, non_calculable = service._evaluate_items(items, plans)
+    calculable_subtotal_units, calculable_count = calculable_totals(items, non_calculable)
+    return _FileEvaluation(
+        file_id=file_id,
+        model=type(items[0]) if items else None,
+        total_items=len(items),
+        old_statuses={item.id: item.status for item in items},
+        results=results,
+        non_calculable=non_calculable,
+        calculable_subtotal_units=calculable_subtotal_units,
+        calculable_count=calculable_count,
+    )
@@ -0,0 +1,89 @@
+# benchmarks/bench_cost_rollup.py
+"""
+跨项目成本汇总：读 CostRollup 与逐个加载 CostSummary 再汇总的耗时对比。
+
+直接批量写入 --projects 个项目（随机 spec_tags）、每个项目 --summaries 个 CostSummary
+（分布在 24 个月内，每个项目只有最新一个为 ACTIVE），重建 CostRollup 后计时：
+- scan_summaries：加载全部 CostSummary + Project，在内存中按标签汇总（没有汇总表时的做法）
+- rollup_by_tag：CostRollupService.query(group_by=tag)
+- rollup_by_tag_month：按 标签 × 月份，含已替代版本
+- rollup_drill_down：单个标签、单月，按项目分组
+
+用法：python -m benchmarks.bench_cost_rollup --projects 2000 --summaries 25 --repeat 5
+"""
+import argparse
+
+from benchmarks.fixtures import measure, print_table, setup_database
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=2000)
+    parser.add_argument("--summaries", type=int, default=25, help="每个项目的 CostSummary 数")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-url", default=None, help="默认使用临时 SQLite 文件")
+    args = parser.parse_args()
+
+    setup_database(args.database_url)
+
+    import random
+    import uuid
+    from collections import defaultdict
+    from datetime import datetime
+    from decimal import Decimal
+
+    from sqlalchemy import insert, select
+
+    from app.db.enums import CostSummaryStatus
+    from app.db.session import get_session
+    from app.models.cost_summary import CostSummary
+    from app.models.project import Project
+    from app.services.cost_rollup_service import CostRollupService
+
+    rng = random.Random(7)
+    tags = ["钢结构", "出口", "桥梁", "厂房", "储罐", "塔架"]
+    db = get_session()
+    projects, summaries = [], []
+    for p in range(args.projects):
+        project_id = str(uuid.uuid4())
+        projects.append({"id": project_id, "raw_name": f"项目{p}", "spec_tags": rng.sample(tags, rng.randint(0, 2))})
+        for v in range(1, args.summaries + 1):
+            month = (v - 1) * 24 // args.summaries
+            costs = [Decimal(rng.randint(1, 10 ** 9)) / 100 for _ in range(4)]
+            summaries.append({
+                "id": str(uuid.uuid4()), "project_id": project_id, "calculation_version": v,
+                "material_file_id": "m", "part_file_id": "p", "labor_file_id": "l", "logistics_file_id": "g",
+                "material_cost": costs[0], "part_cost": costs[1], "labor_cost": costs[2], "logistics_cost": costs[3],
+                "total_cost": sum(costs),
+                "status": CostSummaryStatus.ACTIVE if v == args.summaries else CostSummaryStatus.REPLACED,
+                "calculated_at": datetime(2025 + month // 12, month % 12 + 1, 15),
+            })
+    db.execute(insert(Project), projects)
+    db.execute(insert(CostSummary), summaries)
+    service = CostRollupService(db)
+    rollup_rows = service.rebuild()
+    db.commit()
+
+    def scan_summaries():
+        project_tags = {pid: spec_tags or [] for pid, spec_tags in db.execute(select(Project.id, Project.spec_tags))}
+        totals = defaultdict(Decimal)
+        for summary in db.query(CostSummary).filter(CostSummary.status == CostSummaryStatus.ACTIVE):
+            for tag in project_tags[summary.project_id] or [None]:
+                totals[tag] += summary.total_cost
+        db.expunge_all()
+        return totals
+
+    print_table(f"portfolio rollup, {len(summaries)} summaries, {rollup_rows} rollup rows", [
+        {"path": "scan_summaries", **measure(scan_summaries, args.repeat)},
+        {"path": "rollup_by_tag", **measure(lambda: service.query(group_by=("tag",)), args.repeat)},
+        {"path": "rollup_by_tag_month", **measure(
+            lambda: service.query(group_by=("tag", "month"), statuses=None), args.repeat)},
+        {"path": "rollup_drill_down", **measure(
+            lambda: service.query(group_by=("project",), tags=["出口"], month_from="2026-12", month_to="2026-12"),
+            args.repeat)},
+    ])
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/bench_cost_summary.py
+"""
+CostSummary 生成路径的往返次数与耗时。
+
+对比：
+- per_table_sum：4 次 _load_file + 每表一条 SUM（最初的实现）
+- union_recompute：1 次 IN 加载 FileRecord + 1 条 UNION ALL 从 items 重新聚合
+- aggregate_lookup：1 次 IN 加载 FileRecord + 读取 FileCostAggregate 聚合行
+并统计完整 generate_cost_summary 执行的 SQL 语句数（每轮回滚，不落库）。
+
+用法：python -m benchmarks.bench_cost_summary --items 20000 --repeat 5
+"""
+import argparse
+from decimal import Decimal
+
+from benchmarks.fixtures import count_queries, measure, print_table, seed_project, setup_database
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=20000, help="每个成本文件的 item 数")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-url", default=None, help="默认使用临时 SQLite 文件")
+    args = parser.parse_args()
+
+    setup_database(args.database_url)
+
+    from sqlalchemy import func
+
+    from app.db.session import get_engine, get_session
+    from app.models.labor_item import LaborItem
+    from app.models.logistics_item import LogisticsItem
+    from app.models.material_item import MaterialItem
+    from app.models.part_item import PartItem
+    from app.services.audit_log_service import AuditLogService
+    from app.services.cost_calculation_service import CostCalculationService
+
+    db = get_session()
+    ids = seed_project(db, args.items)
+    db.commit()
+
+    engine = get_engine()
+    service = CostCalculationService(db, AuditLogService(db))
+    categories = [
+        (MaterialItem, ids["material_cost"]),
+        (PartItem, ids["part_cost"]),
+        (LaborItem, ids["labor_cost"]),
+        (LogisticsItem, ids["logistics_cost"]),
+    ]
+    file_ids = [file_id for _, file_id in categories]
+
+    def per_table_sum():
+        db.expire_all()
+        totals = []
+        for model, file_id in categories:
+            service._load_file(file_id)
+            subtotal_sum = (
+                db.query(func.sum(model.subtotal))
+                .filter(model.source_file_id == file_id, model.is_calculable.is_(True))
+                .scalar()
+            )
+            totals.append(Decimal(subtotal_sum or 0).quantize(Decimal("0.00001")))
+        return totals
+
+    def union_recompute():
+        db.expire_all()
+        service._load_files(file_ids)
+        totals = service.aggregates.recompute(file_ids)
+        return [totals[file_id].calculable_subtotal for file_id in file_ids]
+
+    def aggregate_lookup():
+        db.expire_all()
+        service._load_files(file_ids)
+        totals = service.aggregates.get_many(file_ids)
+        return [totals[file_id].calculable_subtotal for file_id in file_ids]
+
+    expected = per_table_sum()
+    assert union_recompute() == expected, "UNION ALL totals differ from per-table SUM"
+    assert aggregate_lookup() == expected, "FileCostAggregate differs from per-table SUM"
+
+    rows = []
+    for name, fn in (
+        ("per_table_sum", per_table_sum),
+        ("union_recompute", union_recompute),
+        ("aggregate_lookup", aggregate_lookup),
+    ):
+        with count_queries(engine) as counter:
+            fn()
+        rows.append({"path": name, "statements": counter.count, **measure(fn, args.repeat)})
+
+    def full_summary():
+        try:
+            service.generate_cost_summary(
+                project_id=ids["project_id"],
+                material_file_id=ids["material_cost"],
+                part_file_id=ids["part_cost"],
+                labor_file_id=ids["labor_cost"],
+                logistics_file_id=ids["logistics_cost"],
+                operator_id=ids["user_id"],
+            )
+        finally:
+            db.rollback()
+
+    with count_queries(engine) as counter:
+        full_summary()
+    rows.append({"path": "generate_cost_summary", "statements": counter.count, **measure(full_summary, args.repeat)})
+
+    print_table(f"cost summary aggregation, {args.items} items per file", rows)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
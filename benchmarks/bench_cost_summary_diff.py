@@ -0,0 +1,88 @@
+# benchmarks/bench_cost_summary_diff.py
+"""
+两个 CostSummary 版本对比（CostSummaryDiffService.diff）的耗时。
+
+造同一项目的两版文件（每类各 --items 条），第二版改动约 1% 的材料单价、删掉若干配件，
+分别生成 CostSummary 后计时：
+- load_items：只执行两版四类 item 的分组查询（diff 的查询部分）
+- diff：完整对比（查询 + 按键哈希连接）
+- as_dict：diff + 转为 JSON 结构（diff.json 接口返回全部变化时的开销）
+
+用法：python -m benchmarks.bench_cost_summary_diff --items 12500 --repeat 5
+"""
+import argparse
+
+from benchmarks.fixtures import measure, print_table, seed_project, setup_database
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=12500, help="每个成本文件的 item 数（一个 CostSummary 共 4 倍）")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-url", default=None, help="默认使用临时 SQLite 文件")
+    args = parser.parse_args()
+
+    setup_database(args.database_url)
+
+    from decimal import Decimal
+
+    from sqlalchemy import delete, update
+
+    from app.db.session import get_session
+    from app.models.material_item import MaterialItem
+    from app.models.part_item import PartItem
+    from app.services.audit_log_service import AuditLogService
+    from app.services.cost_calculation_service import CostCalculationService
+    from app.services.cost_summary_diff_service import DIFF_CATEGORIES, CostSummaryDiffService
+    from app.services.file_aggregate_service import FileAggregateService
+
+    db = get_session()
+    first = seed_project(db, args.items)
+    second = seed_project(db, args.items, version=2, project_id=first["project_id"])
+
+    # 第二版：约 1% 的材料改单价，删掉 100 个配件名称对应的行
+    changed_names = [f"材料{i}" for i in range(0, 500, 100)]
+    db.execute(
+        update(MaterialItem)
+        .where(MaterialItem.source_file_id == second["material_cost"], MaterialItem.normalized_name.in_(changed_names))
+        .values(unit_price=Decimal("4.6"), subtotal=MaterialItem.weight_kg * Decimal("4.6") / 1000)
+    )
+    db.execute(
+        delete(PartItem)
+        .where(PartItem.source_file_id == second["part_cost"], PartItem.normalized_name.in_([f"配件{i}" for i in range(100)]))
+    )
+    FileAggregateService(db).rebuild([second["material_cost"], second["part_cost"]])
+
+    cost_service = CostCalculationService(db, AuditLogService(db))
+    summaries = [
+        cost_service.generate_cost_summary(
+            project_id=first["project_id"], operator_id=first["user_id"],
+            **{f"{c}_file_id": ids[f"{c}_cost"] for c in ("material", "part", "labor", "logistics")},
+        )
+        for ids in (first, second)
+    ]
+    db.commit()
+
+    service = CostSummaryDiffService(db)
+    base, target = service.resolve(first["project_id"], summaries[1].id)
+
+    def load_items():
+        return sum(
+            1
+            for spec in DIFF_CATEGORIES
+            for summary in (base, target)
+            for _ in service._iter_groups(spec, getattr(summary, spec.file_attr))
+        )
+
+    result = service.diff(base, target)
+    rows = load_items()
+    print_table(f"cost summary diff, {args.items} items per file, {rows} groups read, {len(result.changes)} changes", [
+        {"path": "load_items", **measure(load_items, args.repeat)},
+        {"path": "diff", **measure(lambda: service.diff(base, target), args.repeat)},
+        {"path": "as_dict", **measure(lambda: service.diff(base, target).as_dict(), args.repeat)},
+    ])
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
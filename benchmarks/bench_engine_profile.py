@@ -0,0 +1,89 @@
+# benchmarks/bench_engine_profile.py
+"""
+SQLite Engine 配置档：basic 与 tuned 的提交吞吐对比。
+
+每个配置档一个新的临时数据库文件：
+- serial_commits：单线程 --commits 次小事务提交（每次提交的 fsync 开销）
+- concurrent_commits：--threads 个线程各 --commits 次提交，同时有一个长读事务（报告导出）
+  以及同样数量的读线程；记录完成耗时和 database is locked 错误数
+
+用法：python -m benchmarks.bench_engine_profile --commits 200 --threads 8
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from benchmarks.fixtures import print_table
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commits", type=int, default=200, help="每个线程的提交次数")
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    from sqlalchemy import func, select
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.orm import sessionmaker
+
+    from app.db.base import Base
+    import app.db.auto_init  # noqa: F401  注册所有模型
+    from app.db.session import build_engine
+    from app.models.project import Project
+
+    def run(profile):
+        path = os.path.join(tempfile.mkdtemp(prefix="cost_bench_"), f"{profile}.db")
+        engine = build_engine(f"sqlite:///{path}", profile)
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        locked = []
+        done = threading.Event()
+
+        def commit_many(n):
+            for i in range(args.commits):
+                with Session() as db:
+                    db.add(Project(id=str(uuid.uuid4()), raw_name=f"p{n}-{i}"))
+                    try:
+                        db.commit()
+                    except OperationalError:
+                        locked.append(1)
+
+        def read():
+            while not done.is_set():
+                with Session() as db:
+                    db.scalar(select(func.count()).select_from(Project))
+
+        def long_read():
+            with engine.connect() as conn:
+                conn.exec_driver_sql("BEGIN")
+                conn.scalar(select(func.count()).select_from(Project))
+                done.wait(timeout=2)
+                conn.exec_driver_sql("ROLLBACK")
+
+        start = time.perf_counter()
+        commit_many(-1)
+        serial_ms = (time.perf_counter() - start) * 1000
+
+        writers = [threading.Thread(target=commit_many, args=(n,)) for n in range(args.threads)]
+        readers = [threading.Thread(target=read) for _ in range(args.threads)] + [threading.Thread(target=long_read)]
+        start = time.perf_counter()
+        for t in readers + writers:
+            t.start()
+        for t in writers:
+            t.join()
+        concurrent_ms = (time.perf_counter() - start) * 1000
+        done.set()
+        for t in readers:
+            t.join()
+        engine.dispose()
+        return {"profile": profile, "serial_commits_ms": serial_ms,
+                "concurrent_commits_ms": concurrent_ms, "locked_errors": len(locked)}
+
+    print_table(f"{args.commits} commits x {args.threads} threads", [run("basic"), run("tuned")])
+
+
+if __name__ == "__main__":
+    main()
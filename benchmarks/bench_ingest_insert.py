@@ -0,0 +1,71 @@
+# benchmarks/bench_ingest_insert.py
+"""
+Excel 解析入库：写入 items 的两种方式对比（不含读 Excel）。
+
+每轮构造 --rows 个 MaterialItem 对象（与 _parse_material_items 相同的字段），分别：
+- orm_add_all：Session.add_all + flush（原先的做法，逐对象走 unit of work）
+- bulk_insert：ExcelIngestService._insert_items（ORM bulk INSERT；PostgreSQL 上为多行 INSERT ... VALUES）
+每轮回滚。--database-url 可指向 PostgreSQL 对比两种数据库。
+
+用法：python -m benchmarks.bench_ingest_insert --rows 20000 --repeat 5
+"""
+import argparse
+
+from benchmarks.fixtures import measure, print_table, seed_project, setup_database
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-url", default=None, help="默认使用临时 SQLite 文件")
+    args = parser.parse_args()
+
+    url = setup_database(args.database_url)
+
+    from decimal import Decimal
+    from uuid import uuid4
+
+    from app.db.enums import CostItemStatus
+    from app.db.session import get_session
+    from app.models.material_item import MaterialItem
+    from app.services.audit_log_service import AuditLogService
+    from app.services.excel_ingest_service import ExcelIngestService
+    from app.services.file_record_service import FileRecordService
+    from app.services.name_normalization_service import NameNormalizationService
+
+    db = get_session()
+    ids = seed_project(db, 1)
+    db.commit()
+    audit = AuditLogService(db)
+    ingest = ExcelIngestService(db, audit, NameNormalizationService(db, audit), FileRecordService(db, audit))
+
+    def make_items():
+        return [
+            MaterialItem(
+                id=str(uuid4()), project_id=ids["project_id"], source_file_id=ids["material_cost"],
+                raw_name=f"材料{i % 500}", normalized_name=f"材料{i % 500}", spec=f"S{i % 13}", quantity=Decimal(2),
+                unit="kg", material_grade="Q235", weight_kg=Decimal(1000 + i % 97), unit_price=Decimal("4.5"),
+                subtotal=Decimal("4.5"), status=CostItemStatus.warning, is_calculable=True,
+            )
+            for i in range(args.rows)
+        ]
+
+    def orm_add_all():
+        db.add_all(make_items())
+        db.flush()
+        db.rollback()
+
+    def bulk_insert():
+        ingest._insert_items(make_items())
+        db.rollback()
+
+    print_table(f"{args.rows} material items, {url.split(':', 1)[0]}", [
+        {"path": "orm_add_all", **measure(orm_add_all, args.repeat)},
+        {"path": "bulk_insert", **measure(bulk_insert, args.repeat)},
+    ])
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# benchmarks/bench_item_indexes.py
+"""
+成本 item 表索引：热路径查询在有无索引时的查询计划与耗时。
+
+造 --projects 个项目、每个项目 --versions 版文件（每个文件 --items 条），
+先删除 0007_cost_item_indexes 建立的索引计时，再建回索引计时：
+- file_detail_count：文件详情页按 source_file_id 统计行数
+- file_detail_list：文件详情页按 Excel 行顺序（file_order）读取明细
+- file_detail_rows：按 source_file_id + status 筛选明细（只看 warning / blocked）
+- aggregate_recompute：FileAggregateService.recompute 的分组求和
+- calculable_items：CostCalculationService._get_calculable_items
+- latest_valid_file：FileRecordService.get_latest_valid_file（ix_file_records_latest；没有它时用唯一约束的索引）
+每条路径打印一次查询计划（SQLite 为 EXPLAIN QUERY PLAN，其它数据库为 EXPLAIN）。
+
+用法：python -m benchmarks.bench_item_indexes --projects 40 --versions 3 --items 2000 --repeat 20
+"""
+import argparse
+
+from benchmarks.fixtures import measure, print_table, seed_project, setup_database
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=40)
+    parser.add_argument("--versions", type=int, default=3, help="每个项目的文件版本数")
+    parser.add_argument("--items", type=int, default=2000, help="每个文件的 item 数")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database-url", default=None, help="默认使用临时 SQLite 文件")
+    args = parser.parse_args()
+
+    setup_database(args.database_url)
+
+    from sqlalchemy import event
+
+    from app.db.enums import CostItemStatus, FileType
+    from app.db.session import get_engine, get_session
+    from app.models.file_record import FileRecord
+    from app.models.labor_item import LaborItem
+    from app.models.logistics_item import LogisticsItem
+    from app.models.material_item import MaterialItem
+    from app.models.part_item import PartItem
+    from app.services.audit_log_service import AuditLogService
+    from app.services.cost_calculation_service import CostCalculationService
+    from app.services.file_aggregate_service import FileAggregateService
+    from app.services.file_record_service import FileRecordService
+
+    db = get_session()
+    target = None
+    for _ in range(args.projects):
+        ids = seed_project(db, args.items, version=1)
+        for version in range(2, args.versions + 1):
+            ids = seed_project(db, args.items, version=version, project_id=ids["project_id"])
+        target = target or ids
+    db.commit()
+
+    engine = get_engine()
+    calculation = CostCalculationService(db, AuditLogService(db))
+    aggregates = FileAggregateService(db)
+    files = FileRecordService(db, AuditLogService(db))
+    warning_statuses = [CostItemStatus.warning, CostItemStatus.blocked]
+
+    def run(fn):
+        def wrapped():
+            fn()
+            db.expunge_all()
+        return wrapped
+
+    paths = {
+        "file_detail_count": run(lambda: db.query(MaterialItem).filter(
+            MaterialItem.source_file_id == target["material_cost"]).count()),
+        "file_detail_list": run(lambda: db.query(MaterialItem).filter(
+            MaterialItem.source_file_id == target["material_cost"]).order_by(*MaterialItem.file_order()).all()),
+        "file_detail_rows": run(lambda: db.query(MaterialItem).filter(
+            MaterialItem.source_file_id == target["material_cost"],
+            MaterialItem.status.in_(warning_statuses)).all()),
+        "aggregate_recompute": run(lambda: aggregates.recompute([target["part_cost"]])),
+        "calculable_items": run(lambda: calculation._get_calculable_items(PartItem, target["part_cost"])),
+        "latest_valid_file": run(lambda: files.get_latest_valid_file(
+            project_id=target["project_id"], file_type=FileType.labor_cost)),
+    }
+
+    def capture(fn):
+        '''执行一次 fn，返回它发出的最后一条 SELECT 及参数'''
+        captured = []
+
+        def on_execute(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                captured.append((statement, parameters))
+
+        event.listen(engine, "before_cursor_execute", on_execute)
+        try:
+            fn()
+        finally:
+            event.remove(engine, "before_cursor_execute", on_execute)
+        return captured[-1]
+
+    def plans():
+        prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+        out = {}
+        for name, fn in paths.items():
+            statement, parameters = capture(fn)
+            with engine.connect() as conn:
+                rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+            out[name] = " | ".join(str(row[-1]) for row in rows)
+        return out
+
+    def timings(label):
+        return [{"path": name, "indexes": label, **measure(fn, args.repeat)} for name, fn in paths.items()]
+
+    indexes = [index for model in (MaterialItem, PartItem, LaborItem, LogisticsItem, FileRecord)
+               for index in model.__table__.indexes]
+    with engine.begin() as conn:
+        for index in indexes:
+            index.drop(conn, checkfirst=True)
+    before_plans, before = plans(), timings("none")
+
+    with engine.begin() as conn:
+        for index in indexes:
+            index.create(conn, checkfirst=True)
+    after_plans, after = plans(), timings("0007")
+
+    total_items = args.projects * args.versions * args.items
+    print_table(f"query plans, {total_items} items per table", [
+        {"path": name, "indexes": label, "plan": plan[name]}
+        for name in paths for label, plan in (("none", before_plans), ("0007", after_plans))
+    ])
+    print_table("timings", before + after)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# benchmarks/bench_labor_fees.py
+"""
+人工加工费 / 吨位奖金：逐行 Decimal 与按列数组运算的耗时（不访问数据库）。
+
+- per_row_decimal：报告原先的写法，每行按单位分支做 Decimal 运算
+- labor_fees：共享计算器的单行 Decimal 形式（校验规则使用）
+- labor_fee_columns：共享计算器的列形式，一次 numpy 运算（报告使用）
+并校验三者结果一致（float 比较）。
+
+用法：python -m benchmarks.bench_labor_fees --rows 100000 --repeat 5
+"""
+import argparse
+from decimal import Decimal
+
+from benchmarks.fixtures import measure, print_table
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="人工行数")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from app.services.labor_fees import labor_fee_columns, labor_fees
+
+    quantity = [Decimal(1 + i % 50) / 4 for i in range(args.rows)]
+    unit = ["吨" if i % 3 else "kg" for i in range(args.rows)]
+    price = [Decimal(300 + i % 17) for i in range(args.rows)]
+    rows = list(zip(quantity, unit, price))
+
+    def per_row_decimal():
+        out = []
+        for q, u, p in rows:
+            fee = (q or 0) * (p or 0) if u == "吨" else (q or 0) * (p or 0) * Decimal("0.001")
+            bonus = (q or 0) * 5 if u == "吨" else (q or 0) * Decimal("0.005")
+            out.append((fee, bonus))
+        return out
+
+    def shared_scalar():
+        return [labor_fees(q, u, p) for q, u, p in rows]
+
+    def shared_columns():
+        return labor_fee_columns(quantity, unit, price)
+
+    expected = per_row_decimal()
+    columns = shared_columns()
+    assert shared_scalar() == expected
+    assert all(
+        abs(float(e[0]) - f) < 1e-6 and abs(float(e[1]) - b) < 1e-9
+        for e, f, b in zip(expected, columns.processing_fee.tolist(), columns.ton_bonus.tolist())
+    )
+
+    print_table(f"labor fees, {args.rows} rows", [
+        {"path": "per_row_decimal", **measure(per_row_decimal, args.repeat)},
+        {"path": "labor_fees", **measure(shared_scalar, args.repeat)},
+        {"path": "labor_fee_columns", **measure(shared_columns, args.repeat)},
+    ])
+
+
+if __name__ == "__main__":
+    main()
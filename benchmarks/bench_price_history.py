@@ -0,0 +1,97 @@
+# benchmarks/bench_price_history.py
+"""
+跨项目单价历史：扫描 material_items 与读取 PriceSeries 的查询耗时。
+
+- like_scan：原先的做法，LIKE 扫描全部 material_items（联表筛选已锁定文件），内存中求中位数 / p90
+- price_series：PriceHistoryService.stats，读取一行打包序列并切片求分位数
+- index_file：一个新锁定文件增量并入索引（含价格区间刷新）的耗时（每轮回滚）
+- evaluate_without_bands / evaluate_with_bands：校验一个新材料文件（纯计算，不写库），
+  不启用 / 启用 PRICE_OUT_OF_BAND；差值即按键加载区间 + 逐行查找的开销
+并校验前两者结果一致。
+
+用法：python -m benchmarks.bench_price_history --projects 50 --items 2000 --repeat 20
+"""
+import argparse
+import statistics
+from decimal import Decimal
+
+from benchmarks.fixtures import measure, print_table, seed_project, setup_database
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=50, help="历史项目数")
+    parser.add_argument("--items", type=int, default=2000, help="每个项目的材料行数")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_database()
+
+    from sqlalchemy import select
+    from app.db.session import get_session
+    from app.models.file_record import FileRecord
+    from app.models.material_item import MaterialItem
+    from app.services.audit_log_service import AuditLogService
+    from app.services.price_history_service import INDEXED_STATUSES, PriceHistoryService
+    from app.services.validation_service import ValidationService
+
+    db = get_session()
+    material_files = []
+    for _ in range(args.projects):
+        ids = seed_project(db, args.items)
+        db.get(FileRecord, ids["material_cost"]).locked = True
+        material_files.append(ids["material_cost"])
+    history = PriceHistoryService(db)
+    history.index_files(material_files)
+    db.commit()
+
+    name, spec, grade = "材料7", "S7", "Q235"
+
+    def like_scan():
+        prices = db.scalars(
+            select(MaterialItem.unit_price)
+            .join(FileRecord, FileRecord.id == MaterialItem.source_file_id)
+            .where(
+                FileRecord.locked.is_(True),
+                MaterialItem.status.in_(INDEXED_STATUSES),
+                MaterialItem.normalized_name.like(name),
+                MaterialItem.spec.like(spec),
+                MaterialItem.material_grade.like(grade),
+            )
+        ).all()
+        return len(prices), statistics.median(prices)
+
+    def price_series():
+        stats = history.stats(name, spec, grade, months=None)
+        return stats.count, stats.median
+
+    count, median = like_scan()
+    assert price_series() == (count, Decimal(median).quantize(Decimal("0.00001"))), "PriceSeries differs from item scan"
+
+    extra = seed_project(db, args.items)
+    db.get(FileRecord, extra["material_cost"]).locked = True
+    db.flush()
+
+    def index_file():
+        savepoint = db.begin_nested()
+        history.index_files([extra["material_cost"]])
+        savepoint.rollback()
+
+    validation = ValidationService(db, AuditLogService(db))
+    items = validation._load_items(db.get(FileRecord, extra["material_cost"]))
+    with_bands = validation._resolve_plans(extra["project_id"])
+    without_bands = {model: plan.without({"PRICE_OUT_OF_BAND"}) for model, plan in with_bands.items()}
+
+    print_table(f"price history, {args.projects} projects x {args.items} material rows, {count} points for the key", [
+        {"path": "like_scan", **measure(like_scan, args.repeat)},
+        {"path": "price_series", **measure(price_series, args.repeat)},
+        {"path": "index_file", **measure(index_file, min(args.repeat, 5))},
+        {"path": "evaluate_without_bands", **measure(lambda: validation._evaluate_items(items, without_bands), 5)},
+        {"path": "evaluate_with_bands", **measure(lambda: validation._evaluate_items(items, with_bands), 5)},
+    ])
+    db.rollback()
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# benchmarks/bench_report_export.py
+"""
+成本报告 Excel 导出：DataFrame 路径与流式 write-only 路径的耗时和峰值内存。
+
+- dataframe：generate_df_report + pd.ExcelWriter(openpyxl)（原先的下载实现）
+- streaming：iter_report_rows + write_report_xlsx（写入临时文件）
+并逐个单元格比较两份文件，确认版式一致。两条路径都经 ReportDataLoader 读取数据，
+statements 为数据库往返次数（project / files / 审计记录 / users / items 各一次）。
+
+用法：python -m benchmarks.bench_report_export --items 5000
+（tracemalloc 会显著放慢两条路径，耗时只用于相对比较）
+"""
+import argparse
+import io
+import tempfile
+import time
+import tracemalloc
+from decimal import Decimal
+
+from benchmarks.fixtures import count_queries, print_table, seed_project, setup_database
+
+
+def _profile(fn, engine):
+    tracemalloc.start()
+    start = time.perf_counter()
+    with count_queries(engine) as counter:
+        result = fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {"statements": counter.count, "ms": elapsed, "peak_mb": peak / 1024 / 1024}
+
+
+def _cells(fileobj):
+    import openpyxl
+    fileobj.seek(0)
+    sheet = openpyxl.load_workbook(fileobj, read_only=True).active
+    for row in sheet.iter_rows(values_only=True):
+        # 两种写法对行尾空单元格的处理不同，只比较有内容的部分
+        values = list(row)
+        while values and values[-1] in (None, ""):
+            values.pop()
+        yield [float(v) if isinstance(v, (int, float, Decimal)) and not isinstance(v, bool) else v for v in values]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=5000, help="每个成本文件的 item 数")
+    parser.add_argument("--database-url", default=None, help="默认使用临时 SQLite 文件")
+    args = parser.parse_args()
+
+    setup_database(args.database_url)
+
+    import pandas as pd
+
+    from app.db.session import get_session
+    from app.services.audit_log_service import AuditLogService
+    from app.services.cost_calculation_service import CostCalculationService, REPORT_COLUMN_COUNT
+    from app.services.report_writer import REPORT_SHEET_NAME, write_report_xlsx
+
+    db = get_session()
+    ids = seed_project(db, args.items)
+    service = CostCalculationService(db, AuditLogService(db))
+    summary = service.generate_cost_summary(
+        project_id=ids["project_id"],
+        material_file_id=ids["material_cost"],
+        part_file_id=ids["part_cost"],
+        labor_file_id=ids["labor_cost"],
+        logistics_file_id=ids["logistics_cost"],
+        operator_id=ids["user_id"],
+    )
+    db.commit()
+
+    def dataframe():
+        df = service.generate_df_report(cost_summary=summary, operator_id=ids["user_id"])
+        output = io.BytesIO()
+        with pd.ExcelWriter(output, engine="openpyxl") as writer:
+            df.to_excel(writer, index=False, sheet_name=REPORT_SHEET_NAME)
+        return output
+
+    def streaming():
+        output = tempfile.TemporaryFile()
+        rows = service.iter_report_rows(cost_summary=summary, operator_id=ids["user_id"])
+        write_report_xlsx(rows, output, column_count=REPORT_COLUMN_COUNT)
+        return output
+
+    db.expire_all()
+    old, old_stats = _profile(dataframe, db.get_bind())
+    db.expire_all()
+    new, new_stats = _profile(streaming, db.get_bind())
+
+    mismatches = sum(1 for a, b in zip(_cells(old), _cells(new)) if a != b)
+    assert mismatches == 0, f"{mismatches} rows differ between the two exports"
+    new.close()
+
+    print_table(f"cost report export, {args.items} items per file", [
+        {"path": "dataframe", **old_stats},
+        {"path": "streaming", **new_stats},
+    ])
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
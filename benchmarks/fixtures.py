@@ -0,0 +1,172 @@
+# benchmarks/fixtures.py
+"""
+Benchmark 公共工具：临时 SQLite 库、批量造数、SQL 语句计数、计时。
+
+必须在导入任何 app.* 模块之前调用 setup_database()，
+因为 app.db.session 在第一次 get_engine() 时读取 DATABASE_URL。
+"""
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional
+
+
+def setup_database(url: Optional[str] = None) -> str:
+    '''
+    指定数据库（默认临时 SQLite 文件）并建表
+
+    :param url: DATABASE_URL，None 时使用临时文件
+    :return: 实际使用的 DATABASE_URL
+    '''
+    if url is None:
+        url = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="cost_bench_"), "bench.db")
+    os.environ["DATABASE_URL"] = url
+
+    import app.db.auto_init  # noqa: F401  注册所有模型
+    from app.db.init_db import init_db
+    init_db()
+    return url
+
+
+def _uid() -> str:
+    return str(uuid.uuid4())
+
+
+def seed_project(db, n_items: int, version: int = 1, project_id: Optional[str] = None) -> Dict[str, str]:
+    '''
+    造一个项目（或在已有项目下新增一版文件）：四类成本文件各 n_items 条、全部校验通过
+
+    :param db: Session
+    :param n_items: 每个文件的 item 数
+    :param version: 文件版本号
+    :param project_id: 已有项目ID，None 时新建项目和上传人
+    :return: {"project_id", "user_id", "material_cost", "part_cost", "labor_cost", "logistics_cost"}
+    '''
+    from app.db.enums import CostItemStatus, FileType, LogisticsType, ParseStatus, ValidationStatus
+    from app.models.file_record import FileRecord
+    from app.models.labor_item import LaborItem
+    from app.models.logistics_item import LogisticsItem
+    from app.models.material_item import MaterialItem
+    from app.models.part_item import PartItem
+    from app.models.project import Project
+    from app.models.user import User
+
+    if project_id is None:
+        user = User(id=_uid(), account="bench_" + _uid()[:8], display_name="bench", password_hash="x")
+        project = Project(
+            id=_uid(), raw_name="bench", normalized_name="bench",
+            business_code="B-" + _uid()[:6], contract_code="C-" + _uid()[:6], spec_tags=["bench"],
+        )
+        db.add_all([user, project])
+        db.flush()
+        project_id, user_id = project.id, user.id
+    else:
+        user_id = db.query(FileRecord.uploader_id).filter(FileRecord.project_id == project_id).limit(1).scalar()
+
+    ids = {"project_id": project_id, "user_id": user_id}
+    for file_type in ("material_cost", "part_cost", "labor_cost", "logistics_cost"):
+        file_record = FileRecord(
+            id=_uid(), project_id=project_id, file_type=FileType[file_type],
+            original_name=f"{file_type}_v{version}.xlsx", uploader_id=user_id, version=version,
+            parse_status=ParseStatus.parsed, validation_status=ValidationStatus.ok, locked=False,
+        )
+        db.add(file_record)
+        ids[file_type] = file_record.id
+    db.flush()
+
+    common = dict(project_id=project_id, status=CostItemStatus.ok, is_calculable=True)
+    rows: Dict[type, List[dict]] = {MaterialItem: [], PartItem: [], LaborItem: [], LogisticsItem: []}
+    for i in range(n_items):
+        weight = Decimal(1000 + i % 97)
+        rows[MaterialItem].append(dict(
+            id=_uid(), source_file_id=ids["material_cost"], raw_name=f"材料{i % 500}",
+            normalized_name=f"材料{i % 500}", spec=f"S{i % 13}", material_grade="Q235", supplier=f"供应商{i % 7}",
+            quantity=Decimal(1 + i % 5), unit="kg", weight_kg=weight, unit_price=Decimal("4.5"),
+            subtotal=weight * Decimal("4.5") / 1000, **common,
+        ))
+        rows[PartItem].append(dict(
+            id=_uid(), source_file_id=ids["part_cost"], raw_name=f"配件{i % 300}", normalized_name=f"配件{i % 300}",
+            spec="x", quantity=Decimal(2), unit="件", unit_price=Decimal(10 + i % 3),
+            subtotal=Decimal(2) * (10 + i % 3), **common,
+        ))
+        rows[LaborItem].append(dict(
+            id=_uid(), source_file_id=ids["labor_cost"], raw_group=f"班组{i % 20}", normalized_group=f"班组{i % 20}",
+            work_quantity=Decimal(3), unit="吨", unit_price=Decimal(7), extra_subsidies=Decimal(1),
+            ton_bonus=Decimal(15), subtotal=Decimal(37), **common,
+        ))
+        rows[LogisticsItem].append(dict(
+            id=_uid(), source_file_id=ids["logistics_cost"], type=LogisticsType.TRANSPORT,
+            description=f"运输{i}", subtotal=Decimal("10.50"), **common,
+        ))
+    for model, model_rows in rows.items():
+        db.bulk_insert_mappings(model, model_rows)
+    db.flush()
+
+    # 与 ingest 一样建立 FileCostAggregate 聚合行
+    from app.services.file_aggregate_service import FileAggregateService
+    FileAggregateService(db).rebuild([ids[t] for t in ("material_cost", "part_cost", "labor_cost", "logistics_cost")])
+    db.flush()
+    return ids
+
+
+class QueryCounter:
+    '''统计一段代码在 engine 上执行的 SQL 语句数（即数据库往返次数）'''
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements: List[str] = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self) -> "QueryCounter":
+        from sqlalchemy import event
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        from sqlalchemy import event
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries(engine):
+    counter = QueryCounter(engine)
+    with counter:
+        yield counter
+
+
+def measure(fn: Callable[[], object], repeat: int = 5) -> Dict[str, float]:
+    '''
+    重复执行 fn，返回毫秒级 min / median
+
+    :param fn: 被测函数
+    :param repeat: 次数
+    '''
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"min_ms": min(samples), "median_ms": statistics.median(samples)}
+
+
+def print_table(title: str, rows: List[Dict[str, object]]) -> None:
+    '''把结果按列对齐打印'''
+    print(f"\n== {title} ==")
+    if not rows:
+        return
+    headers = list(rows[0])
+    cells = [[f"{r[h]:.2f}" if isinstance(r[h], float) else str(r[h]) for h in headers] for r in rows]
+    widths = [max(len(h), *(len(c[i]) for c in cells)) for i, h in enumerate(headers)]
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    for c in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(c, widths)))
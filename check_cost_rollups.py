@@ -0,0 +1,48 @@
+# check_cost_rollups.py
+"""
+CostRollup / ProjectCostRollup 一致性检查：从 CostSummary 重新计算跨项目汇总并报告偏差
+⚠️ 仅用于开发 / 手动维护
+
+用法：
+    python check_cost_rollups.py            # 检查
+    python check_cost_rollups.py --repair   # 有偏差时从 CostSummary 重建全部汇总行
+退出码：无偏差 0，有偏差（且未修复）1
+"""
+import argparse
+import sys
+
+from app.db.session import get_session
+from app.services.cost_rollup_service import CostRollupService
+
+
+def check_cost_rollups(repair: bool = False) -> int:
+    db = get_session()
+    try:
+        drifts = CostRollupService(db).check_consistency(repair=repair)
+        for drift in drifts:
+            key, month, status = drift.key
+            print(f"⚠️ {drift.table}: {key!r} month={month} status={status.value}")
+            print(f"    stored={drift.stored}")
+            print(f"    actual={drift.actual}")
+
+        if not drifts:
+            print("✅ 成本汇总表与 CostSummary 一致")
+            return 0
+        if repair:
+            db.commit()
+            print(f"🔧 已重建汇总行（{len(drifts)} 处偏差）")
+            return 0
+        print(f"❌ {len(drifts)} 个汇总行与 CostSummary 不一致（--repair 可修复）")
+        return 1
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check CostRollup against CostSummaries")
+    parser.add_argument("--repair", action="store_true", help="从 CostSummary 重建汇总行")
+    args = parser.parse_args()
+    sys.exit(check_cost_rollups(args.repair))
@@ -0,0 +1,49 @@
+# check_file_aggregates.py
+"""
+FileCostAggregate 一致性检查：从 items 重新计算每个聚合行并报告偏差
+⚠️ 仅用于开发 / 手动维护
+
+用法：
+    python check_file_aggregates.py                 # 检查全部
+    python check_file_aggregates.py --project <id>  # 只检查一个项目
+    python check_file_aggregates.py --repair        # 用重新计算的值修复偏差
+退出码：无偏差 0，有偏差（且未修复）1
+"""
+import argparse
+import sys
+
+from app.db.session import get_session
+from app.services.file_aggregate_service import FileAggregateService
+
+
+def check_file_aggregates(project_id: str = None, repair: bool = False) -> int:
+    db = get_session()
+    try:
+        drifts = FileAggregateService(db).check_consistency(project_id=project_id, repair=repair)
+        for drift in drifts:
+            print(f"⚠️ file={drift.file_id} project={drift.project_id}")
+            for name in drift.fields:
+                print(f"    {name}: stored={getattr(drift.stored, name)} actual={getattr(drift.actual, name)}")
+
+        if not drifts:
+            print("✅ FileCostAggregate 与 items 一致")
+            return 0
+        if repair:
+            db.commit()
+            print(f"🔧 已修复 {len(drifts)} 个文件的聚合行")
+            return 0
+        print(f"❌ {len(drifts)} 个文件的聚合行与 items 不一致（--repair 可修复）")
+        return 1
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check FileCostAggregate against cost items")
+    parser.add_argument("--project", default=None, help="只检查该项目ID")
+    parser.add_argument("--repair", action="store_true", help="修复有偏差的聚合行")
+    args = parser.parse_args()
+    sys.exit(check_file_aggregates(args.project, args.repair))
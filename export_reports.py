@@ -0,0 +1,56 @@
+# export_reports.py
+"""
+批量导出多个项目的最新成本报告（月末财务导出）
+每个项目导出其最新的 ACTIVE CostSummary（不重新计算），打包为 zip（xlsx + manifest.json）
+
+用法：
+    python export_reports.py -o 成本报告.zip                      # 全部项目
+    python export_reports.py -o out.zip --search 2024             # 项目名 / 编号 / 合同号包含 2024
+    python export_reports.py -o out.zip --project <id> --project <id>
+    python export_reports.py -o out.zip --workers 8
+退出码：全部成功 0，有项目导出失败 1，没有可导出的项目 2
+"""
+import argparse
+import sys
+
+from app.db.session import get_session
+from app.services.batch_report_export import (
+    DEFAULT_EXPORT_WORKERS,
+    BatchExportProgress,
+    export_reports_zip,
+    select_export_targets,
+)
+
+
+def export_reports(output: str, project_ids=None, search: str = None, workers: int = DEFAULT_EXPORT_WORKERS) -> int:
+    db = get_session()
+    try:
+        targets = select_export_targets(db, project_ids=project_ids, search=search)
+    finally:
+        db.close()
+
+    if not targets:
+        print("⚠️ 没有符合条件且已生成成本报告的项目")
+        return 2
+
+    def progress(state: BatchExportProgress) -> None:
+        print(f"[{state.done}/{state.total}] {state.current}")
+
+    with open(output, "wb") as fileobj:
+        results = export_reports_zip(targets, fileobj, workers=workers, progress=progress)
+
+    failed = [r for r in results if not r.ok]
+    for r in failed:
+        print(f"❌ {r.project_name} ({r.project_id}): {r.error}")
+    print(f"✅ 已导出 {len(results) - len(failed)} / {len(results)} 个项目 -> {output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the latest cost report of many projects into one zip")
+    parser.add_argument("-o", "--output", required=True, help="zip 输出路径")
+    parser.add_argument("--project", action="append", default=None, help="只导出该项目ID（可重复）")
+    parser.add_argument("--search", default=None, help="项目名 / 项目编号 / 合同编号包含该文本")
+    parser.add_argument("--workers", type=int, default=DEFAULT_EXPORT_WORKERS, help="渲染进程数")
+    args = parser.parse_args()
+    sys.exit(export_reports(args.output, args.project, args.search, args.workers))
@@ -0,0 +1,78 @@
+# price_history.py
+"""
+跨项目材料 / 配件单价历史（PriceSeries / PriceBand）：重建索引 / 查询某个键的历史单价和价格区间
+索引在核价锁定文件时增量更新，已有的锁定文件由升级步骤 0006 回填；--rebuild 用于修复
+
+用法：
+    python price_history.py --rebuild
+    python price_history.py --name 钢板 --spec 10mm --grade Q235            # 最近 12 个月
+    python price_history.py --name 钢板 --spec 10mm --grade Q235 --months 36
+    python price_history.py --part --name 螺栓 --spec M12
+退出码：成功 0，没有历史数据 1
+"""
+import argparse
+import sys
+
+from app.db.session import get_session
+from app.models.material_item import MaterialItem
+from app.models.part_item import PartItem
+from app.services.price_history_service import DEFAULT_MONTHS, PriceHistoryService
+
+
+def rebuild_price_history() -> int:
+    db = get_session()
+    try:
+        points = PriceHistoryService(db).rebuild()
+        db.commit()
+        print(f"✅ 价格历史已重建，共 {points} 个单价点")
+        return 0
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def show_price_history(
+    name: str,
+    spec: str = None,
+    grade: str = None,
+    months: int = DEFAULT_MONTHS,
+    model: type = MaterialItem,
+) -> int:
+    db = get_session()
+    try:
+        history = PriceHistoryService(db)
+        stats = history.stats(name, spec, grade, months=months or None, item_type=model.__name__)
+        label_fields = (name, spec, grade)[:2 if model is PartItem else 3]
+        band = history.bands(model, [label_fields]).get(label_fields)
+    finally:
+        db.close()
+
+    label = " / ".join(v or "-" for v in (name, spec, grade))
+    if stats is None:
+        print(f"⚠️ 没有 {label} 的历史单价")
+        return 1
+    print(f"{label}：{stats.count} 个单价点"
+          f"（{stats.first_observed_at:%Y-%m-%d} ~ {stats.last_observed_at:%Y-%m-%d}）")
+    print(f"    中位数={stats.median} p90={stats.p90} 最低={stats.min} 最高={stats.max}")
+    if band is not None:
+        print(f"    价格区间（最近 {band.point_count} 个单价）: "
+              f"[{band.lower}, {band.upper}]")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild or query the cross-project unit-price history")
+    parser.add_argument("--rebuild", action="store_true", help="从全部已锁定文件重建索引")
+    parser.add_argument("--name", default=None, help="材料名称（normalized_name）")
+    parser.add_argument("--spec", default=None, help="规格")
+    parser.add_argument("--grade", default=None, help="材质")
+    parser.add_argument("--months", type=int, default=DEFAULT_MONTHS, help="最近 N 个月，0 表示全部历史")
+    parser.add_argument("--part", action="store_true", help="查询配件（默认材料）")
+    args = parser.parse_args()
+    if args.rebuild:
+        sys.exit(rebuild_price_history())
+    if not args.name:
+        parser.error("--name or --rebuild is required")
+    sys.exit(show_price_history(args.name, args.spec, args.grade, args.months, PartItem if args.part else MaterialItem))
@@ -8,6 +8,7 @@ run.py 是标准 Flask 服务启动脚本（给开发者 / 运维 / CLI 用）
 import os
 import sys
 from flask import request
+from sqlalchemy.engine import make_url
 from app.app_factory import create_app
 from app.db.auto_init import auto_init
 
@@ -26,7 +27,13 @@ def get_app_base_dir():
 def configure_database():
     """
     强制指定数据库为：程序根目录下的 cost_sys.db
+    已通过 DATABASE_URL 指定 PostgreSQL 等服务端数据库时保留该配置（多用户部署）
     """
+    db_url = os.environ.get("DATABASE_URL", "")
+    if db_url and not db_url.startswith("sqlite"):
+        print(f"📦 Using database: {make_url(db_url).render_as_string(hide_password=True)}")
+        return
+
     base_dir = get_app_base_dir()
     db_path = os.path.join(base_dir, "cost_sys.db")
     os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"#锁死数据库路径，防止打包后路径错乱
@@ -70,6 +70,7 @@ if not os.path.exists(DB_PATH):
 # ===== 在 import run 之前，锁死数据库路径 =====
 # 这一步非常关键，必须在任何可能导入数据库的模块之前执行,如run.py
 os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("DATABASE_PROFILE", config.get("database", "profile", fallback="tuned"))
 
 # ===== 端口占用 =====
 if is_port_in_use("127.0.0.1", PORT):